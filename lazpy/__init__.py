@@ -49,12 +49,18 @@ from .headers import (header_formats, format_size,  # noqa: F401
                       unpack_format, pack_format, EXTRA_BYTES_ATTRIBUTE_SIZE)
 from .extra_bytes import (ExtraBytesAttribute,  # noqa: F401
                           extra_bytes_record)
-from .reader import Reader, ExtendedVariableLengthRecord  # noqa: F401
+from .reader import (Reader, ExtendedVariableLengthRecord,  # noqa: F401
+                     QueryPlan, Raster, Statistics,
+                     FieldStatistics, CountEstimate, ChunkSummary,
+                     Chunk)
 from .writer import (Writer, auto_offsets,  # noqa: F401
                      append_spatial_index)
+from .ranges import RangeFile, HTTPRangeReader  # noqa: F401
 
 __all__ = ["Reader", "Writer", "Point", "Chunking", "Compressor", "Coder",
            "ItemType", "Selective", "LazError", "UnsupportedFileError",
-           "ExtendedVariableLengthRecord", "ExtraBytesAttribute",
+           "ExtendedVariableLengthRecord", "QueryPlan", "Raster",
+           "Statistics", "FieldStatistics", "CountEstimate", "ChunkSummary",
+           "Chunk", "ExtraBytesAttribute",
            "extra_bytes_record", "crs_record", "read_crs", "auto_offsets",
-           "append_spatial_index"]
+           "append_spatial_index", "RangeFile", "HTTPRangeReader"]
@@ -0,0 +1,248 @@
+"""Reading from asyncio: :class:`AsyncReader`.
+
+A :class:`~lazpy.Reader` call decodes in C with the GIL released, so an event
+loop can have it done on a thread and go on serving while it runs. What
+``loop.run_in_executor(None, reader.arrays_within, ...)`` cannot do is stop
+it: cancelling the task that awaits it leaves the thread decoding to the end
+of the query, holding its memory, for an answer no one will take. And a
+server that hands out a file in blocks has nothing to stop it decoding the
+whole file ahead of a client that reads one block a second.
+
+:class:`AsyncReader` awaits the same calls, run on a pool of threads of its
+own through the cursors a shared reader hands each thread, and passes a
+cancel on to the decoder, which stops where the next point would open a
+chunk::
+
+    async with await AsyncReader.open("cloud.laz") as reader:
+        a = await reader.arrays_within("X", "Y", "Z", rect=rect)
+        async for block in reader.aiter_arrays("X", "Y", block=100_000):
+            await send(block)
+
+:meth:`AsyncReader.aiter_arrays` decodes no more than *ahead* blocks past
+the one its consumer has, so a slow consumer holds the decoding back.
+"""
+
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from .reader import Reader
+
+
+class _Job:
+    """One call on the pool, and the point reader it decodes through while
+    it runs, for cancelling it from the event loop's thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._points = None
+
+    def cancel(self):
+        """Stop the call: before it starts, or at the next chunk."""
+        with self._lock:
+            self._cancelled = True
+            if self._points is not None:
+                self._points.cancel()
+
+    def run(self, reader, call):
+        """Make *call* on a cursor of this thread's own, which a cancel
+        reaches for as long as it runs."""
+        with reader._cursor():
+            points = reader._points()
+            with self._lock:
+                if self._cancelled:
+                    return None
+                points.cancel(False)
+                self._points = points
+            try:
+                return call()
+            finally:
+                # taken back under the lock, so that no cancel lands on the
+                # point reader once the next call has it
+                with self._lock:
+                    self._points = None
+                    points.cancel(False)
+
+
+class AsyncReader:
+    """A :class:`~lazpy.Reader`'s queries, awaited.
+
+    Wraps an open reader, whose calls each run on one of *threads* threads
+    of this object's own; ``reader`` is that reader, for its header and
+    anything else that reads nothing. As many calls as there are threads
+    decode at once, each through a cursor of its own on the file, so the
+    reader wants to have been opened by name or from a range reader: a file
+    object's calls take turns on its one handle.
+
+    Cancelling the task that awaits a call stops its decoding where the next
+    point would open a chunk, or within 50,000 points of a file without
+    chunks, and the thread goes on to the next call.
+    """
+
+    def __init__(self, reader, threads=4):
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+        self.reader = reader
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix='lazpy')
+        self._owns_reader = False
+
+    @classmethod
+    async def open(cls, source, threads=4, decompress_selective=None):
+        """An AsyncReader over a :class:`~lazpy.Reader` of *source*, opened
+        on the pool rather than on the event loop -- opening reads the
+        header and records, and for a range reader fetches them. The reader
+        is closed with this object."""
+        self = cls(None, threads)
+        try:
+            self.reader = await asyncio.get_running_loop().run_in_executor(
+                self._pool, Reader, source, decompress_selective)
+        except BaseException:
+            self._pool.shutdown(wait=False)
+            raise
+        self._owns_reader = True
+        return self
+
+    async def close(self):
+        """Wait for the calls under way, then let the threads go, and close
+        the reader if :meth:`open` opened it."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._pool.shutdown)
+        if self._owns_reader:
+            self.reader.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    def _start(self, call):
+        job = _Job()
+        future = asyncio.get_running_loop().run_in_executor(
+            self._pool, job.run, self.reader, call)
+        return job, future
+
+    @staticmethod
+    async def _finish(started):
+        job, future = started
+        try:
+            return await future
+        except asyncio.CancelledError:
+            job.cancel()
+            _unheeded(future)
+            raise
+
+    async def _run(self, call):
+        return await self._finish(self._start(call))
+
+    async def arrays(self, *names, start=0, count=None):
+        """:meth:`Reader.arrays <lazpy.Reader.arrays>`, from *start* -- the
+        first point unless given."""
+        return await self._run(lambda: self.reader.arrays(
+            *names, start=start, count=count))
+
+    async def arrays_within(self, *names, rect=None, circle=None, box=None):
+        """:meth:`Reader.arrays_within <lazpy.Reader.arrays_within>`."""
+        return await self._run(lambda: self.reader.arrays_within(
+            *names, rect=rect, circle=circle, box=box))
+
+    async def arrays_between(self, t0, t1, *names):
+        """:meth:`Reader.arrays_between <lazpy.Reader.arrays_between>`."""
+        return await self._run(lambda: self.reader.arrays_between(
+            t0, t1, *names))
+
+    async def xyz_within(self, rect=None, circle=None, box=None):
+        """:meth:`Reader.xyz_within <lazpy.Reader.xyz_within>`."""
+        return await self._run(lambda: self.reader.xyz_within(
+            rect=rect, circle=circle, box=box))
+
+    async def grid(self, cell_size, stat="max_z", **kwargs):
+        """:meth:`Reader.grid <lazpy.Reader.grid>`."""
+        return await self._run(lambda: self.reader.grid(
+            cell_size, stat, **kwargs))
+
+    async def statistics(self, *names):
+        """:meth:`Reader.statistics <lazpy.Reader.statistics>`, on one of
+        this object's threads."""
+        return await self._run(lambda: self.reader.statistics(*names))
+
+    async def aiter_arrays(self, *names, block=1 << 20, start=0, stop=None,
+                           rect=None, circle=None, box=None, ahead=1):
+        """The points from *start* to *stop* as :meth:`Reader.arrays
+        <lazpy.Reader.arrays>` blocks of *block* points, in file order::
+
+            async for a in reader.aiter_arrays("X", "Y", block=100_000):
+                ...
+
+        With ``rect``, ``circle`` or ``box``, only the points inside the
+        area, as :meth:`arrays_within` finds them, of those from *start* to
+        *stop*: the blocks are of the
+        candidates the query looks through, and hold what of each was
+        inside, so may be smaller than *block* -- a block with nothing
+        inside is not handed out at all.
+
+        *ahead* blocks past the one last handed out are decoded meanwhile,
+        on as many threads, and no more: a consumer slower than the decoding
+        holds it back rather than have the blocks pile up. 0 decodes each
+        block only once the consumer asks for it. Leaving the loop early
+        cancels what was decoding ahead.
+        """
+        if block < 1:
+            raise ValueError("a block is of one point or more")
+        if ahead < 0:
+            raise ValueError("ahead is 0 blocks or more")
+        reader = self.reader
+        if stop is None:
+            stop = reader.num_points
+        area = rect is not None or circle is not None or box is not None
+        if area:
+            # the index is looked for and read here, off the event loop
+            region, spans = await self._run(lambda: reader._region(
+                rect=rect, circle=circle, box=box))
+            spans = [(max(first, start), min(last, stop))
+                     for first, last in spans]
+        else:
+            spans = [(start, stop)]
+        pieces = [(first, min(first + block, end)) for begin, end in spans
+                  for first in range(begin, end, block)]
+
+        def decode(first, last):
+            if not area:
+                return reader.arrays(*names, start=first, count=last - first)
+            with reader._reading([(first, last)]):
+                return reader._within_block(names, region, first, last)
+
+        pending = collections.deque()
+        try:
+            for first, last in pieces:
+                pending.append(self._start(
+                    lambda first=first, last=last: decode(first, last)))
+                if len(pending) <= ahead:
+                    continue
+                found = await self._finish(pending.popleft())
+                if not area or _num_rows(found):
+                    yield found
+            while pending:
+                found = await self._finish(pending.popleft())
+                if not area or _num_rows(found):
+                    yield found
+        finally:
+            for job, future in pending:
+                job.cancel()
+                future.cancel()
+                _unheeded(future)
+
+
+def _unheeded(future):
+    """Take whatever a call no one awaits any more ends with -- a
+    cancelled decoder's LazError, as often as not -- so that asyncio does
+    not log it as an exception never retrieved."""
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+
+def _num_rows(columns):
+    """How many points a block of columns holds."""
+    return len(next(iter(columns.values()))) if columns else 0
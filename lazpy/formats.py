@@ -27,6 +27,10 @@ EXTRA_BYTES_VLR_KEY = (b"LASF_Spec", 4)
 # EVLR" fields do.
 LASINDEX_EVLR_KEY = (b"LAStools", 30)
 
+# The extended record a Writer given chunk_stats=True leaves behind the point
+# block: what each chunk holds, which Reader.chunk_summaries reads back.
+CHUNK_SUMMARY_EVLR_KEY = (b"lazpy", 1)
+
 # Where a file states its coordinate reference system: the GeoTIFF
 # GeoKeyDirectory, and the OGC WKT string LAS 1.4 uses in its place for the
 # extended point formats. lazpy.crs reads and builds both.
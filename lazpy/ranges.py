@@ -0,0 +1,250 @@
+"""Files read a range of bytes at a time: object storage, HTTP, anything that
+answers ``read_range(offset, length)``.
+
+A reader wants a seekable file, and asks it for little and often: the header,
+each variable length record, the chunk table at the far end, then the points
+64 KiB at a time. Each of those is a round trip to a store that charges by
+the request and answers in tens of milliseconds, and reading a small area out
+of a large file that way costs more than the points it finds.
+
+:class:`RangeFile` stands between the two. It is the seekable file the reader
+wants, over a *range reader* -- an object with two methods::
+
+    read_range(offset, length) -> bytes   # exactly length bytes
+    size() -> int                         # how long the object is
+
+It fetches whole blocks rather than what each call asks for, holds the most
+recently used of them, and fetches a run of blocks a read needs and does not
+hold as one range rather than a range each. So the header and records come
+in one request, the chunk table in one more, and each chunk a query decodes
+in one or two; nothing the query does not reach is fetched at all.
+
+A range reader may also have ``sidecar(extension)``, returning a range reader
+over the file of the same name with *extension* in place of its own, or None.
+That is how a reader finds a ``.lax`` index beside a file it cannot list the
+directory of. :class:`HTTPRangeReader` is one for a URL, over nothing but
+the standard library; wrapping an object store's client in the same two
+methods is a few lines.
+"""
+
+import collections
+import io
+import posixpath
+import urllib.parse
+import urllib.request
+
+
+class RangeFile(io.RawIOBase):
+    """A seekable, read-only binary file over a range reader, with a cache of
+    the blocks it fetched.
+
+    :class:`~lazpy.Reader` makes one for a range reader it is given, so this
+    class is only needed for a cache of a different size, or to look at what
+    was fetched: :attr:`requests` and :attr:`bytes_fetched` count what went
+    to the range reader.
+
+    *block_size* is how much is fetched at a time, and *cache_blocks* how
+    many blocks are kept, the least recently used dropped first. The default
+    holds 16 MiB: a chunk of 50,000 points is about 1 MiB compressed, so a
+    query that goes back over chunks it read finds them there.
+    """
+
+    BLOCK_SIZE = 256 * 1024
+    CACHE_BLOCKS = 64
+
+    def __init__(self, source, block_size=None, cache_blocks=None):
+        super().__init__()
+        # first, since close() runs on one whose arguments were refused too
+        self._blocks = collections.OrderedDict()
+        block_size = self.BLOCK_SIZE if block_size is None else block_size
+        cache_blocks = (self.CACHE_BLOCKS if cache_blocks is None
+                        else cache_blocks)
+        if block_size < 1:
+            raise ValueError("a block is of one byte or more")
+        if cache_blocks < 1:
+            raise ValueError("the cache holds one block or more")
+        self.source = source
+        self.block_size = int(block_size)
+        self.cache_blocks = int(cache_blocks)
+        self._size = int(source.size())
+        self._pos = 0
+        #: How many times the range reader was asked for bytes.
+        self.requests = 0
+        #: How many bytes it handed back, over all of them.
+        self.bytes_fetched = 0
+
+    @property
+    def name(self):
+        """The range reader's name, if it has one: a URL, say."""
+        return getattr(self.source, 'name', None)
+
+    def readable(self):
+        """True: a range reader is read."""
+        return True
+
+    def seekable(self):
+        """True: any range can be asked for."""
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Move to *offset*, as a file does. Fetches nothing."""
+        if self.closed:
+            raise ValueError("seek of closed file")
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        """Where the next read begins."""
+        if self.closed:
+            raise ValueError("tell of closed file")
+        return self._pos
+
+    def readinto(self, b):
+        """Fill *b* from the blocks it covers, fetching those not held."""
+        if self.closed:
+            raise ValueError("read of closed file")
+        out = memoryview(b).cast('B')
+        n = min(len(out), self._size - self._pos)
+        if n <= 0:
+            return 0
+        size = self.block_size
+        first, last = self._pos // size, (self._pos + n - 1) // size
+        self._fetch(first, last)
+        done = 0
+        for k in range(first, last + 1):
+            block = self._blocks[k]
+            self._blocks.move_to_end(k)
+            at = self._pos + done - k * size
+            take = min(len(block) - at, n - done)
+            out[done:done + take] = block[at:at + take]
+            done += take
+        self._pos += n
+        # only now, so that a read of more blocks than are kept still finds
+        # all of them until it has them
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+        return n
+
+    def _fetch(self, first, last):
+        """Has blocks *first* to *last* held, fetching each run of them that
+        is not as one range."""
+        size = self.block_size
+        k = first
+        while k <= last:
+            if k in self._blocks:
+                k += 1
+                continue
+            end = k
+            while end < last and end + 1 not in self._blocks:
+                end += 1
+            start = k * size
+            data = self._read_range(start,
+                                    min((end + 1) * size, self._size) - start)
+            for j in range(k, end + 1):
+                self._blocks[j] = data[(j - k) * size:(j - k + 1) * size]
+            k = end + 1
+
+    def size(self):
+        """How long the file is, as the range reader said when this was
+        made."""
+        return self._size
+
+    def read_at(self, offset, length):
+        """*length* bytes from *offset*, or as many as there are, fetched as
+        one range past the cache and without moving the file.
+
+        For whoever reads beside the decoder rather than through it -- an
+        extended record's payload, a query's chunks read up front, another
+        thread -- which would otherwise have to seek the file out from under
+        it and back. The blocks held are not looked at: what is read this way
+        is read once, and would only push out what decoding goes back to.
+        """
+        if self.closed:
+            raise ValueError("read of closed file")
+        length = min(length, self._size - offset)
+        if length <= 0:
+            return b''
+        return self._read_range(offset, length)
+
+    def _read_range(self, offset, length):
+        data = self.source.read_range(offset, length)
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        if len(data) != length:
+            raise OSError(f"asked for {length} bytes at {offset}, the range "
+                          f"reader returned {len(data)}")
+        return bytes(data)
+
+    def close(self):
+        """Drop the cache. The range reader is the caller's, and is left
+        as it is."""
+        self._blocks.clear()
+        super().close()
+
+
+class HTTPRangeReader:
+    """A range reader over a URL, from a server that honours ``Range``
+    headers -- as object stores and most static file servers do.
+
+    Each range is one GET. The size is asked for once, by a request for the
+    first byte, which also finds out whether the server serves ranges at
+    all: one that answers with the whole object raises OSError rather than
+    leave every later read to download it again. *headers* go with every
+    request, for whatever authorisation the server wants.
+    """
+
+    def __init__(self, url, headers=None, timeout=30.0):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self._size = None
+
+    @property
+    def name(self):
+        """The URL."""
+        return self.url
+
+    def _get(self, first, last):
+        request = urllib.request.Request(
+            self.url, headers={**self.headers,
+                               'Range': f'bytes={first}-{last}'})
+        response = urllib.request.urlopen(request, timeout=self.timeout)
+        with response:
+            if response.status != 206:
+                raise OSError(f"{self.url} does not serve byte ranges")
+            return response.headers.get('Content-Range'), response.read()
+
+    def size(self):
+        """How long the object is, from the server's ``Content-Range``."""
+        if self._size is None:
+            content_range, _ = self._get(0, 0)
+            try:
+                self._size = int(content_range.rpartition('/')[2])
+            except (AttributeError, ValueError):
+                raise OSError(f"{self.url} gave no length for its "
+                              "ranges") from None
+        return self._size
+
+    def read_range(self, offset, length):
+        """*length* bytes from *offset*."""
+        if length <= 0:
+            return b''
+        _, data = self._get(offset, offset + length - 1)
+        return data
+
+    def sidecar(self, extension):
+        """The same URL with *extension* in place of the file's own."""
+        parts = urllib.parse.urlsplit(self.url)
+        path = posixpath.splitext(parts.path)[0] + extension
+        return HTTPRangeReader(urllib.parse.urlunsplit(parts._replace(
+            path=path)), self.headers, self.timeout)
@@ -1,12 +1,23 @@
 """The reading front end: :class:`Reader` and what only it needs."""
 
+from array import array
+import bisect
 from collections import namedtuple
 from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import functools
 import io
+import math
+import operator
 import os
+import struct
+import threading
 
-from ._cpylaz import PointReader, SpatialIndex, LazError, POINT_LAYOUT
-from .formats import (LASINDEX_EVLR_KEY, Compressor, Coder,
+from ._cpylaz import (ArithmeticEncoder, IntegerCompressor, PointReader,
+                      SpatialIndex, LazError, POINT_LAYOUT, grid_add)
+from .formats import (CHUNK_SUMMARY_EVLR_KEY, LASINDEX_EVLR_KEY,
+                      Compressor, Coder,
                       Chunking, Selective, UnsupportedFileError,
                       items_for_point_format, _point_format)
 from .headers import (EVLR_HEADER_FORMAT, EVLR_HEADER_SIZE, keeping_position,
@@ -14,6 +25,7 @@ from .headers import (EVLR_HEADER_FORMAT, EVLR_HEADER_SIZE, keeping_position,
                       _read_las_header, _find_laz_header)
 from .compat import _compatibility_layout, _upgrade_to_las_14
 from .crs import read_crs
+from .ranges import RangeFile
 
 # ---------------------------------------------------------------------------
 # The array API.
@@ -48,6 +60,9 @@ from .crs import read_crs
 # the one width C states rather than a numpy dtype implying it
 _WAVEPACKET_WIDTH = POINT_LAYOUT['wave_packet'][1]
 
+# how much of a decoded point there is, ahead of its extra bytes
+_POINT_EXTENT = POINT_LAYOUT['__extent__']
+
 _Field = namedtuple("_Field", "offset dtype width shift mask",
                     defaults=(1, 0, None))
 
@@ -176,11 +191,211 @@ def _array_field(name, num_extra_bytes):
 # either.
 _RUN_GAP = 1000
 
+# Which point a voxel keeps of those that fall in it, for
+# Reader.voxel_downsample: the first, the first moved to the mean of them
+# all, or the lowest or the highest.
+_VOXEL_KEEPS = ("first", "centroid", "lowest", "highest")
+
+# What Reader.grid can say of a cell's points, and which of grid_add's totals
+# each needs beyond the count.
+_GRID_OPS = {'min': ('low',), 'max': ('high',), 'mean': ('total',),
+             'idw': ('weights', 'weighted')}
+
 # What Reader.crs holds before it has been asked for, since None is the answer
 # for a file that names no projection, and that answer is worth caching too.
 _UNPARSED = object()
 
 
+def _spans_of(chunks):
+    """The points of some :class:`ChunkSummary`, in file order, as
+    ``(start, stop)`` spans joined where one chunk follows another."""
+    spans = []
+    for chunk in chunks:
+        stop = chunk.start + chunk.count
+        if spans and spans[-1][1] == chunk.start:
+            spans[-1] = (spans[-1][0], stop)
+        else:
+            spans.append((chunk.start, stop))
+    return spans
+
+
+def _overlap(spans, others):
+    """The points two lists of sorted ``(start, stop)`` spans share."""
+    shared = []
+    i = j = 0
+    while i < len(spans) and j < len(others):
+        start = max(spans[i][0], others[j][0])
+        stop = min(spans[i][1], others[j][1])
+        if start < stop:
+            shared.append((start, stop))
+        if spans[i][1] < others[j][1]:
+            i += 1
+        else:
+            j += 1
+    return shared
+
+
+def _reframed(band, old, new):
+    """A raster band over the cells *old*, as one over the cells *new*
+    instead: zero where *old* had none, and cut where *new* is smaller.
+
+    Cells are ``(first_x, first_y, rows, cols)``, in multiples of the cell
+    size, and a band is flat with its first row the northernmost, as
+    grid_add fills it.
+    """
+    np = _numpy()
+    ox, oy, orows, ocols = old
+    nx, ny, nrows, ncols = new
+    out = np.zeros((nrows, ncols), dtype=band.dtype)
+    x0, x1 = max(ox, nx), min(ox + ocols, nx + ncols)
+    y0, y1 = max(oy, ny), min(oy + orows, ny + nrows)
+    if x0 < x1 and y0 < y1:
+        out[ny + nrows - y1:ny + nrows - y0, x0 - nx:x1 - nx] = \
+            band.reshape(orows, ocols)[oy + orows - y1:oy + orows - y0,
+                                       x0 - ox:x1 - ox]
+    return out.ravel()
+
+
+def _coalesced(ranges, gap):
+    """Byte ranges, sorted, joined where they overlap or lie no more than
+    *gap* apart: the gap is read through rather than sought over."""
+    joined = []
+    for start, stop in sorted(ranges):
+        if joined and start - joined[-1][1] <= gap:
+            joined[-1] = (joined[-1][0], max(joined[-1][1], stop))
+        else:
+            joined.append((start, stop))
+    return joined
+
+
+def _read_range(fp, start, stop):
+    """The bytes from *start* to *stop* of a file object, or as many as
+    there are, read however many calls it takes."""
+    fp.seek(start)
+    parts = []
+    while start < stop:
+        data = fp.read(stop - start)
+        if not data:
+            break
+        parts.append(data)
+        start += len(data)
+    return parts[0] if len(parts) == 1 else b''.join(parts)
+
+
+def _pread_range(fd, start, stop):
+    """What :func:`_read_range` reads, from a descriptor, without moving
+    anything's position."""
+    parts = []
+    while start < stop:
+        data = os.pread(fd, min(stop - start, 1 << 30), start)
+        if not data:
+            break
+        parts.append(data)
+        start += len(data)
+    return parts[0] if len(parts) == 1 else b''.join(parts)
+
+
+def _read_at(fp, start, stop):
+    """What :func:`_read_range` reads, without moving *fp*.
+
+    For reading beside a point reader that decodes through *fp*, from a
+    thread that may not be the one decoding: seeking the file and back would
+    move it out from under the other. A :class:`RangeFile` fetches the range
+    itself, and a file with a descriptor is read with ``pread``; anything
+    else can only be read and put back, and is as safe as that.
+    """
+    if isinstance(fp, RangeFile):
+        return fp.read_at(start, stop - start)
+    if hasattr(os, 'pread'):
+        try:
+            fd = fp.fileno()
+        except (AttributeError, OSError, ValueError):
+            pass
+        else:
+            return _pread_range(fd, start, stop)
+    with keeping_position(fp):
+        return _read_range(fp, start, stop)
+
+
+class _PreadFile(io.RawIOBase):
+    """A file of its own over another's descriptor: a position that is this
+    object's, and reads with ``pread`` from there.
+
+    What a thread decodes through when it is not the one that opened the
+    reader. The descriptor is asked of the reader's file at every read rather
+    than kept, so once that file is closed this one's reads fail as a closed
+    file's do, and never reach whatever the number is given to next.
+    """
+
+    def __init__(self, fp):
+        super().__init__()
+        self._fp = fp
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += os.fstat(self._fp.fileno()).st_size
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"invalid whence ({whence})")
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._pos = offset
+        return offset
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, b):
+        fd = self._fp.fileno()
+        if hasattr(os, 'preadv'):
+            n = os.preadv(fd, [b], self._pos)
+        else:
+            data = os.pread(fd, len(b), self._pos)
+            n = len(data)
+            memoryview(b).cast('B')[:n] = data
+        self._pos += n
+        return n
+
+
+def _on_a_cursor(method):
+    """Runs *method* on a cursor of the calling thread's own, for the
+    reader's methods that say where to read and can be called from several
+    threads at once; see :meth:`Reader._cursor`."""
+    @functools.wraps(method)
+    def on_a_cursor(self, *args, **kwargs):
+        with self._cursor():
+            return method(self, *args, **kwargs)
+    return on_a_cursor
+
+
+def _sidecar_for(path, dims=2):
+    """The ``.lax`` an index of the file at *path* goes in, or the ``.lax3``
+    an octree of it does."""
+    return os.path.splitext(path)[0] + ('.lax3' if dims == 3 else '.lax')
+
+
+def _table_sidecar_for(path):
+    """The ``.lazt`` a chunk table rebuilt for the file at *path* is kept
+    in."""
+    return os.path.splitext(path)[0] + '.lazt'
+
+
+# What a saved chunk table begins with: a tag, a version, how long the file it
+# was saved for was, and how many chunk starts follow it, each an int64. All
+# little-endian, as the file it describes is.
+_SAVED_TABLE = struct.Struct('<4sIQI')
+_SAVED_TABLE_TAG = b'LZCT'
+_SAVED_TABLE_VERSION = 1
+
+
 def _numpy():
     """numpy, imported on use.
 
@@ -197,6 +412,130 @@ def _numpy():
     return numpy
 
 
+class QueryPlan(namedtuple("QueryPlan", "index cells_hit runs spans chunks "
+                                        "candidates decoded_points "
+                                        "decoded_bytes scan_points scan_bytes "
+                                        "use_index")):
+    """How :meth:`Reader.explain` says a query over an area would be read.
+
+    ``index`` is which index answered, ``"quadtree"`` or ``"octree"``, or
+    ``"chunks"`` where the file's :attr:`Reader.chunk_summaries` stood in for
+    one, or None for a file with none of them. ``cells_hit`` is how many of
+    its cells holding points the area reached -- of its chunks, for
+    ``"chunks"`` -- and ``runs`` how many runs of point indices those gave
+    after merging, and after dropping the chunks the summaries rule out.
+    ``spans`` are the ``(start, stop)`` point ranges the index path would
+    read once they are laid over the chunks -- see :meth:`Reader._planned`
+    -- and ``chunks`` how many chunks those go into; ``candidates`` is how
+    many points the spans hold, each of which is decoded and tested against
+    the area.
+
+    ``decoded_points`` is how many points the index path decodes, which is
+    more than the candidates: a span's decoder starts at the beginning of its
+    chunk. ``decoded_bytes`` estimates the compressed point data those are,
+    from the chunk table -- or the records themselves, for a file with no
+    table. ``scan_points`` and ``scan_bytes`` are the same for the whole file.
+
+    ``use_index`` is the decision: False where reading the spans is reckoned
+    to cost at least what scanning the file would, and the query scans.
+    """
+
+    __slots__ = ()
+
+
+class Raster(namedtuple("Raster", "bands geotransform")):
+    """What :meth:`Reader.grid` makes of a file: ``bands``, a 2-D numpy
+    array for each statistic asked for, keyed by its name, and the
+    ``geotransform`` that places them.
+
+    The geotransform is GDAL's, ``(left, cell_size, 0.0, top, 0.0,
+    -cell_size)``: the first row is the northernmost, and cell ``(row,
+    col)`` has its top-left corner at ``(left + col * cell_size, top - row *
+    cell_size)``. That is what ``rasterio``'s ``Affine.from_gdal`` and
+    GDAL's ``SetGeoTransform`` take, so writing a band out is one call.
+    """
+
+    __slots__ = ()
+
+
+class CountEstimate(namedtuple("CountEstimate", "count low high")):
+    """What :meth:`Reader.estimate_count` makes of an area from the index.
+
+    ``high`` is every point of the index cells the area reaches, as many as
+    a query could find; ``low`` is those of the cells wholly inside it, as
+    few as it could. ``count`` shares each cell reached out by how much of
+    it the area covers, rounded: what a query finds where the points are
+    spread evenly over their cells, and near it where they are not.
+    """
+
+    __slots__ = ()
+
+
+class FieldStatistics(namedtuple("FieldStatistics", "count minimum maximum "
+                                                    "mean stddev histogram")):
+    """One field of :class:`Statistics`.
+
+    ``count`` is how many points had a value, which is every point but those
+    whose GPS time is NaN. ``minimum``, ``maximum``, ``mean`` and
+    ``stddev`` are over those values, the spread being the population's --
+    numpy's ``std()`` with its default ``ddof=0`` -- and all four are None
+    where there were none. Values are as :meth:`Reader.arrays` gives them,
+    so X, Y and Z are the stored integers.
+
+    ``histogram`` is ``{value: points}`` over the values that occurred, for
+    the fields that are categories rather than measurements: the
+    classifications, return numbers, flags, scanner channel, user data and
+    point source. None for any other field.
+    """
+
+    __slots__ = ()
+
+
+class Statistics(namedtuple("Statistics", "num_points bounds "
+                                          "number_of_points_by_return "
+                                          "fields")):
+    """What :meth:`Reader.statistics` found in a file's points.
+
+    ``bounds`` is ``(min_x, min_y, min_z, max_x, max_y, max_z)`` in
+    georeferenced coordinates, the box the points really cover, or None for
+    a file with none. ``number_of_points_by_return`` counts the points
+    carrying each return number from 1 to 15 -- LAS 1.4 return numbers for
+    the LAS 1.4 formats, as the header's own counts are -- and ``fields``
+    maps each field asked about to its :class:`FieldStatistics`. These are
+    what a header states, and what it can be checked against.
+    """
+
+    __slots__ = ()
+
+
+class ChunkSummary(namedtuple("ChunkSummary", "start count bounds gps_time "
+                                              "intensity classifications")):
+    """One chunk of :attr:`Reader.chunk_summaries`.
+
+    ``start`` and ``count`` are the points the chunk holds. ``bounds`` is
+    ``(min_x, min_y, min_z, max_x, max_y, max_z)`` in georeferenced
+    coordinates, as :class:`Statistics` states it; ``gps_time`` and
+    ``intensity`` are ``(minimum, maximum)``, ``gps_time`` being None where
+    the point format has none or no point's was a number. ``classifications``
+    is the set of values the chunk's points have, as the file holds them:
+    the extended classification for point formats 6 to 10.
+    """
+
+    __slots__ = ()
+
+
+class Chunk(namedtuple("Chunk", "start count offset length")):
+    """One chunk of :meth:`Reader.chunks`.
+
+    ``start`` and ``count`` are the points the chunk holds, as
+    :class:`ChunkSummary` has them; ``offset`` and ``length`` are the bytes
+    it takes up in the file, from where it starts to where the next one
+    does.
+    """
+
+    __slots__ = ()
+
+
 class ExtendedVariableLengthRecord(Mapping):
     """One EVLR, whose payload is read the first time it is asked for.
 
@@ -237,16 +576,17 @@ class ExtendedVariableLengthRecord(Mapping):
         """The payload, read out from under whoever else is using the file.
 
         The point reader has owned the file handle since the reader was
-        constructed and keeps its own buffer over it, so this method must
-        restore the handle to exactly the position it found. The point reader
+        constructed and keeps its own buffer over it, and may be decoding
+        through it on another thread right now, so the payload is read
+        without moving the handle where that can be done, and otherwise with
+        the handle put back exactly where it was found. The point reader
         advances the handle only by reading, so tell() reports the position
         the point reader believes it is at.
         """
         length = self._fields['record_length_after_header']
+        offset = self._fields['offset_to_data']
         try:
-            with keeping_position(self._fp):
-                self._fp.seek(self._fields['offset_to_data'])
-                data = self._fp.read(length)
+            data = _read_at(self._fp, offset, offset + length)
         except (OSError, ValueError) as exc:
             # a closed file object is a ValueError, a dead one an OSError
             raise LazError(f"cannot read the payload of {self!r}: the file is "
@@ -256,12 +596,68 @@ class ExtendedVariableLengthRecord(Mapping):
         return data
 
 
+class _FirstTimes:
+    """The GPS time each chunk begins with, as a sequence that a bisection
+    can search: a point is decoded for each chunk it looks at, and no
+    other."""
+
+    def __init__(self, reader, firsts):
+        self._reader = reader
+        self._firsts = firsts
+        self._seen = {}
+
+    def __len__(self):
+        return len(self._firsts)
+
+    def __getitem__(self, k):
+        if k not in self._seen:
+            self._reader.seek(self._firsts[k])
+            self._seen[k] = self._reader.read().gps_time
+        return self._seen[k]
+
+    def in_order(self):
+        """Whether the times looked at rise with the chunks, which a NaN
+        among them does not."""
+        times = [self._seen[k] for k in sorted(self._seen)]
+        return all(map(operator.le, times, times[1:]))
+
+
 class Reader:
     """Read the points of a LAS or LAZ file: in order, by index, or as arrays.
 
-    Open one by path or from an open binary file, then iterate it point by
-    point, or use :meth:`seek`, :meth:`arrays` and
-    :meth:`points_within`.
+    Open one by path, from an open binary file or from a range reader (see
+    :mod:`lazpy.ranges`), then iterate it point by point, or use
+    :meth:`seek`, :meth:`arrays` and :meth:`points_within`.
+
+    One reader can be shared between threads. What it parsed on opening --
+    the header, the records, the index, the chunk summaries -- is parsed
+    once and read by all of them; the calls that say where to read --
+    :meth:`arrays` with a *start*, the area and time queries, :meth:`grid`,
+    :meth:`statistics` -- each decode through a cursor of the calling
+    thread's own, over the same file::
+
+        with ThreadPoolExecutor(8) as pool:
+            blocks = pool.map(lambda s: reader.arrays(start=s, count=n),
+                              range(0, len(reader), n))
+
+    A cursor is a point reader over the file, with a position of its own:
+    by ``pread`` on the reader's own descriptor for a file opened by name,
+    and through a cache of its own for a range reader -- which is then
+    called from several threads at once. The thread that opened the reader
+    decodes through the reader's own point reader, as it always has, and the
+    others through cursors that are kept for the next call once one is done
+    with them. Each reads the chunk table for itself the first time it
+    decodes. A reader opened on a file object has one handle, and no more
+    cursors than that: the calls take turns on it instead.
+
+    What moves the reader's own position -- :meth:`read`, :meth:`seek`,
+    iterating, :meth:`arrays` without a *start* -- is one position, and for
+    one thread at a time.
+
+    A reader opened by name or from a range reader pickles, for a process
+    pool to hand its workers: as where it reads from and the point it is at,
+    with what it parsed, so that a worker opens the file again and parses
+    none of it. A reader on a file object cannot be, and raises TypeError.
 
     ``reader.header`` is a dict of every LAS header field, plus the variable
     length records under ``header["variable_length_records"]``, keyed by
@@ -271,8 +667,10 @@ class Reader:
     nothing in the physical file.
     """
 
-    def __init__(self, filename=None, decompress_selective=None):
-        """Open *filename*, if given.
+    def __init__(self, filename=None, decompress_selective=None,
+                 chunks=None):
+        """Open *filename*, if given, and only its *chunks* if given; see
+        :meth:`open`.
 
         ``decompress_selective`` is a bitmask of ``Selective`` flags naming the
         attributes to decode. It only has an effect on the layered LAS 1.4
@@ -292,45 +690,103 @@ class Reader:
         self._evlr_warning = None
         self._crs = _UNPARSED
         self._path = None
+        self._source = None
         self._index = None
+        self._index_data = None
         self._index_looked_for = False
+        self._octree = None
+        self._octree_data = None
+        self._octree_looked_for = False
+        self._summaries = _UNPARSED
+        self._ahead_fp = None
+        # what reads a query's ranges at once: _read_ranges's, made the
+        # first time it is wanted
+        self._gather_pool = None
+        self._opener = None
+        self._point_args = None
+        self._saved_starts = None
+        self._saved_totals = None
+        self._table_warning = None
+        # (first chunk, stop chunk, first point, points) of a reader of
+        # some of the file's chunks
+        self._window = None
+        # what other threads decode through: _cursor's
+        self._local = threading.local()
+        self._spares = []
+        self._idle = []
+        self._spares_lock = threading.Lock()
+        # for what is parsed the first time it is asked for, and for the one
+        # handle of a reader on a file object
+        self._lock = threading.RLock()
         self.decompress_selective = (
             Selective.ALL if decompress_selective is None
             else int(decompress_selective))
         if filename is not None:
-            self.open(filename)
+            self.open(filename, chunks)
 
     # -- construction ----------------------------------------------------
 
-    def open(self, filename):
-        """Open a file by path. Also accepts an already-open binary file.
+    def open(self, filename, chunks=None):
+        """Open a file by path. Also accepts an already-open binary file,
+        or a range reader -- an object with ``read_range(offset, length)``
+        and ``size()``, such as :class:`~lazpy.ranges.HTTPRangeReader` --
+        which is read through a :class:`~lazpy.ranges.RangeFile` and its
+        cache of blocks, so that only what is decoded is fetched.
+
+        *chunks*, ``(start, stop)``, has the reader read those of the file's
+        :meth:`chunks` and no others, as if they were the whole file: point
+        0 is the first of chunk *start*, :attr:`num_points` counts only
+        theirs, and seeks, arrays and queries stay inside them. That is a
+        unit of work a scheduler can hand out by the manifest
+        :meth:`chunks` gives. The header is still the file's, and
+        :meth:`estimate_count` and :meth:`density`, which count from the
+        index without reading a point, still describe the whole file.
 
         A reader that was already open is closed first, so opening a second
         file through the same object does not strand the first one's handle.
         """
         self.close()
         self._path = None
+        self._source = None
         self._index = None
+        self._index_data = None
         self._index_looked_for = False
+        self._octree = None
+        self._octree_data = None
+        self._octree_looked_for = False
+        self._summaries = _UNPARSED
         self._crs = _UNPARSED
-
-        if hasattr(filename, 'read'):
-            self.fp = filename
-            self._owns_fp = False
-        else:
-            self.fp = open(filename, 'rb')
-            self._owns_fp = True
-            # remembered for the sidecar ".lax", which is found by name
-            self._path = os.fspath(filename)
-
+        self._opener = threading.get_ident()
+        self._window = None
+        self._open_file(filename)
         try:
             self._setup()
+            if chunks is not None:
+                self._restrict(*chunks)
         except Exception:
             self.close()
             raise
         self._was_opened = True
         return self
 
+    def _open_file(self, filename):
+        """Has `fp` be the file *filename* names, is or reads ranges of."""
+        if hasattr(filename, 'read'):
+            self.fp = filename
+            self._owns_fp = False
+        elif hasattr(filename, 'read_range'):
+            self.fp = RangeFile(filename)
+            self._owns_fp = True
+            # for its sidecars, and for a second file over it to read ahead
+            self._source = filename
+        else:
+            self.fp = open(filename, 'rb')
+            self._owns_fp = True
+            # remembered for the sidecar ".lax", which is found by name, and
+            # for a copy of this reader to open again: made absolute, so that
+            # a worker in another directory opens this file and not another
+            self._path = os.path.abspath(os.fspath(filename))
+
     def _setup(self):
         self.header = _read_las_header(self.fp)
         # before the point reader takes the file over, since reading the
@@ -372,16 +828,26 @@ class Reader:
         compatibility = _compatibility_layout(self.header)
 
         self.items = items
-        self._reader = PointReader(
-            self.fp,
-            items,
-            int(compressor),
+        # kept for the cursors of other threads, which are point readers of
+        # the same file
+        self._point_args = ((items, int(compressor)), dict(
             coder=int(coder),
             chunk_size=int(chunk_size),
             start_offset=point_data_offset,
             decompress_selective=self.decompress_selective,
             compatibility=compatibility,
-        )
+        ))
+        self._reader = PointReader(self.fp, *self._point_args[0],
+                                   **self._point_args[1])
+        # a table an earlier reader had to rebuild and kept, taken before the
+        # file's own is looked for -- which would only be rebuilt again
+        self._saved_starts = None
+        self._saved_totals = None
+        self._table_warning = None
+        if self._path is not None and self.chunking is Chunking.FIXED:
+            self._saved_starts = self._saved_chunk_table(point_data_offset)
+            if self._saved_starts is not None:
+                self._reader.use_chunk_table(self._saved_starts)
         # sized by the C core from the item layout, not recomputed here; in
         # compatibility mode it is whatever the layout leaves after lazpy
         # removes the hidden LAS 1.4 fields
@@ -395,16 +861,66 @@ class Reader:
                               h['z_scale_factor'], h['x_offset'],
                               h['y_offset'], h['z_offset'])
 
+    def _restrict(self, start, stop):
+        """Has this reader read chunks *start* to *stop* of its file only.
+
+        A point reader of its own, which has read nothing, is handed the
+        part of the chunk table that describes them -- the points each
+        begins with counted from the first of them -- and so takes them for
+        the whole file, down to where a seek lands. So do the cursors, which
+        are handed the same part.
+        """
+        if self.laz_header is None or self.chunking is Chunking.NONE:
+            raise ValueError("a file without chunks cannot be read by "
+                             "chunks")
+        chunks = self.chunks()
+        if not 0 <= start < stop <= len(chunks):
+            raise IndexError(f"chunks {start} to {stop} are not a range of "
+                             f"the file's {len(chunks)}")
+        kept = chunks[start:stop]
+        first = kept[0].start
+        count = sum(chunk.count for chunk in kept)
+        starts = [chunk.offset for chunk in kept]
+        starts.append(kept[-1].offset + kept[-1].length)
+        totals = None
+        if self.chunking is Chunking.ADAPTIVE:
+            totals = [chunk.start - first for chunk in kept] + [count]
+        warning = self._reader.warning
+        self._reader = PointReader(self.fp, *self._point_args[0],
+                                   **self._point_args[1])
+        self._reader.use_chunk_table(starts, totals)
+        self._saved_starts, self._saved_totals = starts, totals
+        # what the file's own table said, which this one will not
+        self._table_warning = warning
+        self._window = (start, stop, first, count)
+
     def close(self):
         """Release the point reader, and the file if this reader opened it.
 
         A file object handed in is left open.
         """
+        if self._reader is not None and self._ahead_fp is not None:
+            self._reader.read_ahead(None, (), 0)
         self._reader = None
+        if self._ahead_fp is not None:
+            self._ahead_fp.close()
+            self._ahead_fp = None
+        with self._spares_lock:
+            spares, self._spares, self._idle = self._spares, [], []
+        for _, fp in spares:
+            fp.close()
+        with self._lock:
+            pool, self._gather_pool = self._gather_pool, None
+        if pool is not None:
+            pool.shutdown()
         # dropped rather than left to be looked for: finding an index means
         # reading the file, and there is no file any more
         self._index = None
+        self._index_data = None
         self._index_looked_for = True
+        self._octree = None
+        self._octree_data = None
+        self._octree_looked_for = True
         if self.fp is not None and self._owns_fp:
             self.fp.close()
         self.fp = None
@@ -416,6 +932,147 @@ class Reader:
         self.close()
         return False
 
+    # -- pickling --------------------------------------------------------
+
+    def __getstate__(self):
+        """What a reader is pickled as: the path or range reader it was
+        opened from, what it was opened with and the point it is at, along
+        with what it parsed on opening.
+
+        Which is what hands a reader to a process pool's worker cheaply. The
+        header and its records, the chunk table and -- as far as this reader
+        has looked for them -- the spatial index and chunk summaries go with
+        it, so the worker opens the file again but reads none of that. The
+        chunk table is read here, once, if this reader has not read it yet.
+
+        A reader opened on a file object has no way back to its file in
+        another process, and raises TypeError; a closed one, ValueError.
+        """
+        self._points()
+        if self._path is None and self._source is None:
+            raise TypeError("a reader opened on a file object cannot be "
+                            "pickled; open it by path or from a range reader")
+        header = dict(self.header)
+        # the payloads already read go too; the rest is read from the file
+        # the unpickled reader has open
+        header['extended_variable_length_records'] = {
+            key: (record._fields, record._data) for key, record in
+            header['extended_variable_length_records'].items()}
+        table = self._whole_chunk_table()
+        with self._lock:
+            found = (self._index_looked_for, self._index_data,
+                     self._octree_looked_for, self._octree_data,
+                     self._summaries)
+        return {
+            'source': self._path if self._path is not None else self._source,
+            'size': self._length(),
+            'decompress_selective': self.decompress_selective,
+            'position': self._reader.index,
+            'header': header,
+            'laz_header': self.laz_header,
+            'items': self.items,
+            'evlr_warning': self._evlr_warning,
+            'point_args': self._point_args,
+            'chunk_table': table,
+            # what reading the table said, which reading it will not
+            'table_warning': (self._reader.warning or self._table_warning
+                              if table is not None else None),
+            'window': self._window,
+            'found': found,
+        }
+
+    def __setstate__(self, state):
+        """Open the file a pickled reader had open, taking what it parsed
+        rather than parsing it again, and go to the point it was at.
+
+        The file has to be the one that reader had open: one that is no
+        longer the length it was then raises LazError, rather than be read
+        by a header that may not be its own.
+        """
+        self.__init__(decompress_selective=state['decompress_selective'])
+        self._opener = threading.get_ident()
+        self._open_file(state['source'])
+        try:
+            self._restore(state)
+        except Exception:
+            self.close()
+            raise
+        self._was_opened = True
+
+    def _restore(self, state):
+        """What :meth:`_setup` does, out of what :meth:`__getstate__` kept
+        of it, and the index and summaries as well."""
+        size = self._length()
+        if size != state['size']:
+            raise LazError(f"the file is {size} bytes, and was "
+                           f"{state['size']} when the reader was pickled")
+        self.header = dict(state['header'])
+        records = {}
+        for key, (fields, data) in \
+                self.header['extended_variable_length_records'].items():
+            records[key] = ExtendedVariableLengthRecord(fields, self.fp)
+            records[key]._data = data
+        self.header['extended_variable_length_records'] = records
+        self.laz_header = state['laz_header']
+        self.items = state['items']
+        self._evlr_warning = state['evlr_warning']
+        self._point_args = state['point_args']
+        self._reader = PointReader(self.fp, *self._point_args[0],
+                                   **self._point_args[1])
+        # handed to every cursor as well, as a saved table is
+        if state['chunk_table'] is not None:
+            self._saved_starts, self._saved_totals = state['chunk_table']
+            self._reader.use_chunk_table(self._saved_starts,
+                                         self._saved_totals)
+            self._table_warning = state['table_warning']
+        self._window = state['window']
+        self.num_extra_bytes = self._reader.num_extra_bytes
+        h = self.header
+        self._scale_offset = (h['x_scale_factor'], h['y_scale_factor'],
+                              h['z_scale_factor'], h['x_offset'],
+                              h['y_offset'], h['z_offset'])
+        (self._index_looked_for, self._index_data, self._octree_looked_for,
+         self._octree_data, self._summaries) = state['found']
+        if self._index_data is not None:
+            self._index = SpatialIndex(self._index_data)
+        if self._octree_data is not None:
+            self._octree = SpatialIndex(self._octree_data)
+        if state['position']:
+            self.seek(state['position'])
+
+    def _whole_chunk_table(self):
+        """The chunk table, as ``use_chunk_table`` takes it, or None where
+        there is not one whole to hand on.
+
+        The file's own table is read at the first point, which is where a
+        reader that has not read it yet still is. One that had to be rebuilt
+        is whole once reading has found every chunk, and ends where
+        :meth:`save_chunk_table` would have it end; until then it is left
+        for the next reader to rebuild too, as is one that will not read at
+        all, which that reader will raise over when it reads a point.
+        """
+        if self.laz_header is None or self.chunking is Chunking.NONE:
+            return None
+        if self._saved_starts is not None:
+            return self._saved_starts, self._saved_totals
+        with self._cursor():
+            points = self._points()
+            try:
+                if points.chunk_points is None:
+                    points.seek(0)
+            except LazError:
+                return None
+            firsts, starts = points.chunk_points, points.chunk_starts
+        if self.chunking is Chunking.ADAPTIVE:
+            return (starts, firsts) if len(starts) > 1 else None
+        # a whole table says where its last chunk ends as well
+        chunks = -(-self.num_points // self.chunk_size)
+        if len(starts) == chunks:
+            starts.append(self._end_of_chunks(self._length()))
+        if len(starts) <= max(chunks, 1):
+            return None
+        return starts, None
+
     # -- header parsing --------------------------------------------------
 
     @staticmethod
@@ -489,10 +1146,17 @@ class Reader:
         header begins once the payload is skipped.
         """
         data = fp.read(EVLR_HEADER_SIZE)
+        return Reader._evlr_of(data, fp.tell(), end_of_file, fp)
+
+    @staticmethod
+    def _evlr_of(data, offset_to_data, end_of_file, fp):
+        """The extended record whose header is *data* and whose payload is
+        at *offset_to_data* in `fp`, or None, for the reasons _evlr_at
+        gives."""
         if len(data) < EVLR_HEADER_SIZE:
             return None
         fields, _ = unpack_format(EVLR_HEADER_FORMAT, data)
-        fields['offset_to_data'] = fp.tell()
+        fields['offset_to_data'] = offset_to_data
         if (fields['offset_to_data'] + fields['record_length_after_header']
                 > end_of_file):
             return None
@@ -509,11 +1173,88 @@ class Reader:
         happens to do with it. :class:`Writer` already raises ValueError for a
         closed writer, and this reader answers the same way.
         """
+        points = getattr(self._local, 'points', None)
+        if points is not None:
+            return points
         if self._reader is None:
             raise ValueError("reader is closed" if self._was_opened
                              else "reader is not open")
         return self._reader
 
+    @contextmanager
+    def _cursor(self):
+        """Has what runs inside decode through a cursor of this thread's
+        own, for as long as it runs.
+
+        The thread that opened the reader has the reader's own point reader,
+        and any other a spare -- one another thread was done with, or a new
+        one over the file. :meth:`_points` hands out whichever it is, so
+        everything inside, down to a seek, goes through it; a call inside
+        another keeps the one it was given. A reader on a file object has
+        nothing to make a spare of, so calls take turns on its one handle.
+        """
+        if getattr(self._local, 'points', None) is not None:
+            yield
+            return
+        if self._path is None and self._source is None:
+            with self._lock:
+                self._local.points = self._points()
+                try:
+                    yield
+                finally:
+                    self._local.points = None
+            return
+        if threading.get_ident() == self._opener:
+            yield
+            return
+        self._points()
+        with self._spares_lock:
+            points = self._idle.pop() if self._idle else None
+        if points is None:
+            points = self._spare()
+        self._local.points = points
+        try:
+            yield
+        finally:
+            self._local.points = None
+            with self._spares_lock:
+                # not handed back to a reader closed meanwhile, whose file
+                # it can no longer read
+                if any(spare is points for spare, _ in self._spares):
+                    self._idle.append(points)
+
+    def _spare(self):
+        """A new point reader over this reader's file, for a thread other
+        than the one that opened it."""
+        if self._source is not None:
+            fp = RangeFile(self._source, self.fp.block_size,
+                           self.fp.cache_blocks)
+        elif hasattr(os, 'pread'):
+            fp = _PreadFile(self.fp)
+        else:
+            fp = open(self._path, 'rb')
+        try:
+            points = PointReader(fp, *self._point_args[0],
+                                 **self._point_args[1])
+            if self._saved_starts is not None:
+                points.use_chunk_table(self._saved_starts,
+                                       self._saved_totals)
+        except BaseException:
+            fp.close()
+            raise
+        with self._spares_lock:
+            self._spares.append((points, fp))
+        return points
+
+    def _length(self):
+        """How long the file is, found without moving it where that can be
+        done."""
+        if isinstance(self.fp, RangeFile):
+            return self.fp.size()
+        if self._path is not None:
+            return os.fstat(self.fp.fileno()).st_size
+        return _end_of_file(self.fp)
+
     def _fields(self):
         """The header, or the same refusal. Kept after close, since it was
         read once and describes a file that has not changed."""
@@ -526,8 +1267,11 @@ class Reader:
         """How many points the file holds, which is also ``len(reader)``.
 
         The LAS 1.4 count where the header has one, since the legacy field
-        is only 32 bits and saturates.
+        is only 32 bits and saturates. A reader of some of the file's chunks
+        counts theirs.
         """
+        if self._window is not None:
+            return self._window[3]
         return self._fields()['number_of_point_records']
 
     @property
@@ -609,10 +1353,12 @@ class Reader:
         Needs pyproj, which ``pip install lazpy[crs]`` adds; a reader that
         never touches this does not.
         """
-        if self._crs is _UNPARSED:
-            header = self.header
-            self._crs = read_crs(header['variable_length_records'],
-                                 header['extended_variable_length_records'])
+        with self._lock:
+            if self._crs is _UNPARSED:
+                header = self.header
+                self._crs = read_crs(
+                    header['variable_length_records'],
+                    header['extended_variable_length_records'])
         return self._crs
 
     @property
@@ -634,7 +1380,8 @@ class Reader:
         ``spatial_index.warning``; they are not here because asking would
         make every reader go looking for an index it may never want.
         """
-        table = self._reader.warning if self._reader is not None else None
+        table = (self._reader.warning or self._table_warning
+                 if self._reader is not None else None)
         return tuple(w for w in (table, self._evlr_warning) if w)
 
     @property
@@ -675,6 +1422,248 @@ class Reader:
             raise IndexError(f"point index {index} out of range")
         self._points().seek(index)
 
+    def keep_checkpoints(self, every=100000):
+        """Make seeking in a POINTWISE file cheap, at a cost in memory.
+
+        The POINTWISE container is one arithmetic-coded run from the first
+        point to the last, with no chunks for the decoder to restart at, so
+        a :meth:`seek` back decodes from the first point again and one far
+        ahead decodes everything between -- which leaves an archive of them
+        that cannot be recompressed no good for random access. With
+        checkpoints on, the reader keeps where its decoder stands every
+        *every* points it passes -- the stream position, the coder's
+        registers, and every model and last item -- and a seek starts from
+        the nearest one at or before where it lands, so costs at most
+        *every* points of decoding across whatever the reader has passed::
+
+            reader.keep_checkpoints(20000)
+            reader.seek(len(reader))        # passes them all, in one go
+
+        Each checkpoint is a copy of every model the decoder has, about
+        400 KiB for point format 3, held for the life of the reader; they
+        are not saved, that state being nothing the file or a sidecar could
+        hold more cheaply than decoding it again. ``every=0`` takes no more,
+        and keeps those taken.
+
+        Raises ValueError for any other kind of file, none of which needs
+        them: a plain LAS file seeks straight to a record, and a chunked one
+        by its chunk table.
+        """
+        if every < 0:
+            raise ValueError("checkpoints are every 0 points or more")
+        if self.laz_header is None:
+            raise ValueError("a LAS file seeks straight to any point, and "
+                             "needs no checkpoints")
+        if self.chunking is not Chunking.NONE:
+            raise ValueError("a file with chunks seeks by its chunk table, "
+                             "and needs no checkpoints")
+        self._points().keep_checkpoints(every)
+
+    def read_ahead(self, chunks=2):
+        """Read the next *chunks* chunks from the file while decoding the
+        one before them.
+
+        Decoding waits on every read it makes, which on network storage is
+        as long again as the decoding: the two take turns. With read-ahead
+        on, a thread of the reader's own reads whole chunks -- the chunk
+        table says which bytes each one is -- into memory ahead of the
+        decoder, which then finds them there::
+
+            reader.read_ahead(2)
+            for block in ...:
+                reader.arrays(...)
+
+        Reading in file order is read ahead through every chunk; a query over
+        an area or a time window reads ahead only the chunks it is going to
+        decode. A seek elsewhere reads the chunk it lands in itself, and
+        read-ahead goes on from the next. What it holds is *chunks* chunks
+        and the one being decoded, which for adaptive chunks can be a good
+        deal more than the default 50,000 points each. ``chunks=0`` stops
+        it.
+
+        The thread reads through a second handle of its own on the file, so
+        the reader has to have been opened by name, or from a range reader
+        -- which the thread then calls as well, from a thread of its own.
+        Raises ValueError for a file object, and for a file without chunks
+        to read.
+        """
+        if chunks < 0:
+            raise ValueError("read-ahead is of 0 chunks or more")
+        points = self._points()
+        if chunks == 0:
+            points.read_ahead(None, (), 0)
+            if self._ahead_fp is not None:
+                self._ahead_fp.close()
+                self._ahead_fp = None
+            return
+        if self._path is None and self._source is None:
+            raise ValueError("read-ahead reads through a handle of its own "
+                             "on the file, so the reader has to be opened "
+                             "by name")
+        if self.laz_header is None or self.chunking is Chunking.NONE:
+            raise ValueError("read-ahead reads a chunk at a time, and a file "
+                             "without chunks has none to read")
+        table = self._chunk_table()
+        if table is None:
+            return
+        if self._source is not None:
+            fp = RangeFile(self._source)
+        else:
+            fp = open(self._path, 'rb', buffering=0)
+        try:
+            points.read_ahead(fp, table[1], chunks)
+        except BaseException:
+            fp.close()
+            raise
+        if self._ahead_fp is not None:
+            self._ahead_fp.close()
+        self._ahead_fp = fp
+
+    def _plan_reads(self, spans):
+        """Tells reading what a query is about to decode: read-ahead keeps
+        to it where it is on, and otherwise it is read up front."""
+        if self._ahead_fp is not None and self._points() is self._reader:
+            self._plan_ahead(spans)
+        elif spans != [(0, self.num_points)]:
+            self._gather(spans)
+        else:
+            # a scan of the whole file reads it in order, with no seek to
+            # save, and would only hold all of it at once
+            self._points().hold_ranges(())
+
+    @contextmanager
+    def _reading(self, spans=None):
+        """Has what runs inside read as :meth:`_plan_reads` plans for
+        *spans*, where there are some, and lets go of what was read up front
+        once it is done.
+
+        Which is once the query returns, or its generator is exhausted or
+        dropped half way: the ranges a query gathered are only let go of as
+        decoding passes them, so one that stops early would otherwise keep
+        up to :data:`GATHER_LIMIT` of them until the next query.
+        """
+        points = self._points()
+        if spans is not None:
+            self._plan_reads(spans)
+        try:
+            yield
+        finally:
+            points.hold_ranges(())
+
+    def _plan_ahead(self, spans):
+        """Has read-ahead keep to the chunks *spans* are in, until reading
+        goes into another."""
+        firsts, _ = self._chunk_table()
+        last_chunk = len(firsts) - 2
+        wanted = bytearray(last_chunk + 1)
+        for start, stop in spans:
+            if start >= stop:
+                continue
+            first = max(bisect.bisect_right(firsts, start) - 1, 0)
+            last = min(bisect.bisect_right(firsts, stop - 1) - 1, last_chunk)
+            wanted[first:last + 1] = b"\1" * (last + 1 - first)
+        self._points().plan_ahead(bytes(wanted))
+
+    @contextmanager
+    def _ahead_held(self):
+        """Has read-ahead read nothing while reading looks at a point here
+        and there, as a bisection does: the chunk it looks in is no sign
+        that those after it are wanted. What is read ahead next is the plan
+        that follows, or every chunk again should the block raise."""
+        held = self._ahead_fp is not None and self._points() is self._reader
+        if held:
+            firsts, _ = self._chunk_table()
+            self._points().plan_ahead(bytes(len(firsts) - 1))
+        try:
+            yield
+        except BaseException:
+            if held:
+                self._points().plan_ahead(None)
+            raise
+
+    #: The most a query reads before it decodes, in bytes. What it decodes
+    #: past that is read as it is reached, as if nothing had been read
+    #: first; 0 reads nothing first.
+    GATHER_LIMIT = 64 << 20
+
+    #: How far apart, in bytes, two ranges a query decodes can be and be
+    #: read as one. Reading a gap costs less than a seek over it for gaps
+    #: up to about what a disk reads in the time it takes to seek.
+    GATHER_GAP = 256 * 1024
+
+    #: How many reads of a query's ranges run at once, where the file is
+    #: read by descriptor.
+    GATHER_THREADS = 4
+
+    def _byte_ranges(self, spans):
+        """The bytes of the file that decoding *spans* reads, as ``(start,
+        stop)`` ranges, or None where that is not known."""
+        if self.laz_header is None:
+            record = self.header['point_data_record_length']
+            offset = self.header['offset_to_point_data']
+            return [(offset + start * record, offset + stop * record)
+                    for start, stop in spans if start < stop]
+        if self.chunking is Chunking.NONE:
+            return None
+        table = self._chunk_table()
+        if table is None:
+            return None
+        firsts, starts = table
+        last_chunk = len(firsts) - 2
+        ranges = []
+        for start, stop in spans:
+            if start >= stop:
+                continue
+            first = max(bisect.bisect_right(firsts, start) - 1, 0)
+            last = min(bisect.bisect_right(firsts, stop - 1) - 1, last_chunk)
+            ranges.append((starts[first], starts[last + 1]))
+        return ranges
+
+    def _gather(self, spans):
+        """Reads the bytes a query will decode before it decodes any, in as
+        few reads as they make, for the point reader to take its refills
+        from.
+
+        Decoding a span reads the chunks it is in a refill at a time, and
+        seeks between spans: on a spinning disk, a network file system or a
+        range reader, every one of those is a wait. The chunk table says
+        exactly which bytes each chunk is, so the plan does too; ranges a
+        small gap apart are joined, and each joined range is one read --
+        ``pread`` on a thread pool where this reader opened the file and
+        has a descriptor to read by, or one request of a range reader's.
+        """
+        points = self._points()
+        ranges = (None if self.GATHER_LIMIT <= 0
+                  else self._byte_ranges(spans))
+        held = []
+        total = 0
+        for start, stop in _coalesced(ranges or (), self.GATHER_GAP):
+            total += stop - start
+            if total > self.GATHER_LIMIT:
+                break
+            held.append((start, stop))
+        points.hold_ranges(list(zip((start for start, _ in held),
+                                    self._read_ranges(held))))
+
+    def _read_ranges(self, ranges):
+        """The bytes of each of *ranges*, in order."""
+        if not ranges:
+            return []
+        if self._path is not None and hasattr(os, 'pread'):
+            fd = self.fp.fileno()
+            if len(ranges) == 1:
+                return [_pread_range(fd, *ranges[0])]
+            # pread lets the GIL go, and takes no position to share; the
+            # pool is the reader's, kept from one query to the next
+            with self._lock:
+                if self._gather_pool is None:
+                    self._gather_pool = ThreadPoolExecutor(
+                        self.GATHER_THREADS,
+                        thread_name_prefix='lazpy-gather')
+                pool = self._gather_pool
+            return list(pool.map(lambda r: _pread_range(fd, *r), ranges))
+        return [_read_at(self.fp, start, stop) for start, stop in ranges]
+
     def scale(self, point):
         """Return the georeferenced (x, y, z) of *point* as floats."""
         sx, sy, sz, ox, oy, oz = self._scale_offset
@@ -734,11 +1723,11 @@ class Reader:
         if not _can_seek(self.fp):
             return None
 
-        # read out from under the point reader and put the handle back, as
-        # ExtendedVariableLengthRecord does; see its _read_data
-        with keeping_position(self.fp):
-            self.fp.seek(offset)
-            record = Reader._evlr_at(self.fp, _end_of_file(self.fp))
+        # read beside the point reader, as ExtendedVariableLengthRecord
+        # does; see its _read_data
+        data = _read_at(self.fp, offset, offset + EVLR_HEADER_SIZE)
+        record = Reader._evlr_of(data, offset + EVLR_HEADER_SIZE,
+                                 self._length(), self.fp)
 
         if record is None:
             # unlike a record the header merely counted, this one was pointed
@@ -753,29 +1742,45 @@ class Reader:
             return None
         return record['data']
 
-    def _sidecar_path(self):
+    def _sidecar_path(self, dims=2):
         """Where an index of this file belongs, or None for a file object.
 
         An index is found by the name of the file it indexes, so a reader
         opened on a stream neither finds one nor has anywhere to put one.
+        An octree goes in a ``.lax3`` of its own rather than the ``.lax``,
+        which laszip's tools would take for a quadtree they could read.
         """
         if self._path is None:
             return None
-        return os.path.splitext(self._path)[0] + '.lax'
+        return _sidecar_for(self._path, dims)
 
-    def _sidecar_index_data(self):
+    def _sidecar_index_data(self, dims=2):
         """The index in the ".lax" beside this file, or None."""
-        path = self._sidecar_path()
+        path = self._sidecar_path(dims)
         if path is None:
-            return None
+            return self._source_sidecar_data('.lax3' if dims == 3 else '.lax')
         try:
             with open(path, 'rb') as fp:
                 return fp.read()
         except OSError:
             return None
 
+    def _source_sidecar_data(self, extension):
+        """The whole of the range reader's sidecar with *extension*, where
+        it has one, or None."""
+        sidecar = getattr(self._source, 'sidecar', None)
+        if sidecar is None:
+            return None
+        try:
+            source = sidecar(extension)
+            if source is None:
+                return None
+            return bytes(source.read_range(0, source.size()))
+        except OSError:
+            return None
+
     def build_spatial_index(self, cell_size=1.0, minimum_points=100000,
-                            maximum_intervals=-20):
+                            maximum_intervals=-20, dims=2, bounds="points"):
         """Build a spatial index over this file's points, as bytes.
 
         What ``lasindex`` does, and the write side of the index this reader
@@ -792,42 +1797,74 @@ class Reader:
         ``maximum_intervals`` means that many runs per cell, which is how
         lasindex is usually invoked.
 
-        Two passes over the points, both in C: lazpy cannot place a point in a
-        cell until it knows the extent of every point. The reader is left at
-        the end of the file.
+        ``dims=3`` builds an octree instead: cubes ``cell_size`` on a side
+        rather than squares, so that a query over a range of elevations as
+        well as an area -- a canopy, a line of pylons -- skips the cells
+        above and below it too. laszip has no such index, so it is
+        lazpy's to read: :meth:`write_spatial_index` puts it in a ``.lax3``
+        beside the file, where :attr:`octree_index` looks for it, and
+        ``box=`` queries use it. Eight siblings rather than four coarsen
+        together, so ``minimum_points`` is over eight cells' points.
+
+        One pass over the points, in C. The tree is laid over the area the
+        points really cover, which is not known until the last of them has
+        been read, so they are first bucketed into cells ``cell_size``
+        across -- which is what the tree's leaves turn out to be -- and the
+        tree is put over them at the end. Where the tree's single-precision
+        edges do not fall exactly on that grid, as for a cell size a float
+        cannot hold, the points are read a second time into the tree itself.
+        The index is the same either way.
+
+        ``bounds="header"`` lays the tree over the header's bounding box
+        instead, which is what ``lasindex`` does, and skips the bucketing. A
+        header that is wrong -- or a placeholder, as every fixture's is --
+        would leave points outside the tree, so one that misses any point is
+        caught and the points read again over the area they really cover; a
+        header wider than the points is believed, and gives a tree laid over
+        more than they need. The reader is left at the end of the file.
         """
+        if dims not in (2, 3):
+            raise ValueError(f"an index is over 2 or 3 dimensions, not "
+                             f"{dims!r}")
+        if bounds not in ("points", "header"):
+            raise ValueError(f"bounds are 'points' or 'header', not "
+                             f"{bounds!r}")
         if not self.num_points:
             raise LazError("a file with no points has nothing to index")
-        self.seek(0)
-        bounds = self._point_bounds()
-        self.seek(0)
-        return self._points().build_index(
-            self.num_points, bounds, self.scales[:2], self.offsets[:2],
-            float(cell_size), int(minimum_points), int(maximum_intervals),
-            _RUN_GAP)
-
-    def _point_bounds(self):
-        """The area the points really cover, georeferenced.
-
-        The header's bounding box would do and would cost nothing, but a file
-        whose header is wrong -- or is a placeholder, as every fixture's is --
-        would get a tree with everything in one cell. laszip's own index
-        creation goes by the points too.
-        """
-        stored = self._points().bounds(self.num_points)
-        scales, offsets = self.scales, self.offsets
-        return tuple(value * scales[i % 2] + offsets[i % 2]
-                     for i, value in enumerate(stored))
+        area = self._header_bounds(dims) if bounds == "header" else None
+        while True:
+            self.seek(0)
+            index = self._points().build_index(
+                self.num_points, area, self.scales[:dims],
+                self.offsets[:dims], float(cell_size), int(minimum_points),
+                int(maximum_intervals), _RUN_GAP)
+            if not isinstance(index, tuple):
+                return index
+            # the extent the points really cover, which the tree has to be
+            # laid over before they go into it; they lie inside it by
+            # definition, so the second pass is the last
+            area = index
+
+    def _header_bounds(self, dims):
+        """The header's bounding box, in the order build_index takes."""
+        h = self._fields()
+        axes = 'xyz'[:dims]
+        return (tuple(h[f'min_{axis}'] for axis in axes)
+                + tuple(h[f'max_{axis}'] for axis in axes))
 
     def write_spatial_index(self, path=None, **kwargs):
         """Build an index and write it beside the file, as ``lasindex`` does.
 
         The path defaults to this file's own with a ``.lax`` extension, which
-        is where :attr:`spatial_index` looks for one. Everything else is
+        is where :attr:`spatial_index` looks for one -- or ``.lax3`` for an
+        octree, where :attr:`octree_index` does. Everything else is
         :meth:`build_spatial_index`'s. Returns the path written.
         """
         if path is None:
-            path = self._sidecar_path()
+            if self._window is not None:
+                raise ValueError("an index of some of the file's chunks is "
+                                 "not one to put beside it")
+            path = self._sidecar_path(kwargs.get('dims', 2))
             if path is None:
                 raise ValueError("a reader opened on a file object has no "
                                  "name to put an index beside")
@@ -850,13 +1887,18 @@ class Reader:
         ignored. Falling back to a full scan would answer the same question
         far more slowly and say nothing about why.
         """
-        if not self._index_looked_for:
-            self._index_looked_for = True
-            data = self._appended_index_data()
-            if data is None:
-                data = self._sidecar_index_data()
-            if data is not None:
-                self._index = SpatialIndex(data)
+        # looked for by one thread while the others wait, which also keeps
+        # any from finding it looked for and not yet found
+        with self._lock:
+            if not self._index_looked_for:
+                self._index_looked_for = True
+                data = self._appended_index_data()
+                if data is None:
+                    data = self._sidecar_index_data()
+                if data is not None:
+                    self._index = SpatialIndex(data)
+                    # for pickling, which hands a reader on with its index
+                    self._index_data = data
         return self._index
 
     @property
@@ -865,46 +1907,203 @@ class Reader:
         whether a rectangle query can skip most of the file."""
         return self.spatial_index is not None
 
-    def _region(self, rect=None, circle=None):
+    @property
+    def octree_index(self):
+        """The octree beside this file, or None if it has none.
+
+        What ``build_spatial_index(dims=3)`` builds, found in the ``.lax3``
+        :meth:`write_spatial_index` puts it in, and looked for as lazily as
+        :attr:`spatial_index` is. A ``box=`` query prefers it to the
+        quadtree, being the one that can tell elevations apart; the other
+        two shapes use it only where there is no quadtree.
+
+        A ``.lax3`` that holds something other than an octree raises, for the
+        reason an unreadable ``.lax`` does.
+        """
+        with self._lock:
+            if not self._octree_looked_for:
+                self._octree_looked_for = True
+                data = self._sidecar_index_data(3)
+                if data is not None:
+                    index = SpatialIndex(data)
+                    if index.dims != 3:
+                        raise LazError(f"{self._sidecar_path(3)} holds a "
+                                       f"quadtree, not an octree")
+                    self._octree = index
+                    self._octree_data = data
+        return self._octree
+
+    @property
+    def chunk_summaries(self):
+        """What each chunk holds, as a tuple of :class:`ChunkSummary` in file
+        order, or None for a file written without them.
+
+        ``Writer(chunk_stats=True)`` leaves these behind the point block, and
+        every query that can use them does: an area query skips the chunks
+        whose box it misses, :meth:`arrays_between` those whose times miss
+        its window, and :meth:`grid` those that hold none of the
+        classifications or intensities its ``where`` asks for -- none of
+        them decoding a point of what it skips. A spatial index still picks
+        the points where there is one, and the summaries only strike out
+        what it picked in chunks they rule out, which an octree would have
+        and a quadtree, seeing no elevations, would not.
+
+        Read the first time they are asked for. Summaries that are there but
+        do not add up to this file's points raise, as an unreadable index
+        does, rather than being trusted to skip points they do not describe.
+        """
+        with self._lock:
+            if self._summaries is _UNPARSED:
+                record = self.header['extended_variable_length_records'].get(
+                    CHUNK_SUMMARY_EVLR_KEY)
+                self._summaries = (None if record is None
+                                   else self._summaries_of(record['data']))
+        return self._summaries
+
+    #: One chunk of the summaries' record: its point count, the box its
+    #: stored coordinates cover, its GPS times and intensities, and a bit
+    #: for each classification, as laz_chunksummaries_pack lays them out.
+    _SUMMARY = struct.Struct('<I3i3i2d2H32s')
+
+    def _summaries_of(self, data):
+        """The :class:`ChunkSummary` of every chunk, out of a record's
+        payload."""
+        if len(data) < 8:
+            raise LazError("the chunk statistics record is too short to "
+                           "hold its own count")
+        version, count = struct.unpack_from('<II', data)
+        if version != 1:
+            raise UnsupportedFileError(
+                f"chunk statistics version {version} is not one lazpy knows")
+        if len(data) != 8 + count * self._SUMMARY.size:
+            raise LazError(f"the chunk statistics record is {len(data)} "
+                           f"bytes, which is not {count} chunks of them")
+        scales, offsets = self.scales, self.offsets
+        timed = 'gps_time' in _fields_for_point_format(self.point_format,
+                                                       self.num_extra_bytes)
+        summaries = []
+        start = 0
+        for (n, *xyz, t0, t1, i0, i1,
+             bits) in self._SUMMARY.iter_unpack(data[8:]):
+            bounds = tuple(v * scales[k % 3] + offsets[k % 3]
+                           for k, v in enumerate(xyz))
+            classes = frozenset(value for value in range(256)
+                                if bits[value >> 3] >> (value & 7) & 1)
+            summaries.append(ChunkSummary(
+                start, n, bounds, (t0, t1) if timed and t0 <= t1 else None,
+                (i0, i1), classes))
+            start += n
+        total = self._fields()['number_of_point_records']
+        if start != total:
+            raise LazError(f"the chunk statistics describe {start} points, "
+                           f"and this file has {total}")
+        if self._window is not None:
+            # those of the chunks this reader reads, counted from its first
+            first_chunk, stop_chunk, first, _ = self._window
+            summaries = [summary._replace(start=summary.start - first)
+                         for summary in summaries[first_chunk:stop_chunk]]
+        return tuple(summaries)
+
+    def _summarised(self, keep):
+        """The points of the chunks *keep* passes, as ``(start, stop)``
+        spans joined where they meet; or None where the file has no
+        :attr:`chunk_summaries` to go by."""
+        summaries = self.chunk_summaries
+        if summaries is None:
+            return None
+        return _spans_of(filter(keep, summaries))
+
+    @staticmethod
+    def _reaches(bounds, rect, circle, box):
+        """Whether an area reaches a chunk's box: edges included, since a
+        chunk kept that did not need to be costs its decoding and a chunk
+        dropped that did costs points."""
+        min_x, min_y, min_z, max_x, max_y, max_z = bounds
+        if box is not None:
+            return (box[0] <= max_x and min_x <= box[3]
+                    and box[1] <= max_y and min_y <= box[4]
+                    and box[2] <= max_z and min_z <= box[5])
+        if circle is not None:
+            x, y, radius = circle
+            dx = max(min_x - x, 0.0, x - max_x)
+            dy = max(min_y - y, 0.0, y - max_y)
+            return dx * dx + dy * dy <= radius * radius
+        return (rect[0] <= max_x and min_x <= rect[2]
+                and rect[1] <= max_y and min_y <= rect[3])
+
+    def _matches(self, chunk, where):
+        """Whether a chunk can hold a point with the values of a
+        :meth:`grid` ``where``, by the fields its summary speaks for."""
+        point14 = _point_format(self.point_format).point14
+        for name, wanted in where.items():
+            values = _numpy().ravel(wanted).tolist()
+            if name == 'intensity':
+                low, high = chunk.intensity
+                found = any(low <= value <= high for value in values)
+            elif name == 'classification' and point14:
+                # the legacy field of a LAS 1.4 point is its class where that
+                # fits in five bits, and zero where it does not
+                found = any(value in chunk.classifications
+                            or value == 0
+                            and max(chunk.classifications, default=0) > 31
+                            for value in values)
+            elif (name == 'classification'
+                  or name == 'extended_classification' and point14):
+                found = not chunk.classifications.isdisjoint(values)
+            else:
+                found = True
+            if not found:
+                return False
+        return True
+
+    def _region(self, rect=None, circle=None, box=None):
+        """The region of :meth:`_query`, and the spans the query reads: the
+        plan's where it uses the index, and the whole file where scanning
+        costs no more. The query reads them inside :meth:`_reading`."""
+        region, plan = self._query(rect, circle, box)
+        spans = plan.spans if plan.use_index else [(0, self.num_points)]
+        return region, spans
+
+    def _query(self, rect=None, circle=None, box=None):
         """What the C side needs to answer a query over an area.
 
-        The area is a rectangle ``(min_x, min_y, max_x, max_y)`` or a circle
-        ``(center_x, center_y, radius)``, one or the other.
+        The area is a rectangle ``(min_x, min_y, max_x, max_y)``, a circle
+        ``(center_x, center_y, radius)`` or a box ``(min_x, min_y, min_z,
+        max_x, max_y, max_z)``, one of the three.
 
         Returns a pair. The first element is the region: the rectangle, the
         scale and offset that put a point in it, and the circle, as eleven
-        floats the C side takes as one argument. The second is the half-open
-        ``(start, stop)`` spans of point indices to look through -- the
-        index's intervals clamped against the point count, or the whole file
-        where there is no index. Clamping here is why the core never needs to
-        know how many points the file claims.
+        floats the C side takes as one argument -- fifteen for a box, whose
+        elevations and z scale and offset follow. The second is the
+        :class:`QueryPlan`, whose spans are the index's intervals clamped
+        against the point count and laid over the chunks by :meth:`_planned`,
+        or the whole file where there is no index. Clamping here is why the
+        core never needs to know how many points the file claims.
         """
-        if (rect is None) == (circle is None):
-            raise TypeError("a query is over a rectangle or a circle")
-
-        if circle is None:
+        self._check_area(rect, circle, box)
+        if box is not None:
+            min_x, min_y, min_z, max_x, max_y, max_z = box
+            center_x = center_y = radius = 0.0
+        elif circle is None:
             min_x, min_y, max_x, max_y = rect
             center_x = center_y = radius = 0.0
-            if min_x > max_x or min_y > max_y:
-                raise ValueError("rectangle is inside out: "
-                                 "min must not exceed max")
         else:
             center_x, center_y, radius = circle
-            if radius < 0:
-                raise ValueError("a circle's radius cannot be negative")
             # the rectangle goes unread for a circle: lazpy queries the index
             # with the circle itself, and tests every candidate point against
             # the circle too
             min_x = min_y = max_x = max_y = 0.0
 
-        index = self.spatial_index
+        index = self._index_for(box)
         num_points = self.num_points
         if circle is not None and not radius:
-            spans = []                      # a circle of no size holds nothing
+            runs = []                       # a circle of no size holds nothing
         elif index is None:
-            spans = [(0, num_points)]
+            runs = None
         else:
-            if circle is None:
+            if box is not None:
+                intervals = index.intervals_within_box(*box)
+            elif circle is None:
                 intervals = index.intervals(min_x, min_y, max_x, max_y)
             else:
                 intervals = index.intervals_within_circle(center_x, center_y,
@@ -913,18 +2112,478 @@ class Reader:
             # the intervals that begin past the last point rather than
             # decoding toward points this file does not have, and clamps the
             # rest against the point count
-            spans = [(start, min(end + 1, num_points))
-                     for start, end in intervals
-                     if start < num_points]
+            # and a reader of some of the file's chunks moves them to its
+            # own first point, dropping those of the chunks it does not read
+            shift = self._window[2] if self._window is not None else 0
+            runs = [(max(start - shift, 0), min(end + 1 - shift, num_points))
+                    for start, end in intervals
+                    if start - shift < num_points and end + 1 > shift]
+
+        name = cells_hit = None
+        if index is not None:
+            name = "octree" if index.dims == 3 else "quadtree"
+            cells_hit = index.cells_hit
+        summaries = self.chunk_summaries
+        if summaries is not None and runs != []:
+            reached = [chunk for chunk in summaries
+                       if self._reaches(chunk.bounds, rect, circle, box)]
+            if runs is None:
+                name, cells_hit = "chunks", len(reached)
+                runs = _spans_of(reached)
+            else:
+                runs = _overlap(runs, _spans_of(reached))
 
         scales, offsets = self.scales, self.offsets
         region = (min_x, min_y, max_x, max_y,
                   scales[0], scales[1], offsets[0], offsets[1],
                   center_x, center_y, radius)
-        return region, spans
+        if box is not None:
+            region += (min_z, max_z, scales[2], offsets[2])
+        return region, self._plan(name, cells_hit, runs)
 
     @staticmethod
-    def _area(bounds, rect, circle):
+    def _check_area(rect, circle, box):
+        """Raises for anything but exactly one area, the right way out."""
+        if sum(area is not None for area in (rect, circle, box)) != 1:
+            raise TypeError("a query is over a rectangle or a circle, or a "
+                            "box of elevations")
+        if box is not None:
+            min_x, min_y, min_z, max_x, max_y, max_z = box
+            if min_x > max_x or min_y > max_y or min_z > max_z:
+                raise ValueError("box is inside out: "
+                                 "min must not exceed max")
+        elif circle is None:
+            min_x, min_y, max_x, max_y = rect
+            if min_x > max_x or min_y > max_y:
+                raise ValueError("rectangle is inside out: "
+                                 "min must not exceed max")
+        elif circle[2] < 0:
+            raise ValueError("a circle's radius cannot be negative")
+
+    def _index_for(self, box):
+        """The index that answers a query: the octree for a box, being the
+        one that can narrow it by elevation, and the quadtree for anything
+        else; either stands in for the other where it is the only one
+        there is."""
+        if box is not None:
+            return self.octree_index or self.spatial_index
+        return self.spatial_index or self.octree_index
+
+    #: What a seek and a fresh decoder are reckoned to cost, in points
+    #: decoded: the gap across which LASzip reckons reading through two runs
+    #: cheaper than seeking between them. Decoding is paid by the point
+    #: rather than by the byte -- a survey of regular rows can compress to
+    #: almost nothing and still take its time to decode -- so points are
+    #: what the index and the scan are weighed in.
+    SEEK_COST = _RUN_GAP
+
+    def _plan(self, index, cells_hit, runs):
+        """The :class:`QueryPlan` for the runs of the index named *index*,
+        or for a scan where *runs* is None because there is no index."""
+        num_points = self.num_points
+        whole = [(0, num_points)] if num_points else []
+        scan_points, scan_bytes, scan_chunks, _ = self._decoding(whole)
+        if runs is None:
+            return QueryPlan(None, 0, 0, whole, scan_chunks, num_points,
+                             scan_points, scan_bytes, scan_points, scan_bytes,
+                             False)
+        spans = self._planned(runs)
+        points, decoded, chunks, seeks = self._decoding(spans)
+        return QueryPlan(
+            index, cells_hit, len(runs), spans, chunks,
+            sum(stop - start for start, stop in spans), points, decoded,
+            scan_points, scan_bytes,
+            points + seeks * self.SEEK_COST < scan_points)
+
+    def _chunk_table(self):
+        """Which point each chunk begins with and where, as two lists, or
+        None for a file with no chunk table.
+
+        The table is read at the first point rather than when the file is
+        opened, so a reader that has decoded nothing yet is sent to its first
+        point -- which is where it already is.
+        """
+        if self.laz_header is None or self.chunking is Chunking.NONE:
+            return None
+        points = self._points()
+        if points.chunk_points is None:
+            self.seek(0)
+        firsts, starts = points.chunk_points, points.chunk_starts
+        if not firsts:
+            return None
+        # a fixed-size table's last boundary is a whole chunk on, past the
+        # last point
+        num_points = self.num_points
+        return [min(first, num_points) for first in firsts], starts
+
+    def chunks(self):
+        """Every chunk of the file, as a tuple of :class:`Chunk` in file
+        order: the point each begins with, how many it holds, and the bytes
+        it takes up. None for a file without chunks -- plain LAS, or LAZ
+        compressed point by point.
+
+        The manifest a scheduler splits a file by. A chunk is the least a
+        reader can decode on its own, so work units made of whole chunks --
+        ``Reader(path, chunks=(start, stop))`` opens one -- decode nothing
+        twice, and their byte lengths weigh them by what each has to read,
+        which for an adaptive file, whose chunks hold as many points as its
+        writer chose, point counts do not.
+
+        Out of the chunk table, which is read for it if it has not been.
+        Where the file lost its table and this reader is rebuilding it, the
+        rest of the chunks are found by reading up to the last point, which
+        leaves the reader after it; a file whose chunks are not all there
+        raises LazError, as :meth:`save_chunk_table` does.
+        """
+        if self.laz_header is None or self.chunking is Chunking.NONE:
+            return None
+        with self._cursor():
+            points = self._points()
+            if self.chunking is Chunking.FIXED:
+                starts, _ = self._fixed_chunk_starts()
+                num_points, size = self.num_points, self.chunk_size
+                firsts = [min(n * size, num_points)
+                          for n in range(len(starts))]
+            else:
+                if points.chunk_points is None:
+                    self.seek(0)
+                firsts, starts = points.chunk_points, points.chunk_starts
+        return tuple(Chunk(firsts[n], firsts[n + 1] - firsts[n], starts[n],
+                           starts[n + 1] - starts[n])
+                     for n in range(len(starts) - 1))
+
+    def save_chunk_table(self, in_place=False):
+        """Keep the chunk table this reader had to rebuild, so that the next
+        reader of the file can seek at once.
+
+        A file whose chunk table is lost -- its writer interrupted, or
+        streamed somewhere the table never reached -- or will not decode is
+        still read whole where its chunks are all one size, since each ends
+        where the next begins. But where they begin is only found by reading
+        up to them, so every seek, and every query an index sends across the
+        file, first decodes everything before where it lands. This finds
+        every chunk, reading the rest of the file if it has to, and keeps
+        where each one begins.
+
+        By default in a ``.lazt`` beside the file, which a :class:`Reader`
+        opening the file by name takes in place of the table it would
+        otherwise rebuild; it is passed over once the file is no longer the
+        length it was saved for. ``in_place=True`` writes a LASzip chunk
+        table onto the end of the file itself instead, and points the file
+        at it, which mends the file for any LAZ reader -- and changes it,
+        which the sidecar does not. Returns the path written.
+
+        Raises ValueError for a file whose table is whole, which has nothing
+        to keep, and for one opened from a file object, which has no name to
+        keep it by. The reader is left after the last point where the rest
+        of the file had to be read.
+        """
+        if self._path is None:
+            raise ValueError("a reader opened on a file object has no name "
+                             "to keep a chunk table by")
+        if self.chunking is Chunking.NONE:
+            raise ValueError("a file without chunks has no chunk table")
+        if self.chunking is Chunking.ADAPTIVE:
+            raise ValueError("adaptive chunks are known only from the file's "
+                             "own table, so no reader rebuilds one to keep")
+        if self._window is not None:
+            raise ValueError("a reader of some of the file's chunks has only "
+                             "those to keep")
+        starts, whole = self._fixed_chunk_starts()
+        if whole:
+            raise ValueError("the file's own chunk table is whole; there is "
+                             "nothing to keep")
+        chunks = len(starts) - 1
+        size = self._length()
+        if in_place:
+            self._append_chunk_table(starts)
+            return self._path
+        path = _table_sidecar_for(self._path)
+        with open(path, 'wb') as fp:
+            fp.write(_SAVED_TABLE.pack(_SAVED_TABLE_TAG, _SAVED_TABLE_VERSION,
+                                       size, chunks))
+            fp.write(struct.pack(f'<{chunks + 1}q', *starts))
+        return path
+
+    def _fixed_chunk_starts(self):
+        """Where each chunk of a file of fixed-size chunks starts, and then
+        where the last one ends, with whether the file's own table said so.
+
+        A whole table says where its last chunk ends as well, where one
+        being rebuilt has only the starts reading has found so far; the rest
+        of those are found by reading the last point, which opens the last
+        chunk and every one before it on the way there, and leaves the
+        reader after it.
+        """
+        points = self._points()
+        if points.chunk_points is None:
+            self.seek(0)
+        num_points = self.num_points
+        chunks = -(-num_points // self.chunk_size)
+        if len(points.chunk_starts) > chunks:
+            return points.chunk_starts[:chunks + 1], True
+        if len(points.chunk_starts) < chunks:
+            self.seek(num_points - 1)
+            self.read()
+        starts = points.chunk_starts[:chunks]
+        if len(starts) < chunks:
+            raise LazError(f"reading found {len(starts)} of the file's "
+                           f"{chunks} chunks")
+        # and where the last one ends, which is where a table would go
+        starts.append(self._end_of_chunks(self._length()))
+        return starts, False
+
+    def _end_of_chunks(self, size):
+        """Where the last chunk of a file *size* bytes long that has lost
+        its table ends: before any extended records, or else at the end of
+        the file."""
+        fields = self._fields()
+        return (fields['start_of_first_extended_variable_length_record']
+                if fields['extended_variable_length_records'] else size)
+
+    def _saved_chunk_table(self, point_data_offset):
+        """The chunk starts :meth:`save_chunk_table` kept beside this file,
+        or None where there are none that still fit it.
+
+        A saved table is good only for the file as it was saved, so one for
+        a file of another length is stale, and passed over as anything else
+        that is not a table of this file's chunks is: what that costs is no
+        more than the reading it was kept to spare.
+        """
+        try:
+            with open(_table_sidecar_for(self._path), 'rb') as fp:
+                data = fp.read()
+        except OSError:
+            return None
+        if len(data) < _SAVED_TABLE.size:
+            return None
+        tag, version, size, count = _SAVED_TABLE.unpack_from(data)
+        if (tag != _SAVED_TABLE_TAG or version != _SAVED_TABLE_VERSION
+                or size != self._length() or not count
+                or len(data) != _SAVED_TABLE.size + 8 * (count + 1)):
+            return None
+        starts = struct.unpack_from(f'<{count + 1}q', data,
+                                    _SAVED_TABLE.size)
+        # the first chunk follows the eight bytes that say where the table is
+        if (starts[0] != point_data_offset + 8 or starts[-1] > size
+                or not all(map(operator.lt, starts, starts[1:]))):
+            return None
+        return starts
+
+    def _append_chunk_table(self, starts):
+        """Write *starts*, which end with where the last chunk does, onto
+        the end of this file as the LASzip chunk table its writer would have
+        left, and point the file at it."""
+        lengths = [b - a for a, b in zip(starts, starts[1:])]
+        table = io.BytesIO()
+        table.write(struct.pack('<II', 0, len(lengths)))
+        if lengths:
+            # each length as a delta from the one before, entropy coded as
+            # write_chunk_table codes it (src/laz_writepoint.c)
+            encoder = ArithmeticEncoder(table)
+            compressor = IntegerCompressor(encoder, 32, 2, 8, 0)
+            encoder.start()
+            compressor.init_compressor()
+            previous = 0
+            for length in lengths:
+                compressor.compress(previous, length, 1)
+                previous = length
+            encoder.done()
+        with open(self._path, 'r+b') as fp:
+            position = fp.seek(0, io.SEEK_END)
+            fp.write(table.getvalue())
+            fp.seek(starts[0] - 8)
+            fp.write(struct.pack('<q', position))
+
+    def _decoding(self, spans):
+        """What reading *spans* costs: ``(points decoded, bytes decoded,
+        chunks decoded into, seeks)``.
+
+        Each span in a chunked file is decoded from the start of the chunk it
+        begins in, and each begins with a seek. The POINTWISE container is one
+        chunk, decoded from the first point. A plain LAS file decodes
+        nothing, and reads only the records asked for, a seek apart.
+        """
+        if not spans:
+            return 0, 0, 0, 0
+        record = self._fields()['point_data_record_length']
+        if self.laz_header is None:
+            points = sum(stop - start for start, stop in spans)
+            return points, points * record, 0, len(spans)
+        table = self._chunk_table()
+        if table is None:
+            points = spans[-1][1]
+            return points, points * record, 1, 1
+        firsts, starts = table
+
+        def chunk_of(index):
+            return max(bisect.bisect_right(firsts, index) - 1, 0)
+
+        def offset_of(index):
+            # linear within a chunk, and at the table's average past it
+            k = chunk_of(index)
+            if k + 1 < len(firsts) and firsts[k + 1] > firsts[k]:
+                width = ((starts[k + 1] - starts[k])
+                         / (firsts[k + 1] - firsts[k]))
+            elif firsts[-1]:
+                width = (starts[-1] - starts[0]) / firsts[-1]
+            else:
+                width = record
+            return starts[k] + (index - firsts[k]) * width
+
+        points = decoded = 0
+        touched = set()
+        for start, stop in spans:
+            first, last = chunk_of(start), chunk_of(stop - 1)
+            touched.update(range(first, last + 1))
+            points += stop - firsts[first]
+            decoded += offset_of(stop) - starts[first]
+        return points, int(decoded), len(touched), len(spans)
+
+    def explain(self, *bounds, rect=None, circle=None, box=None):
+        """How a query over this area would be read, as a
+        :class:`QueryPlan`, without reading it.
+
+        Takes the area as :meth:`points_within` does. What comes back is
+        which index answered and how many of its cells, the spans of points
+        it leaves to decode and how many chunks they reach, and an estimate
+        of the bytes that is beside the bytes of scanning the whole file::
+
+            >>> reader.explain(rect=(x0, y0, x1, y1))      # doctest: +SKIP
+            QueryPlan(index='quadtree', cells_hit=4, runs=40, spans=[...],
+                      chunks=2, candidates=76080, decoded_points=78080,
+                      decoded_bytes=1127, scan_points=2000000,
+                      scan_bytes=28454, use_index=True)
+
+        Which is what tells a query slowed by a badly built ``.lax`` from one
+        that is simply large: an index whose runs reach most of the chunks
+        decodes most of the file, and where it would cost at least what a
+        scan does the query scans instead, which ``use_index`` says. The
+        estimate is the points from each span's chunk start to its end, and
+        :attr:`SEEK_COST` more for each span.
+
+        Reads the index, and the chunk table if it has not been read; no
+        points. The reader may be left at its first point.
+        """
+        rect, circle, box = self._area(bounds, rect, circle, box)
+        return self._query(rect, circle, box)[1]
+
+    def estimate_count(self, *bounds, rect=None, circle=None, box=None):
+        """How many points an area holds, as a :class:`CountEstimate`,
+        from the spatial index alone.
+
+        Takes the area as :meth:`points_within` does. A ``.lax`` states how
+        many points fell in each of its cells, so the answer is those counts
+        added up over the cells the area reaches -- each one's shared out by
+        how much of it the area covers -- and costs a walk down the index
+        rather than a decode::
+
+            >>> reader.estimate_count(rect=(x0, y0, x1, y1))  # doctest: +SKIP
+            CountEstimate(count=76212, low=65536, high=81920)
+
+        Which is what sizing a job or a tile, or choosing between areas,
+        wants; the exact count is ``len(reader.arrays_within(...)["X"])``.
+        The index is the one a query would use, so a box is estimated by its
+        elevations only where there is an octree: a quadtree counts the
+        rectangle under it.
+        Raises ValueError for a file with no index, which has no counts to
+        estimate from.
+        """
+        rect, circle, box = self._area(bounds, rect, circle, box)
+        self._check_area(rect, circle, box)
+        index = self._index_for(box)
+        if index is None:
+            raise ValueError("estimating a count needs a spatial index; "
+                             "build_spatial_index() makes one")
+        if box is not None:
+            estimate, low, high = index.estimate_within_box(*box)
+        elif circle is not None:
+            estimate, low, high = index.estimate_within_circle(*circle)
+        else:
+            estimate, low, high = index.estimate(*rect)
+        return CountEstimate(round(estimate), low, high)
+
+    def density(self, cell_size=None):
+        """How the points are spread over the ground, as a :class:`Raster`,
+        from the spatial index alone.
+
+        The ``"count"`` band is how many points each cell holds and
+        ``"density"`` how many that is to a unit of area, both shared out
+        from the counts of the index cells under each raster cell by how
+        much of each one it covers -- a coarse picture, as fine as the
+        index's cells, for picking tile sizes or finding the gaps in a
+        survey without decoding it. *cell_size* defaults to the index's
+        smallest cell; the raster covers the index's bounds, on the
+        multiples of *cell_size* that :meth:`grid`'s cells are on. Both
+        bands are float64.
+
+        Raises ValueError for a file with no index.
+        """
+        np = _numpy()
+        index = self._index_for(None)
+        if index is None:
+            raise ValueError("a density raster needs a spatial index; "
+                             "build_spatial_index() makes one")
+        if cell_size is None:
+            cell_size = min((box[index.dims] - box[0]
+                             for box, _ in index.cell_counts()
+                             if box[index.dims] > box[0]), default=1.0)
+        if not cell_size > 0:
+            raise ValueError("a cell's size must be positive")
+        bounds = index.bounds
+        left, bottom, rows, cols = self._raster_cells(
+            cell_size, (None, None, None),
+            bounds[:2] + bounds[index.dims:index.dims + 2])
+        count = np.zeros((rows, cols))
+        index.density(left, bottom, cell_size, (rows, cols), count)
+        return Raster({"count": count, "density": count / cell_size ** 2},
+                      (left, cell_size, 0.0, bottom + rows * cell_size, 0.0,
+                       -cell_size))
+
+    def _planned(self, spans):
+        """The spans a query reads, joined wherever the decoder would go
+        through the points between them anyway.
+
+        A compressed point can only be reached by decoding every point
+        before it in its chunk, so the gap between two spans in one chunk is
+        decoded whether it is read or seeked over: seek() decodes it forward
+        and throws it away. Reading it instead costs the region test on each
+        gap point and nothing more, and saves the seek, the read call and --
+        for the arrays -- a block of columns per span. The decoding is what
+        it was: seek() never restarted a chunk to go forward in it.
+
+        So a span is joined to the one before it when it begins in the chunk
+        reading would go on into from where that one stopped; a span in a
+        later chunk still begins with a seek, which starts that chunk's
+        decoder afresh. Each chunk a query touches is decoded once, from its
+        first point to its last needed one. The points the joined gaps hold
+        are outside the index's cells, and so fail the region test.
+
+        The chunk table says where chunks begin, and is read at the first
+        point rather than when the file is opened. A plain LAS file reaches
+        any point for the price of a file seek, and keeps its spans; the
+        POINTWISE container is one chunk end to end.
+        """
+        if len(spans) < 2 or self.laz_header is None:
+            return spans
+        if self.chunking is Chunking.NONE:
+            return [(spans[0][0], spans[-1][1])]
+        table = self._chunk_table()
+        if table is None:
+            return spans
+        firsts, _ = table
+        planned = [spans[0]]
+        for start, stop in spans[1:]:
+            first, last_stop = planned[-1]
+            if (bisect.bisect_right(firsts, start)
+                    == bisect.bisect_right(firsts, last_stop)):
+                planned[-1] = (first, stop)
+            else:
+                planned.append((start, stop))
+        return planned
+
+    @staticmethod
+    def _area(bounds, rect, circle, box=None):
         """One area from either spelling of it.
 
         A rectangle may be given as four numbers or as ``rect=``, so that the
@@ -932,14 +2591,14 @@ class Reader:
         older positional form goes on working.
         """
         if not bounds:
-            return rect, circle
-        if rect is not None or circle is not None:
+            return rect, circle, box
+        if rect is not None or circle is not None or box is not None:
             raise TypeError("give a rectangle once, not twice")
         if len(bounds) != 4:
             raise TypeError("a rectangle is min_x, min_y, max_x, max_y")
-        return bounds, None
+        return bounds, None, None
 
-    def points_within(self, *bounds, rect=None, circle=None):
+    def points_within(self, *bounds, rect=None, circle=None, box=None):
         """Yield the points inside a rectangle, in file order.
 
         The rectangle is half-open -- a point counts when ``min_x <= x <
@@ -950,21 +2609,30 @@ class Reader:
 
         With a spatial index, only the runs of points the index says could be
         inside are decoded. Without one it is a filtered full scan: the same
-        points, at the cost of reading everything.
+        points, at the cost of reading everything -- which is also what a
+        query does where its runs would cost no less, and :meth:`explain`
+        says which it will be.
 
         The rectangle is four numbers, or ``rect=(min_x, min_y, max_x,
         max_y)``; ``circle=(center_x, center_y, radius)`` selects that shape
-        instead. Those are the arguments :meth:`arrays_within` and
-        :meth:`xyz_within` take, so a query keeps its shape when it moves
-        between them.
+        instead, and ``box=(min_x, min_y, min_z, max_x, max_y, max_z)`` a
+        rectangle between two elevations, half-open in z as in x and y. Those
+        are the arguments :meth:`arrays_within` and :meth:`xyz_within` take,
+        so a query keeps its shape when it moves between them.
+
+        A box is what an octree -- ``build_spatial_index(dims=3)`` -- is for:
+        with one, only the runs of points near those elevations are decoded.
+        With only a quadtree it decodes what the rectangle under it would,
+        and keeps the points between the elevations.
 
         As with :meth:`points`, each iteration yields the same object with new
         contents; call ``point.copy()`` to keep one. The reader is left
         wherever the last interval ended, so :meth:`seek` before reading
         sequentially again.
         """
-        rect, circle = self._area(bounds, rect, circle)
-        return self._points_in(*self._region(rect=rect, circle=circle))
+        rect, circle, box = self._area(bounds, rect, circle, box)
+        return self._points_in(*self._region(rect=rect, circle=circle,
+                                             box=box))
 
     def points_within_circle(self, center_x, center_y, radius):
         """Yield the points inside a circle, in file order.
@@ -986,13 +2654,14 @@ class Reader:
     def _points_in(self, region, spans):
         """Yield the points a query selects, interval by interval."""
         read_within = self._points().read_within
-        for start, stop in spans:
-            self.seek(start)
-            while True:
-                point = read_within(stop, region)
-                if point is None:
-                    break
-                yield point
+        with self._reading(spans):
+            for start, stop in spans:
+                self.seek(start)
+                while True:
+                    point = read_within(stop, region)
+                    if point is None:
+                        break
+                    yield point
 
     # -- reading as arrays -----------------------------------------------
 
@@ -1000,7 +2669,7 @@ class Reader:
         """Where *name* lives in a decoded point, sized for this file."""
         return _array_field(name, self.num_extra_bytes)
 
-    def arrays(self, *names, start=None, count=None):
+    def arrays(self, *names, start=None, count=None, shared=False):
         """Decode points into numpy arrays, one per field.
 
         Returns ``{name: array}``, each array *count* long and in file order.
@@ -1025,18 +2694,77 @@ class Reader:
         to the end of the file unless *count* says otherwise; a *count* past
         the end stops there, as slicing does. The reader is left after the
         last point read, so successive calls walk the file in blocks.
+
+        ``shared=True`` decodes into one block of shared memory instead, and
+        returns it as a :class:`~lazpy.shared.SharedArrays` -- the same
+        mapping of columns, which another process attaches to rather than
+        being sent a copy. The block is the caller's to unlink.
         """
-        if start is not None:
+        if start is None:
+            return self._arrays_here(names, count, shared)
+        with self._cursor():
             self.seek(start)
+            return self._arrays_here(names, count, shared)
+
+    def _arrays_here(self, names, count, shared=False):
+        """:meth:`arrays` from wherever the reader is."""
         remaining = self.num_points - self.index
         count = remaining if count is None else min(count, remaining)
 
+        if shared:
+            from .shared import SharedArrays
+            out = SharedArrays(self._column_layout(names), count)
+            try:
+                self._fill_columns(out, count)
+            except BaseException:
+                out.unlink()
+                raise
+            return out
         # no names at all means every field, which _array_columns settles --
         # it has to, since arrays_within reaches it the same way
         out, targets, packed = self._array_columns(names, count)
         self._points().read_into(targets, count)
         return self._finish_columns(out, packed, count)
 
+    def _column_layout(self, names):
+        """``(name, dtype, width)`` of the column :meth:`arrays` returns for
+        each of *names*, or for every field without names."""
+        if not names:
+            names = _fields_for_point_format(self.point_format,
+                                             self.num_extra_bytes)
+        layout = []
+        for name in names:
+            f = self._array_field(name)
+            layout.append((name, f.dtype, f.width))
+        return layout
+
+    def _fill_columns(self, columns, count):
+        """Decode *count* points from where the reader is into *columns*,
+        ``{name: array}`` of at least as many rows each, laid out as
+        :meth:`_column_layout` has them -- arrays of someone else's, such as
+        part of a :class:`~lazpy.shared.SharedArrays`.
+
+        The sub-byte fields are unpacked into theirs from a byte column of
+        this call's own, which is the one thing allocated here.
+        """
+        np = _numpy()
+        targets, packed, byte_columns = [], [], {}
+        for name, column in columns.items():
+            f = self._array_field(name)
+            column = column[:count]
+            if f.mask is None:
+                targets.append((column, f.offset,
+                                column.itemsize * f.width))
+                continue
+            if f.offset not in byte_columns:
+                byte_columns[f.offset] = np.empty(count, dtype=f.dtype)
+                targets.append((byte_columns[f.offset], f.offset, 1))
+            packed.append((column, f, byte_columns[f.offset]))
+        self._points().read_into(targets, count)
+        for column, f, byte_column in packed:
+            np.right_shift(byte_column, f.shift, out=column)
+            column &= f.mask
+
     def _array_columns(self, names, count):
         """Arrays for *names*, and the read_into targets that fill them.
 
@@ -1088,20 +2816,23 @@ class Reader:
                              else column[:count])
         return out
 
-    def arrays_within(self, *names, rect=None, circle=None):
+    @_on_a_cursor
+    def arrays_within(self, *names, rect=None, circle=None, box=None):
         """The points inside a rectangle or a circle, as numpy arrays.
 
         :meth:`arrays` and :meth:`points_within` in one: the fields *names*
         asks for, of the points the area contains, selected the same way and
         with the same edges. The area is ``rect``, which is
         ``(min_x, min_y, max_x, max_y)``, or ``circle``, which is
-        ``(center_x, center_y, radius)``.
+        ``(center_x, center_y, radius)``, or ``box``, which is
+        ``(min_x, min_y, min_z, max_x, max_y, max_z)``.
 
         The index decides which points to decode, and the array path decides
         how cheaply to hand them over::
 
             a = reader.arrays_within("X", "Y", "Z", rect=(x0, y0, x1, y1))
             a = reader.arrays_within("X", "Y", circle=(x, y, 30.0))
+            a = reader.arrays_within("Z", box=(x0, y0, 200, x1, y1, 220))
 
         Arrays are sized for the candidates being looked through and trimmed
         to what was really inside, so a query briefly holds more than it
@@ -1110,10 +2841,11 @@ class Reader:
         from sizing itself for the whole file. The reader is left wherever
         the last interval ended.
         """
-        region, spans = self._region(rect=rect, circle=circle)
-        blocks = [self._within_block(names, region, start, stop)
-                  for span_start, span_stop in spans
-                  for start, stop in self._blocks(span_start, span_stop)]
+        region, spans = self._region(rect=rect, circle=circle, box=box)
+        with self._reading(spans):
+            blocks = [self._within_block(names, region, start, stop)
+                      for span_start, span_stop in spans
+                      for start, stop in self._blocks(span_start, span_stop)]
         return self._joined(names, blocks)
 
     #: How many points an area query looks through at once. Its arrays are
@@ -1149,14 +2881,14 @@ class Reader:
         return {name: np.concatenate([block[name] for block in blocks])
                 for name in blocks[0]}
 
-    def xyz_within(self, rect=None, circle=None):
+    def xyz_within(self, rect=None, circle=None, box=None):
         """The georeferenced points inside an area, as ``(N, 3)`` floats.
 
-        :meth:`xyz` restricted to ``rect`` or ``circle``, which are what
-        :meth:`arrays_within` takes them to be.
+        :meth:`xyz` restricted to ``rect``, ``circle`` or ``box``, which are
+        what :meth:`arrays_within` takes them to be.
         """
         return self._scaled_xyz(self.arrays_within('X', 'Y', 'Z', rect=rect,
-                                                   circle=circle))
+                                                   circle=circle, box=box))
 
     def xyz(self, start=None, count=None):
         """The georeferenced points, as an ``(N, 3)`` array of floats.
@@ -1179,3 +2911,788 @@ class Reader:
             np.multiply(columns[name], scales[i], out=xyz[:, i])
             xyz[:, i] += offsets[i]
         return xyz
+
+    # -- time windows ----------------------------------------------------
+
+    def points_between(self, t0, t1):
+        """Yield the points whose GPS time is in ``t0 <= gps_time < t1``, in
+        file order.
+
+        Half-open, as an area query is, so that consecutive windows share no
+        points. A file whose points are in time order -- which a flight
+        line's are, and a file of flight lines flown one after another is --
+        is searched rather than scanned: the chunks are bisected by the time
+        of the first point of each, which is one point decoded per step, and
+        only the chunks the window falls in are decoded after that. Those
+        are decoded twice, once for their times, to find exactly where the
+        window begins and ends, and once for the points in it.
+
+        A file that is not in time order, a tile cut from several flight
+        lines, is scanned and filtered instead: the same points, at the cost
+        of reading everything. What decides it is what the search sees --
+        the times of the chunks it looked at and of every point in the
+        chunks it decodes -- so a file out of order only where the search
+        never looks is taken to be in order, and answered for the part
+        it does look at. A POINTWISE file, which no chunk table divides, is
+        always scanned.
+
+        As with :meth:`points`, each iteration yields the same object with
+        new contents; call ``point.copy()`` to keep one.
+        """
+        self._check_window(t0, t1)
+        return self._points_between(t0, t1)
+
+    def _points_between(self, t0, t1):
+        """:meth:`points_between`, searching once it is first asked for a
+        point: the chunks the search reads up front are held for decoding
+        the points after it, and let go of with the generator."""
+        with self._reading():
+            found = self._time_range(t0, t1)
+            if found is not None:
+                yield from self.points(*found)
+                return
+            spans = self._timed_spans(t0, t1)
+            self._plan_reads(spans)
+            for start, stop in spans:
+                for point in self.points(start, stop - start):
+                    if t0 <= point.gps_time < t1:
+                        yield point
+
+    def _timed_spans(self, t0, t1):
+        """What a scan for a time window reads: the chunks whose times the
+        :attr:`chunk_summaries` say reach it, or the whole file."""
+        spans = self._summarised(lambda chunk: chunk.gps_time is not None
+                                 and chunk.gps_time[0] < t1
+                                 and t0 <= chunk.gps_time[1])
+        return [(0, self.num_points)] if spans is None else spans
+
+    @_on_a_cursor
+    def arrays_between(self, t0, t1, *names):
+        """The points whose GPS time is in ``t0 <= gps_time < t1``, as numpy
+        arrays.
+
+        :meth:`arrays` and :meth:`points_between` in one: the fields *names*
+        asks for -- every field, without names -- of the points in the
+        window, found the way :meth:`points_between` finds them::
+
+            a = reader.arrays_between(t, t + 5.0, "X", "Y", "Z", "gps_time")
+
+        Where the file is searched, the chunks the window falls in are
+        decoded once: the fields are read along with the times that find
+        where the window begins and ends, and cut to it. Where it has to be
+        scanned it is decoded a block of :data:`WITHIN_BLOCK` points at a
+        time, so what this holds is the answer and one block -- and only the
+        chunks whose times reach the window are, where the file has
+        :attr:`chunk_summaries` to say which.
+        """
+        with self._reading():
+            found = self._time_range(t0, t1, names)
+            if found is not None:
+                start, count, columns = found
+                if columns is not None:
+                    return columns
+                return self.arrays(*names, start=start, count=count)
+        np = _numpy()
+        columns = names and tuple(dict.fromkeys(names + ('gps_time',)))
+        blocks = []
+        spans = self._timed_spans(t0, t1)
+        with self._reading(spans):
+            for start, stop in (piece for span in spans
+                                for piece in self._blocks(*span)):
+                block = self.arrays(*columns, start=start,
+                                    count=stop - start)
+                times = block['gps_time']
+                keep = (times >= t0) & (times < t1)
+                blocks.append({name: block[name][keep]
+                               for name in names or block})
+        if not blocks:
+            return self._joined(names, blocks)
+        return {name: np.concatenate([block[name] for block in blocks])
+                for name in blocks[0]}
+
+    #: How far apart the points a plain LAS file is bisected by are, which
+    #: has nothing to divide it into chunks: as many points as LASzip puts
+    #: in one.
+    TIME_STRIDE = 50000
+
+    def _check_window(self, t0, t1):
+        """Raises for a window that is not one, or a file without GPS
+        times."""
+        if not t0 <= t1:
+            raise ValueError("a time window runs from t0 to a t1 no earlier")
+        if 'gps_time' not in _fields_for_point_format(self.point_format,
+                                                      self.num_extra_bytes):
+            raise ValueError(f"point format {self.point_format} has no "
+                             f"GPS time")
+
+    def _time_range(self, t0, t1, names=None):
+        """The points from the first in a time window to the first after it,
+        as ``(start, count)``; or None where the file has to be scanned,
+        because it is not in time order or has no chunks to bisect by.
+
+        With *names*, the fields :meth:`arrays_between` asks for, it is
+        ``(start, count, columns)``: those fields of the points in the
+        window, cut from the chunks decoded to find it rather than decoded
+        again -- or None for columns where nothing was decoded.
+
+        Raises for a window that is not one, or a file without GPS times.
+        """
+        self._check_window(t0, t1)
+        gps_time = self._array_field('gps_time')
+        num_points = self.num_points
+        if self.laz_header is None:
+            firsts = range(0, num_points, self.TIME_STRIDE)
+        elif self.chunking is Chunking.NONE:
+            return None
+        else:
+            table = self._chunk_table()
+            if table is None:
+                return None
+            # a writer that closes on a chunk boundary leaves an empty
+            # chunk after it, which has no first point to look at
+            firsts = [first for first in table[0] if first < num_points]
+        if not len(firsts):
+            return (0, 0) if names is None else (0, 0, None)
+
+        # the chunks the window may reach: from the last one beginning before
+        # t0 -- whose end may be in it -- to the first beginning at t1 or after
+        times = _FirstTimes(self, firsts)
+        with self._ahead_held():
+            first = max(bisect.bisect_left(times, t0) - 1, 0)
+            last = bisect.bisect_left(times, t1, first)
+            after = times[last] if last < len(firsts) else math.inf
+        if not times.in_order():
+            return None
+        span_stop = firsts[last] if last < len(firsts) else num_points
+        # decoded twice over for points, for the times and then for the
+        # points in the window; arrays are read with the times instead
+        self._plan_reads([(firsts[first], span_stop)])
+        if names is not None:
+            columns = names and tuple(dict.fromkeys(names + ('gps_time',)))
+            read = []
+
+        # the times of every point in those chunks, to see that they are in
+        # order too and to find where in them the window begins and ends
+        start = stop = None
+        previous = -math.inf
+        for block_start, block_stop in self._blocks(firsts[first], span_stop):
+            if names is None:
+                block = array('d', bytes(8 * (block_stop - block_start)))
+                self.seek(block_start)
+                self._points().read_into([(block, gps_time.offset, 8)],
+                                         block_stop - block_start)
+            else:
+                read.append((block_start, self.arrays(
+                    *columns, start=block_start,
+                    count=block_stop - block_start)))
+                block = array('d', read[-1][1]['gps_time'].tobytes())
+            if not (previous <= block[0]
+                    and all(map(operator.le, block, block[1:]))):
+                return None
+            previous = block[-1]
+            if start is None and previous >= t0:
+                start = block_start + bisect.bisect_left(block, t0)
+            if stop is None and previous >= t1:
+                stop = block_start + bisect.bisect_left(block, t1)
+        if previous > after:
+            return None
+        start = span_stop if start is None else start
+        stop = span_stop if stop is None else stop
+        if names is None:
+            return start, stop - start
+        # each block cut to the window, dropping those wholly outside it
+        blocks = [{name: block[name][max(start - at, 0):stop - at]
+                   for name in names or block}
+                  for at, block in read
+                  if at < stop and start < at + len(block['gps_time'])]
+        return start, stop - start, self._joined(names, blocks)
+
+    # -- thinning --------------------------------------------------------
+
+    @_on_a_cursor
+    def voxel_downsample(self, *names, size, keep="centroid", rect=None,
+                         circle=None, box=None, writer=None):
+        """The points thinned to one per voxel, as numpy arrays.
+
+        Space is cut into boxes *size* across -- ``(dx, dy, dz)``, or one
+        number for cubes -- on a grid anchored at the origin of the
+        georeferenced coordinates, so two files thinned to the same size
+        share their voxels. ``(dx, dy)`` makes each voxel a column that
+        takes in every elevation. Each voxel keeps one point:
+
+        * ``"first"``: the first of its points in file order;
+        * ``"centroid"``: that same point, moved to the mean position of all
+          of them -- its other fields are still the first point's;
+        * ``"lowest"`` or ``"highest"``: the point with the least or the
+          greatest Z, the first of them where several tie.
+
+        The points come back in the order their voxels were first reached,
+        as the fields *names* asks for, as :meth:`arrays` would hand them
+        over::
+
+            a = reader.voxel_downsample("X", "Y", "Z", size=0.5)
+            ground = reader.voxel_downsample(size=(2.0, 2.0), keep="lowest")
+
+        The file is read once, in C, and what that costs in memory is a
+        point per voxel rather than the file: thinning with numpy instead
+        needs every point decoded, and then the sort behind ``np.unique``.
+
+        ``rect``, ``circle`` or ``box`` thin only the points inside that
+        area, as :meth:`arrays_within` selects them. With *writer*, a
+        :class:`Writer`, the points are written to it rather than returned,
+        and what comes back is how many there were. The reader is left after
+        the last point it read.
+        """
+        size = tuple(size) if isinstance(size, (tuple, list)) else (size,) * 3
+        if len(size) == 2:
+            size += (0.0,)          # the z of a column: C's "no z at all"
+        if len(size) != 3:
+            raise ValueError("a voxel's size is one number, or (dx, dy) or "
+                             "(dx, dy, dz)")
+        if not all(extent > 0 for extent in size[:3 if size[2] else 2]):
+            raise ValueError("a voxel's size must be positive")
+        if keep not in _VOXEL_KEEPS:
+            raise ValueError(f"keep is one of {', '.join(_VOXEL_KEEPS)}, "
+                             f"not {keep!r}")
+        if rect is None and circle is None and box is None:
+            region, spans = None, [(0, self.num_points)]
+        else:
+            region, spans = self._region(rect=rect, circle=circle, box=box)
+
+        with self._reading(spans):
+            count, records = self._points().voxel_downsample(
+                spans, region, size, self.scales, self.offsets, keep)
+        columns = self._columns_of(names, count, records)
+        if writer is None:
+            return columns
+        writer.write_arrays(columns, count)
+        return count
+
+    def _columns_of(self, names, count, records):
+        """Columns for *names* out of *count* decoded point images, each
+        followed by its extra bytes, as the C side hands a point back when
+        it has kept more than one."""
+        np = _numpy()
+        out, targets, packed = self._array_columns(names, count)
+        images = np.frombuffer(records, dtype=np.uint8).reshape(
+            count, _POINT_EXTENT + self.num_extra_bytes)
+        # the bytes of each target are where read_into would have copied
+        # them from, so a field is a slice of every image at once
+        for column, offset, width in targets:
+            start = _POINT_EXTENT if offset == -1 else offset
+            column.view(np.uint8).reshape(count, width)[:] = \
+                images[:, start:start + width]
+        return self._finish_columns(out, packed, count)
+
+    # -- rasters ---------------------------------------------------------
+
+    @_on_a_cursor
+    def grid(self, cell_size, stat="max_z", *, rect=None, circle=None,
+             box=None, where=None, power=2.0):
+        """The points binned into square cells, as a :class:`Raster`.
+
+        *stat* is what a cell says of the points in it, or a sequence of
+        those to make several rasters in the one pass: ``"count"``, or
+        ``"min_"``, ``"max_"``, ``"mean_"`` or ``"idw_"`` followed by a field
+        -- ``z``, ``intensity``, ``gps_time``, any one-number field of
+        :meth:`arrays`::
+
+            dsm = reader.grid(0.5, "max_z").bands["max_z"]
+            r = reader.grid(1.0, ("min_z", "count", "mean_intensity"),
+                            where={"classification": 2})
+
+        X, Y and Z are georeferenced, as :meth:`xyz` gives them; any other
+        field is as stored. ``idw`` weights each point by its distance from
+        the cell's centre to the power -*power*, a point right at the centre
+        taking the cell. Cells no point fell in are NaN, or 0 for
+        ``count``, whose band is int64 where the rest are float64. A bare
+        ``"idw"`` is ``"idw_z"``, its band keyed by the name given.
+
+        *where* keeps only the points whose fields have the values given,
+        ``{name: value}`` or ``{name: (value, ...)}`` -- the ground returns
+        for a terrain model, the first returns for a surface. A file with
+        :attr:`chunk_summaries` is not decoded where they say no point has
+        the classification or intensity asked for.
+
+        The raster covers ``rect``, or the square around ``circle``, or
+        ``box`` seen from above, and takes in only the points the area
+        selects, as :meth:`arrays_within` does; without one it covers the
+        points, every one of them whether *where* keeps it or not. That is
+        where they are, not where the header says: a header left stale by
+        an edit would drop the points outside its box, and a placeholder
+        would have a raster made of all of its box. The points' extent is
+        the chunks' boxes where the file has :attr:`chunk_summaries`, and is
+        otherwise found as they are decoded, the raster growing to take in
+        each block. Cells are aligned to multiples of *cell_size*, so
+        rasters of neighbouring tiles line up, and are half-open as an area
+        query is.
+
+        The file is decoded a block at a time, and the cells are filled in
+        C as each block goes by, so what this holds is the raster and one
+        block -- not the whole file, as binning :meth:`xyz` would.
+        """
+        np = _numpy()
+        if not cell_size > 0:
+            raise ValueError("a cell's size must be positive")
+        stats = (stat,) if isinstance(stat, str) else tuple(stat)
+        if not stats:
+            raise ValueError("a raster needs a statistic")
+        fields = {}                      # field -> the statistics over it
+        for name in stats:
+            op, _, field = name.partition('_')
+            if name == 'count':
+                field = None
+            elif name == 'idw':
+                field = 'Z'              # what is interpolated, unless named
+            elif op not in _GRID_OPS or not field:
+                raise ValueError(
+                    f"unknown statistic {name!r}: it is 'count', or "
+                    f"{', '.join(_GRID_OPS)} and a field, as in 'max_z'")
+            else:
+                field = field.upper() if field in ('x', 'y', 'z') else field
+                if self._array_field(field).width != 1:
+                    raise ValueError(f"{field} is not one number per point")
+            fields.setdefault(field, []).append((name, op))
+        where = dict(where or {})
+        for name in where:
+            self._array_field(name)          # unknown fields raise here
+
+        area = rect, circle, box
+        whole = rect is None and circle is None and box is None
+        extent = cells = None
+        if not whole:
+            cells = self._cell_box(cell_size, area)
+        elif self.chunk_summaries:
+            # every point is in one of the chunks' boxes, decoded or not
+            bounds = [chunk.bounds for chunk in self.chunk_summaries]
+            extent = (min(b[0] for b in bounds), min(b[1] for b in bounds),
+                      max(b[3] for b in bounds), max(b[4] for b in bounds))
+            cells = self._grown((0, 0, 0, 0),
+                                self._cell_box(cell_size, area, extent))
+        if cells is None:
+            cells = (0, 0, 0, 0)
+        sums = {field: {total: np.zeros(cells[2] * cells[3])
+                        for _, op in ops for total in _GRID_OPS.get(op, ())}
+                for field, ops in fields.items()}
+        counts = {field: np.zeros(cells[2] * cells[3], dtype=np.int64)
+                  for field in fields}
+
+        names = {'X', 'Y', *where, *(field for field in fields if field)}
+        kept = self._summarised(lambda chunk: self._matches(chunk, where))
+        for columns in self._raster_blocks(sorted(names), area, kept):
+            if whole and len(columns['X']):
+                extent = self._extent_of(columns, extent)
+                grown = self._grown(cells, self._cell_box(cell_size, area,
+                                                          extent))
+                if grown != cells:
+                    for field in fields:
+                        counts[field] = _reframed(counts[field], cells, grown)
+                        sums[field] = {
+                            total: _reframed(band, cells, grown)
+                            for total, band in sums[field].items()}
+                    cells = grown
+            if where:
+                keep = np.ones(len(columns['X']), dtype=bool)
+                for name, wanted in where.items():
+                    keep &= np.isin(columns[name], wanted)
+                columns = {name: column[keep]
+                           for name, column in columns.items()}
+            placement = (self.scales[0], self.scales[1],
+                         self.offsets[0], self.offsets[1],
+                         cells[0] * cell_size, cells[1] * cell_size,
+                         cell_size, power)
+            for field in fields:
+                values = None if field is None else self._raster_values(
+                    columns, field)
+                totals = sums[field]
+                landed = grid_add(
+                    columns['X'], columns['Y'], values, placement,
+                    cells[2:], counts[field],
+                    *(totals.get(total) for total in (
+                        'low', 'high', 'total', 'weights', 'weighted')))
+                if whole and landed != len(columns['X']):
+                    raise LazError(
+                        f"{len(columns['X']) - landed} points fell outside "
+                        f"a raster laid over where the points are")
+
+        if whole and extent is not None:
+            # growing left room to spare, which is cut off again -- all but
+            # a cell that rounding did put a point in
+            final = self._cell_box(cell_size, area, extent)
+            if fields:
+                filled = counts[next(iter(fields))].reshape(cells[2:])
+                rows, cols = np.nonzero(filled)
+                if len(rows):
+                    x0 = min(final[0], cells[0] + int(cols.min()))
+                    x1 = max(final[0] + final[3],
+                             cells[0] + int(cols.max()) + 1)
+                    top = cells[1] + cells[2]
+                    y0 = min(final[1], top - 1 - int(rows.max()))
+                    y1 = max(final[1] + final[2], top - int(rows.min()))
+                    final = (x0, y0, y1 - y0, x1 - x0)
+            for field in fields:
+                counts[field] = _reframed(counts[field], cells, final)
+                sums[field] = {total: _reframed(band, cells, final)
+                               for total, band in sums[field].items()}
+            cells = final
+        left, bottom = cells[0] * cell_size, cells[1] * cell_size
+        rows, cols = cells[2], cells[3]
+        bands = {}
+        for field, ops in fields.items():
+            count, totals = counts[field], sums[field]
+            empty = count == 0
+            for name, op in ops:
+                if op == 'count':
+                    band = count
+                elif op == 'mean':
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        band = totals['total'] / count
+                elif op == 'idw':
+                    weights, weighted = totals['weights'], totals['weighted']
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        band = np.where(np.isinf(weights), weighted,
+                                        weighted / weights)
+                else:
+                    band = totals[_GRID_OPS[op][0]].copy()
+                if op != 'count':
+                    band[empty] = np.nan
+                bands[name] = band.reshape(rows, cols)
+        top = bottom + rows * cell_size
+        return Raster(bands, (left, cell_size, 0.0, top, 0.0, -cell_size))
+
+    def _raster_cells(self, cell_size, area, bounds=None):
+        """Where a raster's cells begin and how many there are, as ``(left,
+        bottom, rows, cols)``: enough cells on the multiples of *cell_size*
+        to cover the area, or *bounds* where there is none -- the header's,
+        without them."""
+        rect, circle, box = area
+        if box is not None:
+            rect = box[0], box[1], box[3], box[4]
+        elif circle is not None:
+            x, y, radius = circle
+            rect = x - radius, y - radius, x + radius, y + radius
+        if rect is not None:
+            min_x, min_y, max_x, max_y = rect
+            # half-open, so a maximum on a cell's edge needs no cell after it
+            last_x = math.ceil(max_x / cell_size) - 1
+            last_y = math.ceil(max_y / cell_size) - 1
+        else:
+            min_x, min_y, max_x, max_y = bounds or self._header_bounds(2)
+            last_x = math.floor(max_x / cell_size)
+            last_y = math.floor(max_y / cell_size)
+        first_x = math.floor(min_x / cell_size)
+        first_y = math.floor(min_y / cell_size)
+        return (first_x * cell_size, first_y * cell_size,
+                max(0, last_y - first_y + 1), max(0, last_x - first_x + 1))
+
+    def _cell_box(self, cell_size, area, bounds=None):
+        """:meth:`_raster_cells` in whole cells, ``(first_x, first_y, rows,
+        cols)``, as :func:`_reframed` takes them."""
+        left, bottom, rows, cols = self._raster_cells(cell_size, area, bounds)
+        return (round(left / cell_size), round(bottom / cell_size), rows,
+                cols)
+
+    def _extent_of(self, columns, extent=None):
+        """The box a block's points cover, georeferenced, taken together with
+        *extent* where there is one."""
+        found = []
+        for axis, name in enumerate('XY'):
+            ends = (int(columns[name].min()) * self.scales[axis]
+                    + self.offsets[axis],
+                    int(columns[name].max()) * self.scales[axis]
+                    + self.offsets[axis])
+            found.append((min(ends), max(ends)))
+        (min_x, max_x), (min_y, max_y) = found
+        if extent is not None:
+            min_x, min_y = min(min_x, extent[0]), min(min_y, extent[1])
+            max_x, max_y = max(max_x, extent[2]), max(max_y, extent[3])
+        return min_x, min_y, max_x, max_y
+
+    @staticmethod
+    def _grown(cells, needed):
+        """The cells a growing raster is laid over once it needs *needed*:
+        *cells* where they hold it already, or else more than it needs, by
+        as much again on every side it grows, so that a survey that reaches
+        further a block at a time copies its raster a few times rather than
+        once a block."""
+        x, y, rows, cols = cells
+        nx, ny, nrows, ncols = needed
+        # a cell to spare on every side, for a point that rounding puts
+        # across the edge of the last one
+        low_x, high_x = nx - 1, nx + ncols + 1
+        low_y, high_y = ny - 1, ny + nrows + 1
+        if not rows or not cols:
+            return low_x, low_y, high_y - low_y, high_x - low_x
+        if (x <= low_x and high_x <= x + cols
+                and y <= low_y and high_y <= y + rows):
+            return cells
+        x0 = x if x <= low_x else min(low_x, x - cols)
+        x1 = x + cols if high_x <= x + cols else max(high_x, x + 2 * cols)
+        y0 = y if y <= low_y else min(low_y, y - rows)
+        y1 = y + rows if high_y <= y + rows else max(high_y, y + 2 * rows)
+        return x0, y0, y1 - y0, x1 - x0
+
+    def _raster_blocks(self, names, area, kept=None):
+        """The columns of every point a raster takes in, a block at a time:
+        the whole file, or the points an area query selects -- of the
+        *kept* spans alone, where there are some."""
+        rect, circle, box = area
+        if rect is None and circle is None and box is None:
+            spans = [(0, self.num_points)] if kept is None else kept
+            for span_start, span_stop in spans:
+                for start, stop in self._blocks(span_start, span_stop):
+                    yield self.arrays(*names, start=start,
+                                      count=stop - start)
+            return
+        region, spans = self._region(rect=rect, circle=circle, box=box)
+        if kept is not None:
+            spans = _overlap(spans, kept)
+        with self._reading(spans):
+            for span_start, span_stop in spans:
+                for start, stop in self._blocks(span_start, span_stop):
+                    yield self._within_block(names, region, start, stop)
+
+    def _raster_values(self, columns, field):
+        """A field of a block as what grid_add adds up: doubles, and
+        georeferenced for the coordinates."""
+        np = _numpy()
+        values = columns[field].astype(np.float64)
+        axis = 'XYZ'.find(field)
+        if axis >= 0:
+            values *= self.scales[axis]
+            values += self.offsets[axis]
+        return values
+
+    # -- summaries -------------------------------------------------------
+
+    @_on_a_cursor
+    def statistics(self, *names, threads=1):
+        """Every point summed up, as :class:`Statistics`, in one pass.
+
+        For each field *names* asks for -- every one-number field of the
+        point format, without names -- the least, greatest and mean value,
+        the spread, and for the fields that are categories a histogram; and
+        whichever fields are asked for, the box the points cover and how many
+        there are of each return number, which are what a header claims::
+
+            s = reader.statistics()
+            if s.bounds[3] > reader.header["max_x"]:
+                ...                     # points outside the stated box
+            ground = s.fields["classification"].histogram.get(2, 0)
+
+        Nothing is kept of a point once it has been counted, so a file of any
+        size is summarised in the memory of the totals, without numpy, and
+        in C with the GIL released.
+
+        *threads* above 1 divides the file between that many threads at its
+        chunk boundaries, each decoding through a cursor of its own on this
+        reader, and adds up what they found. That needs a file opened by name
+        or from a range reader, and a file whose points can be reached
+        without decoding those before them: a chunked LAZ file or a plain LAS
+        one. A file that is neither is read by one thread whatever *threads*
+        says. The reader is left after the last point, or where it was for
+        more than one thread.
+        """
+        if not names:
+            names = [name for name in _fields_for_point_format(
+                self.point_format, self.num_extra_bytes)
+                if self._array_field(name).width == 1]
+        spec = [self._summed_field(name) for name in names]
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+
+        ranges = self._divided(threads)
+        if len(ranges) == 1:
+            self.seek(0)
+            parts = [self._points().statistics(self.num_points, spec)]
+        else:
+            if self._path is None and self._source is None:
+                raise ValueError("reading with threads needs a file opened "
+                                 "by name or from a range reader, which a "
+                                 "file object is not")
+            with ThreadPoolExecutor(len(ranges)) as pool:
+                parts = list(pool.map(
+                    lambda span: self._summed(span, spec), ranges))
+        return self._statistics_of(names, parts)
+
+    def _summed_field(self, name):
+        """What the C side needs to total *name*: ``(offset, type, shift,
+        mask, bins)``."""
+        f = self._array_field(name)
+        if f.width != 1:
+            raise ValueError(f"{name} is not one number per point")
+        code = f.dtype.lstrip('=')
+        if f.mask is not None:
+            bins = f.mask + 1
+        elif code == 'u1':
+            bins = 256
+        elif name == 'point_source_ID':
+            bins = 1 << 16
+        else:
+            bins = 0                    # a measurement, not a category
+        return f.offset, code, f.shift, f.mask or 0, bins
+
+    def _divided(self, parts):
+        """The file as at most *parts* ``(start, stop)`` ranges, each
+        beginning where a reader can seek to without decoding the points
+        before it: a chunk boundary, or any point of a plain LAS file."""
+        num_points = self.num_points
+        if parts == 1 or num_points == 0:
+            return [(0, num_points)]
+        if self.laz_header is None:
+            bounds = [num_points * i // parts for i in range(parts + 1)]
+        else:
+            table = self._chunk_table()
+            if table is None:
+                return [(0, num_points)]
+            firsts = sorted(set(table[0]) | {num_points})
+            # the boundary nearest each even share of the points
+            bounds = sorted({firsts[bisect.bisect_left(
+                firsts, num_points * i // parts)] for i in range(parts + 1)}
+                | {0})
+        return [(start, stop) for start, stop in zip(bounds, bounds[1:])
+                if start < stop]
+
+    def _summed(self, span, spec):
+        """One thread's share of :meth:`statistics`, read through a cursor of
+        its own."""
+        start, stop = span
+        with self._cursor():
+            self.seek(start)
+            return self._points().statistics(stop - start, spec)
+
+    def _statistics_of(self, names, parts):
+        """The :class:`Statistics` that the C side's totals for several parts
+        of the file add up to."""
+        num_points = sum(part[0] for part in parts)
+        by_return = [sum(part[2][i] for part in parts) for i in range(16)]
+
+        boxes = [part[1] for part in parts if part[1] is not None]
+        bounds = None
+        if boxes:
+            lows = [min(box[i] for box in boxes) for i in range(3)]
+            highs = [max(box[i + 3] for box in boxes) for i in range(3)]
+            scaled = [sorted((low * scale + offset, high * scale + offset))
+                      for low, high, scale, offset
+                      in zip(lows, highs, self.scales, self.offsets)]
+            bounds = (tuple(low for low, _ in scaled)
+                      + tuple(high for _, high in scaled))
+
+        fields = {}
+        for i, name in enumerate(names):
+            count, mean, m2 = 0, 0.0, 0.0
+            low = high = histogram = None
+            for part in parts:
+                n, minimum, maximum, pivot, total, squares, counts = part[3][i]
+                if counts is not None:
+                    counts = memoryview(counts).cast('Q')
+                    histogram = histogram or [0] * len(counts)
+                    for value, points in enumerate(counts):
+                        histogram[value] += points
+                if not n:
+                    continue
+                low = minimum if low is None else min(low, minimum)
+                high = maximum if high is None else max(high, maximum)
+                # each part's mean and sum of squared deviations, from its
+                # sums about its pivot, combined as Chan et al. combine them
+                part_mean = pivot + total / n
+                part_m2 = max(squares - total * total / n, 0.0)
+                delta = part_mean - mean
+                mean += delta * n / (count + n)
+                m2 += part_m2 + delta * delta * count * n / (count + n)
+                count += n
+            if histogram is not None:
+                histogram = {value: points
+                             for value, points in enumerate(histogram)
+                             if points}
+            fields[name] = FieldStatistics(
+                count, low, high, mean if count else None,
+                math.sqrt(m2 / count) if count else None, histogram)
+        return Statistics(num_points, bounds, tuple(by_return[1:]), fields)
+
+    # -- overview --------------------------------------------------------
+
+    @_on_a_cursor
+    def overview(self, *names, threads=1):
+        """The first point of every chunk, as numpy arrays.
+
+        A chunk begins with its first point stored as it is, ahead of the
+        entropy coder that point seeds, so reading it decodes nothing -- no
+        models set up, no layers of a LAS 1.4 chunk read in -- and a whole
+        file's worth of them costs a seek and a record per chunk. Row *k* is
+        chunk *k*'s first point, so together they sketch the file -- where
+        it lies, when it was flown, what it holds -- for the price of its
+        chunk table::
+
+            o = reader.overview("X", "Y", "gps_time")
+            start, end = o["gps_time"].min(), o["gps_time"].max()
+
+        The columns are what :meth:`arrays` makes of *names*, or of every
+        field without them. A plain LAS file has no chunks, and gives every
+        :data:`OVERVIEW_STRIDE`-th point instead, its record read where it
+        lies; so does a file of fixed-size chunks whose table is lost, every
+        chunk size apart. The POINTWISE container is one chunk, and gives its
+        first point.
+
+        *threads* above 1 shares the chunks out between that many threads,
+        each with a cursor of its own, as :meth:`statistics` does, which
+        needs a file opened by name or from a range reader. The reader is
+        left by the last point read -- at it for the first point of a chunk,
+        after it otherwise -- or where it was for more than one thread.
+        """
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+        firsts, heads = self._heads()
+        rows = [(len(firsts) * i // threads, len(firsts) * (i + 1) // threads)
+                for i in range(threads)]
+        rows = [(start, stop) for start, stop in rows if start < stop]
+        if len(rows) <= 1:
+            return self._overview_rows(names, firsts, heads, 0, len(firsts))
+        if self._path is None and self._source is None:
+            raise ValueError("reading with threads needs a file opened by "
+                             "name or from a range reader, which a file "
+                             "object is not")
+        with ThreadPoolExecutor(len(rows)) as pool:
+            blocks = list(pool.map(
+                lambda part: self._overviewed(names, firsts, heads, part),
+                rows))
+        return self._joined(names, blocks)
+
+    #: How far apart the points of a plain LAS file's overview are, which
+    #: has no chunks to take the first points of: as many points as LASzip
+    #: puts in one.
+    OVERVIEW_STRIDE = 50000
+
+    def _heads(self):
+        """The points an overview is of, as ``(firsts, heads)``: *heads* is
+        true where each of *firsts* begins a chunk the table locates, and
+        can be read as it is stored, and false where each has to be read as
+        any other point is."""
+        num_points = self.num_points
+        if self.laz_header is None:
+            return range(0, num_points, self.OVERVIEW_STRIDE), False
+        table = self._chunk_table()
+        # a table that reaches the last point is one read from the file,
+        # rather than rebuilt as far as reading has got
+        if table is not None and table[0][-1] == num_points:
+            # a writer that closes on a chunk boundary leaves an empty
+            # chunk after it, which has no first point to read
+            return [first for first in table[0] if first < num_points], True
+        if self.chunking is Chunking.FIXED:
+            return range(0, num_points, self.chunk_size), False
+        return range(min(num_points, 1)), False
+
+    def _overview_rows(self, names, firsts, heads, start, stop):
+        """Rows *start* to *stop* of :meth:`overview`, as columns."""
+        if heads:
+            out, targets, packed = self._array_columns(names, stop - start)
+            self._points().read_heads(targets, start, stop - start)
+            return self._finish_columns(out, packed, stop - start)
+        return self._joined(names, [self.arrays(*names, start=first, count=1)
+                                    for first in firsts[start:stop]])
+
+    def _overviewed(self, names, firsts, heads, rows):
+        """One thread's share of :meth:`overview`, read through a cursor of
+        its own."""
+        with self._cursor():
+            return self._overview_rows(names, firsts, heads, *rows)
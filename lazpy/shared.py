@@ -0,0 +1,220 @@
+"""Decoding into shared memory: :class:`SharedArrays` and
+:func:`shared_arrays`.
+
+Several processes that each want the same decoded file -- feature extractors
+over one tile, say -- have two ways to get it from :meth:`Reader.arrays
+<lazpy.Reader.arrays>`: decode it again apiece, or have it pickled across to
+them, hundreds of megabytes at a time. A :class:`SharedArrays` is the third:
+the columns live in one block of :mod:`multiprocessing.shared_memory`, and
+what goes to another process is the block's name, which the process attaches
+to. ``reader.arrays(..., shared=True)`` decodes into one::
+
+    with reader.arrays("X", "Y", "Z", shared=True) as a:
+        pool.map(extract, [a] * len(jobs), jobs)
+
+and :func:`shared_arrays` has a pool of processes do the decoding as well,
+each its own share of the chunks, straight into the block. Nothing decoded
+is pickled either way.
+"""
+
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+from .reader import _numpy
+
+# where each column begins: a cache line, so that no two columns share one
+# and the processes filling them do not contend for it
+_ALIGN = 64
+
+
+def _placed(columns, count):
+    """Where in the block each of *columns* begins, and how big the block
+    is."""
+    np = _numpy()
+    offsets, size = [], 0
+    for _, dtype, width in columns:
+        size = -(-size // _ALIGN) * _ALIGN
+        offsets.append(size)
+        size += count * width * np.dtype(dtype).itemsize
+    return offsets, size
+
+
+class _Block(shared_memory.SharedMemory):
+    """A block whose arrays may outlive it.
+
+    Each array of a :class:`SharedArrays` keeps the mapping it is over, so
+    when the block is collected with one still about -- handed out, or held
+    by a traceback -- it is not closed from under it, and the mapping goes
+    with the last of them instead.
+    """
+
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+def _attached(name):
+    """The block called *name*, for a process other than the one that made
+    it."""
+    try:
+        # not the resource tracker's to unlink when this process ends
+        return _Block(name, track=False)
+    except TypeError:
+        # before 3.13 every block is tracked; a pool's processes share their
+        # parent's tracker, which unlinks only what is left at its own end
+        return _Block(name)
+
+
+class SharedArrays(Mapping):
+    """Columns of points, ``{name: array}`` as :meth:`Reader.arrays
+    <lazpy.Reader.arrays>` returns them, in one block of shared memory.
+
+    *columns* is ``[(name, dtype, width)]`` and *count* how many points each
+    column holds. Without *name* a new block is made, zeroed, which this
+    object owns; with one, the block of that name is attached to.
+
+    Pickling one sends its name and layout, not its contents, so handing it
+    to another process -- as an argument to a pool's task -- attaches that
+    process to the same memory: what either writes, the other reads.
+
+    The process that made the block unlinks it, by :meth:`unlink` or by
+    leaving a ``with`` block; every process that has it open lets go of its
+    mapping by :meth:`close`, which, as for any shared memory, raises
+    BufferError while an array of it is still referenced.
+    """
+
+    def __init__(self, columns, count, name=None):
+        np = _numpy()
+        self.columns = tuple((n, dtype, width) for n, dtype, width in columns)
+        self.count = count
+        offsets, size = _placed(self.columns, count)
+        if name is None:
+            # a block of no bytes is not one the OS will make
+            self._shm = _Block(create=True, size=max(size, 1))
+        else:
+            self._shm = _attached(name)
+        self._owner = name is None
+        self._arrays = {}
+        for (n, dtype, width), offset in zip(self.columns, offsets):
+            # frombuffer rather than ndarray(buffer=...): its arrays hold on
+            # to the block, so that closing it under one raises rather than
+            # leave the array over memory that is no longer mapped
+            column = np.frombuffer(self._shm.buf, dtype, count * width,
+                                   offset)
+            self._arrays[n] = (column if width == 1
+                               else column.reshape(count, width))
+
+    @property
+    def name(self):
+        """The block's name, which :class:`SharedArrays` attaches by."""
+        return self._shm.name
+
+    def __reduce__(self):
+        return SharedArrays, (self.columns, self.count, self.name)
+
+    def __getitem__(self, key):
+        return self._arrays[key]
+
+    def __iter__(self):
+        return iter(self._arrays)
+
+    def __len__(self):
+        return len(self._arrays)
+
+    def __repr__(self):
+        return (f"<SharedArrays {self.name!r}: {self.count} points of "
+                f"{', '.join(self._arrays)}>")
+
+    def rows(self, start, stop):
+        """Every column from row *start* to *stop*, as views."""
+        return {n: a[start:stop] for n, a in self._arrays.items()}
+
+    def close(self):
+        """Let go of this process's mapping of the block; its arrays are
+        gone from here on."""
+        self._arrays = {}
+        self._shm.close()
+
+    def unlink(self):
+        """Have the block go once every process has closed it. The one that
+        made it does this, once."""
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._owner:
+            self.unlink()
+        self.close()
+        return False
+
+
+def _fill(reader, out, row, start, stop):
+    """One process's share of :func:`shared_arrays`: the points from *start*
+    to *stop*, into *out* from *row* on."""
+    with reader:
+        reader.seek(start)
+        reader._fill_columns(out.rows(row, row + stop - start),
+                             stop - start)
+    out.close()
+
+
+def shared_arrays(reader, *names, start=0, count=None, processes=None,
+                  pool=None):
+    """:meth:`Reader.arrays <lazpy.Reader.arrays>` decoded by a pool of
+    processes, into a :class:`SharedArrays` that is returned to the caller,
+    to unlink.
+
+    The points from *start* on, *count* of them or to the end of the file,
+    are divided between *processes* at chunk boundaries, as
+    :meth:`Reader.statistics <lazpy.Reader.statistics>` divides them between
+    threads; each process decodes its share into its rows of the block.
+    What goes to each is the reader, pickled with what it parsed, and the
+    block's name; nothing comes back but that it is done.
+
+    *pool* is a :class:`~concurrent.futures.ProcessPoolExecutor` to use
+    rather than one of this call's own, for calls over many files; without
+    it *processes* defaults to the number of CPUs. The reader needs to have
+    been opened by name or from a range reader, which a process can open
+    again, and is left where it was.
+    """
+    if reader._path is None and reader._source is None:
+        raise ValueError("decoding in processes needs a file opened by name "
+                         "or from a range reader, which a file object is not")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes < 1:
+        raise ValueError("processes must be at least 1")
+    stop = reader.num_points if count is None else min(
+        reader.num_points, start + count)
+    if not 0 <= start <= reader.num_points:
+        raise IndexError(f"point index {start} out of range")
+    stop = max(stop, start)
+    out = SharedArrays(reader._column_layout(names), stop - start)
+    # a chunk boundary may lie before start or past stop; the share that
+    # straddles either is cut to it, and seeks inside its chunk
+    spans = [(max(first, start), min(last, stop))
+             for first, last in reader._divided(processes)]
+    spans = [(first, last) for first, last in spans if first < last]
+    try:
+        if spans:
+            own = pool is None
+            if own:
+                pool = ProcessPoolExecutor(min(processes, len(spans)))
+            try:
+                for future in [pool.submit(_fill, reader, out, first - start,
+                                           first, last)
+                               for first, last in spans]:
+                    future.result()
+            finally:
+                if own:
+                    pool.shutdown()
+    except BaseException:
+        out.unlink()
+        raise
+    return out
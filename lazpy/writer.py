@@ -2,20 +2,22 @@
 
 import io
 import math
+import os
 
 from ._cpylaz import PointWriter, LazError
 from ._utils import cstr, pack_cstr
 from .compat import _compatibility_payload, _disguise, _DISGUISED_FORMAT
 from .extra_bytes import _described_width
-from .formats import (EXTRA_BYTES_VLR_KEY, LASCOMPATIBLE_VLR_KEY,
-                      LASINDEX_EVLR_KEY, LASZIP_VLR_KEY,
+from .formats import (ADAPTIVE_CHUNK_SIZE, CHUNK_SUMMARY_EVLR_KEY,
+                      EXTRA_BYTES_VLR_KEY,
+                      LASCOMPATIBLE_VLR_KEY, LASINDEX_EVLR_KEY, LASZIP_VLR_KEY,
                       PROJECTION_VLR_KEYS, WKT_GLOBAL_ENCODING_BIT,
                       Compressor,
                       Coder, UnsupportedFileError, _point_format,
                       items_for_point_format, _versioned_items,
                       _default_version_minor, _min_version_minor)
 from .crs import crs_record
-from .reader import _array_field, _numpy
+from .reader import Reader, _RUN_GAP, _array_field, _numpy, _sidecar_for
 from .headers import (EVLR_HEADER_FORMAT, LASZIP_SPECIAL_EVLRS_AT,
                       LASZIP_SPECIAL_EVLR_FORMAT, MAX_VLR_PAYLOAD,
                       VLR_HEADER_FORMAT, VLR_HEADER_SIZE,
@@ -119,6 +121,44 @@ def append_spatial_index(path, data):
     return at
 
 
+#: What ``Writer(spatial_index=...)`` builds when it is not told otherwise:
+#: :meth:`Reader.build_spatial_index`'s own defaults, and ``sidecar=None`` to
+#: put the index inside the file where a file can carry one.
+_INDEX_OPTIONS = {'cell_size': 1.0, 'minimum_points': 100000,
+                  'maximum_intervals': -20, 'dims': 2, 'sidecar': None}
+
+
+def _index_options(spatial_index, filename, compressed):
+    """``Writer(spatial_index=...)`` checked and filled in, or None.
+
+    An index goes inside the file or beside it, and either way it is found by
+    the file's name, so a writer lent a file object has nowhere to put one.
+    Inside is the default wherever it can go: a LASzip record is what points
+    at an appended index, so an uncompressed file cannot carry one, and
+    laszip's tools would take an octree there for a quadtree they could read.
+    """
+    if spatial_index is None:
+        return None
+    unknown = set(spatial_index) - set(_INDEX_OPTIONS)
+    if unknown:
+        raise TypeError(f"spatial_index takes {sorted(_INDEX_OPTIONS)}, not "
+                        f"{sorted(unknown)}")
+    options = dict(_INDEX_OPTIONS, **spatial_index)
+    if hasattr(filename, 'write'):
+        raise ValueError("an index goes in or beside a file by its name, "
+                         "and a file object has none")
+    if options['dims'] not in (2, 3):
+        raise ValueError(f"an index is over 2 or 3 dimensions, not "
+                         f"{options['dims']!r}")
+    inside = compressed and options['dims'] == 2
+    if options['sidecar'] is None:
+        options['sidecar'] = not inside
+    elif not options['sidecar'] and not inside:
+        raise ValueError("only a compressed file's quadtree can go inside "
+                         "it; this index has to go beside the file")
+    return options
+
+
 def _user_id(value):
     """A record's user id as a reader will key it by.
 
@@ -304,7 +344,8 @@ class Writer:
                  generating_software=None, crs=None, vlrs=(), evlrs=(),
                  vlr_description=b'lazpy', file_creation=(0, 0),
                  compatibility=False, user_data_in_header=b'',
-                 user_data_after_header=b''):
+                 user_data_after_header=b'', spatial_index=None,
+                 chunk_stats=False):
         """Open *filename* for writing points of *point_format*.
 
         ``compressed`` defaults to LAZ unless the name ends in ``.las``.
@@ -371,6 +412,33 @@ class Writer:
         can be disguised as, for readers that predate LAS 1.4; see
         :meth:`_disguise_as_legacy` for what that costs.
 
+        ``spatial_index`` builds the index :meth:`Reader.build_spatial_index`
+        would, as the points are written rather than by reading them back
+        afterwards: a dict of that method's arguments, ``cell_size``,
+        ``minimum_points``, ``maximum_intervals`` and ``dims``, and of
+        ``sidecar``, which says whether ``close()`` puts the index in a
+        ``.lax`` beside the file or appends it inside, as
+        :func:`append_spatial_index` does::
+
+            with Writer("out.laz", 1, spatial_index=dict(cell_size=10.0)):
+
+        Inside is the default where it can go, which is a compressed file's
+        quadtree; an octree, or any index of an uncompressed file, goes
+        beside it. Either way the writer needs the file's name to put it by.
+
+        ``chunk_stats`` notes, for every chunk, the box its points cover, the
+        span of their GPS times and intensities, and which classifications
+        they have, and ``close()`` writes the lot as an extended record
+        behind the point block. :attr:`Reader.chunk_summaries` reads it back,
+        and a query holds it up against each chunk to skip the ones that
+        cannot answer it -- an area that misses a chunk's box, a time window
+        that misses its span, a classification it does not have -- without
+        decoding them. A plain LAS file is summarised in runs of
+        ``chunk_size`` points, which it can seek to just as cheaply; a
+        POINTWISE file has nothing to skip to, and is refused. Being an
+        extended record it needs LAS 1.4, which is what ``version_minor``
+        defaults to here.
+
         ``system_identifier``, ``generating_software`` and ``vlr_description``
         are free text the file carries about its own provenance.
         """
@@ -381,6 +449,8 @@ class Writer:
         self._failure = None
         self._owns_fp = False
         self._compatibility_at = None
+        self._index_options = None
+        self._indexed_through = None
 
         records = _keyed(vlrs)
         num_extra_bytes = _extra_bytes_width(records, num_extra_bytes)
@@ -412,8 +482,11 @@ class Writer:
         if compressed is None:
             compressed = not str(filename).lower().endswith('.las')
         if version_minor is None:
-            version_minor = _default_version_minor(self.written_format)
+            version_minor = (4 if chunk_stats and not compatibility
+                             else _default_version_minor(self.written_format))
         self._check_version(self.written_format, version_minor)
+        if chunk_stats:
+            self._check_extended(version_minor)
 
         #: The extended records to write behind the point data, which may be
         #: added to until the file is closed.
@@ -439,6 +512,11 @@ class Writer:
         self.laz_version = laz_version
         self.compressor = compressor
         self.chunk_size = chunk_size
+        self._index_options = _index_options(spatial_index, filename,
+                                             self.compressed)
+        self.chunk_stats = bool(chunk_stats)
+        if self.chunk_stats:
+            self._check_summarisable(compressor, chunk_size)
 
         # the LASzip record goes last, where laszip puts its own: it appends
         # to the records it was given
@@ -471,6 +549,11 @@ class Writer:
                                        int(self.compressor),
                                        chunk_size=chunk_size,
                                        compatibility=self.compat_layout)
+            if self._index_options is not None:
+                self._start_index()
+            if self.chunk_stats:
+                self._writer.start_summaries(
+                    0 if self.compressed else chunk_size)
         except Exception:
             self._close_file()
             raise
@@ -551,6 +634,23 @@ class Writer:
                 f"a LAS 1.{version_minor} file, whose header has no fields to "
                 f"say where they are")
 
+    @staticmethod
+    def _check_summarisable(compressor, chunk_size):
+        """Refuse chunk statistics to a file with no chunks to skip.
+
+        A POINTWISE file is one stream decoded from its first point, so a
+        reader can skip nothing in it; a plain LAS file is summarised in
+        runs of ``chunk_size`` points, which have to be a number of them.
+        """
+        if compressor == Compressor.POINTWISE:
+            raise ValueError("a POINTWISE file has no chunks for chunk "
+                             "statistics to describe")
+        if (compressor == Compressor.NONE
+                and not 0 < chunk_size < ADAPTIVE_CHUNK_SIZE):
+            raise ValueError("chunk statistics cover a plain LAS file in runs "
+                             "of chunk_size points, which has to be a number "
+                             "of them")
+
     @staticmethod
     def _check_laz_version(laz_version, point14):
         """A pre-flight check, so an impossible request fails before a file is
@@ -591,9 +691,11 @@ class Writer:
         if hasattr(filename, 'write'):
             self.fp = filename
             self._owns_fp = False
+            self._path = None
         else:
             self.fp = open(filename, 'wb')
             self._owns_fp = True
+            self._path = os.fspath(filename)
         # close() has to go back and fill in the counts and the bounding box
         if not _can_seek(self.fp):
             self._close_file()
@@ -837,6 +939,10 @@ class Writer:
         finally:
             self._close_file()
         self._closed = True
+        # after the file is finished and marked so: a file without its index
+        # is still a file, and the index can be built again from it
+        if self._index_options is not None:
+            self._write_spatial_index()
 
     def _check_closable(self):
         """Everything close() needs from what the caller set, asked before the
@@ -877,6 +983,10 @@ class Writer:
         fill in.
         """
         records = _records(self.evlrs)
+        if self.chunk_stats:
+            records.append(_record(CHUNK_SUMMARY_EVLR_KEY,
+                                   self._writer.summaries(),
+                                   b'lazpy chunk statistics'))
         if not records:
             return
         self._check_extended(self.header['version_minor'])
@@ -936,6 +1046,48 @@ class Writer:
             self.fp.seek(0)
             self.fp.write(self._pack_header(header))
 
+    def _scaling(self, dims):
+        """The scales and offsets a point's first *dims* coordinates are
+        georeferenced through, as the header states them now."""
+        header = self.header
+        return (tuple(header[f'{axis}_scale_factor'] for axis in 'xyz'[:dims]),
+                tuple(header[f'{axis}_offset'] for axis in 'xyz'[:dims]))
+
+    def _start_index(self):
+        options = self._index_options
+        self._indexed_through = self._scaling(options['dims'])
+        self._writer.start_index(*self._indexed_through,
+                                 float(options['cell_size']), _RUN_GAP)
+
+    def _write_spatial_index(self):
+        """Finish the index the points went into, and put it where the
+        caller asked, once the file it indexes is closed.
+
+        The points went into a grid rather than the tree, as they do for a
+        one-pass build, and the same two things can leave the grid no use:
+        tree edges that miss it, and -- here only -- a scale or an offset
+        set through ``writer.header`` after the first point, which moved
+        every point the index placed. The file is read back then, over the
+        bounds its header now states exactly; the index is the same one
+        :meth:`Reader.build_spatial_index` builds either way.
+        """
+        options, self._index_options = self._index_options, None
+        if not self.num_points:
+            return          # nothing to index, as Reader would say
+        dims = options['dims']
+        data = self._writer.finish_index(int(options['minimum_points']),
+                                         int(options['maximum_intervals']))
+        if data is None or self._scaling(dims) != self._indexed_through:
+            with Reader(self._path) as reader:
+                data = reader.build_spatial_index(
+                    options['cell_size'], options['minimum_points'],
+                    options['maximum_intervals'], dims, bounds="header")
+        if options['sidecar']:
+            with open(_sidecar_for(self._path, dims), 'wb') as fp:
+                fp.write(data)
+        else:
+            append_spatial_index(self._path, data)
+
     def _patch_compatibility_record(self, count, by_return):
         """Rewrite the "lascompatible" record with the LAS 1.4 counts.
 
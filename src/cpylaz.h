@@ -5,7 +5,8 @@
  * the only header that knows about Python: the laz_* headers stay
  * Python-free, which is what keeps the core portable. Everything here is
  * cross-file plumbing -- the object structs more than one file dereferences,
- * the type objects, the exception, and the few helpers shared between types.
+ * the module state that holds the types and the exception, and the few
+ * helpers shared between types.
  */
 #ifndef CPYLAZ_H
 #define CPYLAZ_H
@@ -23,14 +24,126 @@
 #include "laz_writepoint.h"
 #include "laz_index.h"
 #include "laz_indexbuild.h"
+#include "laz_voxel.h"
+#include "laz_stats.h"
 
 /*
- * The exception every decode failure raises. lazpy/__init__.py re-exports
- * this as LazError, so "this file failed to decode" is one catchable
- * category rather than a mix of RuntimeError, ValueError and OSError.
- * Defined in cpylazmodule.c, created at module init.
+ * What one import of the module holds: its exception and its types.
+ *
+ * Each interpreter that imports lazpy gets a module of its own, and from
+ * 3.12 may run it under a GIL of its own, so nothing here can be a C global
+ * that every interpreter would share -- an exception object or a type of one
+ * interpreter's reached from another's is a crash waiting on a refcount.
+ * They are kept in the module's state, and the types are heap types made by
+ * that module (see cpylaz_exec), so that any object of theirs finds the
+ * state through its type: cpylaz_state(self).
+ *
+ * LazError is the exception every decode failure raises. lazpy/__init__.py
+ * re-exports it, so "this file failed to decode" is one catchable category
+ * rather than a mix of RuntimeError, ValueError and OSError.
+ */
+typedef struct {
+    PyObject *LazError;
+    PyTypeObject *BitModel_Type;
+    PyTypeObject *SymbolModel_Type;
+    PyTypeObject *Encoder_Type;
+    PyTypeObject *Decoder_Type;
+    PyTypeObject *IntComp_Type;
+    PyTypeObject *Point_Type;
+    PyTypeObject *Reader_Type;
+    PyTypeObject *Writer_Type;
+    PyTypeObject *Index_Type;
+} CpylazState;
+
+/* The state of the module that made `obj`'s type, which is one of the
+ * module's own: none of them can be subclassed. */
+static inline CpylazState *cpylaz_state(PyObject *obj)
+{
+    return (CpylazState *)PyType_GetModuleState(Py_TYPE(obj));
+}
+
+/* LazError, as `self`'s module has it. */
+#define LAZ_ERROR(self) (cpylaz_state((PyObject *)(self))->LazError)
+
+/* The end of every tp_dealloc: the memory, then the reference each object
+ * of a heap type holds to it. */
+static inline void cpylaz_free(PyObject *self)
+{
+    PyTypeObject *type = Py_TYPE(self);
+    type->tp_free(self);
+    Py_DECREF(type);
+}
+
+/*
+ * Py_BEGIN_ALLOW_THREADS, for code that reads or writes through a file
+ * stream: the stream's calls into the file object take the GIL back from
+ * here, in whichever interpreter let it go (see laz_stream_release_gil).
+ */
+#define LAZ_BEGIN_ALLOW_THREADS { laz_stream_release_gil();
+#define LAZ_END_ALLOW_THREADS laz_stream_acquire_gil(); }
+
+/*
+ * One thread at a time in a reader, a writer or a spatial index.
+ *
+ * Each is a state machine its methods step, and most of them step it with
+ * the GIL released, so the GIL never was what kept two threads from stepping
+ * one at once -- and on a free-threaded build there is none. Every method
+ * and getter of theirs takes the object's own lock first, letting the GIL go
+ * while it waits for another thread's call to finish. A call that finds the
+ * lock held by its own thread -- a file object's read() calling back into
+ * the reader it is reading for -- raises RuntimeError rather than wait for
+ * itself. PointReader.cancel() alone goes without: reaching a reader that is
+ * busy is what it is for.
+ *
+ * The lock comes first after the header in each of the three objects, so
+ * that this code reaches it through any of them. It is made with the object,
+ * by locked_new, and freed with it.
  */
-extern PyObject *LazErrorType;
+typedef struct {
+    PyThread_type_lock lock;
+    /* the holding thread, or 0: written only by that thread, and compared
+     * by another only against its own ident, which no torn read matches */
+    volatile unsigned long owner;
+} ObjectLock;
+
+typedef struct {
+    PyObject_HEAD
+    ObjectLock lock;
+} LockedObject;
+
+/* tp_new for an object with an ObjectLock: PyType_GenericNew, and the lock. */
+PyObject *locked_new(PyTypeObject *type, PyObject *args, PyObject *kwds);
+
+/* Frees the lock, from tp_dealloc, where no other thread can hold it. */
+void locked_free(PyObject *self);
+
+/* Takes the object's lock: false with RuntimeError set if this thread
+ * already holds it. */
+BOOL object_lock(PyObject *self);
+void object_unlock(PyObject *self);
+
+/* `method`, for a method or getter table: under the object's lock. Both take
+ * the object and one pointer, which is all a wrapper has to pass along. */
+#define LOCKED(method)                                                         \
+    static PyObject *method##_locked(PyObject *self, void *arg)                \
+    {                                                                          \
+        PyObject *result;                                                      \
+        if (!object_lock(self)) return NULL;                                   \
+        result = method((void *)self, arg);                                    \
+        object_unlock(self);                                                   \
+        return result;                                                         \
+    }
+
+/* The same for tp_init, which takes keywords too and answers with an int. */
+#define LOCKED_INIT(init)                                                      \
+    static int init##_locked(PyObject *self, PyObject *args, PyObject *kwds)   \
+    {                                                                          \
+        int result;                                                            \
+        if (!object_lock(self)) return -1;                                     \
+        result = init((void *)self, args, kwds);                               \
+        object_unlock(self);                                                   \
+        return result;                                                         \
+    }
 
 typedef struct {
     PyObject_HEAD
@@ -74,21 +187,23 @@ typedef struct {
     U8 *extra_storage;      /* owned, may be NULL */
 } PointObject;
 
-extern PyTypeObject BitModel_Type;
-extern PyTypeObject SymbolModel_Type;
-extern PyTypeObject Encoder_Type;
-extern PyTypeObject Decoder_Type;
-extern PyTypeObject IntComp_Type;
-extern PyTypeObject Point_Type;
-extern PyTypeObject Reader_Type;
-extern PyTypeObject Writer_Type;
-extern PyTypeObject Index_Type;
+/* What cpylaz_exec makes each module's types from. */
+extern PyType_Spec BitModel_spec;
+extern PyType_Spec SymbolModel_spec;
+extern PyType_Spec Encoder_spec;
+extern PyType_Spec Decoder_spec;
+extern PyType_Spec IntComp_spec;
+extern PyType_Spec Point_spec;
+extern PyType_Spec Reader_spec;
+extern PyType_Spec Writer_spec;
+extern PyType_Spec Index_spec;
 
 /* A model over memory owned by `owner`, kept alive by holding it. */
 PyObject *SymbolModel_borrow(LazSymbolModel *m, PyObject *owner);
 
 /* The create_symbol_model both coders offer: args is (num_symbols,). */
-PyObject *coder_create_symbol_model(PyObject *args, PyObject *compress);
+PyObject *coder_create_symbol_model(PyObject *coder, PyObject *args,
+                                    PyObject *compress);
 
 /* None, or NULL with the exception set, per how the encoder's stream is. */
 PyObject *encoder_result(EncoderObject *self);
@@ -188,7 +303,8 @@ static inline void columns_step(Columns *c)
 PointObject *point_alloc(PyTypeObject *type);
 
 /* A view onto memory owned by `reader`, valid until the reader detaches it. */
-PyObject *Point_borrow(LazPoint *p, U8 *extra, U32 num_extra);
+PyObject *Point_borrow(PyObject *reader, LazPoint *p, U8 *extra,
+                       U32 num_extra);
 
 /* Copies the currently-viewed values into this object so it can outlive the
  * memory it was pointing at. */
@@ -218,23 +334,29 @@ extern const U32 compat_widths[COMPAT_ATTRIBUTES];
  * angle is hundredths of a degree over 0.6, a legacy rank is degrees.
  *
  * The reader tabulates the first for all 256 ranks rather than dividing once
- * per point, and the writer, which needs the same 256 values, shares that
- * table -- see compat_scan_angle_of_rank().
+ * per point, and the writer needs the same 256 values -- each keeps a table
+ * of its own, filled by compat_scan_angle_of_rank().
  */
 #define COMPAT_SCAN_ANGLE_OF_RANK(rank) \
     I16_QUANTIZE(((F32)(rank)) / 0.006f)
 #define COMPAT_RANK_OF_SCAN_ANGLE(angle) \
     I32_QUANTIZE(0.006f * (F32)(angle))
 
-/* The 256 values of COMPAT_SCAN_ANGLE_OF_RANK, indexed by rank as a U8. */
-const I16 *compat_scan_angle_of_rank(void);
+/* Fills `table` with the 256 values of COMPAT_SCAN_ANGLE_OF_RANK, indexed by
+ * rank as a U8. */
+void compat_scan_angle_of_rank(I16 table[256]);
 
 /*
  * The five starts out of the `compatibility` argument, checked against the
  * extra bytes they have to lie inside. 1 when there is a layout, 0 when the
- * argument is absent or None, -1 with the exception set.
+ * argument is absent or None, -1 with the exception set -- LazError as
+ * `self`, the reader or writer asking, has it.
  */
-int parse_compat_starts(PyObject *obj, U32 num_extra_bytes,
+int parse_compat_starts(PyObject *self, PyObject *obj, U32 num_extra_bytes,
                         I32 starts[COMPAT_ATTRIBUTES]);
 
+/* grid_add(), a module function rather than a method: what it adds up is a
+ * block of columns, which is not any one reader's. */
+PyObject *cpylaz_grid_add(PyObject *self, PyObject *args);
+
 #endif
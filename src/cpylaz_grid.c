@@ -0,0 +1,186 @@
+/* grid_add: the accumulating half of Reader.grid, which bins points into the
+ * cells of a raster a block at a time. */
+#include "cpylaz.h"
+
+/* =============================================================== rasters == */
+
+/*
+ * The buffers of one grid_add call: the block's stored X and Y, the value
+ * each point contributes, and the running totals of every cell. An absent
+ * total is a statistic nobody asked for, and costs nothing per point.
+ */
+enum {
+    GRID_X, GRID_Y, GRID_VALUES, GRID_COUNT, GRID_LOW, GRID_HIGH, GRID_TOTAL,
+    GRID_WEIGHTS, GRID_WEIGHTED, GRID_BUFFERS
+};
+
+static const char *grid_names[GRID_BUFFERS] = {
+    "X", "Y", "values", "count", "low", "high", "total", "weights", "weighted"
+};
+
+/*
+ * Takes the view of one of grid_add's buffers, checking it holds `length`
+ * items `itemsize` wide, or any number of them for a `length` of -1. None is
+ * no buffer, which is allowed for everything but the coordinates and the
+ * counts: the counts are what says whether a cell has a value yet.
+ */
+static BOOL grid_view(PyObject *obj, int which, Py_ssize_t length,
+                      Py_ssize_t itemsize, Py_buffer *view, BOOL *held)
+{
+    int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    *held = LAZ_FALSE;
+    if (obj == Py_None) {
+        if (which != GRID_X && which != GRID_Y && which != GRID_COUNT)
+            return LAZ_TRUE;
+        PyErr_Format(PyExc_TypeError, "grid_add needs %s", grid_names[which]);
+        return LAZ_FALSE;
+    }
+    if (which >= GRID_COUNT) flags |= PyBUF_WRITABLE;
+    if (PyObject_GetBuffer(obj, view, flags) < 0) return LAZ_FALSE;
+    *held = LAZ_TRUE;
+    if (view->itemsize != itemsize
+        || (length < 0 ? view->len % itemsize != 0
+                       : view->len != length * itemsize)) {
+        if (length < 0)
+            PyErr_Format(PyExc_ValueError, "%s is not items of %zd bytes",
+                         grid_names[which], itemsize);
+        else
+            PyErr_Format(PyExc_ValueError, "%s is not %zd items of %zd "
+                         "bytes", grid_names[which], length, itemsize);
+        return LAZ_FALSE;
+    }
+    return LAZ_TRUE;
+}
+
+/*
+ * Adds a block of points to the cells they fall in.
+ *
+ * The cells are rows by columns, the first row the northernmost, and cell
+ * (row, col) holds the points with left + col * size <= x < left + (col + 1)
+ * * size and bottom + (rows - 1 - row) * size <= y < ... -- half-open, as an
+ * area query is, so that adjoining rasters share no points. Points outside
+ * every cell are passed over; how many landed is what comes back.
+ *
+ * `count` counts the points in each cell; `low` and `high` keep the least and
+ * the greatest value, `total` the sum of them, and `weights` and `weighted`
+ * an inverse-distance weighting toward the cell's centre, with `power` the
+ * power of the distance. A point exactly at the centre would be infinitely
+ * heavy, so it takes the cell: its weight is recorded as infinite, and its
+ * value is the weighted total from then on.
+ *
+ * The totals are whatever the caller started them at -- NaN-free and
+ * meaningful only where the count is above zero -- since the block before
+ * this one left them there.
+ */
+PyObject *cpylaz_grid_add(PyObject *self, PyObject *args)
+{
+    PyObject *objs[GRID_BUFFERS];
+    Py_buffer views[GRID_BUFFERS];
+    BOOL held[GRID_BUFFERS];
+    double scale_x, scale_y, offset_x, offset_y, left, bottom, size, power;
+    Py_ssize_t rows, cols, n = 0, cells, i;
+    const I32 *xs, *ys;
+    const F64 *values = NULL;
+    I64 *count = NULL;
+    F64 *low = NULL, *high = NULL, *total = NULL;
+    F64 *weights = NULL, *weighted = NULL;
+    Py_ssize_t landed = 0;
+    PyObject *result = NULL;
+    int b;
+    (void)self;
+
+    for (b = 0; b < GRID_BUFFERS; b++) held[b] = LAZ_FALSE;
+    if (!PyArg_ParseTuple(args, "OOO(dddddddd)(nn)OOOOOO",
+                          &objs[GRID_X], &objs[GRID_Y], &objs[GRID_VALUES],
+                          &scale_x, &scale_y, &offset_x, &offset_y,
+                          &left, &bottom, &size, &power, &rows, &cols,
+                          &objs[GRID_COUNT], &objs[GRID_LOW],
+                          &objs[GRID_HIGH], &objs[GRID_TOTAL],
+                          &objs[GRID_WEIGHTS], &objs[GRID_WEIGHTED]))
+        return NULL;
+    if (!(size > 0) || rows < 0 || cols < 0
+        || (cols && rows > PY_SSIZE_T_MAX / 8 / cols)) {
+        PyErr_SetString(PyExc_ValueError, "a grid is rows by columns of "
+                        "cells of positive size");
+        return NULL;
+    }
+    cells = rows * cols;
+
+    /* how many points the block is, which X says and the rest must agree */
+    if (!grid_view(objs[GRID_X], GRID_X, -1, 4, &views[GRID_X],
+                   &held[GRID_X]))
+        goto done;
+    n = views[GRID_X].len / 4;
+    if (!grid_view(objs[GRID_Y], GRID_Y, n, 4, &views[GRID_Y], &held[GRID_Y])
+        || !grid_view(objs[GRID_VALUES], GRID_VALUES, n, 8,
+                      &views[GRID_VALUES], &held[GRID_VALUES]))
+        goto done;
+    for (b = GRID_COUNT; b < GRID_BUFFERS; b++)
+        if (!grid_view(objs[b], b, cells, 8, &views[b], &held[b])) goto done;
+    for (b = GRID_LOW; b < GRID_BUFFERS; b++)
+        if (held[b] && !held[GRID_VALUES]) {
+            PyErr_Format(PyExc_TypeError, "%s needs values", grid_names[b]);
+            goto done;
+        }
+    if (held[GRID_WEIGHTS] != held[GRID_WEIGHTED]) {
+        PyErr_SetString(PyExc_TypeError, "weights and weighted come "
+                        "together");
+        goto done;
+    }
+
+    xs = (const I32 *)views[GRID_X].buf;
+    ys = (const I32 *)views[GRID_Y].buf;
+#define GRID_BUF(type, which) \
+    (held[which] ? (type *)views[which].buf : NULL)
+    values = GRID_BUF(const F64, GRID_VALUES);
+    count = GRID_BUF(I64, GRID_COUNT);
+    low = GRID_BUF(F64, GRID_LOW);
+    high = GRID_BUF(F64, GRID_HIGH);
+    total = GRID_BUF(F64, GRID_TOTAL);
+    weights = GRID_BUF(F64, GRID_WEIGHTS);
+    weighted = GRID_BUF(F64, GRID_WEIGHTED);
+#undef GRID_BUF
+
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < n; i++) {
+        F64 x = xs[i] * scale_x + offset_x, y = ys[i] * scale_y + offset_y;
+        F64 fc = floor((x - left) / size), fr = floor((y - bottom) / size);
+        Py_ssize_t col, row, at;
+        F64 v;
+
+        /* the comparison is made in doubles so that a point far outside
+         * cannot overflow the conversion */
+        if (!(fc >= 0 && fc < (F64)cols && fr >= 0 && fr < (F64)rows))
+            continue;
+        col = (Py_ssize_t)fc;
+        row = rows - 1 - (Py_ssize_t)fr;
+        at = row * cols + col;
+        landed++;
+        count[at]++;
+        if (!values) continue;
+        v = values[i];
+        if (low && (count[at] == 1 || v < low[at])) low[at] = v;
+        if (high && (count[at] == 1 || v > high[at])) high[at] = v;
+        if (total) total[at] += v;
+        if (weights && !isinf(weights[at])) {
+            F64 dx = x - (left + (col + 0.5) * size);
+            F64 dy = y - (bottom + (fr + 0.5) * size);
+            F64 d2 = dx * dx + dy * dy;
+            if (d2 == 0) {
+                weights[at] = HUGE_VAL;
+                weighted[at] = v;
+            } else {
+                F64 w = pow(d2, -0.5 * power);
+                weights[at] += w;
+                weighted[at] += w * v;
+            }
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    result = PyLong_FromSsize_t(landed);
+done:
+    for (b = 0; b < GRID_BUFFERS; b++)
+        if (held[b]) PyBuffer_Release(&views[b]);
+    return result;
+}
@@ -1,4 +1,4 @@
-/* SpatialIndex: the parsed LASzip quadtree index. */
+/* SpatialIndex: the parsed LASzip quadtree index, or lazpy's octree. */
 #include "cpylaz.h"
 
 /* ========================================================== SpatialIndex == */
@@ -12,6 +12,7 @@
  */
 typedef struct {
     PyObject_HEAD
+    ObjectLock lock;        /* first; see ObjectLock in cpylaz.h */
     LazIndex ix;
     BOOL ready;
 } IndexObject;
@@ -40,7 +41,7 @@ static int Index_tp_init(IndexObject *self, PyObject *args, PyObject *kwds)
     PyBuffer_Release(&view);
 
     if (!ok) {
-        PyErr_SetString(LazErrorType, self->ix.has_error
+        PyErr_SetString(LAZ_ERROR(self), self->ix.has_error
                         ? self->ix.last_error : "could not read the spatial index");
         laz_index_destroy(&self->ix);
         return -1;
@@ -52,7 +53,8 @@ static int Index_tp_init(IndexObject *self, PyObject *args, PyObject *kwds)
 static void Index_dealloc(IndexObject *self)
 {
     laz_index_destroy(&self->ix);
-    Py_TYPE(self)->tp_free((PyObject *)self);
+    locked_free((PyObject *)self);
+    cpylaz_free((PyObject *)self);
 }
 
 /* What both query methods do once the core has answered: the merged
@@ -63,7 +65,7 @@ static PyObject *index_result(IndexObject *self, BOOL ok)
     U32 i;
 
     if (!ok) {
-        PyErr_SetString(LazErrorType, self->ix.has_error
+        PyErr_SetString(LAZ_ERROR(self), self->ix.has_error
                         ? self->ix.last_error : "spatial index query failed");
         return NULL;
     }
@@ -119,20 +121,247 @@ static PyObject *Index_intervals_within_circle(IndexObject *self,
     return index_result(self, ok);
 }
 
+static PyObject *Index_intervals_within_box(IndexObject *self,
+                                            PyObject *args)
+{
+    double min_x, min_y, min_z, max_x, max_y, max_z;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "dddddd", &min_x, &min_y, &min_z,
+                          &max_x, &max_y, &max_z))
+        return NULL;
+    if (!self->ready) {
+        PyErr_SetString(PyExc_ValueError, "index is not initialised");
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    ok = laz_index_intersect_box(&self->ix, min_x, min_y, min_z,
+                                 max_x, max_y, max_z);
+    Py_END_ALLOW_THREADS
+    return index_result(self, ok);
+}
+
+/* What the three estimating methods do once the core has answered. */
+static PyObject *estimate_result(IndexObject *self, BOOL ok,
+                                 const LazIndexEstimate *e)
+{
+    if (!ok) {
+        PyErr_SetString(LAZ_ERROR(self), self->ix.has_error
+                        ? self->ix.last_error : "spatial index query failed");
+        return NULL;
+    }
+    return Py_BuildValue("(dKK)", e->estimate, (unsigned long long)e->low,
+                         (unsigned long long)e->high);
+}
+
+static PyObject *Index_estimate(IndexObject *self, PyObject *args)
+{
+    double min_x, min_y, max_x, max_y;
+    LazIndexEstimate e;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "dddd", &min_x, &min_y, &max_x, &max_y))
+        return NULL;
+    if (!self->ready) {
+        PyErr_SetString(PyExc_ValueError, "index is not initialised");
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    ok = laz_index_estimate_rectangle(&self->ix, min_x, min_y, max_x, max_y,
+                                      &e);
+    Py_END_ALLOW_THREADS
+    return estimate_result(self, ok, &e);
+}
+
+static PyObject *Index_estimate_within_circle(IndexObject *self,
+                                              PyObject *args)
+{
+    double center_x, center_y, radius;
+    LazIndexEstimate e;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "ddd", &center_x, &center_y, &radius))
+        return NULL;
+    if (!self->ready) {
+        PyErr_SetString(PyExc_ValueError, "index is not initialised");
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    ok = laz_index_estimate_circle(&self->ix, center_x, center_y, radius, &e);
+    Py_END_ALLOW_THREADS
+    return estimate_result(self, ok, &e);
+}
+
+static PyObject *Index_estimate_within_box(IndexObject *self,
+                                           PyObject *args)
+{
+    double min_x, min_y, min_z, max_x, max_y, max_z;
+    LazIndexEstimate e;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "dddddd", &min_x, &min_y, &min_z,
+                          &max_x, &max_y, &max_z))
+        return NULL;
+    if (!self->ready) {
+        PyErr_SetString(PyExc_ValueError, "index is not initialised");
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    ok = laz_index_estimate_box(&self->ix, min_x, min_y, min_z,
+                                max_x, max_y, max_z, &e);
+    Py_END_ALLOW_THREADS
+    return estimate_result(self, ok, &e);
+}
+
+/* Every cell the index holds points for, with its box and how many. */
+static PyObject *Index_cell_counts(IndexObject *self, PyObject *noargs)
+{
+    PyObject *list;
+    U32 i;
+    (void)noargs;
+
+    if (!self->ready) {
+        PyErr_SetString(PyExc_ValueError, "index is not initialised");
+        return NULL;
+    }
+    list = PyList_New(self->ix.num_cells);
+    if (!list) return NULL;
+    for (i = 0; i < self->ix.num_cells; i++) {
+        const LazIndexCell *cell = &self->ix.cells[i];
+        F64 box[6];
+        PyObject *item;
+
+        laz_index_cell_box(&self->ix, cell->index, box);
+        if (self->ix.dims == 3)
+            item = Py_BuildValue("((dddddd)K)", box[0], box[2], box[4],
+                                 box[1], box[3], box[5],
+                                 (unsigned long long)cell->num_points);
+        else
+            item = Py_BuildValue("((dddd)K)", box[0], box[2], box[1], box[3],
+                                 (unsigned long long)cell->num_points);
+        if (!item) { Py_DECREF(list); return NULL; }
+        PyList_SET_ITEM(list, i, item);
+    }
+    return list;
+}
+
+/* The raster columns (or rows) a cell's extent from `lo` to `hi` reaches,
+ * and how much of it each one takes: the first and last, and the fractions
+ * are worked out as they are walked. */
+static void density_span(F64 lo, F64 hi, F64 origin, F64 size,
+                         Py_ssize_t n, Py_ssize_t *first, Py_ssize_t *last)
+{
+    F64 a = floor((lo - origin) / size);
+    F64 b = hi > lo ? ceil((hi - origin) / size) - 1 : a;
+    if (b < a) b = a;
+    *first = a < 0 ? 0 : (a >= (F64)n ? n : (Py_ssize_t)a);
+    *last = b < 0 ? -1 : (b >= (F64)n ? n - 1 : (Py_ssize_t)b);
+}
+
+static F64 density_share(F64 lo, F64 hi, F64 cell_lo, F64 cell_hi)
+{
+    F64 from = lo > cell_lo ? lo : cell_lo, to = hi < cell_hi ? hi : cell_hi;
+    if (!(hi > lo)) return 1.0;                 /* an extent of nothing */
+    return to > from ? (to - from) / (hi - lo) : 0.0;
+}
+
+/*
+ * Shares every cell's count out among the raster cells under it, by how much
+ * of it each one covers, and adds the shares to `out`: rows by columns of
+ * float64, the first row the northernmost, as grid_add fills. Points the
+ * index puts outside the raster are not added anywhere.
+ */
+static PyObject *Index_density(IndexObject *self, PyObject *args)
+{
+    double left, bottom, size;
+    Py_ssize_t rows, cols;
+    PyObject *obj;
+    Py_buffer view;
+    F64 *out, placed = 0.0;
+    U32 i;
+
+    if (!PyArg_ParseTuple(args, "ddd(nn)O", &left, &bottom, &size, &rows,
+                          &cols, &obj))
+        return NULL;
+    if (!self->ready) {
+        PyErr_SetString(PyExc_ValueError, "index is not initialised");
+        return NULL;
+    }
+    if (!(size > 0) || rows < 0 || cols < 0
+        || (cols && rows > PY_SSIZE_T_MAX / 8 / cols)) {
+        PyErr_SetString(PyExc_ValueError, "a raster is rows by columns of "
+                        "cells of positive size");
+        return NULL;
+    }
+    if (PyObject_GetBuffer(obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT
+                                        | PyBUF_WRITABLE) < 0)
+        return NULL;
+    if (view.itemsize != 8 || view.len != rows * cols * 8) {
+        PyErr_Format(PyExc_ValueError, "the raster is not %zd items of 8 "
+                     "bytes", rows * cols);
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    out = (F64 *)view.buf;
+
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < self->ix.num_cells; i++) {
+        const LazIndexCell *cell = &self->ix.cells[i];
+        Py_ssize_t c0, c1, r0, r1, c, r;
+        F64 box[6];
+
+        laz_index_cell_box(&self->ix, cell->index, box);
+        density_span(box[0], box[1], left, size, cols, &c0, &c1);
+        density_span(box[2], box[3], bottom, size, rows, &r0, &r1);
+        for (r = r0; r <= r1; r++) {
+            F64 share_y = density_share(box[2], box[3], bottom + r * size,
+                                        bottom + (r + 1) * size);
+            for (c = c0; c <= c1; c++) {
+                F64 share = share_y * density_share(
+                    box[0], box[1], left + c * size, left + (c + 1) * size);
+                F64 points = share * (F64)cell->num_points;
+                out[(rows - 1 - r) * cols + c] += points;
+                placed += points;
+            }
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&view);
+    return PyFloat_FromDouble(placed);
+}
+
 static PyObject *Index_get_bounds(IndexObject *self, void *c)
 {
     const LazQuadtree *q = &self->ix.quadtree;
+    const LazOctree *o = &self->ix.octree;
     (void)c;
+    if (self->ix.dims == 3)
+        return Py_BuildValue("(dddddd)", (double)o->min_x, (double)o->min_y,
+                             (double)o->min_z, (double)o->max_x,
+                             (double)o->max_y, (double)o->max_z);
     return Py_BuildValue("(dddd)", (double)q->min_x, (double)q->min_y,
                          (double)q->max_x, (double)q->max_y);
 }
 
 static PyObject *Index_get_levels(IndexObject *self, void *c)
-{ (void)c; return PyLong_FromUnsignedLong(self->ix.quadtree.levels); }
+{
+    (void)c;
+    return PyLong_FromUnsignedLong(self->ix.dims == 3
+                                   ? self->ix.octree.levels
+                                   : self->ix.quadtree.levels);
+}
+
+static PyObject *Index_get_dims(IndexObject *self, void *c)
+{ (void)c; return PyLong_FromUnsignedLong(self->ix.dims); }
 
 static PyObject *Index_get_num_cells(IndexObject *self, void *c)
 { (void)c; return PyLong_FromUnsignedLong(self->ix.num_cells); }
 
+static PyObject *Index_get_cells_hit(IndexObject *self, void *c)
+{ (void)c; return PyLong_FromUnsignedLong(self->ix.num_used); }
+
 static PyObject *Index_get_warning(IndexObject *self, void *c)
 {
     (void)c;
@@ -140,26 +369,75 @@ static PyObject *Index_get_warning(IndexObject *self, void *c)
     return PyUnicode_FromString(self->ix.last_warning);
 }
 
+/* Every method and getter under the object's lock; see ObjectLock. */
+LOCKED(Index_intervals)
+LOCKED(Index_intervals_within_circle)
+LOCKED(Index_intervals_within_box)
+LOCKED(Index_estimate)
+LOCKED(Index_estimate_within_circle)
+LOCKED(Index_estimate_within_box)
+LOCKED(Index_cell_counts)
+LOCKED(Index_density)
+LOCKED(Index_get_bounds)
+LOCKED(Index_get_levels)
+LOCKED(Index_get_dims)
+LOCKED(Index_get_num_cells)
+LOCKED(Index_get_cells_hit)
+LOCKED(Index_get_warning)
+LOCKED_INIT(Index_tp_init)
+
 static PyMethodDef Index_methods[] = {
-    {"intervals", (PyCFunction)Index_intervals, METH_VARARGS,
+    {"intervals", (PyCFunction)Index_intervals_locked, METH_VARARGS,
      "intervals(min_x, min_y, max_x, max_y) -> [(start, end), ...]  "
      "(inclusive point index ranges that may hold a point in the rectangle)"},
-    {"intervals_within_circle", (PyCFunction)Index_intervals_within_circle,
+    {"intervals_within_circle", (PyCFunction)Index_intervals_within_circle_locked,
      METH_VARARGS,
      "intervals_within_circle(center_x, center_y, radius) -> "
      "[(start, end), ...]  (the same for a circle, which reaches fewer cells "
      "than the square around it)"},
+    {"intervals_within_box", (PyCFunction)Index_intervals_within_box_locked,
+     METH_VARARGS,
+     "intervals_within_box(min_x, min_y, min_z, max_x, max_y, max_z) -> "
+     "[(start, end), ...]  (the same for a box, which an octree narrows by "
+     "elevation and a quadtree answers as the rectangle under it)"},
+    {"estimate", (PyCFunction)Index_estimate_locked, METH_VARARGS,
+     "estimate(min_x, min_y, max_x, max_y) -> (estimate, low, high)  "
+     "(how many points the rectangle holds, from the cells' counts: at "
+     "least low, at most high)"},
+    {"estimate_within_circle", (PyCFunction)Index_estimate_within_circle_locked,
+     METH_VARARGS,
+     "estimate_within_circle(center_x, center_y, radius) -> "
+     "(estimate, low, high)  (the same for a circle)"},
+    {"estimate_within_box", (PyCFunction)Index_estimate_within_box_locked,
+     METH_VARARGS,
+     "estimate_within_box(min_x, min_y, min_z, max_x, max_y, max_z) -> "
+     "(estimate, low, high)  (the same for a box)"},
+    {"cell_counts", (PyCFunction)Index_cell_counts_locked, METH_NOARGS,
+     "cell_counts() -> [(bounds, points), ...]  (every cell holding points, "
+     "its bounds as the index's own are given, and how many points fell in "
+     "it)"},
+    {"density", (PyCFunction)Index_density_locked, METH_VARARGS,
+     "density(left, bottom, cell_size, (rows, cols), out) -> points  "
+     "(shares each cell's count among the raster cells under it, adding to "
+     "out, float64 rows by columns with the northernmost first; returns how "
+     "many points landed)"},
     {NULL}
 };
 
 static PyGetSetDef Index_getset[] = {
-    {"bounds", (getter)Index_get_bounds, NULL,
-     "(min_x, min_y, max_x, max_y) of the indexed area", NULL},
-    {"levels", (getter)Index_get_levels, NULL,
-     "how deep the quadtree goes", NULL},
-    {"num_cells", (getter)Index_get_num_cells, NULL,
+    {"bounds", (getter)Index_get_bounds_locked, NULL,
+     "(min_x, min_y, max_x, max_y) of the indexed area; an octree's is "
+     "(min_x, min_y, min_z, max_x, max_y, max_z)", NULL},
+    {"levels", (getter)Index_get_levels_locked, NULL,
+     "how deep the tree goes", NULL},
+    {"dims", (getter)Index_get_dims_locked, NULL,
+     "2 for a quadtree, 3 for an octree", NULL},
+    {"num_cells", (getter)Index_get_num_cells_locked, NULL,
      "how many cells hold points", NULL},
-    {"warning", (getter)Index_get_warning, NULL,
+    {"cells_hit", (getter)Index_get_cells_hit_locked, NULL,
+     "how many cells holding points the last query reached, whose runs "
+     "are the intervals it returned", NULL},
+    {"warning", (getter)Index_get_warning_locked, NULL,
      "a non-fatal problem found while reading the index, or None", NULL},
     {NULL}
 };
@@ -176,17 +454,31 @@ PyDoc_STRVAR(index_doc,
 "\n"
 "`data` is the payload of a \".lax\" file or of the extended record an\n"
 "appended index lives in -- the two carry the same bytes. Finding one is\n"
-"Reader.spatial_index's job.\n");
-
-PyTypeObject Index_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.SpatialIndex",
-    .tp_basicsize = sizeof(IndexObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_doc = index_doc,
-    .tp_new = PyType_GenericNew,
-    .tp_init = (initproc)Index_tp_init,
-    .tp_dealloc = (destructor)Index_dealloc,
-    .tp_methods = Index_methods,
-    .tp_getset = Index_getset,
+"Reader.spatial_index's job.\n"
+"\n"
+"The same bytes can hold an octree instead, which lazpy builds for\n"
+"queries over a range of elevations as well as an area:\n"
+"intervals_within_box() asks it a box, and dims says which tree it is.\n"
+"Reader.octree_index finds one.\n"
+"\n"
+"Each cell also states how many points fell in it, which is what\n"
+"estimate() and its circle and box counterparts answer from, and what\n"
+"cell_counts() and density() give back: the size of a query, or the\n"
+"spread of a survey, without decoding a point.\n");
+
+static PyType_Slot Index_slots[] = {
+    {Py_tp_doc, (void *)index_doc},
+    {Py_tp_new, (void *)locked_new},
+    {Py_tp_init, (void *)Index_tp_init_locked},
+    {Py_tp_dealloc, (void *)Index_dealloc},
+    {Py_tp_methods, (void *)Index_methods},
+    {Py_tp_getset, (void *)Index_getset},
+    {0, NULL}
+};
+
+PyType_Spec Index_spec = {
+    .name = "lazpy._cpylaz.SpatialIndex",
+    .basicsize = sizeof(IndexObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = Index_slots,
 };
@@ -15,6 +15,7 @@ typedef struct {
 
 static int IntComp_tp_init(IntCompObject *self, PyObject *args, PyObject *kwds)
 {
+    CpylazState *state = cpylaz_state((PyObject *)self);
     PyObject *dec_or_enc;
     unsigned int bits = 16, contexts = 1, bits_high = 8, range = 0;
     static char *kwlist[] = {"dec", "bits", "contexts", "bits_high", "range", NULL};
@@ -34,14 +35,14 @@ static int IntComp_tp_init(IntCompObject *self, PyObject *args, PyObject *kwds)
      * Which is the same thing __new__ without __init__ leaves behind. One
      * object on its own is safe now; this is the pair.
      */
-    if (PyObject_TypeCheck(dec_or_enc, &Decoder_Type)) {
+    if (PyObject_TypeCheck(dec_or_enc, state->Decoder_Type)) {
         if (((DecoderObject *)dec_or_enc)->stream == NULL) {
             PyErr_SetString(PyExc_ValueError, "decoder has no file");
             return -1;
         }
         laz_ic_setup_dec(&self->ic, &((DecoderObject *)dec_or_enc)->d,
                          bits, contexts, bits_high, range);
-    } else if (PyObject_TypeCheck(dec_or_enc, &Encoder_Type)) {
+    } else if (PyObject_TypeCheck(dec_or_enc, state->Encoder_Type)) {
         if (((EncoderObject *)dec_or_enc)->stream == NULL) {
             PyErr_SetString(PyExc_ValueError, "encoder has no file");
             return -1;
@@ -65,7 +66,7 @@ static void IntComp_dealloc(IntCompObject *self)
 {
     laz_ic_free(&self->ic);
     Py_XDECREF(self->coder);
-    PyObject_Del(self);
+    cpylaz_free((PyObject *)self);
 }
 
 /* The direction is recorded by the core: exactly one of ic.dec/ic.enc is set. */
@@ -156,7 +157,8 @@ static PyObject *IntComp_get_corrector(IntCompObject *self, PyObject *args)
         return NULL;
     }
     if (idx == 0) {
-        BitModelObject *o = PyObject_New(BitModelObject, &BitModel_Type);
+        BitModelObject *o = PyObject_New(
+            BitModelObject, cpylaz_state((PyObject *)self)->BitModel_Type);
         if (!o) return NULL;
         o->m = self->ic.m_corrector0;      /* snapshot: the bit model is small */
         return (PyObject *)o;
@@ -211,14 +213,18 @@ static PyGetSetDef IntComp_getset[] = {
     {NULL}
 };
 
-PyTypeObject IntComp_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.IntegerCompressor",
-    .tp_basicsize = sizeof(IntCompObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = PyType_GenericNew,
-    .tp_init = (initproc)IntComp_tp_init,
-    .tp_dealloc = (destructor)IntComp_dealloc,
-    .tp_methods = IntComp_methods,
-    .tp_getset = IntComp_getset,
+static PyType_Slot IntComp_slots[] = {
+    {Py_tp_new, (void *)PyType_GenericNew},
+    {Py_tp_init, (void *)IntComp_tp_init},
+    {Py_tp_dealloc, (void *)IntComp_dealloc},
+    {Py_tp_methods, (void *)IntComp_methods},
+    {Py_tp_getset, (void *)IntComp_getset},
+    {0, NULL}
+};
+
+PyType_Spec IntComp_spec = {
+    .name = "lazpy._cpylaz.IntegerCompressor",
+    .basicsize = sizeof(IntCompObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = IntComp_slots,
 };
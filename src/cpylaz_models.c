@@ -76,6 +76,11 @@ static PyMethodDef BitModel_methods[] = {
     {NULL}
 };
 
+static void BitModel_dealloc(BitModelObject *self)
+{
+    cpylaz_free((PyObject *)self);
+}
+
 static PyObject *BitModel_repr(BitModelObject *self)
 {
     return PyUnicode_FromFormat(
@@ -85,17 +90,21 @@ static PyObject *BitModel_repr(BitModelObject *self)
         self->m.bit_0_prob, self->m.bit_0_count, self->m.bit_count);
 }
 
-PyTypeObject BitModel_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.ArithmeticBitModel",
-    .tp_basicsize = sizeof(BitModelObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = BitModel_tp_new,
-    .tp_init = (initproc)BitModel_tp_init,
-    .tp_methods = BitModel_methods,
-    .tp_getset = BitModel_getset,
-    .tp_repr = (reprfunc)BitModel_repr,
-    .tp_dealloc = (destructor)PyObject_Del,
+static PyType_Slot BitModel_slots[] = {
+    {Py_tp_new, (void *)BitModel_tp_new},
+    {Py_tp_init, (void *)BitModel_tp_init},
+    {Py_tp_methods, (void *)BitModel_methods},
+    {Py_tp_getset, (void *)BitModel_getset},
+    {Py_tp_repr, (void *)BitModel_repr},
+    {Py_tp_dealloc, (void *)BitModel_dealloc},
+    {0, NULL}
+};
+
+PyType_Spec BitModel_spec = {
+    .name = "lazpy._cpylaz.ArithmeticBitModel",
+    .basicsize = sizeof(BitModelObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = BitModel_slots,
 };
 
 /* ======================================================= ArithmeticModel == */
@@ -154,13 +163,15 @@ static void SymbolModel_dealloc(SymbolModelObject *self)
     } else if (self->m) {
         laz_symbol_model_free(self->m);
     }
-    PyObject_Del(self);
+    cpylaz_free((PyObject *)self);
 }
 
-/* Wraps a model owned by `owner` without copying it. */
+/* Wraps a model owned by `owner` without copying it: an ArithmeticModel of
+ * the module the owner's type is of. */
 PyObject *SymbolModel_borrow(LazSymbolModel *m, PyObject *owner)
 {
-    SymbolModelObject *o = PyObject_New(SymbolModelObject, &SymbolModel_Type);
+    SymbolModelObject *o = PyObject_New(SymbolModelObject,
+                                        cpylaz_state(owner)->SymbolModel_Type);
     if (!o) return NULL;
     o->m = m;
     memset(&o->storage, 0, sizeof(o->storage));
@@ -288,24 +299,30 @@ static PyGetSetDef SymbolModel_getset[] = {
 };
 
 /* Shared by ArithmeticDecoder.create_symbol_model and the encoder's. */
-PyObject *coder_create_symbol_model(PyObject *args, PyObject *compress)
+PyObject *coder_create_symbol_model(PyObject *coder, PyObject *args,
+                                    PyObject *compress)
 {
     unsigned int num_symbols;
     if (!PyArg_ParseTuple(args, "I", &num_symbols)) return NULL;
-    return PyObject_CallFunction((PyObject *)&SymbolModel_Type, "IO",
-                                 num_symbols, compress);
-}
-
-PyTypeObject SymbolModel_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.ArithmeticModel",
-    .tp_basicsize = sizeof(SymbolModelObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = SymbolModel_tp_new,
-    .tp_init = (initproc)SymbolModel_tp_init,
-    .tp_dealloc = (destructor)SymbolModel_dealloc,
-    .tp_methods = SymbolModel_methods,
-    .tp_getset = SymbolModel_getset,
+    return PyObject_CallFunction(
+        (PyObject *)cpylaz_state(coder)->SymbolModel_Type, "IO",
+        num_symbols, compress);
+}
+
+static PyType_Slot SymbolModel_slots[] = {
+    {Py_tp_new, (void *)SymbolModel_tp_new},
+    {Py_tp_init, (void *)SymbolModel_tp_init},
+    {Py_tp_dealloc, (void *)SymbolModel_dealloc},
+    {Py_tp_methods, (void *)SymbolModel_methods},
+    {Py_tp_getset, (void *)SymbolModel_getset},
+    {0, NULL}
+};
+
+PyType_Spec SymbolModel_spec = {
+    .name = "lazpy._cpylaz.ArithmeticModel",
+    .basicsize = sizeof(SymbolModelObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = SymbolModel_slots,
 };
 
 /* ===================================================== ArithmeticEncoder == */
@@ -337,7 +354,7 @@ static void Encoder_dealloc(EncoderObject *self)
     laz_encoder_free(&self->e);
     if (self->stream) laz_outstream_destroy(self->stream);
     Py_XDECREF(self->fp);
-    PyObject_Del(self);
+    cpylaz_free((PyObject *)self);
 }
 
 /*
@@ -346,10 +363,10 @@ static void Encoder_dealloc(EncoderObject *self)
  * the original, and later ones -- the caller having caught and cleared it --
  * still raise something rather than returning NULL with nothing set.
  */
-static PyObject *encoder_error(void)
+static PyObject *encoder_error(EncoderObject *self)
 {
     if (PyErr_Occurred()) return NULL;            /* propagate the original */
-    PyErr_SetString(LazErrorType, "error writing to the underlying file");
+    PyErr_SetString(LAZ_ERROR(self), "error writing to the underlying file");
     return NULL;
 }
 
@@ -367,7 +384,7 @@ static int encoder_ready(EncoderObject *self)
         PyErr_SetString(PyExc_ValueError, "encoder has no file");
         return -1;
     }
-    if (self->stream->failed) { encoder_error(); return -1; }
+    if (self->stream->failed) { encoder_error(self); return -1; }
     if (self->e.stream == NULL) {
         PyErr_SetString(PyExc_ValueError, "encoder is not started");
         return -1;
@@ -378,7 +395,7 @@ static int encoder_ready(EncoderObject *self)
 /* Returns None, or NULL with an exception set if the stream failed. */
 PyObject *encoder_result(EncoderObject *self)
 {
-    if (self->stream->failed) return encoder_error();
+    if (self->stream->failed) return encoder_error(self);
     Py_RETURN_NONE;
 }
 
@@ -408,7 +425,10 @@ static PyObject *Encoder_encode_bit(EncoderObject *self, PyObject *args)
 {
     PyObject *m;
     unsigned int sym;
-    if (!PyArg_ParseTuple(args, "O!I", &BitModel_Type, &m, &sym)) return NULL;
+    if (!PyArg_ParseTuple(args, "O!I",
+                          cpylaz_state((PyObject *)self)->BitModel_Type,
+                          &m, &sym))
+        return NULL;
     if (sym > 1) {
         PyErr_SetString(PyExc_ValueError, "bit must be 0 or 1");
         return NULL;
@@ -423,7 +443,10 @@ static PyObject *Encoder_encode_symbol(EncoderObject *self, PyObject *args)
     PyObject *m;
     unsigned int sym;
     LazSymbolModel *sm;
-    if (!PyArg_ParseTuple(args, "O!I", &SymbolModel_Type, &m, &sym)) return NULL;
+    if (!PyArg_ParseTuple(args, "O!I",
+                          cpylaz_state((PyObject *)self)->SymbolModel_Type,
+                          &m, &sym))
+        return NULL;
     sm = ((SymbolModelObject *)m)->m;
     if (!sm->distribution) {
         PyErr_SetString(PyExc_ValueError, "model not initialized");
@@ -468,8 +491,7 @@ static PyObject *Encoder_write_int(EncoderObject *self, PyObject *args)
  * which a model differs between the two directions. */
 static PyObject *Encoder_create_symbol_model(EncoderObject *self, PyObject *args)
 {
-    (void)self;
-    return coder_create_symbol_model(args, Py_True);
+    return coder_create_symbol_model((PyObject *)self, args, Py_True);
 }
 
 static PyObject *Encoder_repr(EncoderObject *self)
@@ -506,17 +528,21 @@ static PyGetSetDef Encoder_getset[] = {
     {NULL}
 };
 
-PyTypeObject Encoder_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.ArithmeticEncoder",
-    .tp_basicsize = sizeof(EncoderObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = PyType_GenericNew,
-    .tp_init = (initproc)Encoder_tp_init,
-    .tp_dealloc = (destructor)Encoder_dealloc,
-    .tp_methods = Encoder_methods,
-    .tp_getset = Encoder_getset,
-    .tp_repr = (reprfunc)Encoder_repr,
+static PyType_Slot Encoder_slots[] = {
+    {Py_tp_new, (void *)PyType_GenericNew},
+    {Py_tp_init, (void *)Encoder_tp_init},
+    {Py_tp_dealloc, (void *)Encoder_dealloc},
+    {Py_tp_methods, (void *)Encoder_methods},
+    {Py_tp_getset, (void *)Encoder_getset},
+    {Py_tp_repr, (void *)Encoder_repr},
+    {0, NULL}
+};
+
+PyType_Spec Encoder_spec = {
+    .name = "lazpy._cpylaz.ArithmeticEncoder",
+    .basicsize = sizeof(EncoderObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = Encoder_slots,
 };
 
 /* ===================================================== ArithmeticDecoder == */
@@ -544,7 +570,7 @@ static void Decoder_dealloc(DecoderObject *self)
 {
     if (self->stream) laz_stream_destroy(self->stream);
     Py_XDECREF(self->fp);
-    PyObject_Del(self);
+    cpylaz_free((PyObject *)self);
 }
 
 /*
@@ -587,7 +613,7 @@ static PyObject *decoder_result(DecoderObject *self, PyObject *value)
     if (!self->stream->failed) return value;
     Py_XDECREF(value);
     if (PyErr_Occurred()) return NULL;          /* the file object's own */
-    PyErr_SetString(LazErrorType, "error reading from the underlying file");
+    PyErr_SetString(LAZ_ERROR(self), "error reading from the underlying file");
     return NULL;
 }
 
@@ -602,7 +628,9 @@ static PyObject *Decoder_decode_bit(DecoderObject *self, PyObject *args)
 {
     PyObject *m;
     if (decoder_ready(self) < 0) return NULL;
-    if (!PyArg_ParseTuple(args, "O!", &BitModel_Type, &m)) return NULL;
+    if (!PyArg_ParseTuple(args, "O!",
+                          cpylaz_state((PyObject *)self)->BitModel_Type, &m))
+        return NULL;
     return decoder_result(self, PyLong_FromUnsignedLong(
         laz_decode_bit(&self->d, &((BitModelObject *)m)->m)));
 }
@@ -612,7 +640,9 @@ static PyObject *Decoder_decode_symbol(DecoderObject *self, PyObject *args)
     PyObject *m;
     LazSymbolModel *sm;
     if (decoder_ready(self) < 0) return NULL;
-    if (!PyArg_ParseTuple(args, "O!", &SymbolModel_Type, &m)) return NULL;
+    if (!PyArg_ParseTuple(args, "O!",
+                          cpylaz_state((PyObject *)self)->SymbolModel_Type, &m))
+        return NULL;
     sm = ((SymbolModelObject *)m)->m;
     if (!sm->distribution) {
         PyErr_SetString(PyExc_ValueError, "model not initialized");
@@ -644,8 +674,7 @@ static PyObject *Decoder_read_int(DecoderObject *self, PyObject *Py_UNUSED(i))
 
 static PyObject *Decoder_create_symbol_model(DecoderObject *self, PyObject *args)
 {
-    (void)self;
-    return coder_create_symbol_model(args, Py_False);
+    return coder_create_symbol_model((PyObject *)self, args, Py_False);
 }
 
 static PyObject *Decoder_repr(DecoderObject *self)
@@ -680,15 +709,19 @@ static PyGetSetDef Decoder_getset[] = {
     {NULL}
 };
 
-PyTypeObject Decoder_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.ArithmeticDecoder",
-    .tp_basicsize = sizeof(DecoderObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = PyType_GenericNew,
-    .tp_init = (initproc)Decoder_tp_init,
-    .tp_dealloc = (destructor)Decoder_dealloc,
-    .tp_methods = Decoder_methods,
-    .tp_getset = Decoder_getset,
-    .tp_repr = (reprfunc)Decoder_repr,
+static PyType_Slot Decoder_slots[] = {
+    {Py_tp_new, (void *)PyType_GenericNew},
+    {Py_tp_init, (void *)Decoder_tp_init},
+    {Py_tp_dealloc, (void *)Decoder_dealloc},
+    {Py_tp_methods, (void *)Decoder_methods},
+    {Py_tp_getset, (void *)Decoder_getset},
+    {Py_tp_repr, (void *)Decoder_repr},
+    {0, NULL}
+};
+
+PyType_Spec Decoder_spec = {
+    .name = "lazpy._cpylaz.ArithmeticDecoder",
+    .basicsize = sizeof(DecoderObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = Decoder_slots,
 };
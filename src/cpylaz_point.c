@@ -37,9 +37,10 @@ PointObject *point_alloc(PyTypeObject *type)
 }
 
 /* A view onto memory owned by `reader`, valid until the reader detaches it. */
-PyObject *Point_borrow(LazPoint *p, U8 *extra, U32 num_extra)
+PyObject *Point_borrow(PyObject *reader, LazPoint *p, U8 *extra,
+                       U32 num_extra)
 {
-    PointObject *o = point_alloc(&Point_Type);
+    PointObject *o = point_alloc(cpylaz_state(reader)->Point_Type);
     if (!o) return NULL;
     o->p = p;
     o->extra = extra;
@@ -69,18 +70,18 @@ void Point_detach(PointObject *self)
 static void Point_dealloc(PointObject *self)
 {
     free(self->extra_storage);
-    PyObject_Del(self);
+    cpylaz_free((PyObject *)self);
 }
 
 static PyObject *Point_copy(PointObject *self, PyObject *Py_UNUSED(i))
 {
-    PointObject *o = point_alloc(&Point_Type);
+    PointObject *o = point_alloc(Py_TYPE(self));
     if (!o) return NULL;
     o->storage = *self->p;
     o->num_extra = self->num_extra;
     if (self->num_extra) {
         o->extra_storage = (U8 *)malloc(self->num_extra);
-        if (!o->extra_storage) { PyObject_Del(o); return PyErr_NoMemory(); }
+        if (!o->extra_storage) { Py_DECREF(o); return PyErr_NoMemory(); }
         memcpy(o->extra_storage, self->extra, self->num_extra);
         o->extra = o->extra_storage;
     }
@@ -495,16 +496,20 @@ PyDoc_STRVAR(point_doc,
 "\n"
 "    Point(X=125000, Y=473000, Z=1200, classification=2)\n");
 
-PyTypeObject Point_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.Point",
-    .tp_basicsize = sizeof(PointObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_doc = point_doc,
-    .tp_new = Point_tp_new,
-    .tp_init = (initproc)Point_tp_init,
-    .tp_dealloc = (destructor)Point_dealloc,
-    .tp_getset = Point_getset,
-    .tp_methods = Point_methods,
-    .tp_repr = (reprfunc)Point_repr,
+static PyType_Slot Point_slots[] = {
+    {Py_tp_doc, (void *)point_doc},
+    {Py_tp_new, (void *)Point_tp_new},
+    {Py_tp_init, (void *)Point_tp_init},
+    {Py_tp_dealloc, (void *)Point_dealloc},
+    {Py_tp_getset, (void *)Point_getset},
+    {Py_tp_methods, (void *)Point_methods},
+    {Py_tp_repr, (void *)Point_repr},
+    {0, NULL}
+};
+
+PyType_Spec Point_spec = {
+    .name = "lazpy._cpylaz.Point",
+    .basicsize = sizeof(PointObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = Point_slots,
 };
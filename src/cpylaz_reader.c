@@ -7,6 +7,7 @@
 
 typedef struct {
     PyObject_HEAD
+    ObjectLock lock;        /* first; see ObjectLock in cpylaz.h */
     LazReadPoint rp;
     LazStream *stream;
     PyObject *fp;
@@ -23,35 +24,39 @@ typedef struct {
     I32 compat_starts[COMPAT_ATTRIBUTES];
     /* the quantized scan angle rank for every rank there is; see
      * reader_recode_compat, which would otherwise divide once per point */
-    const I16 *scan_angle_of_rank;
+    I16 scan_angle_of_rank[256];
     PyObject *point_view;
     BOOL ready;
     U64 index;              /* number of points read so far */
+    /* set by cancel(), from any thread, and looked at by reader_next with
+     * the GIL released: a flag one side writes and the other polls, which
+     * volatile is enough for */
+    volatile int cancel;
+    BOOL cancelled;         /* reader_next stopped for it */
+    U32 passed;             /* points reader_next has decoded, wrapping */
 } ReaderObject;
 
+/* How many points apart a cancel is looked for where there is no chunk
+ * boundary to take it at: a LASzip chunk's worth. */
+#define CANCEL_STRIDE 50000
+
 /* The widths of the hidden attributes, in the order cpylaz.h names them. */
 const U32 compat_widths[COMPAT_ATTRIBUTES] = {2, 1, 1, 1, 2};
 
 /*
- * The scan angle every rank stands for, built once and shared by both
- * directions: a division per point is what tabulating it avoids, and the
- * writer needs the same 256 values to work out what a rank leaves over.
+ * The scan angle every rank stands for, for both directions: a division per
+ * point is what tabulating it avoids, and the writer needs the same 256
+ * values to work out what a rank leaves over.
  *
- * Filled on first use rather than at module init because almost no file is a
- * compatibility-mode one. Two threads racing here write the same values.
+ * Filled for each reader or writer of a compatibility-mode file rather than
+ * once for the process: 256 divisions are nothing beside opening a file, and
+ * a table of the object's own is one no two threads fill at once.
  */
-const I16 *compat_scan_angle_of_rank(void)
+void compat_scan_angle_of_rank(I16 table[256])
 {
-    static I16 table[256];
-    static BOOL filled = LAZ_FALSE;
     int i;
-
-    if (!filled) {
-        for (i = 0; i < 256; i++)
-            table[i] = COMPAT_SCAN_ANGLE_OF_RANK((I8)i);
-        filled = LAZ_TRUE;
-    }
-    return table;
+    for (i = 0; i < 256; i++)
+        table[i] = COMPAT_SCAN_ANGLE_OF_RANK((I8)i);
 }
 
 /*
@@ -146,6 +151,20 @@ static BOOL reader_ready(ReaderObject *self)
  */
 static BOOL reader_next(ReaderObject *self)
 {
+    /* A cancel is taken where the next point opens a chunk, or every
+     * CANCEL_STRIDE points of a file without any, so that decoding stops
+     * within a chunk of being asked and leaves the reader somewhere a seek
+     * goes from as from anywhere else. The loops stop as for an error, and
+     * reader_error says which it was. */
+    if (self->cancel) {
+        BOOL chunked = self->rp.have_dec && self->rp.chunk_size != U32_MAX;
+        if (chunked ? self->rp.chunk_count == self->rp.chunk_size
+                    : self->passed % CANCEL_STRIDE == 0) {
+            self->cancelled = LAZ_TRUE;
+            return LAZ_FALSE;
+        }
+    }
+    self->passed++;
     if (!laz_readpoint_read(&self->rp, &self->point, self->extra_bytes))
         return LAZ_FALSE;
     if (!reader_stream_ok(self)) return LAZ_FALSE;
@@ -164,7 +183,8 @@ static void Reader_dealloc(ReaderObject *self)
     if (self->stream) laz_stream_destroy(self->stream);
     Py_XDECREF(self->fp);
     free(self->extra_bytes);
-    PyObject_Del(self);
+    locked_free((PyObject *)self);
+    cpylaz_free((PyObject *)self);
 }
 
 /* items is a sequence of (type, size, version) triples from the LASzip VLR. */
@@ -211,7 +231,7 @@ int parse_items(PyObject *seq, LazItem **out, U32 *out_n)
  * them for every point with no further checking. Shared with the writer,
  * which puts there what this takes back out.
  */
-int parse_compat_starts(PyObject *obj, U32 num_extra_bytes,
+int parse_compat_starts(PyObject *self, PyObject *obj, U32 num_extra_bytes,
                         I32 starts[COMPAT_ATTRIBUTES])
 {
     int i;
@@ -226,7 +246,7 @@ int parse_compat_starts(PyObject *obj, U32 num_extra_bytes,
         /* by subtraction, so a start near U32_MAX cannot wrap past the end */
         if (starts[i] < 0 || compat_widths[i] > num_extra_bytes ||
             (U32)starts[i] > num_extra_bytes - compat_widths[i]) {
-            PyErr_SetString(LazErrorType, "a LAS 1.4 compatibility attribute "
+            PyErr_SetString(LAZ_ERROR(self), "a LAS 1.4 compatibility attribute "
                             "lies outside the extra bytes");
             return -1;
         }
@@ -237,7 +257,8 @@ int parse_compat_starts(PyObject *obj, U32 num_extra_bytes,
 static int parse_compatibility(ReaderObject *self, PyObject *obj)
 {
     I32 *starts = self->compat_starts;
-    int i, found = parse_compat_starts(obj, self->rp.num_extra_bytes, starts);
+    int i, found = parse_compat_starts((PyObject *)self, obj,
+                                       self->rp.num_extra_bytes, starts);
 
     if (found <= 0) return found;
 
@@ -248,7 +269,7 @@ static int parse_compatibility(ReaderObject *self, PyObject *obj)
             self->num_extra_bytes = (U32)starts[i];
     }
 
-    self->scan_angle_of_rank = compat_scan_angle_of_rank();
+    compat_scan_angle_of_rank(self->scan_angle_of_rank);
     self->compat = LAZ_TRUE;
     return 0;
 }
@@ -279,7 +300,7 @@ static int Reader_tp_init(ReaderObject *self, PyObject *args, PyObject *kwds)
     laz_readpoint_init_struct(&self->rp, selective);
     if (!laz_readpoint_setup(&self->rp, num_items, items, compressor, coder, chunk_size)) {
         PyMem_Free(items);
-        PyErr_SetString(LazErrorType, self->rp.last_error);
+        PyErr_SetString(LAZ_ERROR(self), self->rp.last_error);
         return -1;
     }
     PyMem_Free(items);
@@ -301,19 +322,19 @@ static int Reader_tp_init(ReaderObject *self, PyObject *args, PyObject *kwds)
     self->fp = fp;
 
     if (start_offset >= 0 && !laz_stream_seek(self->stream, (I64)start_offset)) {
-        PyErr_SetString(LazErrorType, "could not seek to the start of point data");
+        PyErr_SetString(LAZ_ERROR(self), "could not seek to the start of point data");
         return -1;
     }
 
     if (!laz_readpoint_init(&self->rp, self->stream)) {
-        PyErr_SetString(LazErrorType, "could not initialise the point reader");
+        PyErr_SetString(LAZ_ERROR(self), "could not initialise the point reader");
         return -1;
     }
 
     laz_readpoint_init_point(&self->rp, &self->point);
 
-    self->point_view = Point_borrow(&self->point, self->extra_bytes,
-                                    self->num_extra_bytes);
+    self->point_view = Point_borrow((PyObject *)self, &self->point,
+                                    self->extra_bytes, self->num_extra_bytes);
     if (!self->point_view) return -1;
 
     self->ready = LAZ_TRUE;
@@ -329,11 +350,16 @@ static int Reader_tp_init(ReaderObject *self, PyObject *args, PyObject *kwds)
 static PyObject *reader_error(ReaderObject *self)
 {
     if (PyErr_Occurred()) return NULL;            /* propagate the original */
+    if (self->cancelled) {
+        self->cancelled = LAZ_FALSE;
+        PyErr_SetString(LAZ_ERROR(self), "decoding was cancelled");
+        return NULL;
+    }
     if (self->stream && self->stream->failed) {
-        PyErr_SetString(LazErrorType, "error reading from the underlying file");
+        PyErr_SetString(LAZ_ERROR(self), "error reading from the underlying file");
         return NULL;
     }
-    PyErr_SetString(LazErrorType,
+    PyErr_SetString(LAZ_ERROR(self),
                     self->rp.has_error ? self->rp.last_error : "read failed");
     return NULL;
 }
@@ -370,56 +396,93 @@ static PyObject *Reader_read(ReaderObject *self, PyObject *Py_UNUSED(i))
  * cannot be settled until the extent of them all is known. In C for the
  * reason the second pass is -- a point that never becomes a Python object is
  * most of what makes indexing a large file bearable.
+ *
+ * `dims` of 3 takes in the elevations too, which is what an octree is laid
+ * over.
  */
 static PyObject *Reader_bounds(ReaderObject *self, PyObject *args)
 {
     unsigned long long count;
-    I32 min_xy[2] = {0, 0}, max_xy[2] = {0, 0};
+    int dims = 2;
+    I32 lo[3] = {0, 0, 0}, hi[3] = {0, 0, 0};
     U64 done = 0;
     BOOL ok = LAZ_TRUE;
 
     if (!reader_ready(self)) return NULL;
-    if (!PyArg_ParseTuple(args, "K", &count)) return NULL;
+    if (!PyArg_ParseTuple(args, "K|i", &count, &dims)) return NULL;
+    if (dims != 2 && dims != 3) {
+        PyErr_SetString(PyExc_ValueError, "an extent is over 2 or 3 "
+                        "dimensions");
+        return NULL;
+    }
     if (count == 0) {
-        PyErr_SetString(LazErrorType, "a file with no points has no extent");
+        PyErr_SetString(LAZ_ERROR(self), "a file with no points has no extent");
         return NULL;
     }
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     while (done < count) {
         const LazPoint *p = &self->point;
+        I32 xyz[3];
         int i;
         if (!reader_next(self)) { ok = LAZ_FALSE; break; }
-        if (done == 0) {
-            min_xy[0] = max_xy[0] = p->X;
-            min_xy[1] = max_xy[1] = p->Y;
-        } else {
-            const I32 xy[2] = {p->X, p->Y};
-            for (i = 0; i < 2; i++) {
-                if (xy[i] < min_xy[i]) min_xy[i] = xy[i];
-                if (xy[i] > max_xy[i]) max_xy[i] = xy[i];
-            }
+        xyz[0] = p->X;
+        xyz[1] = p->Y;
+        xyz[2] = p->Z;
+        for (i = 0; i < dims; i++) {
+            if (done == 0 || xyz[i] < lo[i]) lo[i] = xyz[i];
+            if (done == 0 || xyz[i] > hi[i]) hi[i] = xyz[i];
         }
         done++;
         self->index++;
     }
-    Py_END_ALLOW_THREADS
+    LAZ_END_ALLOW_THREADS
 
     if (!ok) return reader_error(self);
-    return Py_BuildValue("(iiii)", min_xy[0], min_xy[1], max_xy[0], max_xy[1]);
+    if (dims == 3)
+        return Py_BuildValue("(iiiiii)", lo[0], lo[1], lo[2],
+                             hi[0], hi[1], hi[2]);
+    return Py_BuildValue("(iiii)", lo[0], lo[1], hi[0], hi[1]);
+}
+
+/*
+ * The box the points a builder was given cover, as the bounds build_index
+ * takes: what to lay the tree over the second time.
+ */
+static PyObject *builder_extent(const LazIndexBuilder *b)
+{
+    const F64 *lo = b->extent_min, *hi = b->extent_max;
+    if (b->dims == 3)
+        return Py_BuildValue("(dddddd)", lo[0], lo[1], lo[2],
+                             hi[0], hi[1], hi[2]);
+    return Py_BuildValue("(dddd)", lo[0], lo[1], hi[0], hi[1]);
 }
 
 /*
  * Builds a spatial index over every point from here to the end.
  *
  * The whole file goes through the builder without a Python object per point,
- * which is what makes indexing a large file worth doing at all: it is two
- * passes over the points, and this is the second.
+ * which is what makes indexing a large file worth doing at all.
+ *
+ * Without bounds it is one pass: the builder buckets the points by cell and
+ * lays the tree over them afterwards. With bounds the tree is laid first.
+ * Either way the answer can be that a tree needs laying over the extent the
+ * points really cover -- a grid the tree's edges do not fall on, or points
+ * outside the bounds it was given -- and then that extent comes back instead
+ * of an index, for the caller to go through the points again with.
+ *
+ * Bounds of six rather than four, with a scale and an offset for z, build an
+ * octree instead of a quadtree; without bounds, it is three scales.
  */
 static PyObject *Reader_build_index(ReaderObject *self, PyObject *args)
 {
-    double min_x, max_x, min_y, max_y, scale_x, scale_y, offset_x, offset_y;
+    double min_x = 0.0, max_x = 0.0, min_y = 0.0, max_y = 0.0;
+    double min_z = 0.0, max_z = 0.0;
+    double scale_x, scale_y, offset_x, offset_y;
+    double scale_z = 0.0, offset_z = 0.0;
     double cell_size;
+    PyObject *bounds, *scales, *offsets;
+    BOOL octree, given, aligned = LAZ_TRUE;
     unsigned long long count;
     unsigned int minimum_points, threshold;
     int maximum_intervals;
@@ -432,15 +495,40 @@ static PyObject *Reader_build_index(ReaderObject *self, PyObject *args)
     BOOL ok = LAZ_TRUE;
     if (!reader_ready(self)) return NULL;
     if (!PyArg_ParseTuple(
-            args, "K(dddd)(dd)(dd)dIiI", &count,
-            &min_x, &min_y, &max_x, &max_y, &scale_x, &scale_y,
-            &offset_x, &offset_y, &cell_size, &minimum_points,
+            args, "KOO!O!dIiI", &count, &bounds, &PyTuple_Type, &scales,
+            &PyTuple_Type, &offsets, &cell_size, &minimum_points,
             &maximum_intervals, &threshold))
         return NULL;
+    given = (bounds != Py_None);
+    if (given && !PyTuple_Check(bounds)) {
+        PyErr_SetString(PyExc_TypeError, "bounds are a tuple, or None");
+        return NULL;
+    }
+    octree = (PyTuple_GET_SIZE(scales) == 3);
+    if (octree) {
+        if (!PyArg_ParseTuple(scales, "ddd", &scale_x, &scale_y, &scale_z) ||
+            !PyArg_ParseTuple(offsets, "ddd", &offset_x, &offset_y,
+                              &offset_z) ||
+            (given && !PyArg_ParseTuple(bounds, "dddddd", &min_x, &min_y,
+                                        &min_z, &max_x, &max_y, &max_z)))
+            return NULL;
+    } else if (!PyArg_ParseTuple(scales, "dd", &scale_x, &scale_y) ||
+               !PyArg_ParseTuple(offsets, "dd", &offset_x, &offset_y) ||
+               (given && !PyArg_ParseTuple(bounds, "dddd", &min_x, &min_y,
+                                           &max_x, &max_y))) {
+        return NULL;
+    }
 
-    if (!laz_indexbuilder_setup(&builder, min_x, max_x, min_y, max_y,
-                                (F32)cell_size, threshold)) {
-        PyErr_SetString(LazErrorType, builder.last_error);
+    if (!given) ok = laz_indexbuilder_setup_grid(&builder, octree ? 3 : 2,
+                                                 (F32)cell_size, threshold);
+    else if (octree) ok = laz_indexbuilder_setup_octree(
+        &builder, min_x, max_x, min_y, max_y, min_z, max_z, (F32)cell_size,
+        threshold);
+    else ok = laz_indexbuilder_setup(&builder, min_x, max_x, min_y, max_y,
+                                     (F32)cell_size, threshold);
+    if (!ok) {
+        PyErr_SetString(LAZ_ERROR(self), builder.last_error);
+        laz_indexbuilder_destroy(&builder);
         return NULL;
     }
     out = laz_outstream_new_array();
@@ -449,31 +537,45 @@ static PyObject *Reader_build_index(ReaderObject *self, PyObject *args)
         return PyErr_NoMemory();
     }
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     while (done < count) {
         LazPoint *p = &self->point;
         if (!reader_next(self)) { ok = LAZ_FALSE; break; }
         if (!laz_indexbuilder_add(&builder,
                                   p->X * scale_x + offset_x,
-                                  p->Y * scale_y + offset_y, done)) {
+                                  p->Y * scale_y + offset_y,
+                                  p->Z * scale_z + offset_z, done)) {
             ok = LAZ_FALSE;
             break;
         }
         done++;
         self->index++;
     }
-    if (ok) ok = laz_indexbuilder_complete(&builder, minimum_points,
-                                           maximum_intervals);
-    if (ok) ok = laz_indexbuilder_serialize(&builder, out);
-    Py_END_ALLOW_THREADS
-
-    if (ok) {
+    if (ok && !given) ok = laz_indexbuilder_reroot(&builder, &aligned);
+    if (ok && given) {
+        /* a point outside the box would be outside the tree, where no
+         * query could find it */
+        const F64 lo[3] = {min_x, min_y, min_z}, hi[3] = {max_x, max_y, max_z};
+        U32 axis;
+        for (axis = 0; axis < builder.dims; axis++)
+            if (builder.extent_min[axis] < lo[axis] ||
+                builder.extent_max[axis] > hi[axis])
+                aligned = LAZ_FALSE;
+    }
+    if (ok && aligned) ok = laz_indexbuilder_complete(&builder, minimum_points,
+                                                      maximum_intervals);
+    if (ok && aligned) ok = laz_indexbuilder_serialize(&builder, out);
+    LAZ_END_ALLOW_THREADS
+
+    if (ok && !aligned) {
+        result = builder_extent(&builder);
+    } else if (ok) {
         data = laz_outstream_array_data(out, &size);
         result = PyBytes_FromStringAndSize((const char *)data,
                                            (Py_ssize_t)size);
     } else if (builder.has_error) {
         /* read before the builder is destroyed, which clears it */
-        PyErr_SetString(LazErrorType, builder.last_error);
+        PyErr_SetString(LAZ_ERROR(self), builder.last_error);
     } else {
         reader_error(self);
     }
@@ -492,7 +594,7 @@ static PyObject *Reader_checksum(ReaderObject *self, PyObject *args)
     if (!reader_ready(self)) return NULL;
     if (!PyArg_ParseTuple(args, "|L", &count)) return NULL;
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     while (count < 0 || done < (U64)count) {
         U8 rec[64];
         LazPoint *p = &self->point;
@@ -525,7 +627,7 @@ static PyObject *Reader_checksum(ReaderObject *self, PyObject *args)
         }
         done++;
     }
-    Py_END_ALLOW_THREADS
+    LAZ_END_ALLOW_THREADS
 
     /* As in read_into: the points that did decode stay decoded, so the index
      * follows them whether or not the read that came after them failed.
@@ -552,11 +654,16 @@ static PyObject *Reader_checksum(ReaderObject *self, PyObject *args)
  * candidate, but it is not bit-equivalent at the boundaries, and which points
  * a query selects is pinned against laszip's own answer in
  * testdata/reference_inside.txt.
+ *
+ * A box query adds a range of elevations, half-open as the rectangle is;
+ * `has_z` is whether there is one to test.
  */
 typedef struct {
     double min_x, min_y, max_x, max_y;
     double scale_x, scale_y, offset_x, offset_y;
     double center_x, center_y, radius;
+    double min_z, max_z, scale_z, offset_z;
+    BOOL has_z;
 } Region;
 
 static BOOL point_inside(const Region *r, const LazPoint *p)
@@ -564,6 +671,11 @@ static BOOL point_inside(const Region *r, const LazPoint *p)
     double x = p->X * r->scale_x + r->offset_x;
     double y = p->Y * r->scale_y + r->offset_y;
 
+    if (r->has_z) {
+        double z = p->Z * r->scale_z + r->offset_z;
+        if (!(z >= r->min_z && z < r->max_z)) return LAZ_FALSE;
+    }
+
     if (r->radius > 0) {
         /* strictly inside, as LASquadtree tests a circle; there are no
          * adjoining circles for a half-open edge to divide */
@@ -598,16 +710,26 @@ static int reader_next_within(ReaderObject *self, U64 stop, const Region *region
 }
 
 /* The area and what puts a point in it, as one flat tuple of doubles:
- * lazpy.Reader._region builds it once for a whole query. The last three are
- * the circle, whose radius is zero for a rectangle query. */
+ * lazpy.Reader._region builds it once for a whole query. The next three are
+ * the circle, whose radius is zero for a rectangle query; a box adds four
+ * more, its elevations and what puts a point's Z among them. */
 static int region_convert(PyObject *obj, void *out)
 {
     Region *r = (Region *)out;
-    return PyArg_ParseTuple(obj, "ddddddddddd;a region is eleven floats",
-                            &r->min_x, &r->min_y, &r->max_x, &r->max_y,
-                            &r->scale_x, &r->scale_y,
-                            &r->offset_x, &r->offset_y,
-                            &r->center_x, &r->center_y, &r->radius);
+    r->scale_z = 0.0;
+    r->offset_z = 0.0;
+    r->min_z = -HUGE_VAL;
+    r->max_z = HUGE_VAL;
+    if (!PyArg_ParseTuple(obj, "ddddddddddd|dddd;a region is eleven floats, "
+                          "or fifteen for a box",
+                          &r->min_x, &r->min_y, &r->max_x, &r->max_y,
+                          &r->scale_x, &r->scale_y,
+                          &r->offset_x, &r->offset_y,
+                          &r->center_x, &r->center_y, &r->radius,
+                          &r->min_z, &r->max_z, &r->scale_z, &r->offset_z))
+        return 0;
+    r->has_z = (PyTuple_GET_SIZE(obj) > 11);
+    return 1;
 }
 
 static PyObject *Reader_read_within(ReaderObject *self, PyObject *args)
@@ -638,9 +760,9 @@ static PyObject *Reader_read_within(ReaderObject *self, PyObject *args)
         }
     }
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     found = reader_next_within(self, (U64)stop, &region);
-    Py_END_ALLOW_THREADS
+    LAZ_END_ALLOW_THREADS
 
     if (found < 0) return reader_error(self);
     if (found == 0) Py_RETURN_NONE;
@@ -778,7 +900,7 @@ static PyObject *Reader_read_into(ReaderObject *self, PyObject *args)
                       targets, count, COLUMNS_FROM_POINT, &c))
         return NULL;
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     for (done = 0; done < count; done++) {
         if (!reader_next(self)) {
             ok = LAZ_FALSE;
@@ -786,7 +908,7 @@ static PyObject *Reader_read_into(ReaderObject *self, PyObject *args)
         }
         columns_step(&c);
     }
-    Py_END_ALLOW_THREADS
+    LAZ_END_ALLOW_THREADS
 
     /* Points that did decode stay decoded, so the index has to follow them
      * even when the read that failed leaves the arrays part-filled. */
@@ -832,14 +954,14 @@ static PyObject *Reader_read_into_within(ReaderObject *self, PyObject *args)
                       targets, room, COLUMNS_FROM_POINT, &c))
         return NULL;
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     while (written < room) {
         found = reader_next_within(self, (U64)stop, &region);
         if (found != 1) break;
         columns_step(&c);
         written++;
     }
-    Py_END_ALLOW_THREADS
+    LAZ_END_ALLOW_THREADS
 
     if (found < 0) result = reader_error(self);   /* raises; returns NULL */
     else result = PyLong_FromSsize_t(written);
@@ -848,6 +970,338 @@ static PyObject *Reader_read_into_within(ReaderObject *self, PyObject *args)
     return result;
 }
 
+/*
+ * read_into for the first point of each of `count` chunks from `first` on:
+ * one row per chunk, each read as it is stored ahead of the entropy coder, so
+ * that a file's outline costs a seek per chunk rather than a chunk decoded.
+ *
+ * The reader is left at the first point of the last chunk, as a seek there
+ * leaves it; nothing of that chunk is decoded until something reads on.
+ */
+static PyObject *Reader_read_heads(ReaderObject *self, PyObject *args)
+{
+    PyObject *targets, *result = NULL;
+    unsigned long first;
+    Py_ssize_t count, done = 0;
+    Columns c;
+    BOOL ok = LAZ_TRUE;
+
+    if (!PyArg_ParseTuple(args, "Okn", &targets, &first, &count)) return NULL;
+    if (!reader_ready(self)) return NULL;
+    if (count < 0) {
+        PyErr_SetString(PyExc_ValueError, "count must not be negative");
+        return NULL;
+    }
+    if (!columns_open(&self->point, self->extra_bytes, self->num_extra_bytes,
+                      targets, count, COLUMNS_FROM_POINT, &c))
+        return NULL;
+
+    LAZ_BEGIN_ALLOW_THREADS
+    for (done = 0; done < count; done++) {
+        if (!laz_readpoint_read_chunk_head(&self->rp, (U32)(first + done),
+                                           &self->point, self->extra_bytes) ||
+            !reader_stream_ok(self)) {
+            ok = LAZ_FALSE;
+            break;
+        }
+        if (self->compat) reader_recode_compat(self);
+        columns_step(&c);
+    }
+    LAZ_END_ALLOW_THREADS
+
+    /* where the last head read left the reader, which is at that point */
+    if (done > 0) {
+        const LazReadPoint *rp = &self->rp;
+        U32 last = (U32)(first + done - 1);
+        self->index = rp->chunk_totals ? rp->chunk_totals[last]
+                                       : (U64)last * rp->chunk_size;
+    }
+
+    if (ok) {
+        result = Py_None;
+        Py_INCREF(result);
+    } else {
+        result = reader_error(self);         /* raises; returns NULL */
+    }
+
+    columns_close(&c);
+    return result;
+}
+
+/* ------------------------------------------------------------- thinning */
+
+/* The (start, stop) pairs of a query's spans, as one array of 2n indices the
+ * decode loop can walk with the GIL released. NULL with an exception set. */
+static U64 *spans_convert(PyObject *obj, Py_ssize_t *n)
+{
+    PyObject *seq = PySequence_Fast(obj, "spans must be a sequence");
+    U64 *spans;
+    Py_ssize_t i;
+
+    if (!seq) return NULL;
+    *n = PySequence_Fast_GET_SIZE(seq);
+    spans = (U64 *)PyMem_Malloc((size_t)(*n ? *n : 1) * 2 * sizeof(U64));
+    if (!spans) {
+        Py_DECREF(seq);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    for (i = 0; i < *n; i++) {
+        unsigned long long start, stop;
+        if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(seq, i), "KK;a span "
+                              "is (start, stop)", &start, &stop)) {
+            PyMem_Free(spans);
+            Py_DECREF(seq);
+            return NULL;
+        }
+        spans[2 * i] = start;
+        spans[2 * i + 1] = stop;
+    }
+    Py_DECREF(seq);
+    return spans;
+}
+
+/*
+ * Thins the points of `spans` to one per voxel, returning how many voxels
+ * there were and the point each kept, as one block of bytes: a decoded point
+ * image POINT_FIXED_EXTENT long and its extra bytes, for every voxel in the
+ * order a point first landed in it.
+ *
+ * One pass, in C and with the GIL released, for the reason build_index is:
+ * the points that are thinned away -- which is most of them, for a thinning
+ * worth asking for -- never become anything, in Python or in memory. What
+ * the pass holds is a record per voxel. A region, where there is one, keeps
+ * out the points outside it as read_into_within does.
+ */
+static PyObject *Reader_voxel_downsample(ReaderObject *self, PyObject *args)
+{
+    static const char *keeps[] = {"first", "centroid", "lowest", "highest"};
+    PyObject *span_list, *region_obj, *result = NULL;
+    const char *keep_name;
+    double size[3], scale[3], offset[3];
+    Region region;
+    const Region *within = NULL;
+    LazVoxelGrid grid;
+    U64 *spans;
+    Py_ssize_t num_spans, i;
+    int keep = -1, k, found = 0;
+    BOOL ok = LAZ_TRUE;
+
+    if (!reader_ready(self)) return NULL;
+    if (!PyArg_ParseTuple(args, "OO(ddd)(ddd)(ddd)s", &span_list, &region_obj,
+                          &size[0], &size[1], &size[2],
+                          &scale[0], &scale[1], &scale[2],
+                          &offset[0], &offset[1], &offset[2], &keep_name))
+        return NULL;
+    for (k = 0; k < 4; k++)
+        if (strcmp(keep_name, keeps[k]) == 0) keep = k;
+    if (keep < 0) {
+        PyErr_Format(PyExc_ValueError, "a voxel keeps its first, centroid, "
+                     "lowest or highest point, not %s", keep_name);
+        return NULL;
+    }
+    if (region_obj != Py_None) {
+        if (!region_convert(region_obj, &region)) return NULL;
+        within = &region;
+    }
+    if (!laz_voxelgrid_setup(&grid, size, scale, offset, (LazVoxelKeep)keep,
+                             POINT_FIXED_EXTENT, self->num_extra_bytes)) {
+        PyErr_SetString(PyExc_ValueError, grid.last_error);
+        laz_voxelgrid_destroy(&grid);
+        return NULL;
+    }
+    spans = spans_convert(span_list, &num_spans);
+    if (!spans) {
+        laz_voxelgrid_destroy(&grid);
+        return NULL;
+    }
+
+    LAZ_BEGIN_ALLOW_THREADS
+    for (i = 0; ok && i < num_spans; i++) {
+        U64 start = spans[2 * i], stop = spans[2 * i + 1];
+        if (start != self->index) {
+            ok = laz_readpoint_seek(&self->rp, self->index, start)
+                 && reader_stream_ok(self);
+            if (!ok) break;
+            self->index = start;
+        }
+        while (self->index < stop) {
+            if (within) {
+                found = reader_next_within(self, stop, within);
+                if (found < 0) ok = LAZ_FALSE;
+                if (found != 1) break;
+            } else {
+                if (!reader_next(self)) { ok = LAZ_FALSE; break; }
+                self->index++;
+            }
+            if (!laz_voxelgrid_add(&grid, &self->point, self->extra_bytes)) {
+                ok = LAZ_FALSE;
+                break;
+            }
+        }
+    }
+    if (ok) laz_voxelgrid_finish(&grid);
+    LAZ_END_ALLOW_THREADS
+
+    if (ok) {
+        result = Py_BuildValue(
+            "(Iy#)", grid.num_voxels,
+            grid.records ? (const char *)grid.records : "",
+            (Py_ssize_t)grid.num_voxels * grid.record_size);
+    } else if (grid.has_error) {
+        PyErr_SetString(LAZ_ERROR(self), grid.last_error);
+    } else {
+        reader_error(self);
+    }
+    PyMem_Free(spans);
+    laz_voxelgrid_destroy(&grid);
+    return result;
+}
+
+/* ------------------------------------------------------------ summaries */
+
+/* A field's type as lazpy names it -- a numpy kind and width, 'u1' through
+ * 'f8' -- as what laz_stats reads it as. -1 for one it cannot read. */
+static int stat_type(const char *code)
+{
+    static const struct { const char *code; LazStatType type; } types[] = {
+        {"u1", LAZ_STAT_U8}, {"i1", LAZ_STAT_I8}, {"u2", LAZ_STAT_U16},
+        {"i2", LAZ_STAT_I16}, {"u4", LAZ_STAT_U32}, {"i4", LAZ_STAT_I32},
+        {"f8", LAZ_STAT_F64}
+    };
+    size_t i;
+    for (i = 0; i < sizeof(types) / sizeof(types[0]); i++)
+        if (strcmp(code, types[i].code) == 0) return (int)types[i].type;
+    return -1;
+}
+
+/* One field's totals as statistics() hands them back. */
+static PyObject *field_totals(const LazFieldStats *f)
+{
+    PyObject *histogram, *result;
+    if (f->histogram) {
+        histogram = PyBytes_FromStringAndSize(
+            (const char *)f->histogram, (Py_ssize_t)f->bins * sizeof(U64));
+        if (!histogram) return NULL;
+    } else {
+        histogram = Py_None;
+        Py_INCREF(histogram);
+    }
+    result = Py_BuildValue("(KdddddN)", (unsigned long long)f->count,
+                           f->minimum, f->maximum, f->pivot, f->sum,
+                           f->sum_squares, histogram);
+    return result;
+}
+
+/*
+ * Decodes `count` points and sums them up, without keeping any of them.
+ *
+ * `fields` is a sequence of (offset, type, shift, mask, bins): where a field
+ * is in the decoded point, its type as 'u1' through 'f8', the shift and mask
+ * of a field packed into part of a byte (a mask of zero for one that is not),
+ * and how many histogram bins to count its values into, or zero for none.
+ *
+ * Every field's least and greatest value, its count, and its sums from the
+ * first value -- see LazFieldStats -- come back with the stored box of every
+ * point and how many carried each return number: the totals, for Python to
+ * turn into a mean and a spread, and to add together with another part of
+ * the file's. Runs in C with the GIL released, like bounds().
+ */
+static PyObject *Reader_statistics(ReaderObject *self, PyObject *args)
+{
+    unsigned long long count;
+    PyObject *spec, *seq = NULL, *totals = NULL, *bounds = NULL;
+    PyObject *by_return = NULL, *result = NULL;
+    LazPointStats stats;
+    Py_ssize_t n, i;
+    U64 done = 0;
+    BOOL ok = LAZ_TRUE;
+
+    if (!reader_ready(self)) return NULL;
+    if (!PyArg_ParseTuple(args, "KO", &count, &spec)) return NULL;
+    seq = PySequence_Fast(spec, "fields must be a sequence");
+    if (!seq) return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    if (!laz_pointstats_setup(&stats, (U32)n)) {
+        Py_DECREF(seq);
+        return PyErr_NoMemory();
+    }
+    for (i = 0; i < n; i++) {
+        unsigned int offset, shift, mask, bins;
+        const char *code;
+        int type;
+        if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(seq, i),
+                              "IsIII;a field is (offset, type, shift, mask, "
+                              "bins)", &offset, &code, &shift, &mask, &bins))
+            goto done;
+        type = stat_type(code);
+        if (type < 0) {
+            PyErr_Format(PyExc_ValueError, "no statistics of a %s", code);
+            goto done;
+        }
+        /* the width is the code's digit; stat_type has vouched for it */
+        if ((size_t)offset + (size_t)(code[1] - '0') > POINT_FIXED_EXTENT
+            || shift > 7 || (type != LAZ_STAT_U8 && mask)) {
+            PyErr_SetString(PyExc_ValueError,
+                            "field lies outside the decoded point");
+            goto done;
+        }
+        if (!laz_pointstats_field(&stats, (U32)i, offset, (LazStatType)type,
+                                  shift, mask, bins)) {
+            PyErr_SetString(PyExc_ValueError, stats.last_error);
+            goto done;
+        }
+    }
+
+    LAZ_BEGIN_ALLOW_THREADS
+    while (done < count) {
+        if (!reader_next(self)) { ok = LAZ_FALSE; break; }
+        laz_pointstats_add(&stats, &self->point);
+        done++;
+    }
+    LAZ_END_ALLOW_THREADS
+
+    /* as in checksum: what decoded stays decoded */
+    self->index += done;
+    if (!ok) {
+        reader_error(self);
+        goto done;
+    }
+
+    totals = PyList_New(n);
+    if (!totals) goto done;
+    for (i = 0; i < n; i++) {
+        PyObject *t = field_totals(&stats.fields[i]);
+        if (!t) goto done;
+        PyList_SET_ITEM(totals, i, t);
+    }
+    by_return = PyTuple_New(16);
+    if (!by_return) goto done;
+    for (i = 0; i < 16; i++) {
+        PyObject *v = PyLong_FromUnsignedLongLong(stats.by_return[i]);
+        if (!v) goto done;
+        PyTuple_SET_ITEM(by_return, i, v);
+    }
+    if (done) {
+        const I32 *lo = stats.min_xyz, *hi = stats.max_xyz;
+        bounds = Py_BuildValue("(iiiiii)", lo[0], lo[1], lo[2],
+                               hi[0], hi[1], hi[2]);
+        if (!bounds) goto done;
+    } else {
+        bounds = Py_None;
+        Py_INCREF(bounds);
+    }
+    result = Py_BuildValue("(KOOO)", (unsigned long long)done, bounds,
+                           by_return, totals);
+done:
+    Py_XDECREF(bounds);
+    Py_XDECREF(by_return);
+    Py_XDECREF(totals);
+    Py_DECREF(seq);
+    laz_pointstats_destroy(&stats);
+    return result;
+}
+
 static PyObject *Reader_seek(ReaderObject *self, PyObject *args)
 {
     unsigned long long target;
@@ -855,15 +1309,279 @@ static PyObject *Reader_seek(ReaderObject *self, PyObject *args)
     if (!reader_ready(self)) return NULL;
     if (!PyArg_ParseTuple(args, "K", &target)) return NULL;
 
-    Py_BEGIN_ALLOW_THREADS
+    LAZ_BEGIN_ALLOW_THREADS
     ok = laz_readpoint_seek(&self->rp, self->index, (U64)target);
-    Py_END_ALLOW_THREADS
+    LAZ_END_ALLOW_THREADS
 
     if (!ok || !reader_stream_ok(self)) return reader_error(self);
     self->index = (U64)target;
     Py_RETURN_NONE;
 }
 
+/*
+ * Where chunks start, and where the last of them ends, out of a sequence of
+ * them: at least two. PyMem_Malloc'd; NULL with an exception set otherwise.
+ */
+static I64 *parse_chunk_starts(PyObject *obj, Py_ssize_t *count)
+{
+    PyObject *seq;
+    I64 *starts;
+    Py_ssize_t n, i;
+
+    seq = PySequence_Fast(obj, "starts must be a sequence");
+    if (!seq) return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    if (n < 2 || n > (Py_ssize_t)U32_MAX - 1) {
+        Py_DECREF(seq);
+        PyErr_SetString(PyExc_ValueError, "a chunk table is where each chunk "
+                        "starts and where the last one ends");
+        return NULL;
+    }
+    starts = (I64 *)PyMem_Malloc((size_t)n * sizeof(I64));
+    if (!starts) {
+        Py_DECREF(seq);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    for (i = 0; i < n; i++) {
+        long long v = PyLong_AsLongLong(PySequence_Fast_GET_ITEM(seq, i));
+        if (v == -1 && PyErr_Occurred()) {
+            PyMem_Free(starts);
+            Py_DECREF(seq);
+            return NULL;
+        }
+        starts[i] = (I64)v;
+    }
+    Py_DECREF(seq);
+    *count = n;
+    return starts;
+}
+
+/*
+ * The point each of `count` chunks begins with, and then how many points there
+ * are, out of a sequence of as many as there are starts. PyMem_Malloc'd; NULL
+ * with an exception set otherwise.
+ */
+static U64 *parse_chunk_totals(PyObject *obj, Py_ssize_t count)
+{
+    PyObject *seq;
+    U64 *totals;
+    Py_ssize_t i;
+
+    seq = PySequence_Fast(obj, "totals must be a sequence");
+    if (!seq) return NULL;
+    if (PySequence_Fast_GET_SIZE(seq) != count) {
+        Py_DECREF(seq);
+        PyErr_SetString(PyExc_ValueError, "a chunk table has as many totals "
+                        "as it has starts");
+        return NULL;
+    }
+    totals = (U64 *)PyMem_Malloc((size_t)count * sizeof(U64));
+    if (!totals) {
+        Py_DECREF(seq);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    for (i = 0; i < count; i++) {
+        unsigned long long v = PyLong_AsUnsignedLongLong(
+            PySequence_Fast_GET_ITEM(seq, i));
+        if (v == (unsigned long long)-1 && PyErr_Occurred()) {
+            PyMem_Free(totals);
+            Py_DECREF(seq);
+            return NULL;
+        }
+        totals[i] = (U64)v;
+    }
+    Py_DECREF(seq);
+    return totals;
+}
+
+/*
+ * Chunk starts, and the end of the last chunk, to use in place of the file's
+ * own table: one a reader that had to rebuild it saved, or one a reader read
+ * and handed on, which for adaptive chunks brings the points before each as
+ * well. Taken before anything is read, which is when the table would have
+ * been.
+ */
+static PyObject *Reader_use_chunk_table(ReaderObject *self, PyObject *args)
+{
+    PyObject *obj, *totals_obj = Py_None;
+    I64 *starts;
+    U64 *totals = NULL;
+    Py_ssize_t n;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "O|O", &obj, &totals_obj)) return NULL;
+    if (!reader_ready(self)) return NULL;
+    starts = parse_chunk_starts(obj, &n);
+    if (!starts) return NULL;
+    if (totals_obj != Py_None) {
+        totals = parse_chunk_totals(totals_obj, n);
+        if (!totals) {
+            PyMem_Free(starts);
+            return NULL;
+        }
+    }
+
+    ok = laz_readpoint_use_chunk_table(&self->rp, starts, totals,
+                                       (U32)(n - 1));
+    PyMem_Free(starts);
+    PyMem_Free(totals);
+    if (!ok || !reader_stream_ok(self)) return reader_error(self);
+    Py_RETURN_NONE;
+}
+
+/*
+ * Chunks read ahead by a thread of the stream's own, through `fp`: a second
+ * handle on the file, which nothing else may use while it does. None stops
+ * it. See laz_stream_read_ahead.
+ */
+static PyObject *Reader_read_ahead(ReaderObject *self, PyObject *args)
+{
+    PyObject *fp, *obj;
+    unsigned int depth;
+    I64 *starts;
+    Py_ssize_t n;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "OOI", &fp, &obj, &depth)) return NULL;
+    if (!reader_ready(self)) return NULL;
+    if (fp == Py_None) {
+        laz_stream_read_ahead(self->stream, NULL, NULL, 0, 0);
+        Py_RETURN_NONE;
+    }
+    starts = parse_chunk_starts(obj, &n);
+    if (!starts) return NULL;
+
+    ok = laz_stream_read_ahead(self->stream, fp, starts, (U32)(n - 1), depth);
+    PyMem_Free(starts);
+    if (!ok) {
+        PyErr_SetString(LAZ_ERROR(self), "could not start reading ahead");
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+/* The chunks a query will read, for reading ahead to keep to: a byte per
+ * chunk, or None for all of them. */
+static PyObject *Reader_plan_ahead(ReaderObject *self, PyObject *args)
+{
+    PyObject *obj;
+    Py_buffer wanted;
+    BOOL ok;
+
+    if (!PyArg_ParseTuple(args, "O", &obj)) return NULL;
+    if (!reader_ready(self)) return NULL;
+    if (obj == Py_None) {
+        laz_stream_plan_ahead(self->stream, NULL);
+        Py_RETURN_NONE;
+    }
+    if (PyObject_GetBuffer(obj, &wanted, PyBUF_SIMPLE) < 0) return NULL;
+    if (wanted.len != (Py_ssize_t)laz_stream_ahead_chunks(self->stream)) {
+        PyBuffer_Release(&wanted);
+        PyErr_SetString(PyExc_ValueError, "a plan is a byte for every chunk "
+                        "read ahead");
+        return NULL;
+    }
+    ok = laz_stream_plan_ahead(self->stream, (const U8 *)wanted.buf);
+    PyBuffer_Release(&wanted);
+    if (!ok) return PyErr_NoMemory();
+    Py_RETURN_NONE;
+}
+
+/*
+ * Ranges of the file a query read up front, for refills inside them to copy
+ * from: a sequence of (offset, bytes-like) pairs, in file order. An empty one
+ * lets go of any held. See laz_stream_hold.
+ */
+static PyObject *Reader_hold_ranges(ReaderObject *self, PyObject *args)
+{
+    PyObject *obj, *seq;
+    I64 *starts = NULL;
+    PyObject **objects = NULL;
+    Py_ssize_t n, i;
+    I64 end = 0;
+    BOOL ok = LAZ_FALSE;
+
+    if (!PyArg_ParseTuple(args, "O", &obj)) return NULL;
+    if (!reader_ready(self)) return NULL;
+    seq = PySequence_Fast(obj, "ranges must be a sequence");
+    if (!seq) return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    if (n > (Py_ssize_t)0xFFFFFFFFu) {
+        PyErr_SetString(PyExc_ValueError, "too many ranges");
+        goto done;
+    }
+    starts = (I64 *)PyMem_Malloc((size_t)(n ? n : 1) * sizeof(I64));
+    objects = (PyObject **)PyMem_Malloc((size_t)(n ? n : 1) *
+                                        sizeof(PyObject *));
+    if (!starts || !objects) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    for (i = 0; i < n; i++) {
+        long long start;
+        Py_ssize_t size;
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, i), *data;
+        if (!PyTuple_Check(item)) {
+            PyErr_SetString(PyExc_TypeError, "a range is an offset and the "
+                            "bytes there");
+            goto done;
+        }
+        if (!PyArg_ParseTuple(item, "LO;a range is an offset and the bytes "
+                              "there", &start, &data))
+            goto done;
+        size = PyObject_Length(data);
+        if (size < 0) goto done;
+        if (start < end) {
+            PyErr_SetString(PyExc_ValueError, "ranges must be in file order "
+                            "and not overlap");
+            goto done;
+        }
+        end = (I64)start + (I64)size;
+        starts[i] = (I64)start;
+        objects[i] = data;
+    }
+    ok = laz_stream_hold(self->stream, (U32)n, starts,
+                         (void *const *)objects);
+done:
+    PyMem_Free(starts);
+    PyMem_Free(objects);
+    Py_DECREF(seq);
+    if (!ok) return NULL;
+    Py_RETURN_NONE;
+}
+
+/*
+ * Checkpoints for a POINTWISE file, which has no chunks to seek by. Taken as
+ * reading passes the points they are of, which is why this only switches
+ * them on.
+ */
+static PyObject *Reader_keep_checkpoints(ReaderObject *self, PyObject *args)
+{
+    unsigned long long every;
+
+    if (!PyArg_ParseTuple(args, "K", &every)) return NULL;
+    if (!reader_ready(self)) return NULL;
+    if (every > U32_MAX) {
+        PyErr_SetString(PyExc_ValueError, "checkpoints are at most "
+                        "4294967295 points apart");
+        return NULL;
+    }
+    if (!laz_readpoint_keep_checkpoints(&self->rp, (U32)every))
+        return reader_error(self);
+    Py_RETURN_NONE;
+}
+
+static PyObject *Reader_cancel(ReaderObject *self, PyObject *args)
+{
+    int cancel = 1;
+
+    if (!PyArg_ParseTuple(args, "|p", &cancel)) return NULL;
+    self->cancel = cancel;
+    Py_RETURN_NONE;
+}
+
 static PyObject *Reader_get_point(ReaderObject *self, void *c)
 {
     (void)c;
@@ -891,6 +1609,46 @@ static PyObject *Reader_get_chunk_starts(ReaderObject *self, void *c)
     return list;
 }
 
+/*
+ * chunk_starts by point rather than by byte: which point each chunk begins
+ * with. A fixed chunk size says so by itself; adaptive chunks are what the
+ * table's counts add up to, and the table has to be there to say.
+ */
+static PyObject *Reader_get_chunk_points(ReaderObject *self, void *c)
+{
+    const LazReadPoint *rp = &self->rp;
+    PyObject *list;
+    U32 i;
+    (void)c;
+    if (!rp->chunk_starts) Py_RETURN_NONE;
+    list = PyList_New(rp->tabled_chunks);
+    if (!list) return NULL;
+    for (i = 0; i < rp->tabled_chunks; i++) {
+        U64 first = rp->chunk_totals ? rp->chunk_totals[i]
+                                     : (U64)i * rp->chunk_size;
+        PyObject *v = PyLong_FromUnsignedLongLong(first);
+        if (!v) { Py_DECREF(list); return NULL; }
+        PyList_SET_ITEM(list, i, v);
+    }
+    return list;
+}
+
+static PyObject *Reader_get_checkpoints(ReaderObject *self, void *c)
+{
+    const LazReadPoint *rp = &self->rp;
+    PyObject *list;
+    U32 i;
+    (void)c;
+    list = PyList_New(rp->num_checkpoints);
+    if (!list) return NULL;
+    for (i = 0; i < rp->num_checkpoints; i++) {
+        PyObject *v = PyLong_FromUnsignedLongLong(rp->checkpoints[i].index);
+        if (!v) { Py_DECREF(list); return NULL; }
+        PyList_SET_ITEM(list, i, v);
+    }
+    return list;
+}
+
 static PyObject *Reader_get_num_extra_bytes(ReaderObject *self, void *c)
 { (void)c; return PyLong_FromUnsignedLong(self->num_extra_bytes); }
 
@@ -901,18 +1659,44 @@ static PyObject *Reader_get_warning(ReaderObject *self, void *c)
     return PyUnicode_FromString(self->rp.last_warning);
 }
 
+/* Every method and getter under the object's lock; see ObjectLock. */
+LOCKED(Reader_read)
+LOCKED(Reader_read_into)
+LOCKED(Reader_read_within)
+LOCKED(Reader_read_into_within)
+LOCKED(Reader_read_heads)
+LOCKED(Reader_use_chunk_table)
+LOCKED(Reader_keep_checkpoints)
+LOCKED(Reader_read_ahead)
+LOCKED(Reader_plan_ahead)
+LOCKED(Reader_hold_ranges)
+LOCKED(Reader_seek)
+LOCKED(Reader_bounds)
+LOCKED(Reader_build_index)
+LOCKED(Reader_voxel_downsample)
+LOCKED(Reader_statistics)
+LOCKED(Reader_checksum)
+LOCKED(Reader_get_point)
+LOCKED(Reader_get_index)
+LOCKED(Reader_get_chunk_starts)
+LOCKED(Reader_get_chunk_points)
+LOCKED(Reader_get_checkpoints)
+LOCKED(Reader_get_num_extra_bytes)
+LOCKED(Reader_get_warning)
+LOCKED_INIT(Reader_tp_init)
+
 static PyMethodDef Reader_methods[] = {
-    {"read", (PyCFunction)Reader_read, METH_NOARGS,
+    {"read", (PyCFunction)Reader_read_locked, METH_NOARGS,
      "read() -> Point\n\n"
      "Decode the next point. The result is the reader's shared Point, "
      "overwritten by the next read(); call copy() to keep it."},
-    {"read_into", (PyCFunction)Reader_read_into, METH_VARARGS,
+    {"read_into", (PyCFunction)Reader_read_into_locked, METH_VARARGS,
      "read_into(targets, count) -> None\n\n"
      "Decode count points straight into buffers, one field per target.\n"
      "A target is (buffer, offset, size): where in a decoded point the "
      "field sits and how wide it is. This is what Reader.arrays() is "
      "built on, and it holds no Python object per point."},
-    {"read_within", (PyCFunction)Reader_read_within, METH_VARARGS,
+    {"read_within", (PyCFunction)Reader_read_within_locked, METH_VARARGS,
      "read_within(stop, region) -> Point | None\n\n"
      "Decode forward to the next point inside the region, or to index "
      "stop, whichever comes first; None means stop was reached with "
@@ -921,31 +1705,100 @@ static PyMethodDef Reader_methods[] = {
      "that turn a stored coordinate into the georeferenced one the area "
      "is in, then a centre and a radius -- so testing a point costs no "
      "Python call. A radius above zero selects the circle inside that "
-     "rectangle rather than the rectangle."},
-    {"read_into_within", (PyCFunction)Reader_read_into_within, METH_VARARGS,
+     "rectangle rather than the rectangle. Four more -- min_z, max_z and "
+     "the z scale and offset -- make the rectangle a box."},
+    {"read_into_within", (PyCFunction)Reader_read_into_within_locked, METH_VARARGS,
      "read_into_within(targets, stop, region) -> int\n\n"
      "read_into and read_within at once: decode to index stop, writing "
      "only the points inside the region, and return how many that was. "
      "How many there will be is what the query is for, so the caller "
      "sizes the targets for the whole span and trims to the result."},
-    {"seek", (PyCFunction)Reader_seek, METH_VARARGS,
+    {"read_heads", (PyCFunction)Reader_read_heads_locked, METH_VARARGS,
+     "read_heads(targets, first, count) -> None\n\n"
+     "read_into for the first point of each of count chunks from chunk "
+     "first on, one row a chunk. Each is the raw point its chunk starts "
+     "with, so nothing is decoded; the reader is left at the last of them."},
+    {"use_chunk_table", (PyCFunction)Reader_use_chunk_table_locked, METH_VARARGS,
+     "use_chunk_table(starts, totals=None) -> None\n\n"
+     "Where each chunk starts, and then where the last one ends, to use in "
+     "place of the file's own table -- one an earlier reader rebuilt, or "
+     "one handed on from a reader that read it. Adaptive chunks also take "
+     "totals, chunk_points as a reader has it: the point each chunk begins "
+     "with, and then how many points there are. Only before any point is "
+     "read."},
+    {"keep_checkpoints", (PyCFunction)Reader_keep_checkpoints_locked, METH_VARARGS,
+     "keep_checkpoints(every) -> None\n\n"
+     "Keep where the decoder of a pointwise-compressed file stands every "
+     "`every` points that reading passes, so that seek() starts from the "
+     "nearest of them rather than the first point. 0 takes no more. Each "
+     "costs a copy of every model the decoder has."},
+    {"cancel", (PyCFunction)Reader_cancel, METH_VARARGS,
+     "cancel(cancel=True) -> None\n\n"
+     "Have decoding stop where the next point would open a chunk, raising "
+     "LazError, until cancel(False). Safe from any thread, while another "
+     "is decoding with the GIL released: that is what it is for."},
+    {"read_ahead", (PyCFunction)Reader_read_ahead_locked, METH_VARARGS,
+     "read_ahead(fp, starts, depth) -> None\n\n"
+     "Read up to `depth` chunks past the one being decoded on a thread of "
+     "their own, through fp, a second handle on the file. starts is where "
+     "each chunk begins and the last ends. fp None stops it."},
+    {"plan_ahead", (PyCFunction)Reader_plan_ahead_locked, METH_VARARGS,
+     "plan_ahead(wanted) -> None\n\n"
+     "Read ahead only the chunks flagged in wanted, a byte per chunk, until "
+     "reading goes into another; with none flagged, nothing until the next "
+     "plan. None reads ahead every chunk again."},
+    {"hold_ranges", (PyCFunction)Reader_hold_ranges_locked, METH_VARARGS,
+     "hold_ranges(ranges) -> None\n\n"
+     "Take refills from ranges of the file read up front: a sequence of "
+     "(offset, bytes) pairs in file order, each let go once reading goes "
+     "past it. An empty sequence lets go of any held."},
+    {"seek", (PyCFunction)Reader_seek_locked, METH_VARARGS,
      "seek(index) -> None\n\n"
      "Make index the next point to be read. Costs a chunk decode where "
      "there is a chunk table to jump by, and a decode from the last "
      "known boundary where there is not."},
-    {"bounds", (PyCFunction)Reader_bounds, METH_VARARGS,
-     "bounds(count) -> (min_X, min_Y, max_X, max_Y)\n\n"
+    {"bounds", (PyCFunction)Reader_bounds_locked, METH_VARARGS,
+     "bounds(count, dims=2) -> (min_X, min_Y, max_X, max_Y)\n\n"
      "Decode count points and report the box they cover, in the integers "
-     "they are stored as. Runs in C with the GIL released."},
-    {"build_index", (PyCFunction)Reader_build_index, METH_VARARGS,
+     "they are stored as. dims=3 reports Z as well, as (min_X, min_Y, "
+     "min_Z, max_X, max_Y, max_Z). Runs in C with the GIL released."},
+    {"build_index", (PyCFunction)Reader_build_index_locked, METH_VARARGS,
      "build_index(count, bounds, scales, offsets, cell_size, "
-     "minimum_points, maximum_intervals, threshold) -> bytes\n\n"
+     "minimum_points, maximum_intervals, threshold) -> bytes | tuple\n\n"
      "Decode count points and build a LASzip spatial index over them, "
      "returning the bytes of one. `bounds` is (min_x, min_y, max_x, max_y) "
      "in the georeferenced coordinates `scales` and `offsets` produce, and "
-     "is what the quadtree is laid over. Runs in C with the GIL released, "
-     "one pass over the points."},
-    {"checksum", (PyCFunction)Reader_checksum, METH_VARARGS,
+     "is what the quadtree is laid over, or None to lay it over whatever "
+     "the points turn out to cover. Three scales and offsets, and six "
+     "bounds (min_x, min_y, min_z, max_x, max_y, max_z), build an octree "
+     "instead. A tuple back instead of bytes is the extent the points "
+     "really cover, when the tree has to be laid over it and the points "
+     "decoded again. Runs in C with the GIL released, one pass over the "
+     "points."},
+    {"voxel_downsample", (PyCFunction)Reader_voxel_downsample_locked, METH_VARARGS,
+     "voxel_downsample(spans, region, size, scales, offsets, keep) -> "
+     "(count, bytes)\n\n"
+     "Decode the points of spans, a list of (start, stop), and keep one "
+     "per voxel of size (dx, dy, dz) -- a dz of 0 for columns -- on a grid "
+     "anchored at the georeferenced origin. keep is 'first', 'centroid', "
+     "'lowest' or 'highest'. region is None or what read_within takes, "
+     "and keeps out the points outside it. Returns the number of voxels "
+     "and the point each kept, as decoded point images followed by their "
+     "extra bytes, in the order a point first landed in each. Runs in C "
+     "with the GIL released."},
+    {"statistics", (PyCFunction)Reader_statistics_locked, METH_VARARGS,
+     "statistics(count, fields) -> (points, bounds, by_return, totals)\n\n"
+     "Decode count points and total them up, keeping none. fields is a "
+     "sequence of (offset, type, shift, mask, bins): where a field is in "
+     "the decoded point, 'u1' through 'f8', how a field packed into part "
+     "of a byte comes out of it (mask 0 for none), and how many histogram "
+     "bins to count it into, 0 for none. Back come how many points were "
+     "read, the box their stored X, Y and Z cover (None for no points), "
+     "how many carried each return number 0-15, and per field (count, "
+     "min, max, pivot, sum, sum_squares, histogram): the sums are of each "
+     "value less the pivot, the first value, and the histogram is bytes of "
+     "uint64 counts or None. Runs in C with the GIL released."},
+    {"checksum", (PyCFunction)Reader_checksum_locked, METH_VARARGS,
      "checksum(count=-1) -> (fnv1a_hash, points_read)\n\n"
      "Decode count points, hashing every field of each, and advance past "
      "them. Runs entirely in C with the GIL released, so verifying a "
@@ -954,23 +1807,29 @@ static PyMethodDef Reader_methods[] = {
 };
 
 static PyGetSetDef Reader_getset[] = {
-    {"point", (getter)Reader_get_point, NULL,
+    {"point", (getter)Reader_get_point_locked, NULL,
      "the Point read() returns: one buffer for the life of the reader, "
      "holding the last point decoded",
      NULL},
-    {"index", (getter)Reader_get_index, NULL,
+    {"index", (getter)Reader_get_index_locked, NULL,
      "which point read() will decode next, counting from 0", NULL},
-    {"chunk_starts", (getter)Reader_get_chunk_starts, NULL,
+    {"chunk_starts", (getter)Reader_get_chunk_starts_locked, NULL,
      "where each chunk begins, as offsets into the file, or None on a file "
      "with no chunk table. Read from the table at the first point rather "
      "than when the reader is built, so it is None until then; where the "
      "table was missing or corrupt (see warning) it holds only the "
      "boundaries reading has reached so far and grows as it reaches more",
      NULL},
-    {"num_extra_bytes", (getter)Reader_get_num_extra_bytes, NULL,
+    {"chunk_points", (getter)Reader_get_chunk_points_locked, NULL,
+     "the index of the point each chunk in chunk_starts begins with, and "
+     "None when that is", NULL},
+    {"checkpoints", (getter)Reader_get_checkpoints_locked, NULL,
+     "the index of the point each checkpoint kept (see keep_checkpoints) "
+     "is of, in order", NULL},
+    {"num_extra_bytes", (getter)Reader_get_num_extra_bytes_locked, NULL,
      "how many extra bytes a decoded point carries -- the item layout's, less "
      "any the LAS 1.4 compatibility attributes take up", NULL},
-    {"warning", (getter)Reader_get_warning, NULL,
+    {"warning", (getter)Reader_get_warning_locked, NULL,
      "a non-fatal problem met while reading, or None. A missing or corrupt "
      "chunk table is the usual one: points still decode, but seeking has to "
      "decode forward to reach them",
@@ -1000,15 +1859,19 @@ PyDoc_STRVAR(reader_doc,
 "`compatibility` describes a LAS 1.4 file disguised as a legacy one, and is\n"
 "None for every ordinary file.\n");
 
-PyTypeObject Reader_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.PointReader",
-    .tp_basicsize = sizeof(ReaderObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_doc = reader_doc,
-    .tp_new = PyType_GenericNew,
-    .tp_init = (initproc)Reader_tp_init,
-    .tp_dealloc = (destructor)Reader_dealloc,
-    .tp_methods = Reader_methods,
-    .tp_getset = Reader_getset,
+static PyType_Slot Reader_slots[] = {
+    {Py_tp_doc, (void *)reader_doc},
+    {Py_tp_new, (void *)locked_new},
+    {Py_tp_init, (void *)Reader_tp_init_locked},
+    {Py_tp_dealloc, (void *)Reader_dealloc},
+    {Py_tp_methods, (void *)Reader_methods},
+    {Py_tp_getset, (void *)Reader_getset},
+    {0, NULL}
+};
+
+PyType_Spec Reader_spec = {
+    .name = "lazpy._cpylaz.PointReader",
+    .basicsize = sizeof(ReaderObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = Reader_slots,
 };
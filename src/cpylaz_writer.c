@@ -27,6 +27,7 @@
 
 typedef struct {
     PyObject_HEAD
+    ObjectLock lock;        /* first; see ObjectLock in cpylaz.h */
     LazWritePoint wp;
     LazOutStream *stream;
     PyObject *fp;
@@ -47,7 +48,17 @@ typedef struct {
      * bytes, with -1 for COMPAT_NIR when there is no NIR band */
     BOOL compat;
     I32 compat_starts[COMPAT_ATTRIBUTES];
-    const I16 *scan_angle_of_rank;      /* what a rank stands for, tabulated */
+    I16 scan_angle_of_rank[256];        /* what a rank stands for, tabulated */
+    /* the spatial index being built as the points go by, or NULL; the
+     * scales and offsets are what made a point's coordinate of its X, Y
+     * and Z when it was added */
+    LazIndexBuilder *index_builder;
+    F64 index_scales[3], index_offsets[3];
+    /* what each chunk holds, noted as the points go by, or NULL; a plain
+     * LAS file has no chunks, and is summarised in blocks of
+     * `summary_block` points instead */
+    LazChunkSummaries *summaries;
+    U32 summary_block;
 } WriterObject;
 
 /*
@@ -122,15 +133,34 @@ static void writer_recode_compat(WriterObject *self)
         laz_le_put16(extra + at[COMPAT_NIR], p->rgb[3]);
 }
 
+static void writer_drop_index(WriterObject *self)
+{
+    if (!self->index_builder) return;
+    laz_indexbuilder_destroy(self->index_builder);
+    PyMem_Free(self->index_builder);
+    self->index_builder = NULL;
+}
+
+static void writer_drop_summaries(WriterObject *self)
+{
+    if (!self->summaries) return;
+    laz_chunksummaries_destroy(self->summaries);
+    PyMem_Free(self->summaries);
+    self->summaries = NULL;
+}
+
 static void Writer_dealloc(WriterObject *self)
 {
+    writer_drop_index(self);
+    writer_drop_summaries(self);
     laz_readpoint_destroy(&self->scatter);
     laz_writepoint_destroy(&self->wp);
     if (self->record) laz_stream_destroy(self->record);
     if (self->stream) laz_outstream_destroy(self->stream);
     Py_XDECREF(self->fp);
     free(self->extra_bytes);
-    PyObject_Del(self);
+    locked_free((PyObject *)self);
+    cpylaz_free((PyObject *)self);
 }
 
 static int Writer_tp_init(WriterObject *self, PyObject *args, PyObject *kwds)
@@ -160,16 +190,16 @@ static int Writer_tp_init(WriterObject *self, PyObject *args, PyObject *kwds)
               !laz_readpoint_setup(&self->scatter, num_items, items, 0, 0, 0));
     PyMem_Free(items);
     if (failed) {
-        PyErr_SetString(LazErrorType, self->wp.has_error ? self->wp.last_error
+        PyErr_SetString(LAZ_ERROR(self), self->wp.has_error ? self->wp.last_error
                                                          : self->scatter.last_error);
         return -1;
     }
 
-    compat = parse_compat_starts(compatibility, self->wp.num_extra_bytes,
-                                 self->compat_starts);
+    compat = parse_compat_starts((PyObject *)self, compatibility,
+                                 self->wp.num_extra_bytes, self->compat_starts);
     if (compat < 0) return -1;
     self->compat = (BOOL)compat;
-    if (self->compat) self->scan_angle_of_rank = compat_scan_angle_of_rank();
+    if (self->compat) compat_scan_angle_of_rank(self->scan_angle_of_rank);
 
     self->record_size = (Py_ssize_t)self->wp.point_size;
     if (self->wp.num_extra_bytes) {
@@ -191,14 +221,14 @@ static int Writer_tp_init(WriterObject *self, PyObject *args, PyObject *kwds)
         laz_outstream_file_set_position(self->stream, (I64)start_offset);
 
     if (!laz_writepoint_init(&self->wp, self->stream)) {
-        PyErr_SetString(LazErrorType, "could not initialise the point writer");
+        PyErr_SetString(LAZ_ERROR(self), "could not initialise the point writer");
         return -1;
     }
     if (self->stream->failed) {
         /* the chunk-table placeholder could not be written; whatever the file
          * object raised is the better message */
         if (!PyErr_Occurred())
-            PyErr_SetString(LazErrorType, "error writing to the underlying file");
+            PyErr_SetString(LAZ_ERROR(self), "error writing to the underlying file");
         return -1;
     }
 
@@ -226,10 +256,10 @@ static PyObject *writer_error(WriterObject *self)
 {
     if (PyErr_Occurred()) return NULL;            /* propagate the original */
     if (self->stream && self->stream->failed) {
-        PyErr_SetString(LazErrorType, "error writing to the underlying file");
+        PyErr_SetString(LAZ_ERROR(self), "error writing to the underlying file");
         return NULL;
     }
-    PyErr_SetString(LazErrorType,
+    PyErr_SetString(LAZ_ERROR(self),
                     self->wp.has_error ? self->wp.last_error : "write failed");
     return NULL;
 }
@@ -250,7 +280,7 @@ static int writer_take_record(WriterObject *self, PyObject *arg)
     laz_stream_array_reset(self->record, (const U8 *)data, len);
     if (!laz_readpoint_read(&self->scatter, &self->point, self->extra_bytes)) {
         if (!PyErr_Occurred())
-            PyErr_SetString(LazErrorType, self->scatter.last_error);
+            PyErr_SetString(LAZ_ERROR(self), self->scatter.last_error);
         return -1;
     }
     return 0;
@@ -317,6 +347,39 @@ static void writer_tally(WriterObject *self)
                     ? laz_point_extended_return_number(&self->point)
                     : laz_point_return_number(&self->point);
     self->by_return[return_number & 0xF]++;
+
+    /* A builder that failed stops taking points rather than failing the
+     * write: the points are the file, and the index only a way into it. What
+     * went wrong stays in the builder for finish_index to raise. */
+    if (self->index_builder && !self->index_builder->has_error)
+        laz_indexbuilder_add(self->index_builder,
+                             xyz[0] * self->index_scales[0]
+                             + self->index_offsets[0],
+                             xyz[1] * self->index_scales[1]
+                             + self->index_offsets[1],
+                             xyz[2] * self->index_scales[2]
+                             + self->index_offsets[2],
+                             self->index);
+
+    /* The chunk the point is about to go into: the open one, unless it is
+     * full and the write closes it first. A summary that failed stops
+     * taking points, as the builder does, and says so when asked for. */
+    if (self->summaries && !self->summaries->has_error) {
+        const LazPoint *p = &self->point;
+        U32 chunk = self->summary_block
+                    ? (U32)(self->index / self->summary_block)
+                    : self->wp.number_chunks
+                      + (self->wp.chunk_count == self->wp.chunk_size);
+        /* the classification the file will hold: the raw POINT14 writer
+         * falls back on the extended one only where the legacy one is
+         * zero, and the compatibility recoding takes the extended one */
+        U8 classification = laz_point_classification(p);
+        if (self->compat)
+            classification = p->extended_classification;
+        else if (laz_point_extended_point_type(p) && classification == 0)
+            classification = p->extended_classification;
+        laz_chunksummaries_add(self->summaries, chunk, p, classification);
+    }
 }
 
 static PyObject *Writer_write(WriterObject *self, PyObject *arg)
@@ -325,7 +388,8 @@ static PyObject *Writer_write(WriterObject *self, PyObject *arg)
 
     if (!writer_ready(self)) return NULL;
 
-    if (PyObject_TypeCheck(arg, &Point_Type)) {
+    if (PyObject_TypeCheck(arg,
+                           cpylaz_state((PyObject *)self)->Point_Type)) {
         taken = writer_take_point(self, (PointObject *)arg);
     } else if (self->compat) {
         PyErr_SetString(PyExc_ValueError,
@@ -429,6 +493,170 @@ static PyObject *Writer_done(WriterObject *self, PyObject *Py_UNUSED(i))
     Py_RETURN_NONE;
 }
 
+/* ---------------------------------------------------- indexing as it goes - */
+
+/*
+ * Starts a spatial index of the points about to be written.
+ *
+ * The reader's build_index decodes a file to find each point's coordinate,
+ * and the writer has every one of them in hand already: tallying the bounds
+ * is the same look at the same point. So the points go into a builder here,
+ * bucketed into the provisional grid laz_indexbuilder_setup_grid describes,
+ * since where they will end up is no better known to a writer than to a
+ * one-pass reader.
+ *
+ * Before the first point only, because an index that missed one would send
+ * every query that should find it somewhere else.
+ */
+static PyObject *Writer_start_index(WriterObject *self, PyObject *args)
+{
+    PyObject *scales, *offsets;
+    double cell_size;
+    unsigned int threshold;
+    U32 dims, i;
+    LazIndexBuilder *builder;
+
+    if (!PyArg_ParseTuple(args, "O!O!dI", &PyTuple_Type, &scales,
+                          &PyTuple_Type, &offsets, &cell_size, &threshold))
+        return NULL;
+    if (!writer_ready(self)) return NULL;
+    if (self->index > 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "an index has to start before the first point");
+        return NULL;
+    }
+    dims = (U32)PyTuple_GET_SIZE(scales);
+    if ((dims != 2 && dims != 3) || PyTuple_GET_SIZE(offsets) != dims) {
+        PyErr_SetString(PyExc_ValueError,
+                        "an index takes two scales and offsets, or three");
+        return NULL;
+    }
+    for (i = 0; i < dims; i++) {
+        self->index_scales[i] = PyFloat_AsDouble(PyTuple_GET_ITEM(scales, i));
+        self->index_offsets[i] =
+            PyFloat_AsDouble(PyTuple_GET_ITEM(offsets, i));
+    }
+    if (PyErr_Occurred()) return NULL;
+    /* a quadtree has no use for z, and ignores what it is given */
+    if (dims == 2) self->index_scales[2] = self->index_offsets[2] = 0.0;
+
+    builder = (LazIndexBuilder *)PyMem_Malloc(sizeof(*builder));
+    if (!builder) return PyErr_NoMemory();
+    if (!laz_indexbuilder_setup_grid(builder, dims, (F32)cell_size,
+                                     threshold)) {
+        PyErr_SetString(LAZ_ERROR(self), builder->last_error);
+        laz_indexbuilder_destroy(builder);
+        PyMem_Free(builder);
+        return NULL;
+    }
+    writer_drop_index(self);
+    self->index_builder = builder;
+    Py_RETURN_NONE;
+}
+
+/*
+ * The index of every point written, as the bytes of a ".lax" -- or None
+ * when the tree's edges missed the grid the points were bucketed into, and
+ * the file has to be read back to build it, as the reader's build_index
+ * does a second pass for the same reason. Either way the builder is spent.
+ */
+static PyObject *Writer_finish_index(WriterObject *self, PyObject *args)
+{
+    unsigned int minimum_points;
+    int maximum_intervals;
+    LazIndexBuilder *b = self->index_builder;
+    LazOutStream *out;
+    PyObject *result = NULL;
+    const U8 *data;
+    I64 size = 0;
+    BOOL ok, aligned = LAZ_TRUE;
+
+    if (!PyArg_ParseTuple(args, "Ii", &minimum_points, &maximum_intervals))
+        return NULL;
+    if (!b) {
+        PyErr_SetString(PyExc_ValueError, "no index was started");
+        return NULL;
+    }
+    out = laz_outstream_new_array();
+    if (!out) return PyErr_NoMemory();
+
+    ok = !b->has_error;
+    LAZ_BEGIN_ALLOW_THREADS
+    if (ok) ok = laz_indexbuilder_reroot(b, &aligned);
+    if (ok && aligned) ok = laz_indexbuilder_complete(b, minimum_points,
+                                                      maximum_intervals);
+    if (ok && aligned) ok = laz_indexbuilder_serialize(b, out);
+    LAZ_END_ALLOW_THREADS
+
+    if (!ok) {
+        PyErr_SetString(LAZ_ERROR(self), b->has_error ? b->last_error
+                                                   : "out of memory");
+    } else if (!aligned) {
+        result = Py_None;
+        Py_INCREF(result);
+    } else {
+        data = laz_outstream_array_data(out, &size);
+        result = PyBytes_FromStringAndSize((const char *)data,
+                                           (Py_ssize_t)size);
+    }
+    laz_outstream_destroy(out);
+    writer_drop_index(self);
+    return result;
+}
+
+/* ------------------------------------------------- summarising chunks - */
+
+/*
+ * Starts noting what each chunk holds, for the extended record a reader
+ * prunes its queries by. `block` is how many points a plain LAS file's
+ * summaries cover each, and 0 for a compressed file, whose chunks are its
+ * own. Before the first point only, as for an index: a chunk summarised
+ * from part of its points would skip queries the rest of them answer.
+ */
+static PyObject *Writer_start_summaries(WriterObject *self, PyObject *args)
+{
+    unsigned int block;
+    LazChunkSummaries *summaries;
+
+    if (!PyArg_ParseTuple(args, "I", &block)) return NULL;
+    if (!writer_ready(self)) return NULL;
+    if (self->index > 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "chunk summaries have to start before the first "
+                        "point");
+        return NULL;
+    }
+    summaries = (LazChunkSummaries *)PyMem_Malloc(sizeof(*summaries));
+    if (!summaries) return PyErr_NoMemory();
+    laz_chunksummaries_init(summaries);
+    writer_drop_summaries(self);
+    self->summaries = summaries;
+    self->summary_block = block;
+    Py_RETURN_NONE;
+}
+
+/* The summaries of every chunk written, as an extended record's payload. */
+static PyObject *Writer_summaries(WriterObject *self, PyObject *Py_UNUSED(i))
+{
+    LazChunkSummaries *s = self->summaries;
+    PyObject *result;
+
+    if (!s) {
+        PyErr_SetString(PyExc_ValueError, "no chunk summaries were started");
+        return NULL;
+    }
+    if (s->has_error) {
+        PyErr_SetString(LAZ_ERROR(self), s->last_error);
+        return NULL;
+    }
+    result = PyBytes_FromStringAndSize(
+        NULL, LAZ_CHUNK_SUMMARY_HEADER
+              + (Py_ssize_t)s->num_chunks * LAZ_CHUNK_SUMMARY_SIZE);
+    if (!result) return NULL;
+    laz_chunksummaries_pack(s, (U8 *)PyBytes_AS_STRING(result));
+    return result;
+}
+
 static PyObject *Writer_get_index(WriterObject *self, void *c)
 { (void)c; return PyLong_FromUnsignedLongLong(self->index); }
 
@@ -460,35 +688,70 @@ static PyObject *Writer_get_points_by_return(WriterObject *self, void *c)
     return t;
 }
 
+/* Every method and getter under the object's lock; see ObjectLock. */
+LOCKED(Writer_write)
+LOCKED(Writer_write_from)
+LOCKED(Writer_chunk)
+LOCKED(Writer_done)
+LOCKED(Writer_start_index)
+LOCKED(Writer_finish_index)
+LOCKED(Writer_start_summaries)
+LOCKED(Writer_summaries)
+LOCKED(Writer_get_index)
+LOCKED(Writer_get_number_chunks)
+LOCKED(Writer_get_bounds)
+LOCKED(Writer_get_points_by_return)
+LOCKED_INIT(Writer_tp_init)
+
 static PyMethodDef Writer_methods[] = {
-    {"write", (PyCFunction)Writer_write, METH_O,
+    {"write", (PyCFunction)Writer_write_locked, METH_O,
      "write(point) -> None\n\n"
      "Append one point: a Point, or the bytes of one on-disk record."},
-    {"write_from", (PyCFunction)Writer_write_from, METH_VARARGS,
+    {"write_from", (PyCFunction)Writer_write_from_locked, METH_VARARGS,
      "write_from(targets, count) -> None\n\n"
      "Append count points straight out of buffers, one field per target.\n"
      "The mirror of PointReader.read_into, and the same (buffer, offset,\n"
      "size) triples; an offset of -1 means the extra bytes. Fields no\n"
      "target names are written as zero."},
-    {"chunk", (PyCFunction)Writer_chunk, METH_NOARGS,
+    {"chunk", (PyCFunction)Writer_chunk_locked, METH_NOARGS,
      "chunk() -> None\n\n"
      "Close the open chunk. Only meaningful with variable-size chunking, "
      "where the boundaries are the caller's to choose."},
-    {"done", (PyCFunction)Writer_done, METH_NOARGS,
+    {"done", (PyCFunction)Writer_done_locked, METH_NOARGS,
      "done() -> None\n\n"
      "Close the last chunk and write the chunk table. Not optional: "
      "without it the file ends mid-chunk and nothing can seek in it."},
+    {"start_index", (PyCFunction)Writer_start_index_locked, METH_VARARGS,
+     "start_index(scales, offsets, cell_size, threshold) -> None\n\n"
+     "Build a spatial index of the points as they are written, from their "
+     "coordinates through these scales and offsets: two of each for a "
+     "quadtree, three for an octree. Before the first point only."},
+    {"finish_index", (PyCFunction)Writer_finish_index_locked, METH_VARARGS,
+     "finish_index(minimum_points, maximum_intervals) -> bytes | None\n\n"
+     "The index start_index began, coarsened as Reader.build_index's is. "
+     "None when the points have to be read back to build it, because the "
+     "tree's edges missed the grid they were bucketed into."},
+    {"start_summaries", (PyCFunction)Writer_start_summaries_locked, METH_VARARGS,
+     "start_summaries(block) -> None\n\n"
+     "Note each chunk's bounds, GPS times, intensities and classifications "
+     "as its points are written: the file's own chunks for a block of 0, "
+     "and runs of block points for a plain LAS file. Before the first "
+     "point only."},
+    {"summaries", (PyCFunction)Writer_summaries_locked, METH_NOARGS,
+     "summaries() -> bytes\n\n"
+     "What start_summaries noted, packed as the payload of the extended "
+     "record lazpy.Reader.chunk_summaries reads."},
     {NULL}
 };
 
 static PyGetSetDef Writer_getset[] = {
-    {"index", (getter)Writer_get_index, NULL,
+    {"index", (getter)Writer_get_index_locked, NULL,
      "number of points written so far", NULL},
-    {"number_chunks", (getter)Writer_get_number_chunks, NULL,
+    {"number_chunks", (getter)Writer_get_number_chunks_locked, NULL,
      "number of chunks closed so far", NULL},
-    {"bounds", (getter)Writer_get_bounds, NULL,
+    {"bounds", (getter)Writer_get_bounds_locked, NULL,
      "(min_x, min_y, min_z, max_x, max_y, max_z), unscaled, or None", NULL},
-    {"points_by_return", (getter)Writer_get_points_by_return, NULL,
+    {"points_by_return", (getter)Writer_get_points_by_return_locked, NULL,
      "how many points carried each return number, 0 through 15", NULL},
     {NULL}
 };
@@ -513,15 +776,19 @@ PyDoc_STRVAR(writer_doc,
 "write() takes a Point or the bytes of one on-disk record; call done()\n"
 "once every point is written.\n");
 
-PyTypeObject Writer_Type = {
-    PyVarObject_HEAD_INIT(NULL, 0)
-    .tp_name = "lazpy._cpylaz.PointWriter",
-    .tp_basicsize = sizeof(WriterObject),
-    .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_doc = writer_doc,
-    .tp_new = PyType_GenericNew,
-    .tp_init = (initproc)Writer_tp_init,
-    .tp_dealloc = (destructor)Writer_dealloc,
-    .tp_methods = Writer_methods,
-    .tp_getset = Writer_getset,
+static PyType_Slot Writer_slots[] = {
+    {Py_tp_doc, (void *)writer_doc},
+    {Py_tp_new, (void *)locked_new},
+    {Py_tp_init, (void *)Writer_tp_init_locked},
+    {Py_tp_dealloc, (void *)Writer_dealloc},
+    {Py_tp_methods, (void *)Writer_methods},
+    {Py_tp_getset, (void *)Writer_getset},
+    {0, NULL}
+};
+
+PyType_Spec Writer_spec = {
+    .name = "lazpy._cpylaz.PointWriter",
+    .basicsize = sizeof(WriterObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = Writer_slots,
 };
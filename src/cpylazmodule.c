@@ -16,7 +16,56 @@
  */
 #include "cpylaz.h"
 
-PyObject *LazErrorType = NULL;
+/* ========================================================== object lock == */
+
+PyObject *locked_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    PyObject *self = PyType_GenericNew(type, args, kwds);
+    LockedObject *o = (LockedObject *)self;
+
+    if (!self) return NULL;
+    o->lock.lock = PyThread_allocate_lock();
+    o->lock.owner = 0;
+    if (!o->lock.lock) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+    return self;
+}
+
+void locked_free(PyObject *self)
+{
+    LockedObject *o = (LockedObject *)self;
+    if (o->lock.lock) PyThread_free_lock(o->lock.lock);
+    o->lock.lock = NULL;
+}
+
+BOOL object_lock(PyObject *self)
+{
+    ObjectLock *l = &((LockedObject *)self)->lock;
+    unsigned long me = PyThread_get_thread_ident();
+
+    if (!PyThread_acquire_lock(l->lock, NOWAIT_LOCK)) {
+        if (l->owner == me) {
+            PyErr_Format(PyExc_RuntimeError,
+                         "%s is already in a call on this thread",
+                         Py_TYPE(self)->tp_name);
+            return LAZ_FALSE;
+        }
+        Py_BEGIN_ALLOW_THREADS
+        PyThread_acquire_lock(l->lock, WAIT_LOCK);
+        Py_END_ALLOW_THREADS
+    }
+    l->owner = me;
+    return LAZ_TRUE;
+}
+
+void object_unlock(PyObject *self)
+{
+    ObjectLock *l = &((LockedObject *)self)->lock;
+    l->owner = 0;
+    PyThread_release_lock(l->lock);
+}
 
 /* ================================================================ module == */
 
@@ -30,10 +79,35 @@ static PyObject *cpylaz_alloc_fail_after(PyObject *self, PyObject *arg)
     Py_RETURN_NONE;
 }
 
+/* Test hook; see laz_layer_window_above in laz_readitem.h. */
+static PyObject *cpylaz_layer_window_above(PyObject *self, PyObject *arg)
+{
+    unsigned long long n = PyLong_AsUnsignedLongLong(arg);
+    (void)self;
+    if (n == (unsigned long long)-1 && PyErr_Occurred()) return NULL;
+    return PyLong_FromUnsignedLongLong(laz_layer_window_above((U64)n));
+}
+
 static PyMethodDef cpylaz_methods[] = {
     {"_alloc_fail_after", cpylaz_alloc_fail_after, METH_O,
      "Test hook: let the next n model allocations succeed and fail every one\n"
      "after that. -1 restores the default of never failing."},
+    {"_layer_window_above", cpylaz_layer_window_above, METH_O,
+     "Test hook: read the layers of a layered chunk through windows over\n"
+     "the file when those decoded come to more than n bytes, returning the\n"
+     "limit there was."},
+    {"grid_add", cpylaz_grid_add, METH_VARARGS,
+     "grid_add(X, Y, values, placement, shape, count, low, high, total, "
+     "weights, weighted) -> int\n\n"
+     "Add a block of points to the cells of a raster, returning how many "
+     "landed in one. X and Y are the stored int32 coordinates and values "
+     "a float64 per point, or None to count alone. placement is (scale_x, "
+     "scale_y, offset_x, offset_y, left, bottom, size, power) and shape "
+     "(rows, cols), the first row the northernmost. The rest are per-cell "
+     "buffers of rows * cols: count int64, the others float64 or None for "
+     "a statistic not wanted -- the least and greatest value, their sum, "
+     "and an inverse-distance weighting toward the cell centre. Runs with "
+     "the GIL released; Reader.grid is built on it."},
     {NULL, NULL}
 };
 
@@ -99,6 +173,8 @@ static int add_point_layout(PyObject *m)
 
 static int cpylaz_exec(PyObject *m)
 {
+    CpylazState *state = (CpylazState *)PyModule_GetState(m);
+
     /* The point layout is enforced at compile time by static assertions in
      * src/laz_types.h, next to the struct they constrain. Byte order cannot be
      * settled there -- either order decodes the same file to the same values,
@@ -110,36 +186,31 @@ static int cpylaz_exec(PyObject *m)
         return -1;
     }
 
-#define ADD_TYPE(var, name)                                                    \
+    /* each module's types, made by it, which is how an object of theirs
+     * finds this module's state; the state keeps a reference of its own */
+#define ADD_TYPE(var, spec)                                                    \
     do {                                                                       \
-        if (PyType_Ready(&var) < 0) return -1;                                 \
-        Py_INCREF(&var);                                                       \
-        if (PyModule_AddObject(m, name, (PyObject *)&var) < 0) {               \
-            Py_DECREF(&var);                                                   \
-            return -1;                                                         \
-        }                                                                      \
+        state->var = (PyTypeObject *)PyType_FromModuleAndSpec(m, &spec, NULL); \
+        if (!state->var) return -1;                                            \
+        if (PyModule_AddType(m, state->var) < 0) return -1;                    \
     } while (0)
 
-    ADD_TYPE(BitModel_Type, "ArithmeticBitModel");
-    ADD_TYPE(SymbolModel_Type, "ArithmeticModel");
-    ADD_TYPE(Encoder_Type, "ArithmeticEncoder");
-    ADD_TYPE(Decoder_Type, "ArithmeticDecoder");
-    ADD_TYPE(IntComp_Type, "IntegerCompressor");
-    ADD_TYPE(Point_Type, "Point");
-    ADD_TYPE(Reader_Type, "PointReader");
-    ADD_TYPE(Writer_Type, "PointWriter");
-    ADD_TYPE(Index_Type, "SpatialIndex");
+    ADD_TYPE(BitModel_Type, BitModel_spec);
+    ADD_TYPE(SymbolModel_Type, SymbolModel_spec);
+    ADD_TYPE(Encoder_Type, Encoder_spec);
+    ADD_TYPE(Decoder_Type, Decoder_spec);
+    ADD_TYPE(IntComp_Type, IntComp_spec);
+    ADD_TYPE(Point_Type, Point_spec);
+    ADD_TYPE(Reader_Type, Reader_spec);
+    ADD_TYPE(Writer_Type, Writer_spec);
+    ADD_TYPE(Index_Type, Index_spec);
 #undef ADD_TYPE
 
-    LazErrorType = PyErr_NewExceptionWithDoc(
+    state->LazError = PyErr_NewExceptionWithDoc(
         "lazpy.LazError", "A LAS/LAZ file could not be read or decoded.",
         NULL, NULL);
-    if (LazErrorType == NULL) return -1;
-    Py_INCREF(LazErrorType);
-    if (PyModule_AddObject(m, "LazError", LazErrorType) < 0) {
-        Py_DECREF(LazErrorType);
-        return -1;
-    }
+    if (state->LazError == NULL) return -1;
+    if (PyModule_AddObjectRef(m, "LazError", state->LazError) < 0) return -1;
 
     if (PyModule_AddIntConstant(m, "DM_LENGTH_SHIFT", DM_LENGTH_SHIFT) < 0)
         return -1;
@@ -153,8 +224,69 @@ static int cpylaz_exec(PyObject *m)
     return 0;
 }
 
+static int cpylaz_traverse(PyObject *m, visitproc visit, void *arg)
+{
+    CpylazState *state = (CpylazState *)PyModule_GetState(m);
+    if (!state) return 0;
+    Py_VISIT(state->LazError);
+    Py_VISIT(state->BitModel_Type);
+    Py_VISIT(state->SymbolModel_Type);
+    Py_VISIT(state->Encoder_Type);
+    Py_VISIT(state->Decoder_Type);
+    Py_VISIT(state->IntComp_Type);
+    Py_VISIT(state->Point_Type);
+    Py_VISIT(state->Reader_Type);
+    Py_VISIT(state->Writer_Type);
+    Py_VISIT(state->Index_Type);
+    return 0;
+}
+
+static int cpylaz_clear(PyObject *m)
+{
+    CpylazState *state = (CpylazState *)PyModule_GetState(m);
+    if (!state) return 0;
+    Py_CLEAR(state->LazError);
+    Py_CLEAR(state->BitModel_Type);
+    Py_CLEAR(state->SymbolModel_Type);
+    Py_CLEAR(state->Encoder_Type);
+    Py_CLEAR(state->Decoder_Type);
+    Py_CLEAR(state->IntComp_Type);
+    Py_CLEAR(state->Point_Type);
+    Py_CLEAR(state->Reader_Type);
+    Py_CLEAR(state->Writer_Type);
+    Py_CLEAR(state->Index_Type);
+    return 0;
+}
+
+static void cpylaz_free_module(void *m)
+{
+    cpylaz_clear((PyObject *)m);
+}
+
+/*
+ * Free-threaded builds (3.13t) run the module without a GIL once it says it
+ * needs none, and otherwise turn the GIL back on for the whole process on
+ * import. It needs none: what one object's calls share is behind that
+ * object's lock (see ObjectLock in cpylaz.h), the read-ahead thread's is
+ * behind a mutex of its own, and nothing else is shared but what module init
+ * sets up before any call -- the types, LazError -- and the two test hooks,
+ * which are each thread's own.
+ *
+ * From 3.12 a subinterpreter may have a GIL of its own, and imports only the
+ * modules that say they can be imported there. This one can: everything an
+ * import makes is in its state, not in C globals, and a file stream calls
+ * into Python in the interpreter that let the GIL go (see
+ * laz_stream_release_gil). The C globals there are -- compatibility tables,
+ * the test hooks -- are constant or each thread's own.
+ */
 static struct PyModuleDef_Slot cpylaz_slots[] = {
     {Py_mod_exec, (void *)cpylaz_exec},
+#ifdef Py_mod_multiple_interpreters
+    {Py_mod_multiple_interpreters, Py_MOD_PER_INTERPRETER_GIL_SUPPORTED},
+#endif
+#ifdef Py_mod_gil
+    {Py_mod_gil, Py_MOD_GIL_NOT_USED},
+#endif
     {0, NULL},
 };
 
@@ -162,10 +294,12 @@ static struct PyModuleDef cpylazmodule = {
     PyModuleDef_HEAD_INIT,
     "lazpy._cpylaz",
     module_doc,
-    0,
+    sizeof(CpylazState),
     cpylaz_methods,
     cpylaz_slots,
-    NULL, NULL, NULL
+    cpylaz_traverse,
+    cpylaz_clear,
+    cpylaz_free_module
 };
 
 PyMODINIT_FUNC PyInit__cpylaz(void)
@@ -13,7 +13,7 @@
 
 /* Number of allocations still allowed, or -1 for "no limit". See the comment
  * on laz_alloc_fail_after in the header. */
-static I64 alloc_countdown = -1;
+static LAZ_THREAD_LOCAL I64 alloc_countdown = -1;
 
 void laz_alloc_fail_after(I64 n)
 {
@@ -224,6 +224,33 @@ void laz_symbol_model_free(LazSymbolModel *m)
     m->initialised = LAZ_FALSE;
 }
 
+/*
+ * The copy leaves the image of a fresh model behind. It is a cache, which the
+ * copy builds again for itself if it is ever initialised twice, and leaving
+ * it out keeps a copy down to the one buffer that is the model's state.
+ */
+BOOL laz_symbol_model_copy(LazSymbolModel *dst, const LazSymbolModel *src)
+{
+    size_t block;
+
+    *dst = *src;
+    dst->fresh = NULL;
+    if (src->distribution == NULL) return LAZ_TRUE;
+
+    block = model_block_size(src);
+    dst->distribution = (U32 *)laz_model_alloc(block * sizeof(U32));
+    if (dst->distribution == NULL) {
+        dst->symbol_count = NULL;
+        dst->decoder_table = NULL;
+        return LAZ_FALSE;
+    }
+    memcpy(dst->distribution, src->distribution, block * sizeof(U32));
+    dst->symbol_count = dst->distribution + src->num_symbols;
+    if (src->decoder_table)
+        dst->decoder_table = dst->distribution + 2 * src->num_symbols;
+    return LAZ_TRUE;
+}
+
 LazSymbolModel *laz_symbol_models_new(U32 n, U32 num_symbols, BOOL compress)
 {
     U32 i;
@@ -241,6 +268,20 @@ void laz_symbol_models_free(LazSymbolModel *models, U32 n)
     free(models);
 }
 
+LazSymbolModel *laz_symbol_models_copy(const LazSymbolModel *src, U32 n)
+{
+    U32 i;
+    BOOL ok = LAZ_TRUE;
+    LazSymbolModel *models = (LazSymbolModel *)laz_model_calloc(n, sizeof(LazSymbolModel));
+    if (!models) return NULL;
+    /* every one is copied, failed or not, so that none of them is left
+     * sharing a buffer with the original when the lot is freed */
+    for (i = 0; i < n; i++) ok = laz_symbol_model_copy(&models[i], &src[i]) && ok;
+    if (ok) return models;
+    laz_symbol_models_free(models, n);
+    return NULL;
+}
+
 /* ---------------------------------------------------------------- decoder */
 
 void laz_decoder_setup(LazDecoder *d, LazStream *stream)
@@ -100,7 +100,8 @@ typedef struct {
  *
  * laz_alloc_fail_after(n) lets the next n allocations through and fails every
  * one after that; -1, the default, never fails. It is a debugging hook, not
- * part of the reading or writing interface, and it is not thread-safe.
+ * part of the reading or writing interface, and it counts the allocations of
+ * the thread that armed it alone.
  */
 void *laz_model_alloc(size_t size);
 void *laz_model_calloc(size_t n, size_t size);
@@ -117,10 +118,16 @@ BOOL laz_symbol_model_init(LazSymbolModel *m, const U32 *table);
 void laz_symbol_model_free(LazSymbolModel *m);
 /* Recomputes the distribution (and decoder table) from the current counts. */
 void laz_symbol_model_update(LazSymbolModel *m);
+/* Makes *dst a copy of *src that owns buffers of its own. On failure *dst owns
+ * nothing and is still safe to free; it returns LAZ_FALSE. */
+BOOL laz_symbol_model_copy(LazSymbolModel *dst, const LazSymbolModel *src);
 
 /* Allocates an array of `n` symbol models, each set up for num_symbols. */
 LazSymbolModel *laz_symbol_models_new(U32 n, U32 num_symbols, BOOL compress);
 void laz_symbol_models_free(LazSymbolModel *models, U32 n);
+/* A copy of an array from laz_symbol_models_new, or NULL if it could not be
+ * made whole. */
+LazSymbolModel *laz_symbol_models_copy(const LazSymbolModel *src, U32 n);
 
 void laz_decoder_setup(LazDecoder *d, LazStream *stream);
 /* really_init false only hands over the stream without consuming the 4 initial
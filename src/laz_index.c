@@ -7,6 +7,7 @@
  * Modified: translated from C++ to C and restructured.
  */
 
+#include <math.h>
 #include <stdio.h>
 #include <stdarg.h>
 #include "laz_index.h"
@@ -71,26 +72,29 @@ void *laz_index_grow(void *base, U32 *alloc, U32 needed, size_t item)
 
 /* Which level a cell index belongs to. The reference stops at 15 whatever the
  * tree's own depth, and so does this. */
-U32 laz_index_level_of(const U32 *level_offset, U32 cell_index)
+U32 laz_index_level_of(const U64 *level_offset, U64 cell_index)
 {
     U32 level = 0;
-    while ((level < 15) && (cell_index >= level_offset[level + 1])) level++;
+    while ((level < LAZ_INDEX_MAX_LEVELS) &&
+           (cell_index >= level_offset[level + 1]))
+        level++;
     return level;
 }
 
 /* Where each level's cell indices begin, which is the tree's shape and not
- * any one file's: level l has 4^l cells, all of them below level l+1's. */
-void laz_index_level_offsets(U32 *level_offset)
+ * any one file's: level l has 4^l cells in a quadtree and 8^l in an octree,
+ * all of them below level l+1's. */
+void laz_index_level_offsets(U64 *level_offset, U32 dims)
 {
     U32 l;
     level_offset[0] = 0;
     for (l = 0; l < 16; l++)
-        level_offset[l + 1] = level_offset[l] + ((1u << l) * (1u << l));
+        level_offset[l + 1] = level_offset[l] + ((U64)1 << (dims * l));
 }
 
 static U32 get_cell_index(const LazQuadtree *q, U32 level_index, U32 level)
 {
-    return level_index + q->level_offset[level];
+    return level_index + (U32)q->level_offset[level];
 }
 
 /* Makes room for `words` words of the subdivision bitmap, the new ones clear. */
@@ -118,7 +122,7 @@ static BOOL adaptive_reserve(LazQuadtree *q, U32 words)
 static BOOL quadtree_manage_cell(LazIndex *ix, U32 cell_index)
 {
     LazQuadtree *q = &ix->quadtree;
-    U32 max_cell_index = q->level_offset[q->levels + 1] - 1;
+    U32 max_cell_index = (U32)q->level_offset[q->levels + 1] - 1;
     U32 level, level_index, pos, bit;
 
     if (cell_index > max_cell_index) {
@@ -149,13 +153,13 @@ static BOOL quadtree_manage_cell(LazIndex *ix, U32 cell_index)
     return LAZ_TRUE;
 }
 
-static BOOL hits_push(LazQuadtree *q, U32 cell_index)
+static BOOL hits_push(LazQuadtree *q, U64 cell_index)
 {
-    I32 *grown = (I32 *)laz_index_grow(q->hits, &q->hits_alloc, q->num_hits + 1,
-                             sizeof(I32));
+    I64 *grown = (I64 *)laz_index_grow(q->hits, &q->hits_alloc, q->num_hits + 1,
+                             sizeof(I64));
     if (!grown) return LAZ_FALSE;
     q->hits = grown;
-    q->hits[q->num_hits++] = (I32)cell_index;
+    q->hits[q->num_hits++] = (I64)cell_index;
     return LAZ_TRUE;
 }
 
@@ -166,10 +170,14 @@ static BOOL hits_push(LazQuadtree *q, U32 cell_index)
  * square around it, and `radius` above zero is what tells a leaf it has one
  * more question to answer. LASquadtree keeps the two apart, in two copies of
  * the same nine-way descent; they are one here.
+ *
+ * The elevations are only an octree's to use, and run from minus infinity
+ * to infinity for the two shapes that have none.
  */
 typedef struct {
     F64 min_x, min_y, max_x, max_y;
     F64 center_x, center_y, radius;
+    F64 min_z, max_z;
 } LazQuery;
 
 /*
@@ -278,6 +286,48 @@ static BOOL quadtree_intersect(LazQuadtree *q, const LazQuery *query)
                            0, 0);
 }
 
+/*
+ * The octree record, which follows a LASspatial record of type 1 where a
+ * quadtree's follows type 0: its own signature and version, the depth, and
+ * the box as six floats -- the quadtree's four and then the elevations.
+ */
+static BOOL octree_read(LazIndex *ix, LazStream *s)
+{
+    LazOctree *o = &ix->octree;
+    U8 sig[4];
+    U8 box[24];
+
+    ix->dims = 3;
+    laz_index_level_offsets(o->level_offset, 3);
+
+    laz_stream_get_bytes(s, sig, 4);
+    if (memcmp(sig, "LASO", 4) != 0) {
+        set_error(ix, "spatial index is missing its octree record");
+        return LAZ_FALSE;
+    }
+    (void)laz_stream_get32(s);                   /* version */
+    o->levels = laz_stream_get32(s);
+    if (o->levels > LAZ_INDEX_MAX_LEVELS) {
+        set_error(ix, "spatial index has %u levels (max %d)", o->levels,
+                  LAZ_INDEX_MAX_LEVELS);
+        return LAZ_FALSE;
+    }
+
+    laz_stream_get_bytes(s, box, 24);
+    o->min_x = laz_le_get_f32(box + 0);
+    o->max_x = laz_le_get_f32(box + 4);
+    o->min_y = laz_le_get_f32(box + 8);
+    o->max_y = laz_le_get_f32(box + 12);
+    o->min_z = laz_le_get_f32(box + 16);
+    o->max_z = laz_le_get_f32(box + 20);
+
+    if (laz_stream_eof(s)) {
+        set_error(ix, "spatial index ends inside its octree");
+        return LAZ_FALSE;
+    }
+    return LAZ_TRUE;
+}
+
 static BOOL quadtree_read(LazIndex *ix, LazStream *s)
 {
     LazQuadtree *q = &ix->quadtree;
@@ -285,7 +335,8 @@ static BOOL quadtree_read(LazIndex *ix, LazStream *s)
     U8 box[16];
     U32 type;
 
-    laz_index_level_offsets(q->level_offset);
+    ix->dims = 2;
+    laz_index_level_offsets(q->level_offset, 2);
 
     laz_stream_get_bytes(s, sig, 4);
     if (memcmp(sig, "LASS", 4) != 0) {
@@ -293,6 +344,7 @@ static BOOL quadtree_read(LazIndex *ix, LazStream *s)
         return LAZ_FALSE;
     }
     type = laz_stream_get32(s);
+    if (type == 1) return octree_read(ix, s);
     if (type != 0) {
         set_error(ix, "unknown LASspatial type %u", type);
         return LAZ_FALSE;
@@ -354,7 +406,7 @@ static int interval_cmp(const void *a, const void *b)
 }
 
 /* The cell with this index, or NULL. */
-static const LazIndexCell *find_cell(const LazIndex *ix, I32 cell_index)
+static const LazIndexCell *find_cell(const LazIndex *ix, I64 cell_index)
 {
     U32 lo = 0, hi = ix->num_cells;
     while (lo < hi) {
@@ -407,11 +459,14 @@ static BOOL interval_read(LazIndex *ix, LazStream *s)
         ix->cells = grown_cells;
         cell = &ix->cells[ix->num_cells++];
 
-        cell->index = (I32)laz_stream_get32(s);
+        /* an octree's cells number past what 32 bits hold, so its index
+         * states them in 64 */
+        if (ix->dims == 3) cell->index = (I64)laz_stream_get64(s);
+        else cell->index = (I32)laz_stream_get32(s);
         number_intervals = laz_stream_get32(s);
         /* how many points fell in the cell, as against how many the intervals
-         * span; read past because nothing here has a use for it */
-        if (wide) (void)laz_stream_get64(s); else (void)laz_stream_get32(s);
+         * span, which is what an estimate counts */
+        cell->num_points = wide ? laz_stream_get64(s) : laz_stream_get32(s);
         cell->first = ix->num_intervals;
         cell->count = 0;
 
@@ -436,7 +491,8 @@ static BOOL interval_read(LazIndex *ix, LazStream *s)
                 iv->end = laz_stream_get32(s);
             }
             if (laz_stream_eof(s)) {
-                set_error(ix, "spatial index ends inside cell %d", cell->index);
+                set_error(ix, "spatial index ends inside cell %lld",
+                          (long long)cell->index);
                 return LAZ_FALSE;
             }
             if (iv->end < iv->start) {
@@ -497,15 +553,26 @@ BOOL laz_index_read(LazIndex *ix, LazStream *stream)
     sort_cells(ix);
 
     /* Which cells exist is what makes the tree adaptive: a cell the intervals
-     * name is a leaf, and its ancestors are interior nodes. */
+     * name is a leaf, and its ancestors are interior nodes. An octree keeps
+     * no such record, so its cells need only be in range. */
     for (i = 0; i < ix->num_cells; i++) {
         if (ix->cells[i].index < 0) {
-            set_error(ix, "spatial index names a negative cell %d",
-                      ix->cells[i].index);
+            set_error(ix, "spatial index names a negative cell %lld",
+                      (long long)ix->cells[i].index);
             return LAZ_FALSE;
         }
-        if (!quadtree_manage_cell(ix, (U32)ix->cells[i].index))
+        if (ix->dims == 3) {
+            U64 max_cell_index =
+                ix->octree.level_offset[ix->octree.levels + 1] - 1;
+            if ((U64)ix->cells[i].index > max_cell_index) {
+                set_error(ix, "spatial index cell %lld is out of range "
+                          "(max %llu)", (long long)ix->cells[i].index,
+                          (unsigned long long)max_cell_index);
+                return LAZ_FALSE;
+            }
+        } else if (!quadtree_manage_cell(ix, (U32)ix->cells[i].index)) {
             return LAZ_FALSE;
+        }
     }
     return LAZ_TRUE;
 }
@@ -541,6 +608,7 @@ static BOOL merge_hits(LazIndex *ix)
     U32 used = 0, i;
 
     ix->num_merged = 0;
+    ix->num_used = 0;
 
     for (i = 0; i < q->num_hits; i++) {
         const LazIndexCell *cell = find_cell(ix, q->hits[i]);
@@ -553,6 +621,7 @@ static BOOL merge_hits(LazIndex *ix)
                (size_t)cell->count * sizeof(LazInterval));
         ix->num_merged += cell->count;
     }
+    ix->num_used = used;
     /* One cell is already in order and already far enough apart, and the
      * reference leaves it alone; running it through the threshold below would
      * join intervals it kept separate. */
@@ -587,31 +656,138 @@ U32 laz_index_coalesce(LazInterval *intervals, U32 n, U64 threshold)
     return kept + 1;
 }
 
-static BOOL intersect(LazIndex *ix, const LazQuery *query)
+/*
+ * The box of an octree cell, by the descent that put points in it: the same
+ * single-precision midpoints the builder split by, taken three bits a level
+ * from the root down.
+ */
+static void octree_cell_box(const LazOctree *o, U64 cell_index, F32 box[6])
 {
-    ix->num_merged = 0;
+    volatile F32 mid;
+    U32 level = laz_index_level_of(o->level_offset, cell_index);
+    U64 level_index = cell_index - o->level_offset[level];
+    int axis;
+
+    box[0] = o->min_x; box[1] = o->max_x;
+    box[2] = o->min_y; box[3] = o->max_y;
+    box[4] = o->min_z; box[5] = o->max_z;
+    while (level) {
+        U32 octant;
+        level--;
+        octant = (U32)(level_index >> (3 * level)) & 7;
+        for (axis = 0; axis < 3; axis++) {
+            mid = (box[2 * axis] + box[2 * axis + 1]) / 2;
+            if (octant & (1u << axis)) box[2 * axis] = mid;
+            else box[2 * axis + 1] = mid;
+        }
+    }
+}
+
+/*
+ * Every cell of the octree that meets the query, left in the hits a
+ * quadtree would leave them in.
+ *
+ * Cell by cell rather than by descent, for the reason LazOctree gives. A
+ * cell meets the query when the query reaches above its lower edge and not
+ * past its upper one, on every axis: the descent's own test, less its
+ * distinction between a split and the root's far edge -- which costs at
+ * most a neighbouring cell's candidates, every one of them tested after.
+ */
+static BOOL octree_intersect(LazIndex *ix, const LazQuery *query)
+{
+    const LazOctree *o = &ix->octree;
+    LazQuadtree *q = &ix->quadtree;
+    U32 i;
+
+    q->num_hits = 0;
+    for (i = 0; i < ix->num_cells; i++) {
+        F32 box[6];
+        octree_cell_box(o, (U64)ix->cells[i].index, box);
+        if (!(query->max_x > box[0] && query->min_x <= box[1] &&
+              query->max_y > box[2] && query->min_y <= box[3] &&
+              query->max_z > box[4] && query->min_z <= box[5]))
+            continue;
+        if (query->radius > 0 &&
+            !circle_meets_cell(query, box[0], box[1], box[2], box[3]))
+            continue;
+        if (!hits_push(q, (U64)ix->cells[i].index)) return LAZ_FALSE;
+    }
+    return LAZ_TRUE;
+}
+
+/* Every cell that meets the query, left in the quadtree's hits whichever
+ * tree it is. */
+static BOOL find_hits(LazIndex *ix, const LazQuery *query)
+{
+    BOOL ok;
+
+    ix->quadtree.num_hits = 0;
     /* An inverted rectangle holds nothing. Said here because the descent's
      * comparisons assume otherwise -- a rectangle can be below a split and
      * above it at once only if it is empty. */
-    if (query->min_x > query->max_x || query->min_y > query->max_y)
+    if (query->min_x > query->max_x || query->min_y > query->max_y ||
+        query->min_z > query->max_z)
         return LAZ_TRUE;
-    if (!quadtree_intersect(&ix->quadtree, query)) {
+    if (ix->dims == 3) ok = octree_intersect(ix, query);
+    else ok = quadtree_intersect(&ix->quadtree, query);
+    if (!ok) {
         set_error(ix, "out of memory answering a spatial index query");
         return LAZ_FALSE;
     }
+    return LAZ_TRUE;
+}
+
+static BOOL intersect(LazIndex *ix, const LazQuery *query)
+{
+    ix->num_merged = 0;
+    ix->num_used = 0;
+    if (!find_hits(ix, query)) return LAZ_FALSE;
     if (!ix->quadtree.num_hits) return LAZ_TRUE;
     return merge_hits(ix);
 }
 
+/* What the three shapes put in a query, which estimating asks as well. */
+static void rectangle_query(LazQuery *query, F64 min_x, F64 min_y,
+                            F64 max_x, F64 max_y)
+{
+    query->min_x = min_x;
+    query->min_y = min_y;
+    query->max_x = max_x;
+    query->max_y = max_y;
+    query->center_x = query->center_y = query->radius = 0.0;
+    query->min_z = -HUGE_VAL;
+    query->max_z = HUGE_VAL;
+}
+
+static void circle_query(LazQuery *query, F64 center_x, F64 center_y,
+                         F64 radius)
+{
+    /* the square around the circle is what the descent follows; the circle
+     * itself is what a leaf is then asked about */
+    rectangle_query(query, center_x - radius, center_y - radius,
+                    center_x + radius, center_y + radius);
+    query->center_x = center_x;
+    query->center_y = center_y;
+    query->radius = radius;
+}
+
+static void box_query(const LazIndex *ix, LazQuery *query, F64 min_x,
+                      F64 min_y, F64 min_z, F64 max_x, F64 max_y, F64 max_z)
+{
+    rectangle_query(query, min_x, min_y, max_x, max_y);
+    /* a quadtree cannot tell one elevation from another, so for one the box
+     * is the rectangle under it; an inverted box still holds nothing */
+    if (ix->dims == 3 || min_z > max_z) {
+        query->min_z = min_z;
+        query->max_z = max_z;
+    }
+}
+
 BOOL laz_index_intersect_rectangle(LazIndex *ix, F64 min_x, F64 min_y,
                                    F64 max_x, F64 max_y)
 {
     LazQuery query;
-    query.min_x = min_x;
-    query.min_y = min_y;
-    query.max_x = max_x;
-    query.max_y = max_y;
-    query.center_x = query.center_y = query.radius = 0.0;
+    rectangle_query(&query, min_x, min_y, max_x, max_y);
     return intersect(ix, &query);
 }
 
@@ -622,20 +798,191 @@ BOOL laz_index_intersect_circle(LazIndex *ix, F64 center_x, F64 center_y,
 
     if (!(radius > 0)) {                    /* a circle of no size, or NaN */
         ix->num_merged = 0;
+        ix->num_used = 0;
         return LAZ_TRUE;
     }
-    /* the square around the circle is what the descent follows; the circle
-     * itself is what a leaf is then asked about */
-    query.min_x = center_x - radius;
-    query.min_y = center_y - radius;
-    query.max_x = center_x + radius;
-    query.max_y = center_y + radius;
-    query.center_x = center_x;
-    query.center_y = center_y;
-    query.radius = radius;
+    circle_query(&query, center_x, center_y, radius);
+    return intersect(ix, &query);
+}
+
+BOOL laz_index_intersect_box(LazIndex *ix, F64 min_x, F64 min_y, F64 min_z,
+                             F64 max_x, F64 max_y, F64 max_z)
+{
+    LazQuery query;
+    box_query(ix, &query, min_x, min_y, min_z, max_x, max_y, max_z);
     return intersect(ix, &query);
 }
 
+/* ============================================================ estimating = */
+
+/*
+ * The box of a quadtree cell, by the descent that put points in it: two bits
+ * a level from the root down, x in the lower, as octree_cell_box takes three.
+ */
+static void quadtree_cell_box(const LazQuadtree *q, U64 cell_index,
+                              F32 box[4])
+{
+    volatile F32 mid;
+    U32 level = laz_index_level_of(q->level_offset, cell_index);
+    U64 level_index = cell_index - q->level_offset[level];
+    int axis;
+
+    box[0] = q->min_x; box[1] = q->max_x;
+    box[2] = q->min_y; box[3] = q->max_y;
+    while (level) {
+        U32 quadrant;
+        level--;
+        quadrant = (U32)(level_index >> (2 * level)) & 3;
+        for (axis = 0; axis < 2; axis++) {
+            mid = (box[2 * axis] + box[2 * axis + 1]) / 2;
+            if (quadrant & (1u << axis)) box[2 * axis] = mid;
+            else box[2 * axis + 1] = mid;
+        }
+    }
+}
+
+void laz_index_cell_box(const LazIndex *ix, I64 cell_index, F64 box[6])
+{
+    F32 narrow[6];
+    int i;
+
+    if (ix->dims == 3) {
+        octree_cell_box(&ix->octree, (U64)cell_index, narrow);
+    } else {
+        quadtree_cell_box(&ix->quadtree, (U64)cell_index, narrow);
+        narrow[4] = -HUGE_VALF;
+        narrow[5] = HUGE_VALF;
+    }
+    for (i = 0; i < 6; i++) box[i] = narrow[i];
+}
+
+/* How much of the cell's extent from `lo` to `hi` the query's covers, as a
+ * fraction. An extent that is unbounded, or that is no extent at all, is
+ * covered wholly by whatever reached it. */
+static F64 covered(F64 lo, F64 hi, F64 query_lo, F64 query_hi)
+{
+    F64 from = lo > query_lo ? lo : query_lo;
+    F64 to = hi < query_hi ? hi : query_hi;
+    if (!(hi > lo) || isinf(hi - lo)) return 1.0;
+    return to > from ? (to - from) / (hi - lo) : 0.0;
+}
+
+/* The integral of the circle's half-height sqrt(r^2 - u^2) from `a` to `b`,
+ * both taken inside -r..r, where the circle is. */
+static F64 chord_area(F64 r, F64 a, F64 b)
+{
+    F64 ends[2];
+    int i;
+
+    ends[0] = a < -r ? -r : (a > r ? r : a);
+    ends[1] = b < -r ? -r : (b > r ? r : b);
+    for (i = 0; i < 2; i++) {
+        F64 u = ends[i];
+        ends[i] = 0.5 * (u * sqrt(r * r - u * u) + r * r * asin(u / r));
+    }
+    return ends[1] - ends[0];
+}
+
+/* The integral from `a` to `b` of the height `y` clamped into the circle at
+ * each u -- y itself where the circle reaches past it, the circle's edge on
+ * y's side where it does not. The area between two such heights is the
+ * area of the circle between them. */
+static F64 clamped_area(F64 r, F64 y, F64 a, F64 b)
+{
+    F64 reach = fabs(y) < r ? sqrt(r * r - y * y) : 0.0;
+    F64 lo = a > -reach ? a : -reach, hi = b < reach ? b : reach;
+    F64 inside = hi > lo ? hi - lo : 0.0;
+    F64 outside = chord_area(r, a, b) - (inside > 0 ? chord_area(r, lo, hi)
+                                                    : 0.0);
+    return y * inside + (y < 0 ? -outside : outside);
+}
+
+/*
+ * How much of a cell's area the circle covers, as a fraction, and whether it
+ * covers all of it. The area is the exact one, the integral of the circle's
+ * height over the cell's width, clipped to the cell's own bottom and top.
+ */
+static F64 circle_covers(const LazQuery *query, const F64 box[6],
+                         BOOL *inside)
+{
+    F64 r = query->radius, area;
+    F64 x0 = box[0] - query->center_x, x1 = box[1] - query->center_x;
+    F64 y0 = box[2] - query->center_y, y1 = box[3] - query->center_y;
+    F64 far_x = fabs(x0) > fabs(x1) ? x0 : x1;
+    F64 far_y = fabs(y0) > fabs(y1) ? y0 : y1;
+
+    *inside = far_x * far_x + far_y * far_y <= r * r;
+    if (*inside || !(x1 > x0) || !(y1 > y0)) return 1.0;
+    area = clamped_area(r, y1, x0, x1) - clamped_area(r, y0, x0, x1);
+    area /= (x1 - x0) * (y1 - y0);
+    return area < 0 ? 0.0 : (area > 1 ? 1.0 : area);
+}
+
+static BOOL estimate(LazIndex *ix, const LazQuery *query,
+                     LazIndexEstimate *e)
+{
+    U32 i;
+
+    e->estimate = 0.0;
+    e->low = e->high = 0;
+    if (!find_hits(ix, query)) return LAZ_FALSE;
+    for (i = 0; i < ix->quadtree.num_hits; i++) {
+        const LazIndexCell *cell = find_cell(ix, ix->quadtree.hits[i]);
+        F64 box[6], fraction;
+        BOOL inside;
+
+        if (!cell) continue;
+        laz_index_cell_box(ix, cell->index, box);
+        fraction = covered(box[4], box[5], query->min_z, query->max_z);
+        if (query->radius > 0) {
+            fraction *= circle_covers(query, box, &inside);
+        } else {
+            fraction *= covered(box[0], box[1], query->min_x, query->max_x)
+                      * covered(box[2], box[3], query->min_y, query->max_y);
+            inside = box[0] >= query->min_x && box[1] <= query->max_x
+                  && box[2] >= query->min_y && box[3] <= query->max_y;
+        }
+        inside = inside && box[4] >= query->min_z && box[5] <= query->max_z;
+        e->high += cell->num_points;
+        if (inside) e->low += cell->num_points;
+        e->estimate += fraction * (F64)cell->num_points;
+    }
+    if (e->estimate < (F64)e->low) e->estimate = (F64)e->low;
+    if (e->estimate > (F64)e->high) e->estimate = (F64)e->high;
+    return LAZ_TRUE;
+}
+
+BOOL laz_index_estimate_rectangle(LazIndex *ix, F64 min_x, F64 min_y,
+                                  F64 max_x, F64 max_y, LazIndexEstimate *e)
+{
+    LazQuery query;
+    rectangle_query(&query, min_x, min_y, max_x, max_y);
+    return estimate(ix, &query, e);
+}
+
+BOOL laz_index_estimate_circle(LazIndex *ix, F64 center_x, F64 center_y,
+                               F64 radius, LazIndexEstimate *e)
+{
+    LazQuery query;
+
+    if (!(radius > 0)) {
+        e->estimate = 0.0;
+        e->low = e->high = 0;
+        return LAZ_TRUE;
+    }
+    circle_query(&query, center_x, center_y, radius);
+    return estimate(ix, &query, e);
+}
+
+BOOL laz_index_estimate_box(LazIndex *ix, F64 min_x, F64 min_y, F64 min_z,
+                            F64 max_x, F64 max_y, F64 max_z,
+                            LazIndexEstimate *e)
+{
+    LazQuery query;
+    box_query(ix, &query, min_x, min_y, min_z, max_x, max_y, max_z);
+    return estimate(ix, &query, e);
+}
+
 void laz_index_destroy(LazIndex *ix)
 {
     free(ix->quadtree.adaptive);
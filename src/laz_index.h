@@ -33,6 +33,13 @@
  *
  * Reading one is here; building one is laz_indexbuild.h, which is the same
  * structures filled the other way.
+ *
+ * The same file can also hold an octree, which laszip has no counterpart
+ * for: the cube around the points split eight ways rather than the square
+ * split four, so that a query over a slice of elevations -- a canopy, a
+ * power line -- skips the cells above and below it as well as beside it.
+ * lazpy keeps one in a sidecar of its own, so that laszip never meets one
+ * where it expects a quadtree.
  */
 #ifndef LAZ_INDEX_H
 #define LAZ_INDEX_H
@@ -66,29 +73,54 @@ typedef struct {
     F32 min_x, max_x, min_y, max_y;
     /* level_offset[l] is where level l's cell indices begin; the cell index of
      * the l'th-level cell with level index i is level_offset[l] + i. */
-    U32 level_offset[17];
+    U64 level_offset[17];
     /* One bit per cell index, set when the cell was subdivided. Absent bits
      * read as clear, so a short array simply means the rest are leaves. */
     U32 *adaptive;
     U32 adaptive_words;
     /* the cells the last intersect_rectangle hit */
-    I32 *hits;
+    I64 *hits;
     U32 num_hits;
     U32 hits_alloc;
 } LazQuadtree;
 
-/* One cell of the index: which run of `LazIndex.intervals` is its own. The
- * file also states how many points fell in the cell, which is smaller than the
- * intervals span whenever an interval also covers a neighbour's points; no
- * query needs the difference, so it is read past rather than kept. */
+/*
+ * The octree: a box in three dimensions and a depth, and nothing else.
+ *
+ * A quadtree records which cells were subdivided in a bit per cell index,
+ * which at eight children a level would run to terabytes for a deep tree.
+ * The octree does without: a coarsened index holds few enough cells that a
+ * query tests each one's box directly, and a cell's box follows from its
+ * index -- three bits a level, x in the lowest, as the quadtree's two.
+ *
+ * F32 for the quadtree's reason. Building and querying descend by the same
+ * single-precision midpoints, so the two agree on which cell a boundary
+ * coordinate is in.
+ */
 typedef struct {
-    I32 index;
+    U32 levels;
+    F32 min_x, max_x, min_y, max_y, min_z, max_z;
+    U64 level_offset[17];
+} LazOctree;
+
+/* One cell of the index: which run of `LazIndex.intervals` is its own, and
+ * how many points fell in the cell. That is smaller than the intervals span
+ * whenever an interval also covers a neighbour's points, and is what an
+ * estimate of a query's size is made from: no query needs it to find its
+ * points, but a count is the cell's own without decoding any of them. */
+typedef struct {
+    I64 index;
     U32 first;
     U32 count;
+    U64 num_points;
 } LazIndexCell;
 
 typedef struct {
+    /* 2 for a quadtree, which is every index laszip writes, or 3 for an
+     * octree; only the one it names is filled in */
+    U32 dims;
     LazQuadtree quadtree;
+    LazOctree octree;
     LazIndexCell *cells;        /* ascending by index */
     U32 num_cells;
     LazInterval *intervals;     /* every cell's, cell-major */
@@ -100,6 +132,8 @@ typedef struct {
     LazInterval *merged;
     U32 num_merged;
     U32 merged_alloc;
+    /* how many of the cells it reached hold points, whose runs those are */
+    U32 num_used;
 
     char last_error[192];
     char last_warning[192];
@@ -130,6 +164,44 @@ BOOL laz_index_intersect_rectangle(LazIndex *ix, F64 min_x, F64 min_y,
 BOOL laz_index_intersect_circle(LazIndex *ix, F64 center_x, F64 center_y,
                                 F64 radius);
 
+/*
+ * The same for the points inside a box, which only an octree can narrow by
+ * elevation. A quadtree answers it as the rectangle under the box, leaving
+ * the elevations for the caller's own test; an octree answers the other two
+ * shapes as reaching from the lowest elevation to the highest.
+ */
+BOOL laz_index_intersect_box(LazIndex *ix, F64 min_x, F64 min_y, F64 min_z,
+                             F64 max_x, F64 max_y, F64 max_z);
+
+/*
+ * How many points a query would find, from the cells' counts alone.
+ *
+ * `high` is every point of every cell the query reaches, which is as many as
+ * it could find, and `low` those of the cells wholly inside it, which it
+ * cannot find fewer than. `estimate` shares out each cell it reaches by how
+ * much of the cell it covers -- the count a query would find were the cell's
+ * points spread evenly over it -- so it lies between the two, and the finer
+ * the cells beside the query the closer the three are.
+ */
+typedef struct {
+    F64 estimate;
+    U64 low, high;
+} LazIndexEstimate;
+
+/* The estimates of the three shapes, reaching the cells their intersect_
+ * counterparts reach. These leave the merged intervals as they were. */
+BOOL laz_index_estimate_rectangle(LazIndex *ix, F64 min_x, F64 min_y,
+                                  F64 max_x, F64 max_y, LazIndexEstimate *e);
+BOOL laz_index_estimate_circle(LazIndex *ix, F64 center_x, F64 center_y,
+                               F64 radius, LazIndexEstimate *e);
+BOOL laz_index_estimate_box(LazIndex *ix, F64 min_x, F64 min_y, F64 min_z,
+                            F64 max_x, F64 max_y, F64 max_z,
+                            LazIndexEstimate *e);
+
+/* The box of the cell with this index, as (min_x, max_x, min_y, max_y,
+ * min_z, max_z); a quadtree's reaches from minus infinity to infinity in z. */
+void laz_index_cell_box(const LazIndex *ix, I64 cell_index, F64 box[6]);
+
 void laz_index_destroy(LazIndex *ix);
 
 /* ---------------------------------------------------- shared with building */
@@ -140,11 +212,18 @@ void laz_index_destroy(LazIndex *ix);
  */
 void *laz_index_grow(void *base, U32 *alloc, U32 needed, size_t item);
 
-/* Where each level's cell indices begin; `level_offset` holds 17 of them. */
-void laz_index_level_offsets(U32 *level_offset);
+/*
+ * Where each level's cell indices begin, for a tree over `dims` dimensions --
+ * four children a cell for 2, eight for 3; `level_offset` holds 17 of them.
+ */
+void laz_index_level_offsets(U64 *level_offset, U32 dims);
 
 /* Which level a cell index belongs to, by that table. */
-U32 laz_index_level_of(const U32 *level_offset, U32 cell_index);
+U32 laz_index_level_of(const U64 *level_offset, U64 cell_index);
+
+/* The deepest tree either shape may be, which is the reference's limit for
+ * a quadtree and, at 45 bits of cell index, fits an octree in an I64. */
+#define LAZ_INDEX_MAX_LEVELS 15
 
 /*
  * Puts `n` runs in order and joins the ones no more than `threshold` apart,
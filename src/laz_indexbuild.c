@@ -30,8 +30,14 @@
  * are an array of its own. What comes out is the same index; what a reader
  * cannot tell apart is the order the cells appear in the file, which the
  * reference leaves to its hash and this leaves sorted.
+ *
+ * The tree cannot be laid until the extent of the points is known, which
+ * the reference settles with a pass over them first. A builder set up with
+ * laz_indexbuilder_setup_grid does without it: see "the provisional grid"
+ * below.
  */
 
+#include <math.h>
 #include <stdio.h>
 #include <stdarg.h>
 #include "laz_indexbuild.h"
@@ -52,77 +58,111 @@ static void build_error(LazIndexBuilder *b, const char *fmt, ...)
 /* ========================================================== the quadtree == */
 
 /*
- * The tree a cell size implies over this area, as LASquadtree::setup.
+ * One axis of the box out to whole cells, away from zero on the side each
+ * end is on, as LASquadtree::setup does it for x and for y.
+ */
+static void fit_axis(F64 lo, F64 hi, F32 cell_size, F32 *min, F32 *max)
+{
+    *min = lo >= 0 ? cell_size * (F32)(I32)(lo / cell_size)
+                   : cell_size * ((F32)(I32)(lo / cell_size) - 1);
+    *max = hi >= 0 ? cell_size * ((F32)(I32)(hi / cell_size) + 1)
+                   : cell_size * (F32)(I32)(hi / cell_size);
+}
+
+/*
+ * And out again to what `levels` levels really span, the difference split
+ * between the two ends -- the larger half below, which is the reference's
+ * rounding and decides which cell a point on a boundary lands in.
+ */
+static void square_axis(U32 levels, U32 cells, F32 cell_size,
+                        F32 *min, F32 *max)
+{
+    U32 c = (1u << levels) - cells;
+    U32 c1 = c / 2;
+    U32 c2 = c - c1;
+    *min -= c2 * cell_size;
+    *max += c1 * cell_size;
+}
+
+/*
+ * The tree a cell size implies over this area, as LASquadtree::setup, or
+ * over this volume for an octree.
  *
- * The box is grown to whole cells, then to the square the tree needs: a
- * quadtree of `levels` levels is 2^levels cells across, and the difference is
- * split between the two sides -- the larger half below, which is the
- * reference's rounding and decides which cell a point on a boundary lands in.
+ * The box is grown to whole cells, then to the square -- or cube -- the tree
+ * needs: a tree of `levels` levels is 2^levels cells across on every axis,
+ * however narrow the points are along one of them.
  */
-BOOL laz_indexbuilder_setup(LazIndexBuilder *b, F64 min_x, F64 max_x,
-                            F64 min_y, F64 max_y, F32 cell_size,
-                            U32 threshold)
+static BOOL setup_tree(LazIndexBuilder *b, U32 dims, const F64 *lo,
+                       const F64 *hi, F32 cell_size, U32 threshold)
 {
-    U32 c, c1, c2, cells_x, cells_y;
+    F32 *mins[3], *maxs[3];
+    U32 cells[3], widest = 0, c, axis;
 
     memset(b, 0, sizeof(*b));
+    b->dims = dims;
     b->threshold = threshold;
     b->last_index = -1;
+    mins[0] = &b->min_x; mins[1] = &b->min_y; mins[2] = &b->min_z;
+    maxs[0] = &b->max_x; maxs[1] = &b->max_y; maxs[2] = &b->max_z;
 
     if (!(cell_size > 0)) {
         build_error(b, "cell size %g must be positive", (double)cell_size);
         return LAZ_FALSE;
     }
-    if (!(min_x <= max_x) || !(min_y <= max_y)) {
-        build_error(b, "the area to index is inside out or not a number");
-        return LAZ_FALSE;
+    for (axis = 0; axis < dims; axis++) {
+        if (!(lo[axis] <= hi[axis])) {
+            build_error(b, "the %s to index is inside out or not a number",
+                        dims == 3 ? "volume" : "area");
+            return LAZ_FALSE;
+        }
     }
     b->cell_size = cell_size;
 
-    /* out to whole cells, away from zero on the side each end is on */
-    b->min_x = min_x >= 0 ? cell_size * (F32)(I32)(min_x / cell_size)
-                          : cell_size * ((F32)(I32)(min_x / cell_size) - 1);
-    b->max_x = max_x >= 0 ? cell_size * ((F32)(I32)(max_x / cell_size) + 1)
-                          : cell_size * (F32)(I32)(max_x / cell_size);
-    b->min_y = min_y >= 0 ? cell_size * (F32)(I32)(min_y / cell_size)
-                          : cell_size * ((F32)(I32)(min_y / cell_size) - 1);
-    b->max_y = max_y >= 0 ? cell_size * ((F32)(I32)(max_y / cell_size) + 1)
-                          : cell_size * (F32)(I32)(max_y / cell_size);
-
-    cells_x = U32_QUANTIZE((b->max_x - b->min_x) / cell_size);
-    cells_y = U32_QUANTIZE((b->max_y - b->min_y) / cell_size);
-    if (cells_x == 0 || cells_y == 0) {
-        build_error(b, "an area of %u by %u cells has nothing to index",
-                    cells_x, cells_y);
-        return LAZ_FALSE;
+    for (axis = 0; axis < dims; axis++) {
+        fit_axis(lo[axis], hi[axis], cell_size, mins[axis], maxs[axis]);
+        cells[axis] = U32_QUANTIZE((*maxs[axis] - *mins[axis]) / cell_size);
+        if (cells[axis] == 0) {
+            build_error(b, "an extent of no cells has nothing to index");
+            return LAZ_FALSE;
+        }
+        if (cells[axis] > widest) widest = cells[axis];
     }
 
-    /* the levels it takes to have that many cells across the wider side */
-    c = (cells_x > cells_y ? cells_x : cells_y) - 1;
+    /* the levels it takes to have that many cells across the widest side */
+    c = widest - 1;
     b->levels = 0;
     while (c) { c >>= 1; b->levels++; }
-    if (b->levels > 15) {
-        build_error(b, "a cell size of %g needs %u levels, over the 15 an "
-                    "index can hold", (double)cell_size, b->levels);
+    if (b->levels > LAZ_INDEX_MAX_LEVELS) {
+        build_error(b, "a cell size of %g needs %u levels, over the %d an "
+                    "index can hold", (double)cell_size, b->levels,
+                    LAZ_INDEX_MAX_LEVELS);
         return LAZ_FALSE;
     }
 
-    /* and out again to the square that many levels really covers */
-    c = (1u << b->levels) - cells_x;
-    c1 = c / 2;
-    c2 = c - c1;
-    b->min_x -= c2 * cell_size;
-    b->max_x += c1 * cell_size;
-    c = (1u << b->levels) - cells_y;
-    c1 = c / 2;
-    c2 = c - c1;
-    b->min_y -= c2 * cell_size;
-    b->max_y += c1 * cell_size;
-
-    laz_index_level_offsets(b->level_offset);
+    for (axis = 0; axis < dims; axis++)
+        square_axis(b->levels, cells[axis], cell_size, mins[axis],
+                    maxs[axis]);
+
+    laz_index_level_offsets(b->level_offset, dims);
     return LAZ_TRUE;
 }
 
+BOOL laz_indexbuilder_setup(LazIndexBuilder *b, F64 min_x, F64 max_x,
+                            F64 min_y, F64 max_y, F32 cell_size,
+                            U32 threshold)
+{
+    const F64 lo[2] = {min_x, min_y}, hi[2] = {max_x, max_y};
+    return setup_tree(b, 2, lo, hi, cell_size, threshold);
+}
+
+BOOL laz_indexbuilder_setup_octree(LazIndexBuilder *b, F64 min_x, F64 max_x,
+                                   F64 min_y, F64 max_y, F64 min_z,
+                                   F64 max_z, F32 cell_size, U32 threshold)
+{
+    const F64 lo[3] = {min_x, min_y, min_z}, hi[3] = {max_x, max_y, max_z};
+    return setup_tree(b, 3, lo, hi, cell_size, threshold);
+}
+
 /*
  * Which leaf a coordinate falls in, as LASquadtree::get_level_index.
  *
@@ -130,16 +170,21 @@ BOOL laz_indexbuilder_setup(LazIndexBuilder *b, F64 min_x, F64 max_x,
  * descent: they decide which side of a split a coordinate is on, and a
  * compiler that kept them wider would put a boundary point in a different
  * cell than laszip does.
+ *
+ * An octree splits the elevations as well, into the third bit of each
+ * level's index.
  */
-static U32 build_cell_index(const LazIndexBuilder *b, F64 x, F64 y)
+static U64 build_cell_index(const LazIndexBuilder *b, F64 x, F64 y, F64 z)
 {
-    volatile F32 cell_mid_x, cell_mid_y;
+    volatile F32 cell_mid_x, cell_mid_y, cell_mid_z;
     F32 cell_min_x = b->min_x, cell_max_x = b->max_x;
     F32 cell_min_y = b->min_y, cell_max_y = b->max_y;
-    U32 level_index = 0, level = b->levels;
+    F32 cell_min_z = b->min_z, cell_max_z = b->max_z;
+    U64 level_index = 0;
+    U32 level = b->levels;
 
     while (level) {
-        level_index <<= 2;
+        level_index <<= b->dims;
         cell_mid_x = (cell_min_x + cell_max_x) / 2;
         cell_mid_y = (cell_min_y + cell_max_y) / 2;
         if (x < cell_mid_x) {
@@ -154,34 +199,226 @@ static U32 build_cell_index(const LazIndexBuilder *b, F64 x, F64 y)
             cell_min_y = cell_mid_y;
             level_index |= 2;
         }
+        if (b->dims == 3) {
+            cell_mid_z = (cell_min_z + cell_max_z) / 2;
+            if (z < cell_mid_z) {
+                cell_max_z = cell_mid_z;
+            } else {
+                cell_min_z = cell_mid_z;
+                level_index |= 4;
+            }
+        }
         level--;
     }
     return b->level_offset[b->levels] + level_index;
 }
 
+/* How many children a cell has: four in a quadtree, eight in an octree. */
+#define FANOUT(b) (1u << (b)->dims)
+
 /*
- * The parent of a cell and the four children of that parent, as
+ * The parent of a cell and the children of that parent, as
  * LASquadtree::coarsen. False for a cell at the root, which has no parent.
  */
-static BOOL build_coarsen(const LazIndexBuilder *b, I32 cell_index,
-                          I32 *parent, I32 siblings[4])
+static BOOL build_coarsen(const LazIndexBuilder *b, I64 cell_index,
+                          I64 *parent, I64 siblings[8])
 {
-    U32 level = laz_index_level_of(b->level_offset, (U32)cell_index);
-    U32 level_index, first;
-    int i;
-
-    if (cell_index < 0 || level == 0) return LAZ_FALSE;
-    level_index = (U32)cell_index - b->level_offset[level];
-    *parent = (I32)(b->level_offset[level - 1] + (level_index >> 2));
-    first = b->level_offset[level] + ((level_index >> 2) << 2);
-    for (i = 0; i < 4; i++) siblings[i] = (I32)(first + (U32)i);
+    U32 level, i;
+    U64 level_index, first;
+
+    if (cell_index < 0) return LAZ_FALSE;
+    level = laz_index_level_of(b->level_offset, (U64)cell_index);
+    if (level == 0) return LAZ_FALSE;
+    level_index = (U64)cell_index - b->level_offset[level];
+    *parent = (I64)(b->level_offset[level - 1] + (level_index >> b->dims));
+    first = b->level_offset[level] + ((level_index >> b->dims) << b->dims);
+    for (i = 0; i < FANOUT(b); i++) siblings[i] = (I64)(first + i);
+    return LAZ_TRUE;
+}
+
+/* ================================================= the provisional grid = */
+
+/*
+ * Bucketing points before the tree exists.
+ *
+ * Every leaf of the tree is a cell of one grid, whatever the extent: setup
+ * grows the box out to whole multiples of the cell size and then by whole
+ * cells, so the leaves' edges fall at multiples of it. A point's leaf is
+ * therefore its cell of that grid, which needs nothing but the cell size --
+ * and a cell's runs of points are the same runs whichever name it goes by
+ * while they are gathered. So the points go into grid cells as they arrive,
+ * with the extent noted on the way, and once the last one is in, the tree is
+ * laid over that extent and each grid cell renamed as the leaf it is. One
+ * pass over the points instead of two, which for a large file is half the
+ * cost of indexing it.
+ */
+
+/* How far from the first point's cell, in cells along an axis, the grid can
+ * name: 21 bits an axis, three to an I64. A tree holds 2^15 cells across, so
+ * the grid can be wider than any tree by far. */
+#define GRID_SPAN ((I64)1 << 20)
+#define GRID_BITS 21
+
+static int build_cell_cmp(const void *a, const void *b);
+
+BOOL laz_indexbuilder_setup_grid(LazIndexBuilder *b, U32 dims, F32 cell_size,
+                                 U32 threshold)
+{
+    memset(b, 0, sizeof(*b));
+    b->dims = dims;
+    b->threshold = threshold;
+    b->last_index = -1;
+    b->provisional = LAZ_TRUE;
+    if (!(cell_size > 0)) {
+        build_error(b, "cell size %g must be positive", (double)cell_size);
+        return LAZ_FALSE;
+    }
+    b->cell_size = cell_size;
+    return LAZ_TRUE;
+}
+
+/*
+ * The grid cell a coordinate is in: the `g` for which g * size <= v <
+ * (g + 1) * size, by the same products the tree's edges are checked against
+ * when the grid becomes a tree, rather than by a division that could round
+ * a coordinate on an edge into the cell beside it.
+ */
+static BOOL grid_cell(F64 v, F64 size, I64 *g)
+{
+    F64 q = floor(v / size);
+    if (!(q > -4e18 && q < 4e18)) return LAZ_FALSE;     /* NaN, or too far */
+    *g = (I64)q;
+    while ((F64)*g * size > v) (*g)--;
+    while ((F64)(*g + 1) * size <= v) (*g)++;
+    return LAZ_TRUE;
+}
+
+/* A point's grid cell as one index: its offset from the first point's cell,
+ * GRID_BITS to an axis. */
+static BOOL grid_index(LazIndexBuilder *b, const F64 *v, I64 *index)
+{
+    U64 key = 0;
+    U32 axis;
+
+    for (axis = 0; axis < b->dims; axis++) {
+        I64 g, d;
+        if (!grid_cell(v[axis], (F64)b->cell_size, &g)) {
+            build_error(b, "point %llu is not somewhere a cell size of %g "
+                        "can place", (unsigned long long)b->num_points,
+                        (double)b->cell_size);
+            return LAZ_FALSE;
+        }
+        if (b->num_points == 0) b->grid_origin[axis] = g;
+        d = g - b->grid_origin[axis];
+        if (d <= -GRID_SPAN || d >= GRID_SPAN) {
+            build_error(b, "a cell size of %g needs over 20 levels, over "
+                        "the %d an index can hold", (double)b->cell_size,
+                        LAZ_INDEX_MAX_LEVELS);
+            return LAZ_FALSE;
+        }
+        key = (key << GRID_BITS) | (U64)(d + GRID_SPAN);
+    }
+    *index = (I64)key;
+    return LAZ_TRUE;
+}
+
+/*
+ * Whether a tree's edges along one axis are the grid's: every leaf boundary
+ * the descent would compute, in the single precision it computes them in,
+ * exactly a multiple of the cell size. -1 if there was no memory to ask.
+ */
+static int axis_aligned(F32 min, F32 max, U32 levels, F64 size)
+{
+    U32 n = 1u << levels, step, i;
+    F32 *edges = (F32 *)malloc((size_t)(n + 1) * sizeof(F32));
+    I64 first;
+    int aligned = 1;
+
+    if (!edges) return -1;
+    edges[0] = min;
+    edges[n] = max;
+    for (step = n; step > 1; step /= 2) {
+        for (i = 0; i < n; i += step) {
+            volatile F32 mid = (edges[i] + edges[i + step]) / 2;
+            edges[i + step / 2] = mid;
+        }
+    }
+    first = (I64)floor((F64)edges[0] / size + 0.5);
+    for (i = 0; i <= n && aligned; i++)
+        aligned = ((F64)edges[i] == (F64)(first + (I64)i) * size);
+    free(edges);
+    return aligned;
+}
+
+BOOL laz_indexbuilder_reroot(LazIndexBuilder *b, BOOL *aligned)
+{
+    LazBuildCell *cells = b->cells;
+    U32 num_cells = b->num_cells, cells_alloc = b->cells_alloc;
+    I64 origin[3];
+    F64 lo[3], hi[3], size;
+    U64 num_points = b->num_points;
+    U32 dims = b->dims, axis, i;
+    BOOL ok;
+
+    *aligned = LAZ_TRUE;
+    if (!b->provisional) return LAZ_TRUE;
+    if (num_points == 0) {
+        build_error(b, "there are no points to lay a tree over");
+        return LAZ_FALSE;
+    }
+    memcpy(origin, b->grid_origin, sizeof(origin));
+    memcpy(lo, b->extent_min, sizeof(lo));
+    memcpy(hi, b->extent_max, sizeof(hi));
+
+    /* setup starts from nothing, so what it would clear is put back after */
+    ok = setup_tree(b, dims, lo, hi, b->cell_size, b->threshold);
+    b->cells = cells;
+    b->num_cells = num_cells;
+    b->cells_alloc = cells_alloc;
+    b->num_points = num_points;
+    memcpy(b->grid_origin, origin, sizeof(origin));
+    memcpy(b->extent_min, lo, sizeof(lo));
+    memcpy(b->extent_max, hi, sizeof(hi));
+    if (!ok) return LAZ_FALSE;
+
+    size = (F64)b->cell_size;
+    for (axis = 0; axis < dims; axis++) {
+        F32 min = axis == 0 ? b->min_x : axis == 1 ? b->min_y : b->min_z;
+        F32 max = axis == 0 ? b->max_x : axis == 1 ? b->max_y : b->max_z;
+        int fits = axis_aligned(min, max, b->levels, size);
+        if (fits < 0) {
+            build_error(b, "out of memory building the spatial index");
+            return LAZ_FALSE;
+        }
+        if (!fits) {
+            *aligned = LAZ_FALSE;
+            return LAZ_TRUE;
+        }
+    }
+
+    /* each grid cell is one leaf, named by where its middle falls -- which
+     * is nowhere near an edge for the descent to round the wrong way */
+    for (i = 0; i < b->num_cells; i++) {
+        U64 key = (U64)b->cells[i].index;
+        F64 centre[3] = {0.0, 0.0, 0.0};
+        for (axis = dims; axis-- > 0;) {
+            I64 d = (I64)(key & (((U64)1 << GRID_BITS) - 1)) - GRID_SPAN;
+            centre[axis] = ((F64)(origin[axis] + d) + 0.5) * size;
+            key >>= GRID_BITS;
+        }
+        b->cells[i].index = (I64)build_cell_index(b, centre[0], centre[1],
+                                                  centre[2]);
+    }
+    qsort(b->cells, b->num_cells, sizeof(LazBuildCell), build_cell_cmp);
+    b->last_index = -1;
+    b->provisional = LAZ_FALSE;
     return LAZ_TRUE;
 }
 
 /* ============================================================== the cells = */
 
 /* Where a cell index sits in the array, or where it would be inserted. */
-static U32 cell_position(const LazIndexBuilder *b, I32 index, BOOL *found)
+static U32 cell_position(const LazIndexBuilder *b, I64 index, BOOL *found)
 {
     U32 low = 0, high = b->num_cells;
 
@@ -195,7 +432,7 @@ static U32 cell_position(const LazIndexBuilder *b, I32 index, BOOL *found)
 }
 
 /* Makes an empty cell at `at`, keeping the array ascending by index. */
-static LazBuildCell *cell_insert(LazIndexBuilder *b, U32 at, I32 index)
+static LazBuildCell *cell_insert(LazIndexBuilder *b, U32 at, I64 index)
 {
     LazBuildCell *grown = (LazBuildCell *)laz_index_grow(
         b->cells, &b->cells_alloc, b->num_cells + 1, sizeof(LazBuildCell));
@@ -236,11 +473,27 @@ static BOOL cell_add_interval(LazIndexBuilder *b, LazBuildCell *cell,
  * starts another. The cell a point falls in is remembered because a scan line
  * crosses a cell many times over before it leaves.
  */
-BOOL laz_indexbuilder_add(LazIndexBuilder *b, F64 x, F64 y, U64 point_index)
+BOOL laz_indexbuilder_add(LazIndexBuilder *b, F64 x, F64 y, F64 z,
+                          U64 point_index)
 {
-    I32 index = (I32)build_cell_index(b, x, y);
+    const F64 v[3] = {x, y, z};
+    I64 index;
     LazBuildCell *cell;
     LazInterval *last;
+    U32 axis;
+
+    if (b->provisional) {
+        if (!grid_index(b, v, &index)) return LAZ_FALSE;
+    } else {
+        index = (I64)build_cell_index(b, x, y, z);
+    }
+    for (axis = 0; axis < b->dims; axis++) {
+        if (b->num_points == 0 || v[axis] < b->extent_min[axis])
+            b->extent_min[axis] = v[axis];
+        if (b->num_points == 0 || v[axis] > b->extent_max[axis])
+            b->extent_max[axis] = v[axis];
+    }
+    b->num_points++;
 
     if (b->last_index == index) {
         cell = &b->cells[b->last_cell];
@@ -333,12 +586,13 @@ static int build_cell_cmp(const void *a, const void *b)
 }
 
 /*
- * Merges every group of four sibling cells that holds few enough points
- * between them, over and over until a pass changes nothing.
+ * Merges every group of sibling cells that holds few enough points between
+ * them, over and over until a pass changes nothing.
  *
  * LASindex::complete's rule: all four have to be there -- a parent standing
  * for a partly-filled quadrant would claim points it does not hold -- and
- * their points together have to be under `minimum_points`.
+ * their points together have to be under `minimum_points`. All eight, in an
+ * octree.
  */
 static BOOL coarsen_cells(LazIndexBuilder *b, U32 minimum_points)
 {
@@ -356,16 +610,16 @@ static BOOL coarsen_cells(LazIndexBuilder *b, U32 minimum_points)
         }
 
         for (i = 0; i < b->num_cells; i++) {
-            I32 parent, siblings[4];
-            LazBuildCell *group[4];
-            U32 positions[4], found = 0, k;
+            I64 parent, siblings[8];
+            LazBuildCell *group[8];
+            U32 positions[8], found = 0, k;
             U64 full = 0;
 
             if (dropped[i]) continue;
             if (!build_coarsen(b, b->cells[i].index, &parent, siblings))
                 continue;
 
-            for (k = 0; k < 4; k++) {
+            for (k = 0; k < FANOUT(b); k++) {
                 BOOL is_there;
                 U32 at = cell_position(b, siblings[k], &is_there);
                 if (!is_there || dropped[at]) break;
@@ -374,17 +628,17 @@ static BOOL coarsen_cells(LazIndexBuilder *b, U32 minimum_points)
                 full += b->cells[at].full;
                 found++;
             }
-            if (found != 4 || full >= minimum_points) continue;
+            if (found != FANOUT(b) || full >= minimum_points) continue;
 
             /* the parent takes their place, at the position the first of
              * them held -- the array stays ascending, since a parent's index
              * is below every one of its children's */
-            if (!cells_merge(b, &b->cells[positions[0]], group, 4)) {
+            if (!cells_merge(b, &b->cells[positions[0]], group, found)) {
                 free(dropped);
                 return LAZ_FALSE;
             }
             b->cells[positions[0]].index = parent;
-            for (k = 1; k < 4; k++) dropped[positions[k]] = LAZ_TRUE;
+            for (k = 1; k < found; k++) dropped[positions[k]] = LAZ_TRUE;
             coarsened = LAZ_TRUE;
         }
 
@@ -531,16 +785,31 @@ BOOL laz_indexbuilder_serialize(LazIndexBuilder *b, LazOutStream *out)
     laz_outstream_put32(out, 0);                /* version */
 
     put_signature(out, "LASS");
-    laz_outstream_put32(out, 0);                /* a quadtree, not a grid */
-    put_signature(out, "LASQ");
-    laz_outstream_put32(out, 0);                /* version */
-    laz_outstream_put32(out, b->levels);
-    laz_outstream_put32(out, 0);                /* level index: no tiling */
-    laz_outstream_put32(out, 0);                /* implicit levels */
-    put_f32(out, b->min_x);
-    put_f32(out, b->max_x);
-    put_f32(out, b->min_y);
-    put_f32(out, b->max_y);
+    if (b->dims == 3) {
+        /* a type laszip does not know, so that it refuses an octree rather
+         * than reading one as a quadtree */
+        laz_outstream_put32(out, 1);
+        put_signature(out, "LASO");
+        laz_outstream_put32(out, 0);            /* version */
+        laz_outstream_put32(out, b->levels);
+        put_f32(out, b->min_x);
+        put_f32(out, b->max_x);
+        put_f32(out, b->min_y);
+        put_f32(out, b->max_y);
+        put_f32(out, b->min_z);
+        put_f32(out, b->max_z);
+    } else {
+        laz_outstream_put32(out, 0);            /* a quadtree, not a grid */
+        put_signature(out, "LASQ");
+        laz_outstream_put32(out, 0);            /* version */
+        laz_outstream_put32(out, b->levels);
+        laz_outstream_put32(out, 0);            /* level index: no tiling */
+        laz_outstream_put32(out, 0);            /* implicit levels */
+        put_f32(out, b->min_x);
+        put_f32(out, b->max_x);
+        put_f32(out, b->min_y);
+        put_f32(out, b->max_y);
+    }
 
     put_signature(out, "LASV");
     /* version 1 widens the point indices, for a file with more points than a
@@ -549,7 +818,8 @@ BOOL laz_indexbuilder_serialize(LazIndexBuilder *b, LazOutStream *out)
     laz_outstream_put32(out, b->num_cells);
     for (i = 0; i < b->num_cells; i++) {
         const LazBuildCell *cell = &b->cells[i];
-        laz_outstream_put32(out, (U32)cell->index);
+        if (b->dims == 3) laz_outstream_put64(out, (U64)cell->index);
+        else laz_outstream_put32(out, (U32)cell->index);
         laz_outstream_put32(out, cell->count);
         if (wide) laz_outstream_put64(out, cell->full);
         else laz_outstream_put32(out, (U32)cell->full);
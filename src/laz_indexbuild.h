@@ -13,6 +13,9 @@
  * What lasindex does: a quadtree over the area the points cover, every point
  * in the leaf it falls in as a run of consecutive point indices, and then a
  * coarsening that trades a little decoding for a much smaller index.
+ *
+ * Or the same over the volume they cover, as an octree: everything below is
+ * the one builder with eight children a cell instead of four.
  */
 #ifndef LAZ_INDEXBUILD_H
 #define LAZ_INDEXBUILD_H
@@ -36,7 +39,7 @@ typedef struct {
     LazInterval *intervals;
     U32 count, alloc;
     U64 full;
-    I32 index;
+    I64 index;
 } LazBuildCell;
 
 /*
@@ -46,8 +49,11 @@ typedef struct {
  */
 typedef struct {
     F32 cell_size, min_x, max_x, min_y, max_y;
+    /* an octree's elevations; a quadtree leaves them at zero */
+    F32 min_z, max_z;
+    U32 dims;                           /* 2 for a quadtree, 3 an octree */
     U32 levels;
-    U32 level_offset[17];
+    U64 level_offset[17];
     LazBuildCell *cells;                /* ascending by index */
     U32 num_cells, cells_alloc;
     /* how far apart two points in a cell may be before the second starts a
@@ -55,8 +61,17 @@ typedef struct {
     U32 threshold;
     /* the cell the last point fell in, since a scan line crosses one many
      * times over before it leaves; -1 for none */
-    I32 last_index;
+    I64 last_index;
     U32 last_cell;
+    /* Bucketing into a grid of cells `cell_size` across rather than into the
+     * tree, which cannot be laid until the extent of every point is known;
+     * laz_indexbuilder_reroot turns grid cells into leaves. A cell's index
+     * is then its offset from `grid_origin`, the cell of the first point. */
+    BOOL provisional;
+    I64 grid_origin[3];
+    /* the box the points added so far cover, and how many there were */
+    F64 extent_min[3], extent_max[3];
+    U64 num_points;
     char last_error[192];
     BOOL has_error;
 } LazIndexBuilder;
@@ -69,8 +84,44 @@ BOOL laz_indexbuilder_setup(LazIndexBuilder *b, F64 min_x, F64 max_x,
                             F64 min_y, F64 max_y, F32 cell_size,
                             U32 threshold);
 
-/* One point, at its georeferenced coordinate. Points arrive in file order. */
-BOOL laz_indexbuilder_add(LazIndexBuilder *b, F64 x, F64 y, U64 point_index);
+/*
+ * An octree over this volume whose leaves are cubes about `cell_size` on a
+ * side, which is what laz_index_intersect_box narrows by elevation with.
+ */
+BOOL laz_indexbuilder_setup_octree(LazIndexBuilder *b, F64 min_x, F64 max_x,
+                                   F64 min_y, F64 max_y, F64 min_z,
+                                   F64 max_z, F32 cell_size, U32 threshold);
+
+/*
+ * A tree over an extent not yet known, for building in one pass over the
+ * points rather than two: they are bucketed into a grid of cells `cell_size`
+ * across until laz_indexbuilder_reroot lays the tree over what they covered.
+ * `dims` is 2 for a quadtree and 3 for an octree.
+ */
+BOOL laz_indexbuilder_setup_grid(LazIndexBuilder *b, U32 dims, F32 cell_size,
+                                 U32 threshold);
+
+/*
+ * Lays the tree over the points a grid-bucketed builder was given, turning
+ * its grid cells into the leaves they are. False leaves the reason in
+ * `last_error`.
+ *
+ * Whether a grid cell is one leaf depends on the tree's single-precision
+ * boundaries landing exactly on the grid's, which they do for any cell size
+ * and extent a float holds exactly -- whole metres, halves, quarters. Where
+ * they do not, `*aligned` comes back false and the builder is no use: the
+ * points have to go through a builder set up over `extent_min`/`extent_max`
+ * again, since which leaf a point on a boundary belongs in is a question
+ * only the point can answer.
+ */
+BOOL laz_indexbuilder_reroot(LazIndexBuilder *b, BOOL *aligned);
+
+/*
+ * One point, at its georeferenced coordinate; a quadtree has no use for `z`.
+ * Points arrive in file order.
+ */
+BOOL laz_indexbuilder_add(LazIndexBuilder *b, F64 x, F64 y, F64 z,
+                          U64 point_index);
 
 /*
  * Coarsens the tree, once every point is in it: cells holding fewer than
@@ -84,7 +135,8 @@ BOOL laz_indexbuilder_complete(LazIndexBuilder *b, U32 minimum_points,
 /*
  * The index written out, which is a ".lax" file's whole contents and what
  * laz_index_read reads back: the LASX header, the quadtree, then the cells
- * and their runs.
+ * and their runs. An octree goes out the same way with its own record where
+ * the quadtree's would be.
  */
 BOOL laz_indexbuilder_serialize(LazIndexBuilder *b, LazOutStream *out);
 
@@ -115,6 +115,28 @@ void laz_ic_free(LazIntCompressor *ic)
     ic->models_created = LAZ_FALSE;
 }
 
+BOOL laz_ic_copy(LazIntCompressor *dst, const LazIntCompressor *src)
+{
+    U32 i;
+    BOOL ok = LAZ_TRUE;
+
+    *dst = *src;
+    dst->m_bits = NULL;
+    dst->m_corrector = NULL;
+    if (src->m_bits) {
+        dst->m_bits = laz_symbol_models_copy(src->m_bits, src->contexts);
+        if (!dst->m_bits) ok = LAZ_FALSE;
+    }
+    if (src->m_corrector) {
+        dst->m_corrector = (LazSymbolModel *)laz_model_calloc(src->corr_bits + 1,
+                                                             sizeof(LazSymbolModel));
+        if (!dst->m_corrector) return LAZ_FALSE;
+        for (i = 1; i <= src->corr_bits; i++)
+            ok = laz_symbol_model_copy(&dst->m_corrector[i], &src->m_corrector[i]) && ok;
+    }
+    return ok;
+}
+
 /* Decodes which magnitude bucket the corrector falls in, then its exact
  * location within that bucket. */
 static I32 read_corrector(LazIntCompressor *ic, LazSymbolModel *m_bits)
@@ -51,6 +51,10 @@ void laz_ic_setup_enc(LazIntCompressor *ic, LazEncoder *enc, U32 bits, U32 conte
 BOOL laz_ic_init_decompressor(LazIntCompressor *ic);
 BOOL laz_ic_init_compressor(LazIntCompressor *ic);
 void laz_ic_free(LazIntCompressor *ic);
+/* Makes *dst a copy of *src, models and all, coding through the same decoder
+ * or encoder. On failure it returns LAZ_FALSE, and *dst holds only what it
+ * copied, for laz_ic_free. */
+BOOL laz_ic_copy(LazIntCompressor *dst, const LazIntCompressor *src);
 
 I32 laz_ic_decompress(LazIntCompressor *ic, I32 pred, U32 context);
 void laz_ic_compress(LazIntCompressor *ic, I32 pred, I32 real, U32 context);
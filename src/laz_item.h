@@ -330,6 +330,17 @@ static inline LazSymbolModel *laz_bank_get(LazSymbolModel *m, U8 *created, U32 i
     return &m[idx];
 }
 
+/* Copies a whole bank, the models never created included, which copy as the
+ * shape they were set up with. `created` is the caller's to copy. */
+static inline BOOL laz_bank_copy(LazSymbolModel *dst, const LazSymbolModel *src,
+                                 U32 n)
+{
+    U32 i;
+    BOOL ok = LAZ_TRUE;
+    for (i = 0; i < n; i++) ok = laz_symbol_model_copy(&dst[i], &src[i]) && ok;
+    return ok;
+}
+
 static inline void laz_bank_free(LazSymbolModel *m, U32 n)
 {
     U32 i;
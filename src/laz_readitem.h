@@ -55,6 +55,11 @@ struct LazReadItem {
      * yielding zero-filled points. */
     BOOL (*overran)(LazReadItem *self);
     void (*destroy)(LazReadItem *self);
+    /* flat (v1/v2) compressed readers only: a reader in the state this one is
+     * in, with models of its own but decoding through the same decoder, or
+     * NULL where one could not be allocated. What a checkpoint of a POINTWISE
+     * file keeps; see laz_readpoint_keep_checkpoints. */
+    LazReadItem *(*clone)(const LazReadItem *self);
 
     /* compressed readers only: TRUE once read() has given up on a point
      * because a model it needed could not be allocated. Those models are
@@ -77,6 +82,20 @@ static inline void laz_readitem_destroy(LazReadItem *r)
     free(r);
 }
 
+/*
+ * How a clone() ends: `copy` starts as a byte-for-byte copy of the reader,
+ * and each model or buffer it owns is then copied over the one it shares.
+ * Every one is copied whether or not the one before it failed, so that
+ * nothing is left shared -- and then a failed copy can be destroyed like any
+ * other reader.
+ */
+static inline LazReadItem *laz_readitem_cloned(LazReadItem *copy, BOOL ok)
+{
+    if (ok) return copy;
+    laz_readitem_destroy(copy);
+    return NULL;
+}
+
 /* --- raw readers (lasreaditemraw.hpp): the on-disk/host byte-order boundary --- */
 LazReadItem *laz_readitem_raw_point10(LazStream *in);
 LazReadItem *laz_readitem_raw_gpstime11(LazStream *in);
@@ -121,6 +140,12 @@ LazReadItem *laz_readitem_v4_rgbnir14(LazDecoder *dec, U32 decompress_selective)
 LazReadItem *laz_readitem_v4_byte14(LazDecoder *dec, U32 number, U32 decompress_selective);
 LazReadItem *laz_readitem_v4_wavepacket14(LazDecoder *dec, U32 decompress_selective);
 
+/* Reads a layered chunk's layers through windows over the stream, rather than
+ * whole, when those it decodes come to more than `num_bytes`; returns what the
+ * limit was. For the calling thread alone: it is there for the tests, which
+ * need small chunks read the way only a very large one otherwise is. */
+U64 laz_layer_window_above(U64 num_bytes);
+
 /* Selective-decompression flags (laszip_api.h). Only the v3/v4 readers honour
  * them; everything else always decodes in full. */
 #define LAZ_DECOMPRESS_SELECTIVE_ALL                0xFFFFFFFFu
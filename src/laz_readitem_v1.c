@@ -131,6 +131,26 @@ static void p10v1_destroy(LazReadItem *self)
     laz_bank_free(r->m_user_data, 256);
 }
 
+static LazReadItem *p10v1_clone(const LazReadItem *self)
+{
+    const Point10v1 *r = (const Point10v1 *)self;
+    Point10v1 *c = (Point10v1 *)malloc(sizeof(Point10v1));
+    BOOL ok;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Point10v1));
+    ok = laz_ic_copy(&c->ic_dx, &r->ic_dx);
+    ok = laz_ic_copy(&c->ic_dy, &r->ic_dy) && ok;
+    ok = laz_ic_copy(&c->ic_z, &r->ic_z) && ok;
+    ok = laz_ic_copy(&c->ic_intensity, &r->ic_intensity) && ok;
+    ok = laz_ic_copy(&c->ic_scan_angle_rank, &r->ic_scan_angle_rank) && ok;
+    ok = laz_ic_copy(&c->ic_point_source_ID, &r->ic_point_source_ID) && ok;
+    ok = laz_symbol_model_copy(&c->m_changed_values, &r->m_changed_values) && ok;
+    ok = laz_bank_copy(c->m_bit_byte, r->m_bit_byte, 256) && ok;
+    ok = laz_bank_copy(c->m_classification, r->m_classification, 256) && ok;
+    ok = laz_bank_copy(c->m_user_data, r->m_user_data, 256) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v1_point10(LazDecoder *dec)
 {
     Point10v1 *r = (Point10v1 *)calloc(1, sizeof(Point10v1));
@@ -138,6 +158,7 @@ LazReadItem *laz_readitem_v1_point10(LazDecoder *dec)
     r->base.read = p10v1_read;
     r->base.init = p10v1_init;
     r->base.destroy = p10v1_destroy;
+    r->base.clone = p10v1_clone;
     r->base.dec = dec;
 
     laz_ic_setup_dec(&r->ic_dx, dec, 32, 1, 8, 0);
@@ -241,6 +262,19 @@ static void gps11v1_destroy(LazReadItem *self)
     laz_ic_free(&r->ic_gpstime);
 }
 
+static LazReadItem *gps11v1_clone(const LazReadItem *self)
+{
+    const Gpstime11v1 *r = (const Gpstime11v1 *)self;
+    Gpstime11v1 *c = (Gpstime11v1 *)malloc(sizeof(Gpstime11v1));
+    BOOL ok;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Gpstime11v1));
+    ok = laz_symbol_model_copy(&c->m_gpstime_multi, &r->m_gpstime_multi);
+    ok = laz_symbol_model_copy(&c->m_gpstime_0diff, &r->m_gpstime_0diff) && ok;
+    ok = laz_ic_copy(&c->ic_gpstime, &r->ic_gpstime) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v1_gpstime11(LazDecoder *dec)
 {
     Gpstime11v1 *r = (Gpstime11v1 *)calloc(1, sizeof(Gpstime11v1));
@@ -248,6 +282,7 @@ LazReadItem *laz_readitem_v1_gpstime11(LazDecoder *dec)
     r->base.read = gps11v1_read;
     r->base.init = gps11v1_init;
     r->base.destroy = gps11v1_destroy;
+    r->base.clone = gps11v1_clone;
     r->base.dec = dec;
     laz_symbol_model_setup(&r->m_gpstime_multi, LASZIP_GPSTIME_MULTIMAX, LAZ_FALSE);
     laz_symbol_model_setup(&r->m_gpstime_0diff, 3, LAZ_FALSE);
@@ -309,6 +344,18 @@ static void rgb12v1_destroy(LazReadItem *self)
     laz_ic_free(&r->ic_rgb);
 }
 
+static LazReadItem *rgb12v1_clone(const LazReadItem *self)
+{
+    const Rgb12v1 *r = (const Rgb12v1 *)self;
+    Rgb12v1 *c = (Rgb12v1 *)malloc(sizeof(Rgb12v1));
+    BOOL ok;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Rgb12v1));
+    ok = laz_symbol_model_copy(&c->m_byte_used, &r->m_byte_used);
+    ok = laz_ic_copy(&c->ic_rgb, &r->ic_rgb) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v1_rgb12(LazDecoder *dec)
 {
     Rgb12v1 *r = (Rgb12v1 *)calloc(1, sizeof(Rgb12v1));
@@ -316,6 +363,7 @@ LazReadItem *laz_readitem_v1_rgb12(LazDecoder *dec)
     r->base.read = rgb12v1_read;
     r->base.init = rgb12v1_init;
     r->base.destroy = rgb12v1_destroy;
+    r->base.clone = rgb12v1_clone;
     r->base.dec = dec;
     laz_symbol_model_setup(&r->m_byte_used, 64, LAZ_FALSE);
     laz_ic_setup_dec(&r->ic_rgb, dec, 8, 6, 8, 0);
@@ -358,6 +406,20 @@ static void bytev1_destroy(LazReadItem *self)
     free(r->last_item);
 }
 
+static LazReadItem *bytev1_clone(const LazReadItem *self)
+{
+    const Bytev1 *r = (const Bytev1 *)self;
+    Bytev1 *c = (Bytev1 *)malloc(sizeof(Bytev1));
+    BOOL ok;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Bytev1));
+    ok = laz_ic_copy(&c->ic_byte, &r->ic_byte);
+    c->last_item = (U8 *)malloc(r->number ? r->number : 1);
+    if (c->last_item) memcpy(c->last_item, r->last_item, r->number);
+    else ok = LAZ_FALSE;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v1_byte(LazDecoder *dec, U32 number)
 {
     Bytev1 *r = (Bytev1 *)calloc(1, sizeof(Bytev1));
@@ -365,6 +427,7 @@ LazReadItem *laz_readitem_v1_byte(LazDecoder *dec, U32 number)
     r->base.read = bytev1_read;
     r->base.init = bytev1_init;
     r->base.destroy = bytev1_destroy;
+    r->base.clone = bytev1_clone;
     r->base.dec = dec;
     r->number = number;
     laz_ic_setup_dec(&r->ic_byte, dec, 8, number, 8, 0);
@@ -460,6 +523,24 @@ static void wp13v1_destroy(LazReadItem *self)
     laz_ic_free(&r->ic_xyz);
 }
 
+static LazReadItem *wp13v1_clone(const LazReadItem *self)
+{
+    const Wavepacket13v1 *r = (const Wavepacket13v1 *)self;
+    Wavepacket13v1 *c = (Wavepacket13v1 *)malloc(sizeof(Wavepacket13v1));
+    BOOL ok;
+    U32 i;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Wavepacket13v1));
+    ok = laz_symbol_model_copy(&c->m_packet_index, &r->m_packet_index);
+    for (i = 0; i < 4; i++)
+        ok = laz_symbol_model_copy(&c->m_offset_diff[i], &r->m_offset_diff[i]) && ok;
+    ok = laz_ic_copy(&c->ic_offset_diff, &r->ic_offset_diff) && ok;
+    ok = laz_ic_copy(&c->ic_packet_size, &r->ic_packet_size) && ok;
+    ok = laz_ic_copy(&c->ic_return_point, &r->ic_return_point) && ok;
+    ok = laz_ic_copy(&c->ic_xyz, &r->ic_xyz) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v1_wavepacket13(LazDecoder *dec)
 {
     Wavepacket13v1 *r = (Wavepacket13v1 *)calloc(1, sizeof(Wavepacket13v1));
@@ -468,6 +549,7 @@ LazReadItem *laz_readitem_v1_wavepacket13(LazDecoder *dec)
     r->base.read = wp13v1_read;
     r->base.init = wp13v1_init;
     r->base.destroy = wp13v1_destroy;
+    r->base.clone = wp13v1_clone;
     r->base.dec = dec;
 
     laz_symbol_model_setup(&r->m_packet_index, 256, LAZ_FALSE);
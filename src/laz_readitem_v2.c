@@ -187,6 +187,27 @@ static void p10v2_destroy(LazReadItem *self)
     laz_ic_free(&r->ic_z);
 }
 
+static LazReadItem *p10v2_clone(const LazReadItem *self)
+{
+    const Point10v2 *r = (const Point10v2 *)self;
+    Point10v2 *c = (Point10v2 *)malloc(sizeof(Point10v2));
+    BOOL ok;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Point10v2));
+    ok = laz_symbol_model_copy(&c->m_changed_values, &r->m_changed_values);
+    ok = laz_ic_copy(&c->ic_intensity, &r->ic_intensity) && ok;
+    ok = laz_symbol_model_copy(&c->m_scan_angle_rank[0], &r->m_scan_angle_rank[0]) && ok;
+    ok = laz_symbol_model_copy(&c->m_scan_angle_rank[1], &r->m_scan_angle_rank[1]) && ok;
+    ok = laz_ic_copy(&c->ic_point_source_ID, &r->ic_point_source_ID) && ok;
+    ok = laz_bank_copy(c->m_bit_byte, r->m_bit_byte, 256) && ok;
+    ok = laz_bank_copy(c->m_classification, r->m_classification, 256) && ok;
+    ok = laz_bank_copy(c->m_user_data, r->m_user_data, 256) && ok;
+    ok = laz_ic_copy(&c->ic_dx, &r->ic_dx) && ok;
+    ok = laz_ic_copy(&c->ic_dy, &r->ic_dy) && ok;
+    ok = laz_ic_copy(&c->ic_z, &r->ic_z) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v2_point10(LazDecoder *dec)
 {
     Point10v2 *r = (Point10v2 *)calloc(1, sizeof(Point10v2));
@@ -194,6 +215,7 @@ LazReadItem *laz_readitem_v2_point10(LazDecoder *dec)
     r->base.read = p10v2_read;
     r->base.init = p10v2_init;
     r->base.destroy = p10v2_destroy;
+    r->base.clone = p10v2_clone;
     r->base.dec = dec;
 
     laz_symbol_model_setup(&r->m_changed_values, 64, LAZ_FALSE);
@@ -344,6 +366,19 @@ static void gps11v2_destroy(LazReadItem *self)
     laz_ic_free(&r->ic_gpstime);
 }
 
+static LazReadItem *gps11v2_clone(const LazReadItem *self)
+{
+    const Gpstime11v2 *r = (const Gpstime11v2 *)self;
+    Gpstime11v2 *c = (Gpstime11v2 *)malloc(sizeof(Gpstime11v2));
+    BOOL ok;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Gpstime11v2));
+    ok = laz_symbol_model_copy(&c->m_gpstime_multi, &r->m_gpstime_multi);
+    ok = laz_symbol_model_copy(&c->m_gpstime_0diff, &r->m_gpstime_0diff) && ok;
+    ok = laz_ic_copy(&c->ic_gpstime, &r->ic_gpstime) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v2_gpstime11(LazDecoder *dec)
 {
     Gpstime11v2 *r = (Gpstime11v2 *)calloc(1, sizeof(Gpstime11v2));
@@ -351,6 +386,7 @@ LazReadItem *laz_readitem_v2_gpstime11(LazDecoder *dec)
     r->base.read = gps11v2_read;
     r->base.init = gps11v2_init;
     r->base.destroy = gps11v2_destroy;
+    r->base.clone = gps11v2_clone;
     r->base.dec = dec;
 
     laz_symbol_model_setup(&r->m_gpstime_multi, LASZIP_GPSTIME_MULTI_TOTAL, LAZ_FALSE);
@@ -453,6 +489,20 @@ static void rgb12v2_destroy(LazReadItem *self)
     for (i = 0; i < 6; i++) laz_symbol_model_free(&r->m_rgb_diff[i]);
 }
 
+static LazReadItem *rgb12v2_clone(const LazReadItem *self)
+{
+    const Rgb12v2 *r = (const Rgb12v2 *)self;
+    Rgb12v2 *c = (Rgb12v2 *)malloc(sizeof(Rgb12v2));
+    BOOL ok;
+    U32 i;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Rgb12v2));
+    ok = laz_symbol_model_copy(&c->m_byte_used, &r->m_byte_used);
+    for (i = 0; i < 6; i++)
+        ok = laz_symbol_model_copy(&c->m_rgb_diff[i], &r->m_rgb_diff[i]) && ok;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v2_rgb12(LazDecoder *dec)
 {
     Rgb12v2 *r = (Rgb12v2 *)calloc(1, sizeof(Rgb12v2));
@@ -461,6 +511,7 @@ LazReadItem *laz_readitem_v2_rgb12(LazDecoder *dec)
     r->base.read = rgb12v2_read;
     r->base.init = rgb12v2_init;
     r->base.destroy = rgb12v2_destroy;
+    r->base.clone = rgb12v2_clone;
     r->base.dec = dec;
     laz_symbol_model_setup(&r->m_byte_used, 128, LAZ_FALSE);
     for (i = 0; i < 6; i++) laz_symbol_model_setup(&r->m_rgb_diff[i], 256, LAZ_FALSE);
@@ -507,6 +558,21 @@ static void bytev2_destroy(LazReadItem *self)
     free(r->last_item);
 }
 
+static LazReadItem *bytev2_clone(const LazReadItem *self)
+{
+    const Bytev2 *r = (const Bytev2 *)self;
+    Bytev2 *c = (Bytev2 *)malloc(sizeof(Bytev2));
+    BOOL ok = LAZ_TRUE;
+    if (!c) return NULL;
+    memcpy(c, r, sizeof(Bytev2));
+    c->m_byte = laz_symbol_models_copy(r->m_byte, r->number);
+    if (!c->m_byte) ok = LAZ_FALSE;
+    c->last_item = (U8 *)malloc(r->number ? r->number : 1);
+    if (c->last_item) memcpy(c->last_item, r->last_item, r->number);
+    else ok = LAZ_FALSE;
+    return laz_readitem_cloned((LazReadItem *)c, ok);
+}
+
 LazReadItem *laz_readitem_v2_byte(LazDecoder *dec, U32 number)
 {
     Bytev2 *r = (Bytev2 *)calloc(1, sizeof(Bytev2));
@@ -514,6 +580,7 @@ LazReadItem *laz_readitem_v2_byte(LazDecoder *dec, U32 number)
     r->base.read = bytev2_read;
     r->base.init = bytev2_init;
     r->base.destroy = bytev2_destroy;
+    r->base.clone = bytev2_clone;
     r->base.dec = dec;
     r->number = number;
     r->m_byte = laz_symbol_models_new(number, 256, LAZ_FALSE);
@@ -96,9 +96,21 @@ const U8 laz_number_return_level_8ctx[16][16] = {
  * are therefore dead weight, and each reader's create_and_init leaves them
  * unbuilt -- the setup is what a chunk pays for whether or not it decodes, and
  * a seek pays it again at every jump.
+ *
+ * A chunk's requested layers are normally read whole into the reader's
+ * buffer, one read for all of them, and each decoded from its own array
+ * stream over its part. Past laz_layer_window_above bytes they are not: an
+ * adaptive chunk of millions of points has layers of hundreds of megabytes,
+ * and a service with hundreds of readers open cannot hold one of those per
+ * reader. Each layer is then decoded from a window over the file instead,
+ * which reads its part of the chunk a buffer at a time as the decoder needs
+ * it; what a reader holds is its windows' buffers, whatever the size of the
+ * chunk. A stream that cannot seek cannot be read that way, and is read
+ * whole as before.
  */
 typedef struct {
     LazStream *stream;
+    LazStream *window;  /* NULL until a chunk is too large to hold */
     LazDecoder dec;
     U32 num_bytes;
     BOOL changed;
@@ -117,7 +129,9 @@ static BOOL layer_create(Layer *l)
 static void layer_free(Layer *l)
 {
     if (l->stream) laz_stream_destroy(l->stream);
+    if (l->window) laz_stream_destroy(l->window);
     l->stream = NULL;
+    l->window = NULL;
 }
 
 static void stream_skip(LazStream *in, U32 n)
@@ -126,11 +140,21 @@ static void stream_skip(LazStream *in, U32 n)
 }
 
 /* Copies this layer's bytes out of `in` into `buf` at `*offset` and points the
- * layer's decoder at them; skips them in the stream if not requested. */
-static void layer_load(Layer *l, LazStream *in, U8 *buf, U64 *offset)
+ * layer's decoder at them; skips them in the stream if not requested. With no
+ * `buf` the bytes are skipped too, and the decoder reads them where they are
+ * through the layer's window. FALSE only if there is no memory for one. */
+static BOOL layer_load(Layer *l, LazStream *in, U8 *buf, U64 *offset)
 {
     if (l->requested) {
-        if (l->num_bytes) {
+        if (l->num_bytes && !buf) {
+            I64 start = laz_stream_tell(in);
+            if (!l->window && !(l->window = laz_stream_new_window(in)))
+                return LAZ_FALSE;
+            laz_stream_window_reset(l->window, start, l->num_bytes);
+            stream_skip(in, l->num_bytes);
+            laz_decoder_init(&l->dec, l->window, LAZ_TRUE);
+            l->changed = LAZ_TRUE;
+        } else if (l->num_bytes) {
             laz_stream_get_bytes(in, buf + *offset, l->num_bytes);
             laz_stream_array_reset(l->stream, buf + *offset, l->num_bytes);
             laz_decoder_init(&l->dec, l->stream, LAZ_TRUE);
@@ -144,18 +168,21 @@ static void layer_load(Layer *l, LazStream *in, U8 *buf, U64 *offset)
              * anyway decodes from an empty stream, which sets eof and
              * surfaces through overran(). See laz_decoder_setup. */
             laz_stream_array_reset(l->stream, NULL, 0);
+            l->dec.stream = l->stream;
             l->changed = LAZ_FALSE;
         }
     } else {
         if (l->num_bytes) stream_skip(in, l->num_bytes);
         l->changed = LAZ_FALSE;
     }
+    return LAZ_TRUE;
 }
 
-/* TRUE once this layer's decoder has read past the bytes it was given. */
+/* TRUE once this layer's decoder has read past the bytes it was given --
+ * from its array or its window, whichever this chunk's are in. */
 static BOOL layer_overran(const Layer *l)
 {
-    return l->stream && l->stream->eof;
+    return l->dec.stream && l->dec.stream->eof;
 }
 
 /*
@@ -186,6 +213,32 @@ static BOOL ensure_bytes(U8 **buf, U64 *allocated, U64 need)
     return LAZ_TRUE;
 }
 
+/* The most a chunk's requested layers may come to and still be read whole;
+ * see the comment on Layer. Four megabytes is a chunk of the default 50,000
+ * points several times over, so only the chunks that would cost a reader
+ * more than that are read through windows. */
+static LAZ_THREAD_LOCAL U64 layer_window_above = 4u << 20;
+
+U64 laz_layer_window_above(U64 num_bytes)
+{
+    U64 was = layer_window_above;
+    layer_window_above = num_bytes;
+    return was;
+}
+
+/* Where a chunk's `need` bytes of requested layers are loaded: `*buf`, grown
+ * to hold them, or -- for more than layer_window_above on a stream that can
+ * seek -- nowhere, `*into` NULL, for layer_load to window them instead. */
+static BOOL layers_buffer(LazStream *in, U8 **buf, U64 *allocated, U64 need,
+                          U8 **into)
+{
+    *into = NULL;
+    if (need > layer_window_above && in->seekable) return LAZ_TRUE;
+    if (!ensure_bytes(buf, allocated, need)) return LAZ_FALSE;
+    *into = *buf;
+    return LAZ_TRUE;
+}
+
 /* ======================================================== POINT14 v3/v4 == */
 
 typedef struct {
@@ -393,6 +446,7 @@ static BOOL p14_init(LazReadItem *self, const U8 *item, U32 *context)
     Point14v3 *r = (Point14v3 *)self;
     LazStream *in = self->dec->stream;
     U64 num_bytes, offset;
+    U8 *buf;
     U32 c;
 
     if (!layer_create(&r->channel_returns_XY) || !layer_create(&r->Z) ||
@@ -413,18 +467,21 @@ static BOOL p14_init(LazReadItem *self, const U8 *item, U32 *context)
     if (r->point_source.requested) num_bytes += r->point_source.num_bytes;
     if (r->gps_time.requested) num_bytes += r->gps_time.num_bytes;
 
-    if (!ensure_bytes(&r->bytes, &r->num_bytes_allocated, num_bytes)) return LAZ_FALSE;
+    if (!layers_buffer(in, &r->bytes, &r->num_bytes_allocated, num_bytes,
+                       &buf))
+        return LAZ_FALSE;
 
     offset = 0;
-    layer_load(&r->channel_returns_XY, in, r->bytes, &offset);
-    layer_load(&r->Z, in, r->bytes, &offset);
-    layer_load(&r->classification, in, r->bytes, &offset);
-    layer_load(&r->flags, in, r->bytes, &offset);
-    layer_load(&r->intensity, in, r->bytes, &offset);
-    layer_load(&r->scan_angle, in, r->bytes, &offset);
-    layer_load(&r->user_data, in, r->bytes, &offset);
-    layer_load(&r->point_source, in, r->bytes, &offset);
-    layer_load(&r->gps_time, in, r->bytes, &offset);
+    if (!layer_load(&r->channel_returns_XY, in, buf, &offset) ||
+        !layer_load(&r->Z, in, buf, &offset) ||
+        !layer_load(&r->classification, in, buf, &offset) ||
+        !layer_load(&r->flags, in, buf, &offset) ||
+        !layer_load(&r->intensity, in, buf, &offset) ||
+        !layer_load(&r->scan_angle, in, buf, &offset) ||
+        !layer_load(&r->user_data, in, buf, &offset) ||
+        !layer_load(&r->point_source, in, buf, &offset) ||
+        !layer_load(&r->gps_time, in, buf, &offset))
+        return LAZ_FALSE;
 
     for (c = 0; c < 4; c++) r->contexts[c].unused = LAZ_TRUE;
 
@@ -823,15 +880,17 @@ static BOOL rgb14_chunk_sizes(LazReadItem *self)
 static BOOL rgb14_init(LazReadItem *self, const U8 *item, U32 *context)
 {
     Rgb14v3 *r = (Rgb14v3 *)self;
+    LazStream *in = self->dec->stream;
     U64 offset = 0;
+    U8 *buf;
     U32 c;
 
     if (!layer_create(&r->rgb)) return LAZ_FALSE;
-    if (!ensure_bytes(&r->bytes, &r->num_bytes_allocated, r->rgb.num_bytes))
+    if (!layers_buffer(in, &r->bytes, &r->num_bytes_allocated,
+                       r->rgb.num_bytes, &buf) ||
+        !layer_load(&r->rgb, in, buf, &offset))
         return LAZ_FALSE;
 
-    layer_load(&r->rgb, self->dec->stream, r->bytes, &offset);
-
     for (c = 0; c < 4; c++) r->contexts[c].unused = LAZ_TRUE;
     r->current_context = *context;      /* set by the POINT14 reader */
     return rgb14_create_and_init(r, r->current_context, item);
@@ -1028,16 +1087,19 @@ static BOOL rgbnir14_chunk_sizes(LazReadItem *self)
 static BOOL rgbnir14_init(LazReadItem *self, const U8 *item, U32 *context)
 {
     RgbNir14v3 *r = (RgbNir14v3 *)self;
+    LazStream *in = self->dec->stream;
     U64 num_bytes = 0, offset = 0;
+    U8 *buf;
     U32 c;
 
     if (!layer_create(&r->rgb) || !layer_create(&r->nir)) return LAZ_FALSE;
     if (r->rgb.requested) num_bytes += r->rgb.num_bytes;
     if (r->nir.requested) num_bytes += r->nir.num_bytes;
-    if (!ensure_bytes(&r->bytes, &r->num_bytes_allocated, num_bytes)) return LAZ_FALSE;
-
-    layer_load(&r->rgb, self->dec->stream, r->bytes, &offset);
-    layer_load(&r->nir, self->dec->stream, r->bytes, &offset);
+    if (!layers_buffer(in, &r->bytes, &r->num_bytes_allocated, num_bytes,
+                       &buf) ||
+        !layer_load(&r->rgb, in, buf, &offset) ||
+        !layer_load(&r->nir, in, buf, &offset))
+        return LAZ_FALSE;
 
     for (c = 0; c < 4; c++) r->contexts[c].unused = LAZ_TRUE;
     r->current_context = *context;
@@ -1205,15 +1267,17 @@ static BOOL wave14_chunk_sizes(LazReadItem *self)
 static BOOL wave14_init(LazReadItem *self, const U8 *item, U32 *context)
 {
     Wave14v3 *r = (Wave14v3 *)self;
+    LazStream *in = self->dec->stream;
     U64 offset = 0;
+    U8 *buf;
     U32 c;
 
     if (!layer_create(&r->wavepacket)) return LAZ_FALSE;
-    if (!ensure_bytes(&r->bytes, &r->num_bytes_allocated, r->wavepacket.num_bytes))
+    if (!layers_buffer(in, &r->bytes, &r->num_bytes_allocated,
+                       r->wavepacket.num_bytes, &buf) ||
+        !layer_load(&r->wavepacket, in, buf, &offset))
         return LAZ_FALSE;
 
-    layer_load(&r->wavepacket, self->dec->stream, r->bytes, &offset);
-
     for (c = 0; c < 4; c++) r->contexts[c].unused = LAZ_TRUE;
     r->current_context = *context;
     return wave14_create_and_init(r, r->current_context, item);
@@ -1391,17 +1455,21 @@ static BOOL byte14_chunk_sizes(LazReadItem *self)
 static BOOL byte14_init(LazReadItem *self, const U8 *item, U32 *context)
 {
     Byte14v3 *r = (Byte14v3 *)self;
+    LazStream *in = self->dec->stream;
     U64 num_bytes = 0, offset = 0;
+    U8 *buf;
     U32 i, c;
 
     for (i = 0; i < r->number; i++) {
         if (!layer_create(&r->layers[i])) return LAZ_FALSE;
         if (r->layers[i].requested) num_bytes += r->layers[i].num_bytes;
     }
-    if (!ensure_bytes(&r->bytes, &r->num_bytes_allocated, num_bytes)) return LAZ_FALSE;
+    if (!layers_buffer(in, &r->bytes, &r->num_bytes_allocated, num_bytes,
+                       &buf))
+        return LAZ_FALSE;
 
     for (i = 0; i < r->number; i++)
-        layer_load(&r->layers[i], self->dec->stream, r->bytes, &offset);
+        if (!layer_load(&r->layers[i], in, buf, &offset)) return LAZ_FALSE;
 
     for (c = 0; c < 4; c++) r->contexts[c].unused = LAZ_TRUE;
     r->current_context = *context;
@@ -8,6 +8,8 @@
 
 #include <stdio.h>
 #include <stdarg.h>
+#include <stdlib.h>
+#include <string.h>
 #include "laz_readpoint.h"
 
 static void set_error(LazReadPoint *rp, const char *fmt, ...)
@@ -175,6 +177,8 @@ BOOL laz_readpoint_setup(LazReadPoint *rp, U32 num_items, const LazItem *items,
         if (compressor != LAZ_COMPRESSOR_POINTWISE) {
             if (chunk_size) rp->chunk_size = chunk_size;
             rp->number_chunks = U32_MAX;
+        } else {
+            rp->pointwise = LAZ_TRUE;
         }
         /* a point buffer for skipping over points while seeking */
         rp->seek_extra_bytes = (U8 *)calloc(rp->point_size + 1, 1);
@@ -513,6 +517,130 @@ static BOOL point_is_whole(LazReadPoint *rp)
     return LAZ_TRUE;
 }
 
+static void free_checkpoint(LazReadPoint *rp, LazCheckpoint *c)
+{
+    U32 i;
+    for (i = 0; i < rp->num_readers; i++) laz_readitem_destroy(c->readers[i]);
+    free(c->readers);
+    c->readers = NULL;
+}
+
+/* Copies every one of the readers `from` into `out`, or none of them. */
+static BOOL clone_readers(LazReadPoint *rp, LazReadItem *const *from,
+                          LazReadItem **out)
+{
+    U32 i, k;
+    for (i = 0; i < rp->num_readers; i++) {
+        out[i] = from[i]->clone(from[i]);
+        if (!out[i]) {
+            for (k = 0; k < i; k++) laz_readitem_destroy(out[k]);
+            return LAZ_FALSE;
+        }
+    }
+    return LAZ_TRUE;
+}
+
+/*
+ * A POINTWISE file is one arithmetic-coded run from its first point to its
+ * last, so where the decoder stands is all of it there is: the stream
+ * position, the coder's two registers, and each reader's models and last
+ * item. The position has to be taken together with the registers, since the
+ * decoder reads ahead of the point it has decoded into `value`.
+ *
+ * Called after point `chunk_count - 1` has been read, so the checkpoint is of
+ * the point after it. One that could not be allocated is simply not taken:
+ * what running out of memory here costs is a longer seek, not a wrong point.
+ */
+static void take_checkpoint(LazReadPoint *rp)
+{
+    LazCheckpoint *c;
+
+    /* seeking back and reading on passes the same points again */
+    if (rp->num_checkpoints &&
+        rp->checkpoints[rp->num_checkpoints - 1].index >= rp->chunk_count)
+        return;
+    if (rp->num_checkpoints == rp->alloced_checkpoints) {
+        U32 want = rp->alloced_checkpoints ? rp->alloced_checkpoints * 2 : 16;
+        LazCheckpoint *grown = (LazCheckpoint *)realloc(
+            rp->checkpoints, sizeof(LazCheckpoint) * want);
+        if (!grown) return;
+        rp->checkpoints = grown;
+        rp->alloced_checkpoints = want;
+    }
+    c = &rp->checkpoints[rp->num_checkpoints];
+    c->readers = (LazReadItem **)calloc(rp->num_readers, sizeof(LazReadItem *));
+    if (!c->readers) return;
+    if (!clone_readers(rp, rp->readers_compressed, c->readers)) {
+        free(c->readers);
+        c->readers = NULL;
+        return;
+    }
+    c->index = rp->chunk_count;
+    c->position = laz_stream_tell(rp->instream);
+    c->value = rp->dec.value;
+    c->length = rp->dec.length;
+    rp->num_checkpoints++;
+}
+
+/* The last checkpoint at or before point `target`, or NULL for none. */
+static const LazCheckpoint *nearest_checkpoint(const LazReadPoint *rp,
+                                               U64 target)
+{
+    U32 lower = 0, upper = rp->num_checkpoints;
+    while (lower < upper) {
+        U32 mid = (lower + upper) / 2;
+        if (rp->checkpoints[mid].index <= target) lower = mid + 1;
+        else upper = mid;
+    }
+    return lower ? &rp->checkpoints[lower - 1] : NULL;
+}
+
+/* Puts the decoder back where `c` found it. The checkpoint keeps its own
+ * readers, so that it can be restored again; the reader gets copies. */
+static BOOL restore_checkpoint(LazReadPoint *rp, const LazCheckpoint *c)
+{
+    LazReadItem *readers[LAZ_MAX_ITEMS];
+    U32 i;
+
+    if (!clone_readers(rp, c->readers, readers)) {
+        set_error(rp, "out of memory");
+        return LAZ_FALSE;
+    }
+    if (!laz_stream_seek(rp->instream, c->position)) {
+        for (i = 0; i < rp->num_readers; i++) laz_readitem_destroy(readers[i]);
+        return LAZ_FALSE;
+    }
+    for (i = 0; i < rp->num_readers; i++) {
+        laz_readitem_destroy(rp->readers_compressed[i]);
+        rp->readers_compressed[i] = readers[i];
+    }
+    rp->readers = rp->readers_compressed;
+    rp->dec.stream = rp->instream;
+    rp->dec.value = c->value;
+    rp->dec.length = c->length;
+    rp->chunk_count = (U32)c->index;
+    return LAZ_TRUE;
+}
+
+BOOL laz_readpoint_keep_checkpoints(LazReadPoint *rp, U32 every)
+{
+    U32 i;
+
+    if (!rp->pointwise) {
+        set_error(rp, "checkpoints are kept only of a pointwise-compressed "
+                  "file; any other seeks by its chunks or its records");
+        return LAZ_FALSE;
+    }
+    for (i = 0; i < rp->num_readers; i++) {
+        if (!rp->readers_compressed[i]->clone) {
+            set_error(rp, "item %u cannot be checkpointed", i);
+            return LAZ_FALSE;
+        }
+    }
+    rp->checkpoint_every = every;
+    return LAZ_TRUE;
+}
+
 BOOL laz_readpoint_read(LazReadPoint *rp, LazPoint *point, U8 *extra_bytes)
 {
     U32 i;
@@ -572,7 +700,11 @@ BOOL laz_readpoint_read(LazReadPoint *rp, LazPoint *point, U8 *extra_bytes)
         }
     }
 
-    return point_is_whole(rp);
+    if (!point_is_whole(rp)) return LAZ_FALSE;
+    /* one branch a point for every file but one keeping checkpoints */
+    if (rp->checkpoint_every && rp->chunk_count % rp->checkpoint_every == 0)
+        take_checkpoint(rp);
+    return LAZ_TRUE;
 }
 
 /* Which chunk holds point *index*, by bisection over the running totals. The
@@ -641,13 +773,23 @@ BOOL laz_readpoint_seek(LazReadPoint *rp, U64 current, U64 target)
         } else {
             delta = target - current;
         }
-    } else if (current > target) {
-        laz_decoder_done(&rp->dec);
-        if (!laz_stream_seek(rp->instream, rp->point_start)) return LAZ_FALSE;
-        if (!init_dec(rp)) return LAZ_FALSE;
-        delta = target;
-    } else if (current < target) {
-        delta = target - current;
+    } else {
+        /* a POINTWISE file: from the nearest checkpoint, where that is
+         * nearer than where the reader already is, or else from where the
+         * reader is or from the first point */
+        const LazCheckpoint *c = nearest_checkpoint(rp, target);
+        if (c && (current > target || c->index > current)) {
+            if (!restore_checkpoint(rp, c)) return LAZ_FALSE;
+            delta = target - c->index;
+        } else if (current > target) {
+            laz_decoder_done(&rp->dec);
+            if (!laz_stream_seek(rp->instream, rp->point_start)) return LAZ_FALSE;
+            if (!init_dec(rp)) return LAZ_FALSE;
+            rp->chunk_count = 0;
+            delta = target;
+        } else {
+            delta = target - current;
+        }
     }
 
     while (delta) {
@@ -657,6 +799,123 @@ BOOL laz_readpoint_seek(LazReadPoint *rp, U64 current, U64 target)
     return LAZ_TRUE;
 }
 
+BOOL laz_readpoint_use_chunk_table(LazReadPoint *rp, const I64 *starts,
+                                   const U64 *totals, U32 count)
+{
+    I64 *copy;
+    U64 *totals_copy = NULL;
+    BOOL adaptive = rp->chunk_size == U32_MAX;
+    U32 i;
+
+    if (!rp->have_dec || rp->point_start != 0 ||
+        rp->number_chunks != U32_MAX) {
+        set_error(rp, "a chunk table can only be given for a file of chunks, "
+                      "fixed-size or adaptive, before any point is read");
+        return LAZ_FALSE;
+    }
+    if (adaptive != (totals != NULL)) {
+        set_error(rp, adaptive ? "adaptive chunks are given with how many "
+                                 "points come before each"
+                               : "fixed-size chunks are given without how "
+                                 "many points come before each");
+        return LAZ_FALSE;
+    }
+    if (count == 0 || count == U32_MAX) {
+        set_error(rp, "a chunk table of %u chunks is not one", count);
+        return LAZ_FALSE;
+    }
+    for (i = 1; i <= count; i++) {
+        if (starts[i] <= starts[i - 1]) {
+            set_error(rp, "chunk %u ends no later than it starts", i - 1);
+            return LAZ_FALSE;
+        }
+        /* a chunk of no points, or of more than a U32 counts, is one no
+         * writer leaves and chunk_size could not hold */
+        if (totals && (totals[i] <= totals[i - 1] ||
+                       totals[i] - totals[i - 1] >= U32_MAX)) {
+            set_error(rp, "chunk %u holds no points, or too many", i - 1);
+            return LAZ_FALSE;
+        }
+    }
+    if (totals && totals[0] != 0) {
+        set_error(rp, "the first chunk begins with point %llu, not point 0",
+                  (unsigned long long)totals[0]);
+        return LAZ_FALSE;
+    }
+    copy = (I64 *)malloc(sizeof(I64) * ((U64)count + 1));
+    if (totals) totals_copy = (U64 *)malloc(sizeof(U64) * ((U64)count + 1));
+    if (!copy || (totals && !totals_copy)) {
+        free(copy);
+        free(totals_copy);
+        set_error(rp, "out of memory");
+        return LAZ_FALSE;
+    }
+    memcpy(copy, starts, sizeof(I64) * ((U64)count + 1));
+    if (totals) memcpy(totals_copy, totals, sizeof(U64) * ((U64)count + 1));
+    if (!laz_stream_seek(rp->instream, starts[0])) {
+        free(copy);
+        free(totals_copy);
+        return LAZ_FALSE;
+    }
+    /* laid out as decode_chunk_table lays out the table it reads, and the
+     * first chunk sized as init_dec sizes it once it has */
+    free(rp->chunk_starts);
+    free(rp->chunk_totals);
+    rp->chunk_starts = copy;
+    rp->chunk_totals = totals_copy;
+    rp->number_chunks = count;
+    rp->tabled_chunks = count + 1;
+    rp->current_chunk = 0;
+    if (totals) rp->chunk_size = (U32)totals[1];
+    return LAZ_TRUE;
+}
+
+/*
+ * The first point of chunk `chunk` as it is stored: raw, ahead of the entropy
+ * coder it seeds, so reading it decodes nothing -- no models set up, no layer
+ * of a LAS 1.4 chunk read in -- and costs a seek and a record.
+ *
+ * The reader is left as a seek to that point leaves it, at the head of the
+ * chunk with nothing of it read: the point just handed back is read again,
+ * with the rest of the chunk behind it, by whatever reads next.
+ */
+BOOL laz_readpoint_read_chunk_head(LazReadPoint *rp, U32 chunk,
+                                   LazPoint *point, U8 *extra_bytes)
+{
+    U32 i;
+    U32 context = 0;
+    U8 *base = (U8 *)point;
+
+    /* nothing read yet, so the table is still where the points begin */
+    if (rp->have_dec && rp->point_start == 0) {
+        if (!rp->instream->seekable || !init_dec(rp)) return LAZ_FALSE;
+        rp->chunk_count = 0;
+    }
+    if (!rp->have_dec || !rp->chunk_starts || chunk >= rp->tabled_chunks ||
+        chunk >= rp->number_chunks) {
+        set_error(rp, "there is no chunk %u to read the head of", chunk);
+        return LAZ_FALSE;
+    }
+    laz_decoder_done(&rp->dec);
+    rp->current_chunk = chunk;
+    if (chunk_is_tabled(rp, chunk))
+        rp->chunk_size = (U32)(rp->chunk_totals[chunk + 1] -
+                               rp->chunk_totals[chunk]);
+    if (!laz_stream_seek(rp->instream, rp->chunk_starts[chunk]))
+        return LAZ_FALSE;
+    if (!init_dec(rp)) return LAZ_FALSE;
+    rp->chunk_count = 0;
+
+    for (i = 0; i < rp->num_readers; i++) {
+        U8 *dst = (rp->item_offsets[i] < 0)
+                ? extra_bytes + rp->item_extra_offsets[i]
+                : (base + rp->item_offsets[i]);
+        rp->readers_raw[i]->read(rp->readers_raw[i], dst, &context);
+    }
+    if (!point_is_whole(rp)) return LAZ_FALSE;
+    return laz_stream_seek(rp->instream, rp->chunk_starts[chunk]);
+}
+
 void laz_readpoint_destroy(LazReadPoint *rp)
 {
     U32 i;
@@ -674,4 +933,8 @@ void laz_readpoint_destroy(LazReadPoint *rp)
     free(rp->chunk_totals); rp->chunk_totals = NULL;
     free(rp->chunk_starts); rp->chunk_starts = NULL;
     free(rp->seek_extra_bytes); rp->seek_extra_bytes = NULL;
+    for (i = 0; i < rp->num_checkpoints; i++)
+        free_checkpoint(rp, &rp->checkpoints[i]);
+    free(rp->checkpoints); rp->checkpoints = NULL;
+    rp->num_checkpoints = rp->alloced_checkpoints = 0;
 }
@@ -28,6 +28,19 @@
 #include "laz_arithmetic.h"
 #include "laz_readitem.h"
 
+/*
+ * Where the decoder of a POINTWISE file stood before point `index`: the
+ * stream position and coder registers, and a copy of every compressed
+ * reader. See laz_readpoint_keep_checkpoints.
+ */
+typedef struct {
+    U64 index;
+    I64 position;
+    U32 value;
+    U32 length;
+    LazReadItem **readers;      /* owned, [num_readers] */
+} LazCheckpoint;
+
 typedef struct {
     LazStream *instream;        /* borrowed */
     U32 num_readers;
@@ -71,6 +84,15 @@ typedef struct {
     LazPoint seek_point;
     U8 *seek_extra_bytes;
 
+    /* A POINTWISE file has no chunks to seek by, so it can keep checkpoints
+     * instead: taken every checkpoint_every points while that is non-zero,
+     * in ascending order of index. */
+    BOOL pointwise;
+    U32 checkpoint_every;
+    U32 num_checkpoints;
+    U32 alloced_checkpoints;
+    LazCheckpoint *checkpoints;
+
     char last_error[192];
     char last_warning[192];
     BOOL has_error;
@@ -99,6 +121,27 @@ BOOL laz_readpoint_read(LazReadPoint *rp, LazPoint *point, U8 *extra_bytes);
  * available and decoding forward otherwise. */
 BOOL laz_readpoint_seek(LazReadPoint *rp, U64 current, U64 target);
 
+/* Takes where `count` chunks start, and where the last of them ends, in
+ * place of the table the file would be asked for: one saved by an earlier
+ * reader that had to rebuild it, or one a reader read and handed on. Adaptive
+ * chunks come with `totals` as well, the point each begins with and then the
+ * number of points, which fixed-size chunks leave NULL. Only before anything
+ * is read, which is when the table would be. */
+BOOL laz_readpoint_use_chunk_table(LazReadPoint *rp, const I64 *starts,
+                                   const U64 *totals, U32 count);
+
+/* Has reading a POINTWISE file keep a checkpoint every `every` points it
+ * passes, and seeking restore the nearest one at or before where it is going
+ * rather than decode from the first point. 0 takes no more; either way the
+ * ones already taken are kept. */
+BOOL laz_readpoint_keep_checkpoints(LazReadPoint *rp, U32 every);
+
+/* Reads the first point of chunk `chunk` without decoding, from the raw copy
+ * a chunk begins with, and leaves the reader at that point as a seek would.
+ * Only for a chunked file whose table has been read. */
+BOOL laz_readpoint_read_chunk_head(LazReadPoint *rp, U32 chunk,
+                                   LazPoint *point, U8 *extra_bytes);
+
 void laz_readpoint_destroy(LazReadPoint *rp);
 
 #endif /* LAZ_READPOINT_H */
@@ -0,0 +1,209 @@
+/*
+ * laz_stats.c -- summarising decoded points; see laz_stats.h.
+ */
+
+#include <math.h>
+#include <stdio.h>
+#include <stdarg.h>
+#include <stdlib.h>
+#include <string.h>
+#include "laz_stats.h"
+
+static void set_error(LazPointStats *s, const char *fmt, ...)
+{
+    va_list ap;
+    va_start(ap, fmt);
+    vsnprintf(s->last_error, sizeof(s->last_error), fmt, ap);
+    va_end(ap);
+    s->has_error = LAZ_TRUE;
+}
+
+BOOL laz_pointstats_setup(LazPointStats *s, U32 num_fields)
+{
+    memset(s, 0, sizeof(*s));
+    if (num_fields) {
+        s->fields = (LazFieldStats *)calloc(num_fields,
+                                            sizeof(LazFieldStats));
+        if (!s->fields) {
+            set_error(s, "out of memory");
+            return LAZ_FALSE;
+        }
+    }
+    s->num_fields = num_fields;
+    return LAZ_TRUE;
+}
+
+BOOL laz_pointstats_field(LazPointStats *s, U32 i, U32 offset,
+                          LazStatType type, U32 shift, U32 mask, U32 bins)
+{
+    LazFieldStats *f = &s->fields[i];
+
+    if (bins && type == LAZ_STAT_F64) {
+        set_error(s, "a histogram is of whole numbers");
+        return LAZ_FALSE;
+    }
+    f->offset = offset;
+    f->type = type;
+    f->shift = shift;
+    f->mask = mask;
+    if (bins) {
+        f->histogram = (U64 *)calloc(bins, sizeof(U64));
+        if (!f->histogram) {
+            set_error(s, "out of memory");
+            return LAZ_FALSE;
+        }
+        f->bins = bins;
+    }
+    return LAZ_TRUE;
+}
+
+/*
+ * A field's value out of a decoded point. The point is in host order, so
+ * each width is read as the host's own type; memcpy, since the offsets are
+ * the caller's and nothing says the point is aligned for them.
+ */
+static F64 field_value(const LazFieldStats *f, const U8 *point)
+{
+    const U8 *at = point + f->offset;
+    switch (f->type) {
+    case LAZ_STAT_U8: {
+        U8 v = *at;
+        if (f->mask) v = (U8)((v >> f->shift) & f->mask);
+        return v;
+    }
+    case LAZ_STAT_I8: return (I8)*at;
+    case LAZ_STAT_U16: { U16 v; memcpy(&v, at, 2); return v; }
+    case LAZ_STAT_I16: { I16 v; memcpy(&v, at, 2); return v; }
+    case LAZ_STAT_U32: { U32 v; memcpy(&v, at, 4); return v; }
+    case LAZ_STAT_I32: { I32 v; memcpy(&v, at, 4); return v; }
+    case LAZ_STAT_F64: { F64 v; memcpy(&v, at, 8); return v; }
+    }
+    return 0.0;
+}
+
+void laz_pointstats_add(LazPointStats *s, const LazPoint *p)
+{
+    const I32 xyz[3] = {p->X, p->Y, p->Z};
+    U8 return_number;
+    U32 i;
+
+    for (i = 0; i < 3; i++) {
+        if (s->num_points == 0 || xyz[i] < s->min_xyz[i])
+            s->min_xyz[i] = xyz[i];
+        if (s->num_points == 0 || xyz[i] > s->max_xyz[i])
+            s->max_xyz[i] = xyz[i];
+    }
+    /* the return numbers a header counts: LAS 1.4's for a LAS 1.4 point,
+     * as the writer tallies them */
+    return_number = laz_point_extended_point_type(p)
+                  ? laz_point_extended_return_number(p)
+                  : laz_point_return_number(p);
+    s->by_return[return_number & 0xF]++;
+    s->num_points++;
+
+    for (i = 0; i < s->num_fields; i++) {
+        LazFieldStats *f = &s->fields[i];
+        F64 v = field_value(f, (const U8 *)p), d;
+        if (v != v) continue;                   /* NaN: no value at all */
+        if (f->count == 0) {
+            f->minimum = f->maximum = f->pivot = v;
+        } else {
+            if (v < f->minimum) f->minimum = v;
+            if (v > f->maximum) f->maximum = v;
+        }
+        d = v - f->pivot;
+        f->sum += d;
+        f->sum_squares += d * d;
+        f->count++;
+        /* a whole number the field's own width bounds, so always a bin */
+        if (f->histogram && v >= 0 && v < f->bins) f->histogram[(U32)v]++;
+    }
+}
+
+void laz_pointstats_destroy(LazPointStats *s)
+{
+    U32 i;
+    for (i = 0; i < s->num_fields; i++) free(s->fields[i].histogram);
+    free(s->fields);
+    memset(s, 0, sizeof(*s));
+}
+
+void laz_chunksummaries_init(LazChunkSummaries *s)
+{
+    memset(s, 0, sizeof(*s));
+}
+
+BOOL laz_chunksummaries_add(LazChunkSummaries *s, U32 chunk,
+                            const LazPoint *p, U8 classification)
+{
+    const I32 xyz[3] = {p->X, p->Y, p->Z};
+    LazChunkSummary *c;
+    U32 i;
+
+    if (chunk >= s->num_chunks) {
+        if (s->num_chunks == s->alloced) {
+            U32 want = s->alloced ? s->alloced * 2 : 64;
+            LazChunkSummary *grown = (LazChunkSummary *)realloc(
+                s->chunks, sizeof(LazChunkSummary) * want);
+            if (!grown) {
+                s->has_error = LAZ_TRUE;
+                snprintf(s->last_error, sizeof(s->last_error),
+                         "out of memory");
+                return LAZ_FALSE;
+            }
+            s->chunks = grown;
+            s->alloced = want;
+        }
+        c = &s->chunks[s->num_chunks++];
+        memset(c, 0, sizeof(*c));
+        for (i = 0; i < 3; i++) c->min_xyz[i] = c->max_xyz[i] = xyz[i];
+        c->min_gps_time = HUGE_VAL;
+        c->max_gps_time = -HUGE_VAL;
+        c->min_intensity = c->max_intensity = p->intensity;
+    } else {
+        c = &s->chunks[s->num_chunks - 1];
+        for (i = 0; i < 3; i++) {
+            if (xyz[i] < c->min_xyz[i]) c->min_xyz[i] = xyz[i];
+            if (xyz[i] > c->max_xyz[i]) c->max_xyz[i] = xyz[i];
+        }
+        if (p->intensity < c->min_intensity)
+            c->min_intensity = p->intensity;
+        if (p->intensity > c->max_intensity)
+            c->max_intensity = p->intensity;
+    }
+    /* a NaN compares false both ways, and so widens nothing */
+    if (p->gps_time < c->min_gps_time) c->min_gps_time = p->gps_time;
+    if (p->gps_time > c->max_gps_time) c->max_gps_time = p->gps_time;
+    c->classifications[classification >> 3] |= (U8)(1u << (classification & 7));
+    c->num_points++;
+    return LAZ_TRUE;
+}
+
+void laz_chunksummaries_pack(const LazChunkSummaries *s, U8 *out)
+{
+    U32 k, i;
+
+    laz_le_put32(out, LAZ_CHUNK_SUMMARY_VERSION);
+    laz_le_put32(out + 4, s->num_chunks);
+    out += LAZ_CHUNK_SUMMARY_HEADER;
+    for (k = 0; k < s->num_chunks; k++) {
+        const LazChunkSummary *c = &s->chunks[k];
+        laz_le_put32(out, c->num_points);
+        for (i = 0; i < 3; i++) {
+            laz_le_put32(out + 4 + 4 * i, (U32)c->min_xyz[i]);
+            laz_le_put32(out + 16 + 4 * i, (U32)c->max_xyz[i]);
+        }
+        laz_le_put_f64(out + 28, c->min_gps_time);
+        laz_le_put_f64(out + 36, c->max_gps_time);
+        laz_le_put16(out + 44, c->min_intensity);
+        laz_le_put16(out + 46, c->max_intensity);
+        memcpy(out + 48, c->classifications, 32);
+        out += LAZ_CHUNK_SUMMARY_SIZE;
+    }
+}
+
+void laz_chunksummaries_destroy(LazChunkSummaries *s)
+{
+    free(s->chunks);
+    memset(s, 0, sizeof(*s));
+}
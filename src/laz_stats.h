@@ -0,0 +1,120 @@
+/*
+ * laz_stats.h -- summarising decoded points without keeping them.
+ *
+ * What a delivery check wants of a file is a few numbers per field: least,
+ * greatest, mean and spread, and for the fields that are categories rather
+ * than measurements how many points fall in each. Every one of those can be
+ * kept up to date a point at a time in a fixed amount of memory, so a file of
+ * any size is summarised by one pass that holds nothing but the totals.
+ *
+ * The totals are also what two passes over different parts of a file can be
+ * combined from, which is what lets lazpy.Reader.statistics divide a file
+ * between threads.
+ */
+#ifndef LAZ_STATS_H
+#define LAZ_STATS_H
+
+#include "laz_types.h"
+
+/* How a field's bytes are read: its width and whether it is signed. */
+typedef enum {
+    LAZ_STAT_U8, LAZ_STAT_I8, LAZ_STAT_U16, LAZ_STAT_I16,
+    LAZ_STAT_U32, LAZ_STAT_I32, LAZ_STAT_F64
+} LazStatType;
+
+/*
+ * One field's totals. The spread is kept as sums of each value's distance
+ * from the first value seen -- the `pivot` -- rather than from zero, which
+ * is what keeps the sum of squares from swamping the variance of something
+ * like a GPS time, whose values are enormous and whose spread is not.
+ *
+ * A field packed into part of a byte has its `shift` and `mask`; `mask` is
+ * zero for a field that is the whole of its bytes. `histogram`, where there
+ * is one, has `bins` counts, one per value the field can take.
+ */
+typedef struct {
+    U32 offset;
+    LazStatType type;
+    U32 shift, mask;
+    U64 count;                          /* values seen; a NaN is not one */
+    F64 minimum, maximum;
+    F64 pivot, sum, sum_squares;
+    U64 *histogram;
+    U32 bins;
+} LazFieldStats;
+
+/*
+ * What every point contributes whichever fields are asked for: the box the
+ * stored coordinates cover and how many points carried each return number,
+ * both of which a header states and a check compares against.
+ */
+typedef struct {
+    U64 num_points;
+    I32 min_xyz[3], max_xyz[3];
+    U64 by_return[16];
+    LazFieldStats *fields;
+    U32 num_fields;
+    char last_error[192];
+    BOOL has_error;
+} LazPointStats;
+
+/* Totals for `num_fields` fields, each to be described by
+ * laz_pointstats_field. False leaves the reason in `last_error`. */
+BOOL laz_pointstats_setup(LazPointStats *s, U32 num_fields);
+
+/* Field `i`: where in a decoded point it is, how to read it, and how many
+ * histogram bins it has, or none for zero bins. */
+BOOL laz_pointstats_field(LazPointStats *s, U32 i, U32 offset,
+                          LazStatType type, U32 shift, U32 mask, U32 bins);
+
+/* One decoded point. */
+void laz_pointstats_add(LazPointStats *s, const LazPoint *p);
+
+void laz_pointstats_destroy(LazPointStats *s);
+
+/*
+ * What a writer notes of each chunk as its points go by: the box the stored
+ * coordinates cover, the span of GPS times and of intensities, and which
+ * classifications occur at all. A reader holds these against a query to
+ * skip every chunk that cannot answer it, without decoding a point of it.
+ *
+ * A chunk with no GPS time that is a number has +inf and -inf for its span,
+ * which no window reaches -- as none of its points are in any.
+ */
+typedef struct {
+    U32 num_points;
+    I32 min_xyz[3], max_xyz[3];
+    F64 min_gps_time, max_gps_time;
+    U16 min_intensity, max_intensity;
+    U8 classifications[32];             /* a bit per value, 0 in bit 0 */
+} LazChunkSummary;
+
+/* How many bytes laz_chunksummaries_pack writes: a version and a count,
+ * then each chunk's summary little-endian, in the order of the struct. */
+#define LAZ_CHUNK_SUMMARY_HEADER 8
+#define LAZ_CHUNK_SUMMARY_SIZE 80
+#define LAZ_CHUNK_SUMMARY_VERSION 1
+
+typedef struct {
+    LazChunkSummary *chunks;
+    U32 num_chunks, alloced;
+    char last_error[192];
+    BOOL has_error;
+} LazChunkSummaries;
+
+void laz_chunksummaries_init(LazChunkSummaries *s);
+
+/* One point, of chunk `chunk`: the chunk the last point went to, or the
+ * one after it, which begins here. `classification` is the value the file
+ * will hold, which the caller knows how to find for its point format. */
+BOOL laz_chunksummaries_add(LazChunkSummaries *s, U32 chunk,
+                            const LazPoint *p, U8 classification);
+
+/* The summaries as an extended record's payload, into `out`, which has
+ * room for LAZ_CHUNK_SUMMARY_HEADER + num_chunks * LAZ_CHUNK_SUMMARY_SIZE
+ * bytes. */
+void laz_chunksummaries_pack(const LazChunkSummaries *s, U8 *out);
+
+void laz_chunksummaries_destroy(LazChunkSummaries *s);
+
+#endif
@@ -97,6 +97,143 @@ void laz_stream_array_reset(LazStream *s, const U8 *data, I64 size)
     s->eof = LAZ_FALSE;
 }
 
+/* ----------------------------------------------------------------- window */
+
+/*
+ * A range of another stream, read through a buffer of its own.
+ *
+ * What the layers of a layered chunk are read through when they are too large
+ * to hold whole (see layer_load in laz_readitem_v3.c). Each layer has one, so
+ * several take turns reading the same underlying stream, and a refill puts
+ * that stream back where it found it -- after the chunk's last layer, which
+ * is where the point reader expects it to be when the chunk ends.
+ *
+ * The buffer is one file refill long: the file stream underneath reads that
+ * much anyway, and a refill costs two seeks and one read whatever its size.
+ */
+#define WINDOW_BUF_SIZE 65536
+
+typedef struct {
+    LazStream *base;    /* borrowed */
+    U8 *buf;
+    I64 start;          /* where in base the window begins */
+    I64 size;
+    I64 buf_at;         /* window offset of buf[0] */
+    I64 fill;           /* valid bytes in buf */
+    I64 pos;            /* read cursor, as a window offset */
+} WindowImpl;
+
+/* Refills the buffer from the read cursor. Returns bytes read. */
+static I64 window_refill(LazStream *s)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    I64 n = w->size - w->pos, here;
+
+    if (n <= 0 || s->failed) { s->eof = LAZ_TRUE; return 0; }
+    if (n > WINDOW_BUF_SIZE) n = WINDOW_BUF_SIZE;
+
+    here = laz_stream_tell(w->base);
+    if (!laz_stream_seek(w->base, w->start + w->pos)) {
+        s->failed = w->base->failed;
+        s->eof = LAZ_TRUE;
+        return 0;
+    }
+    laz_stream_get_bytes(w->base, w->buf, n);
+    /* the file ends inside the layer: what there was is kept, and the rest
+     * reads as the zeros an array stream would give, with eof set for
+     * overran() to find -- before the seek back clears it on the base */
+    if (laz_stream_eof(w->base)) s->eof = LAZ_TRUE;
+    if (!laz_stream_seek(w->base, here)) s->failed = w->base->failed;
+    w->buf_at = w->pos;
+    w->fill = n;
+    return n;
+}
+
+static U32 window_get_byte(LazStream *s)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    if (w->pos < w->buf_at || w->pos >= w->buf_at + w->fill) {
+        if (window_refill(s) == 0) return 0;
+    }
+    return w->buf[w->pos++ - w->buf_at];
+}
+
+static void window_get_bytes(LazStream *s, U8 *bytes, I64 num_bytes)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    while (num_bytes > 0) {
+        I64 avail = w->buf_at + w->fill - w->pos;
+        if (w->pos < w->buf_at || avail <= 0) {
+            if (window_refill(s) == 0) { memset(bytes, 0, (size_t)num_bytes); return; }
+            continue;
+        }
+        if (avail > num_bytes) avail = num_bytes;
+        memcpy(bytes, w->buf + (w->pos - w->buf_at), (size_t)avail);
+        w->pos += avail;
+        bytes += avail;
+        num_bytes -= avail;
+    }
+}
+
+static I64 window_tell(LazStream *s) { return ((WindowImpl *)s->impl)->pos; }
+
+static BOOL window_seek(LazStream *s, I64 position)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    if (position < 0 || position > w->size) return LAZ_FALSE;
+    w->pos = position;
+    return LAZ_TRUE;
+}
+
+static BOOL window_seek_end(LazStream *s, I64 distance)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    if (distance < 0 || distance > w->size) return LAZ_FALSE;
+    w->pos = w->size - distance;
+    return LAZ_TRUE;
+}
+
+static void window_destroy(LazStream *s)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    free(w->buf);
+    free(w);
+}
+
+LazStream *laz_stream_new_window(LazStream *base)
+{
+    LazStream *s = (LazStream *)calloc(1, sizeof(LazStream));
+    WindowImpl *w;
+    if (!s) return NULL;
+    w = (WindowImpl *)calloc(1, sizeof(WindowImpl));
+    if (!w) { free(s); return NULL; }
+    w->buf = (U8 *)malloc(WINDOW_BUF_SIZE);
+    if (!w->buf) { free(w); free(s); return NULL; }
+    w->base = base;
+    s->impl = w;
+    s->get_byte = window_get_byte;
+    s->get_bytes = window_get_bytes;
+    s->tell = window_tell;
+    s->seek = window_seek;
+    s->seek_end = window_seek_end;
+    s->destroy = window_destroy;
+    s->seekable = LAZ_TRUE;
+    s->eof = LAZ_FALSE;
+    return s;
+}
+
+void laz_stream_window_reset(LazStream *s, I64 start, I64 size)
+{
+    WindowImpl *w = (WindowImpl *)s->impl;
+    w->start = start;
+    w->size = size;
+    w->pos = 0;
+    w->buf_at = 0;
+    w->fill = 0;
+    s->eof = LAZ_FALSE;
+    s->failed = LAZ_FALSE;
+}
+
 /* ------------------------------------------------------------------- file */
 
 /*
@@ -110,9 +247,106 @@ void laz_stream_array_reset(LazStream *s, const U8 *data, I64 size)
  * extended record's payload by seeking the same object and putting it back
  * exactly where it found it. Anything here that leaves the object somewhere
  * other than base + fill -- read-ahead, say -- has to be reflected there.
+ *
+ * Its calls into the object take back the GIL that the thread let go of for
+ * the decoding around them (see stream_take_gil); on a free-threaded build
+ * that attaches the thread rather than taking a lock. Nothing more is
+ * needed there, as the stream is only ever stepped by one thread at a time:
+ * its reader's or writer's, under that object's lock (ObjectLock in
+ * cpylaz.h). The read-ahead worker is the exception, and shares only what
+ * its mutex guards.
  */
+/*
+ * The GIL, for a file stream's calls into Python.
+ *
+ * The binding lets the GIL go around decoding with LAZ_BEGIN_ALLOW_THREADS
+ * (cpylaz.h), which keeps the thread state it let go of here, in a variable
+ * of the thread's own, and a call into Python takes that one back. It is
+ * what makes the calls safe in a subinterpreter: PyGILState_Ensure knows of
+ * one thread state a thread, the main interpreter's, and in any other it
+ * would run the file object's read() in the wrong interpreter -- under the
+ * wrong GIL, where each has its own. While the thread is in Python the
+ * variable is NULL again, so that a reader it calls into lets the GIL go and
+ * takes it back for itself.
+ */
+static LAZ_THREAD_LOCAL PyThreadState *let_go = NULL;
+
+/* Set on a read-ahead worker's thread, which holds the GIL only inside
+ * ahead_fetch and never asks there. */
+static LAZ_THREAD_LOCAL BOOL never_holds_gil = LAZ_FALSE;
+
+void laz_stream_release_gil(void)
+{
+    let_go = PyEval_SaveThread();
+}
+
+void laz_stream_acquire_gil(void)
+{
+    PyThreadState *tstate = let_go;
+    let_go = NULL;
+    PyEval_RestoreThread(tstate);
+}
+
+/* Whether this thread holds the GIL. From 3.12 the current thread state is
+ * the thread's own, and NULL while it has let the GIL go; it is asked that
+ * rather than PyGILState_Check, which answers yes to everything once a
+ * process has a subinterpreter. Before 3.12 the current thread state is the
+ * GIL holder's, whichever thread that is, and PyGILState_Check is the way --
+ * after asking what this thread knows for certain, since a subinterpreter
+ * there has it answer yes to everything too. */
+static BOOL stream_holds_gil(void)
+{
+    if (let_go || never_holds_gil) return LAZ_FALSE;
+#if PY_VERSION_HEX >= 0x030D0000
+    return PyThreadState_GetUnchecked() != NULL;
+#elif PY_VERSION_HEX >= 0x030C0000
+    return _PyThreadState_UncheckedGet() != NULL;
+#else
+    return PyGILState_Check() ? LAZ_TRUE : LAZ_FALSE;
+#endif
+}
+
+/* How stream_take_gil came by the GIL, for stream_give_gil to undo. */
+typedef struct {
+    PyThreadState *restored;    /* the thread state taken back, or NULL */
+    BOOL ensured;
+    PyGILState_STATE state;
+} StreamGil;
+
+/* Takes the GIL for a call into Python: back from where this thread let it
+ * go, or not at all if it holds it -- a stream destroyed with its object --
+ * or, for a thread the binding never let it go on, PyGILState_Ensure. */
+static void stream_take_gil(StreamGil *g)
+{
+    g->restored = let_go;
+    g->ensured = LAZ_FALSE;
+    /* read only where ensured, but set always: gcc -O3 cannot see that */
+    g->state = PyGILState_UNLOCKED;
+    if (g->restored) {
+        laz_stream_acquire_gil();
+    } else if (!stream_holds_gil()) {
+        g->state = PyGILState_Ensure();
+        g->ensured = LAZ_TRUE;
+    }
+}
+
+static void stream_give_gil(StreamGil *g)
+{
+    if (g->restored) laz_stream_release_gil();
+    else if (g->ensured) PyGILState_Release(g->state);
+}
+
 #define FILE_BUF_SIZE 65536
 
+typedef struct FileAhead FileAhead;
+
+/* A range of the file read up front, in a buffer Python owns; see
+ * laz_stream_hold. */
+typedef struct {
+    I64 start;
+    Py_buffer view;
+} HeldRange;
+
 typedef struct {
     PyObject *fp;
     U8 *buf;
@@ -126,6 +360,18 @@ typedef struct {
      * where the file object has no readinto, which read() is the fallback
      * for -- BytesIO and open() both have one, a socket makefile may not. */
     PyObject *view;
+    /* Chunks read ahead by a thread of its own, or NULL; see FileAhead. While
+     * there are, the buffer may be filled from them, or a seek into one be
+     * only noted, and `behind` then says the object is not at base + fill:
+     * a refill that reads for itself seeks it there first. */
+    FileAhead *ahead;
+    BOOL behind;
+    /* Ranges a query read up front, in file order, and how many of them
+     * reading has gone past and let go. A refill in one copies from it, and
+     * leaves the object behind as one from a chunk read ahead does. */
+    HeldRange *held;
+    U32 num_held;
+    U32 held_from;
 } FileImpl;
 
 /*
@@ -156,6 +402,407 @@ static void file_drop_view(FileImpl *f)
     PyErr_Restore(type, value, traceback);
 }
 
+/* -------------------------------------------------------- file read-ahead */
+
+/*
+ * Chunks read ahead of the decoder, by a thread of its own.
+ *
+ * A refill is a read the decoder waits for, and where every read costs a
+ * round trip to network storage that wait is as long as the decoding it
+ * interrupts: the two take turns, and throughput halves. With read-ahead on,
+ * a worker thread reads whole chunks -- the chunk table says exactly which
+ * bytes each one is -- into buffers of their own while the decoder works
+ * through the chunk before, and a refill inside one of them is a copy.
+ *
+ * The worker reads through a second handle on the file, its own, so that the
+ * object the rest of this stream and lazpy read is never moved behind their
+ * backs. Where the decoder is in no chunk the worker has read -- the chunk
+ * table, a chunk it had no time for, one a seek jumped to -- a refill reads
+ * for itself as it always did, and the worker goes on from the chunk after.
+ *
+ * The worker takes the GIL only to call its file object, which lets it go
+ * again for the read itself; decoding runs without it, so the two overlap.
+ * Everything else they share is guarded by `mutex`, and each wakes the other
+ * through a lock kept held and released once for a waiter to take: Python's
+ * portable thread API, which is what builds everywhere the extension does,
+ * has locks but no condition variables.
+ */
+enum { AHEAD_FREE, AHEAD_READING, AHEAD_READY, AHEAD_FAILED };
+
+typedef struct {
+    U32 chunk;
+    int state;
+    U8 *buf;
+    I64 alloced;
+    I64 fill;           /* bytes of the chunk read; short only at end of file */
+} AheadSlot;
+
+struct FileAhead {
+    PyObject *fp;               /* the worker's own handle; owned */
+    PyInterpreterState *interp; /* the one fp belongs to */
+    I64 *starts;                /* [num_chunks + 1]: the last is an end */
+    U32 num_chunks;
+    /* [num_chunks]: the chunks a query will read, or NULL for every one */
+    U8 *wanted;
+    /* a plan of no chunks at all, which reading anywhere does not undo */
+    BOOL holding;
+    AheadSlot *slots;
+    U32 num_slots;              /* the decoder's chunk, and `depth` more */
+    U32 next;                   /* the first chunk the worker has not read */
+    U32 current;                /* the chunk the decoder is in */
+    BOOL stop;
+    PyThread_type_lock mutex;
+    PyThread_type_lock wake_worker;
+    PyThread_type_lock wake_reader;
+    PyThread_type_lock finished;    /* held until the worker returns */
+    BOOL worker_waiting;
+    BOOL reader_waiting;
+};
+
+/* Takes `lock`, letting the GIL go while waiting if this thread holds it:
+ * what the other thread has to finish first may need the GIL to get there. */
+static void ahead_acquire(PyThread_type_lock lock)
+{
+    if (stream_holds_gil()) {
+        Py_BEGIN_ALLOW_THREADS
+        PyThread_acquire_lock(lock, WAIT_LOCK);
+        Py_END_ALLOW_THREADS
+    } else {
+        PyThread_acquire_lock(lock, WAIT_LOCK);
+    }
+}
+
+/* With the mutex held: lets it go until `event` is released, and takes it
+ * back. `*waiting` is what asks the other thread for the release. */
+static void ahead_wait(FileAhead *a, PyThread_type_lock event, BOOL *waiting)
+{
+    *waiting = LAZ_TRUE;
+    PyThread_release_lock(a->mutex);
+    ahead_acquire(event);
+    ahead_acquire(a->mutex);
+}
+
+/* With the mutex held: lets through whichever thread waits on `event`. */
+static void ahead_signal(PyThread_type_lock event, BOOL *waiting)
+{
+    if (!*waiting) return;
+    *waiting = LAZ_FALSE;
+    PyThread_release_lock(event);
+}
+
+/* The chunk `position` is in, or num_chunks for none. */
+static U32 ahead_chunk_of(const FileAhead *a, I64 position)
+{
+    U32 lo = 0, hi = a->num_chunks;
+    if (!a->num_chunks || position < a->starts[0]) return a->num_chunks;
+    while (hi - lo > 1) {
+        U32 mid = lo + (hi - lo) / 2;
+        if (a->starts[mid] <= position) lo = mid; else hi = mid;
+    }
+    return position < a->starts[lo + 1] ? lo : a->num_chunks;
+}
+
+static AheadSlot *ahead_slot_of(FileAhead *a, U32 chunk)
+{
+    U32 i;
+    for (i = 0; i < a->num_slots; i++)
+        if (a->slots[i].state != AHEAD_FREE && a->slots[i].chunk == chunk)
+            return &a->slots[i];
+    return NULL;
+}
+
+/* A slot the worker may read into: one not in use, or one holding a chunk
+ * the decoder has gone past. */
+static AheadSlot *ahead_free_slot(FileAhead *a)
+{
+    U32 i;
+    for (i = 0; i < a->num_slots; i++) {
+        AheadSlot *slot = &a->slots[i];
+        if (slot->state == AHEAD_FREE ||
+            (slot->state != AHEAD_READING && slot->chunk < a->current))
+            return slot;
+    }
+    return NULL;
+}
+
+/* The next chunk worth reading, or num_chunks when there is none. */
+static U32 ahead_next(FileAhead *a)
+{
+    U32 k = a->next;
+    while (k < a->num_chunks &&
+           ((a->wanted && !a->wanted[k]) || ahead_slot_of(a, k)))
+        k++;
+    return k;
+}
+
+/* Drops what the slots hold of chunks reading will not come to next: those
+ * before `from`, and those too far past it to have been read for it. */
+static void ahead_drop_stale(FileAhead *a, U32 from)
+{
+    U32 i;
+    for (i = 0; i < a->num_slots; i++) {
+        AheadSlot *slot = &a->slots[i];
+        if (slot->state == AHEAD_READY || slot->state == AHEAD_FAILED) {
+            if (slot->chunk < from || slot->chunk > from + a->num_slots ||
+                (a->wanted && !a->wanted[slot->chunk]))
+                slot->state = AHEAD_FREE;
+        }
+    }
+}
+
+/*
+ * Reads a slot's chunk whole, from the worker, which holds neither the mutex
+ * nor the GIL coming in. Anything that goes wrong is the decoder's to meet
+ * when it reads the chunk for itself, so the exception is not kept.
+ *
+ * The worker's calls are made in the interpreter the reader belongs to, on a
+ * thread state made for each chunk and let go with it, not kept: a thread
+ * state left in a subinterpreter between chunks would stop it ending while
+ * the reader is still open, which Py_EndInterpreter refuses to do.
+ */
+static BOOL ahead_fetch(FileAhead *a, AheadSlot *slot)
+{
+    I64 start = a->starts[slot->chunk];
+    I64 size = a->starts[slot->chunk + 1] - start;
+    PyThreadState *tstate;
+    PyObject *res, *view, *released;
+    BOOL ok = LAZ_TRUE;
+
+    slot->fill = 0;
+    if (size <= 0) return LAZ_FALSE;
+    if (size > slot->alloced) {
+        U8 *grown = (U8 *)realloc(slot->buf, (size_t)size);
+        if (!grown) return LAZ_FALSE;
+        slot->buf = grown;
+        slot->alloced = size;
+    }
+
+    tstate = PyThreadState_New(a->interp);
+    if (!tstate) return LAZ_FALSE;
+    PyEval_RestoreThread(tstate);
+    res = PyObject_CallMethod(a->fp, "seek", "Li", (long long)start, 0);
+    if (res) Py_DECREF(res); else ok = LAZ_FALSE;
+    while (ok && slot->fill < size) {
+        Py_ssize_t n;
+        view = PyMemoryView_FromMemory((char *)slot->buf + slot->fill,
+                                       (Py_ssize_t)(size - slot->fill),
+                                       PyBUF_WRITE);
+        if (!view) { ok = LAZ_FALSE; break; }
+        res = PyObject_CallMethod(a->fp, "readinto", "O", view);
+        /* see file_drop_view: the buffer is ours, not the file object's */
+        released = PyObject_CallMethod(view, "release", NULL);
+        Py_XDECREF(released);
+        Py_DECREF(view);
+        if (!res || !released) { Py_XDECREF(res); ok = LAZ_FALSE; break; }
+        n = PyNumber_AsSsize_t(res, PyExc_OverflowError);
+        Py_DECREF(res);
+        if (n < 0 || n > size - slot->fill) { ok = LAZ_FALSE; break; }
+        if (n == 0) break;                  /* the file ends in the chunk */
+        slot->fill += n;
+    }
+    PyErr_Clear();
+    PyThreadState_Clear(tstate);
+    PyThreadState_DeleteCurrent();
+    return ok;
+}
+
+static void ahead_worker(void *arg)
+{
+    FileAhead *a = (FileAhead *)arg;
+
+    never_holds_gil = LAZ_TRUE;
+    PyThread_acquire_lock(a->mutex, WAIT_LOCK);
+    while (!a->stop) {
+        U32 k = ahead_next(a);
+        AheadSlot *slot = k < a->num_chunks ? ahead_free_slot(a) : NULL;
+        BOOL ok;
+
+        if (!slot) {
+            ahead_wait(a, a->wake_worker, &a->worker_waiting);
+            continue;
+        }
+        slot->chunk = k;
+        slot->state = AHEAD_READING;
+        a->next = k + 1;
+        PyThread_release_lock(a->mutex);
+        ok = ahead_fetch(a, slot);
+        PyThread_acquire_lock(a->mutex, WAIT_LOCK);
+        slot->state = ok ? AHEAD_READY : AHEAD_FAILED;
+        ahead_signal(a->wake_reader, &a->reader_waiting);
+    }
+    PyThread_release_lock(a->mutex);
+    PyThread_release_lock(a->finished);
+}
+
+/*
+ * Fills the buffer, from f->base, out of a chunk read ahead: the bytes
+ * copied, or 0 for the refill to read for itself. Waits for a chunk the
+ * worker is reading rather than read it a second time.
+ */
+static I64 ahead_refill(FileImpl *f)
+{
+    FileAhead *a = f->ahead;
+    U32 k = ahead_chunk_of(a, f->base);
+    AheadSlot *slot;
+    I64 at, n = 0;
+
+    if (k == a->num_chunks) return 0;
+    ahead_acquire(a->mutex);
+    if (k != a->current) {
+        a->current = k;
+        /* a chunk the query did not plan for: reading has gone its own way,
+         * and the worker follows it from here through every chunk -- unless
+         * the plan is of nothing, for reading that looks here and there */
+        if (a->wanted && !a->wanted[k] && !a->holding) {
+            free(a->wanted);
+            a->wanted = NULL;
+        }
+        ahead_signal(a->wake_worker, &a->worker_waiting);
+    }
+    for (;;) {
+        slot = ahead_slot_of(a, k);
+        if (slot && slot->state == AHEAD_READING) {
+            ahead_wait(a, a->wake_reader, &a->reader_waiting);
+            continue;
+        }
+        if (!slot) {
+            /* a seek went somewhere the worker was not, or reading caught it
+             * up: this chunk is the decoder's to read, and the worker starts
+             * again from the next */
+            ahead_drop_stale(a, k);
+            if (a->next <= k || a->next > k + a->num_slots) a->next = k + 1;
+            ahead_signal(a->wake_worker, &a->worker_waiting);
+        }
+        break;
+    }
+    PyThread_release_lock(a->mutex);
+
+    /* A ready slot of the decoder's chunk is not the worker's to reuse, so it
+     * is read without the mutex. */
+    if (slot && slot->state == AHEAD_READY) {
+        at = f->base - a->starts[k];
+        if (at < slot->fill) {
+            n = slot->fill - at;
+            if (n > FILE_BUF_SIZE) n = FILE_BUF_SIZE;
+            memcpy(f->buf, slot->buf + at, (size_t)n);
+        }
+    }
+    return n;
+}
+
+static void ahead_free(FileAhead *a)
+{
+    U32 i;
+    if (a->slots)
+        for (i = 0; i < a->num_slots; i++) free(a->slots[i].buf);
+    free(a->slots);
+    free(a->starts);
+    free(a->wanted);
+    Py_XDECREF(a->fp);
+    if (a->mutex) PyThread_free_lock(a->mutex);
+    if (a->wake_worker) PyThread_free_lock(a->wake_worker);
+    if (a->wake_reader) PyThread_free_lock(a->wake_reader);
+    if (a->finished) PyThread_free_lock(a->finished);
+    free(a);
+}
+
+/* Stops the worker, waits for it to return, and frees what it read. With the
+ * GIL held. */
+static void ahead_stop(FileImpl *f)
+{
+    FileAhead *a = f->ahead;
+    int finalizing;
+
+    if (!a) return;
+    f->ahead = NULL;
+    ahead_acquire(a->mutex);
+    a->stop = LAZ_TRUE;
+    ahead_signal(a->wake_worker, &a->worker_waiting);
+    PyThread_release_lock(a->mutex);
+
+#if PY_VERSION_HEX >= 0x030D0000
+    finalizing = Py_IsFinalizing();
+#else
+    finalizing = _Py_IsFinalizing();
+#endif
+    /* A worker in the middle of a read needs the GIL to finish it, which a
+     * finalizing interpreter will not give it; it is left, with what it reads
+     * into, for the process to take away. */
+    if (finalizing) return;
+    ahead_acquire(a->finished);
+    ahead_free(a);
+}
+
+/* ----------------------------------------------------------- file held */
+
+/*
+ * Ranges of the file a query read before decoding any of them.
+ *
+ * A query knows every chunk it will decode before it decodes one, and the
+ * chunk table knows the bytes of each: read in order, with the small gaps
+ * between them read through rather than sought over, they come in a few
+ * large reads where decoding would make a seek and a refill after refill
+ * of each. Python makes those reads, since it is what knows how the file
+ * is best read -- pread on a descriptor, or one request of a range reader
+ * -- and the stream keeps the buffers it read into until reading has gone
+ * past them.
+ */
+
+static I64 held_end(const HeldRange *h)
+{
+    return h->start + (I64)h->view.len;
+}
+
+/* The held range `position` is in, or NULL. */
+static HeldRange *held_of(FileImpl *f, I64 position)
+{
+    U32 lo = f->held_from, hi = f->num_held;
+    while (lo < hi) {
+        U32 mid = lo + (hi - lo) / 2;
+        if (held_end(&f->held[mid]) <= position) lo = mid + 1; else hi = mid;
+    }
+    if (lo < f->num_held && f->held[lo].start <= position) return &f->held[lo];
+    return NULL;
+}
+
+/* Lets go of the held ranges from `from` on, with the GIL held. */
+static void held_release(FileImpl *f, U32 from)
+{
+    U32 i;
+    for (i = from; i < f->num_held; i++) PyBuffer_Release(&f->held[i].view);
+}
+
+/*
+ * Fills the buffer, from f->base, out of a held range: the bytes copied, or
+ * 0 for the refill to read for itself. The ranges reading has gone past are
+ * let go first -- a query reads in file order, so it will not be back for
+ * them, and what it holds shrinks as it goes.
+ */
+static I64 held_refill(FileImpl *f)
+{
+    HeldRange *h;
+    I64 n;
+    U32 passed = f->held_from;
+
+    while (passed < f->num_held && held_end(&f->held[passed]) <= f->base)
+        passed++;
+    if (passed > f->held_from) {
+        StreamGil gil;
+        U32 i;
+        stream_take_gil(&gil);
+        for (i = f->held_from; i < passed; i++)
+            PyBuffer_Release(&f->held[i].view);
+        stream_give_gil(&gil);
+        f->held_from = passed;
+    }
+    h = held_of(f, f->base);
+    if (!h) return 0;
+    n = held_end(h) - f->base;
+    if (n > FILE_BUF_SIZE) n = FILE_BUF_SIZE;
+    memcpy(f->buf, (const U8 *)h->view.buf + (f->base - h->start), (size_t)n);
+    return n;
+}
+
 /* Refills the buffer from the current logical position. Returns bytes read. */
 static I64 file_refill(LazStream *s)
 {
@@ -163,19 +810,48 @@ static I64 file_refill(LazStream *s)
     PyObject *res;
     Py_ssize_t n;
     char *data;
-    PyGILState_STATE gil;
+    StreamGil gil;
 
     /* Once failed the stream is inert: an exception is pending, so calling
      * back into Python again would be illegal. Decoding continues on zeros
      * until the caller notices and propagates. */
     if (s->failed) return 0;
 
-    gil = PyGILState_Ensure();
-
     f->base += f->pos;
     f->pos = 0;
     f->fill = 0;
 
+    if (f->held_from < f->num_held) {
+        I64 got = held_refill(f);
+        if (got > 0) {
+            f->fill = got;
+            f->behind = LAZ_TRUE;
+            return got;
+        }
+    }
+    if (f->ahead) {
+        I64 got = ahead_refill(f);
+        if (got > 0) {
+            f->fill = got;
+            f->behind = LAZ_TRUE;
+            return got;
+        }
+    }
+
+    stream_take_gil(&gil);
+
+    if (f->behind) {
+        res = PyObject_CallMethod(f->fp, "seek", "Li", (long long)f->base, 0);
+        if (res == NULL) {
+            stream_give_gil(&gil);
+            s->failed = LAZ_TRUE;
+            s->eof = LAZ_TRUE;
+            return 0;
+        }
+        Py_DECREF(res);
+        f->behind = LAZ_FALSE;
+    }
+
     /* On failure the Python exception is deliberately left set: the binding
      * propagates it rather than reporting a generic end-of-file, so a
      * PermissionError or a file object returning a non-bytes value is
@@ -196,7 +872,7 @@ static I64 file_refill(LazStream *s)
                 PyErr_Clear();
                 file_drop_view(f);
             } else {
-                PyGILState_Release(gil);
+                stream_give_gil(&gil);
                 s->failed = LAZ_TRUE;
                 s->eof = LAZ_TRUE;
                 return 0;
@@ -208,13 +884,13 @@ static I64 file_refill(LazStream *s)
                 if (n >= 0)
                     PyErr_SetString(PyExc_ValueError,
                                     "readinto wrote more than it was given");
-                PyGILState_Release(gil);
+                stream_give_gil(&gil);
                 s->failed = LAZ_TRUE;
                 s->eof = LAZ_TRUE;
                 return 0;
             }
             f->fill = (I64)n;
-            PyGILState_Release(gil);
+            stream_give_gil(&gil);
             if (n == 0) s->eof = LAZ_TRUE;
             return (I64)n;
         }
@@ -222,14 +898,14 @@ static I64 file_refill(LazStream *s)
 
     res = PyObject_CallMethod(f->fp, "read", "n", (Py_ssize_t)FILE_BUF_SIZE);
     if (res == NULL) {
-        PyGILState_Release(gil);
+        stream_give_gil(&gil);
         s->failed = LAZ_TRUE;
         s->eof = LAZ_TRUE;
         return 0;
     }
     if (PyBytes_AsStringAndSize(res, &data, &n) < 0) {
         Py_DECREF(res);
-        PyGILState_Release(gil);
+        stream_give_gil(&gil);
         s->failed = LAZ_TRUE;
         s->eof = LAZ_TRUE;
         return 0;
@@ -237,7 +913,7 @@ static I64 file_refill(LazStream *s)
     if (n > FILE_BUF_SIZE) {
         Py_DECREF(res);
         PyErr_SetString(PyExc_ValueError, "read returned more than it was asked for");
-        PyGILState_Release(gil);
+        stream_give_gil(&gil);
         s->failed = LAZ_TRUE;
         s->eof = LAZ_TRUE;
         return 0;
@@ -247,7 +923,7 @@ static I64 file_refill(LazStream *s)
         f->fill = (I64)n;
     }
     Py_DECREF(res);
-    PyGILState_Release(gil);
+    stream_give_gil(&gil);
     if (n == 0) s->eof = LAZ_TRUE;
     return (I64)n;
 }
@@ -290,26 +966,27 @@ static BOOL file_seek_raw(LazStream *s, I64 offset, int whence)
     FileImpl *f = (FileImpl *)s->impl;
     PyObject *res;
     I64 newpos;
-    PyGILState_STATE gil;
+    StreamGil gil;
 
     if (s->failed) return LAZ_FALSE;      /* see file_refill */
 
-    gil = PyGILState_Ensure();
+    stream_take_gil(&gil);
 
     res = PyObject_CallMethod(f->fp, "seek", "Li", (long long)offset, whence);
-    if (res == NULL) { s->failed = LAZ_TRUE; PyGILState_Release(gil); return LAZ_FALSE; }
+    if (res == NULL) { s->failed = LAZ_TRUE; stream_give_gil(&gil); return LAZ_FALSE; }
     Py_DECREF(res);
 
     res = PyObject_CallMethod(f->fp, "tell", NULL);
-    if (res == NULL) { s->failed = LAZ_TRUE; PyGILState_Release(gil); return LAZ_FALSE; }
+    if (res == NULL) { s->failed = LAZ_TRUE; stream_give_gil(&gil); return LAZ_FALSE; }
     newpos = (I64)PyLong_AsLongLong(res);
     Py_DECREF(res);
-    if (PyErr_Occurred()) { s->failed = LAZ_TRUE; PyGILState_Release(gil); return LAZ_FALSE; }
-    PyGILState_Release(gil);
+    if (PyErr_Occurred()) { s->failed = LAZ_TRUE; stream_give_gil(&gil); return LAZ_FALSE; }
+    stream_give_gil(&gil);
 
     f->base = newpos;
     f->pos = 0;
     f->fill = 0;
+    f->behind = LAZ_FALSE;
     s->eof = LAZ_FALSE;
     return LAZ_TRUE;
 }
@@ -322,6 +999,20 @@ static BOOL file_seek(LazStream *s, I64 position)
         f->pos = position - f->base;
         return LAZ_TRUE;
     }
+    /* into a range held or a chunk read ahead, where the refill will find it
+     * without the object having to be moved -- and if it does not, seeks it
+     * then */
+    if (position >= 0 && !s->failed &&
+        ((f->held_from < f->num_held && held_of(f, position)) ||
+         (f->ahead &&
+          ahead_chunk_of(f->ahead, position) < f->ahead->num_chunks))) {
+        f->base = position;
+        f->pos = 0;
+        f->fill = 0;
+        f->behind = LAZ_TRUE;
+        s->eof = LAZ_FALSE;
+        return LAZ_TRUE;
+    }
     return file_seek_raw(s, position, SEEK_SET);
 }
 
@@ -333,10 +1024,14 @@ static BOOL file_seek_end(LazStream *s, I64 distance)
 static void file_destroy(LazStream *s)
 {
     FileImpl *f = (FileImpl *)s->impl;
-    PyGILState_STATE gil = PyGILState_Ensure();
+    StreamGil gil;
+    stream_take_gil(&gil);
+    ahead_stop(f);
+    held_release(f, f->held_from);
+    free(f->held);
     file_drop_view(f);
     Py_XDECREF(f->fp);
-    PyGILState_Release(gil);
+    stream_give_gil(&gil);
     free(f->buf);
     free(f);
 }
@@ -418,6 +1113,133 @@ LazStream *laz_stream_new_file(void *py_fp)
     return s;
 }
 
+BOOL laz_stream_read_ahead(LazStream *s, void *py_fp, const I64 *starts,
+                           U32 num_chunks, U32 depth)
+{
+    FileImpl *f;
+    FileAhead *a;
+
+    if (s->seek != file_seek) return LAZ_FALSE;
+    f = (FileImpl *)s->impl;
+    ahead_stop(f);
+    if (!py_fp || !num_chunks || !depth) return LAZ_TRUE;
+
+    a = (FileAhead *)calloc(1, sizeof(FileAhead));
+    if (!a) return LAZ_FALSE;
+    a->num_chunks = num_chunks;
+    a->num_slots = depth + 1;
+    a->starts = (I64 *)malloc(sizeof(I64) * ((size_t)num_chunks + 1));
+    a->slots = (AheadSlot *)calloc(a->num_slots, sizeof(AheadSlot));
+    a->mutex = PyThread_allocate_lock();
+    a->wake_worker = PyThread_allocate_lock();
+    a->wake_reader = PyThread_allocate_lock();
+    a->finished = PyThread_allocate_lock();
+    if (!a->starts || !a->slots || !a->mutex || !a->wake_worker ||
+        !a->wake_reader || !a->finished) {
+        ahead_free(a);
+        return LAZ_FALSE;
+    }
+    memcpy(a->starts, starts, sizeof(I64) * ((size_t)num_chunks + 1));
+    /* the events start held, for a waiter to block on until released */
+    PyThread_acquire_lock(a->wake_worker, WAIT_LOCK);
+    PyThread_acquire_lock(a->wake_reader, WAIT_LOCK);
+    PyThread_acquire_lock(a->finished, WAIT_LOCK);
+    a->fp = (PyObject *)py_fp;
+    Py_INCREF(a->fp);
+    a->interp = PyInterpreterState_Get();
+    a->current = ahead_chunk_of(a, file_tell(s));
+    if (a->current == num_chunks) a->current = 0;
+    a->next = a->current;
+
+    if (PyThread_start_new_thread(ahead_worker, a) ==
+            PYTHREAD_INVALID_THREAD_ID) {
+        ahead_free(a);
+        return LAZ_FALSE;
+    }
+    f->ahead = a;
+    return LAZ_TRUE;
+}
+
+U32 laz_stream_ahead_chunks(const LazStream *s)
+{
+    if (s->seek != file_seek || !((FileImpl *)s->impl)->ahead) return 0;
+    return ((FileImpl *)s->impl)->ahead->num_chunks;
+}
+
+BOOL laz_stream_plan_ahead(LazStream *s, const U8 *wanted)
+{
+    FileAhead *a;
+    U8 *copy = NULL;
+    U32 k;
+
+    if (s->seek != file_seek) return LAZ_TRUE;
+    a = ((FileImpl *)s->impl)->ahead;
+    if (!a) return LAZ_TRUE;
+    if (wanted) {
+        copy = (U8 *)malloc(a->num_chunks);
+        if (!copy) return LAZ_FALSE;
+        memcpy(copy, wanted, a->num_chunks);
+    }
+    ahead_acquire(a->mutex);
+    free(a->wanted);
+    a->wanted = copy;
+    a->holding = LAZ_FALSE;
+    if (copy) {
+        /* a query reads in file order from the first chunk it wants, which
+         * is where the worker is sent, reading being about to follow; with
+         * none wanted it has nowhere to go until the next plan */
+        for (k = 0; k < a->num_chunks && !copy[k]; k++) {}
+        a->current = a->next = k;
+        a->holding = k == a->num_chunks;
+        ahead_drop_stale(a, k);
+    }
+    ahead_signal(a->wake_worker, &a->worker_waiting);
+    PyThread_release_lock(a->mutex);
+    return LAZ_TRUE;
+}
+
+BOOL laz_stream_hold(LazStream *s, U32 n, const I64 *starts,
+                     void *const *objects)
+{
+    FileImpl *f;
+    HeldRange *held = NULL;
+    U32 i;
+
+    if (s->seek != file_seek) return LAZ_TRUE;
+    f = (FileImpl *)s->impl;
+    if (n) {
+        held = (HeldRange *)calloc(n, sizeof(HeldRange));
+        if (!held) {
+            PyErr_NoMemory();
+            return LAZ_FALSE;
+        }
+        for (i = 0; i < n; i++) {
+            held[i].start = starts[i];
+            if (PyObject_GetBuffer((PyObject *)objects[i], &held[i].view,
+                                   PyBUF_SIMPLE) < 0) {
+                while (i--) PyBuffer_Release(&held[i].view);
+                free(held);
+                return LAZ_FALSE;
+            }
+        }
+    }
+    if (f->held_from < f->num_held) {
+        /* the buffer may be a copy out of what was held, and is dropped with
+         * it; the next refill reads from where reading is, seeking there
+         * first. One that has gone past every range was refilled since. */
+        held_release(f, f->held_from);
+        f->base += f->pos;
+        f->pos = 0;
+        f->fill = 0;
+        f->behind = LAZ_TRUE;
+    }
+    free(f->held);
+    f->held = held;
+    f->num_held = n;
+    f->held_from = 0;
+    return LAZ_TRUE;
+}
+
 /* -------------------------------------------------------------- file out */
 
 /*
@@ -442,14 +1264,14 @@ static void fileout_emit(LazOutStream *s, const U8 *bytes, I64 num_bytes)
 {
     FileOutImpl *f = (FileOutImpl *)s->impl;
     PyObject *res;
-    PyGILState_STATE gil;
+    StreamGil gil;
 
     /* Once failed the stream is inert: an exception is pending, so calling
      * back into Python again would be illegal. The encoder keeps writing into
      * the void until the caller notices and propagates. */
     if (s->failed || num_bytes <= 0) return;
 
-    gil = PyGILState_Ensure();
+    stream_take_gil(&gil);
     res = PyObject_CallMethod(f->fp, "write", "y#",
                               (const char *)bytes, (Py_ssize_t)num_bytes);
     if (res == NULL) {
@@ -457,7 +1279,7 @@ static void fileout_emit(LazOutStream *s, const U8 *bytes, I64 num_bytes)
     } else {
         Py_DECREF(res);
     }
-    PyGILState_Release(gil);
+    stream_give_gil(&gil);
 }
 
 static void fileout_flush(LazOutStream *s)
@@ -490,7 +1312,7 @@ static BOOL fileout_seek(LazOutStream *s, I64 position)
 {
     FileOutImpl *f = (FileOutImpl *)s->impl;
     PyObject *res;
-    PyGILState_STATE gil;
+    StreamGil gil;
 
     if (s->failed || !s->seekable) return LAZ_FALSE;   /* see fileout_emit */
     if (position == f->pos) return LAZ_TRUE;
@@ -499,11 +1321,11 @@ static BOOL fileout_seek(LazOutStream *s, I64 position)
     fileout_flush(s);
     if (s->failed) return LAZ_FALSE;
 
-    gil = PyGILState_Ensure();
+    stream_take_gil(&gil);
     res = PyObject_CallMethod(f->fp, "seek", "L", (long long)position);
-    if (res == NULL) { s->failed = LAZ_TRUE; PyGILState_Release(gil); return LAZ_FALSE; }
+    if (res == NULL) { s->failed = LAZ_TRUE; stream_give_gil(&gil); return LAZ_FALSE; }
     Py_DECREF(res);
-    PyGILState_Release(gil);
+    stream_give_gil(&gil);
 
     f->pos = position;
     return LAZ_TRUE;
@@ -512,7 +1334,8 @@ static BOOL fileout_seek(LazOutStream *s, I64 position)
 static void fileout_destroy(LazOutStream *s)
 {
     FileOutImpl *f = (FileOutImpl *)s->impl;
-    PyGILState_STATE gil = PyGILState_Ensure();
+    StreamGil gil;
+    stream_take_gil(&gil);
 
     /* A last-resort flush, for a stream dropped without being closed. There is
      * nobody left to report a failure to, and an exception left pending here
@@ -527,7 +1350,7 @@ static void fileout_destroy(LazOutStream *s)
     }
 
     Py_XDECREF(f->fp);
-    PyGILState_Release(gil);
+    stream_give_gil(&gil);
     free(f->buf);
     free(f);
 }
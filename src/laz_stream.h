@@ -9,7 +9,7 @@
 /*
  * laz_stream.h -- byte-oriented input and output streams.
  *
- * Ported from LASzip's ByteStreamIn hierarchy. Two backings are needed:
+ * Ported from LASzip's ByteStreamIn hierarchy. Three backings are needed:
  *
  *   - "array": a fixed in-memory buffer. The layered LAS 1.4 (v3/v4) readers
  *     slice a chunk into per-layer sub-streams and give each its own decoder,
@@ -19,6 +19,10 @@
  *     arithmetic decoder pulls single bytes during renormalisation and a
  *     Python-level call per byte dominates decode time otherwise.
  *
+ *   - "window": a range of another stream, through a bounded buffer. The
+ *     layered readers use one per layer in place of an array where a chunk's
+ *     layers are too large to hold whole.
+ *
  * Every getter sets stream->eof on underrun rather than raising; callers check
  * laz_stream_error() at a granularity that makes sense for them.
  */
@@ -58,6 +62,48 @@ LazStream *laz_stream_new_array(const U8 *data, I64 size);
  * Used to recycle per-layer streams across chunks. */
 void laz_stream_array_reset(LazStream *s, const U8 *data, I64 size);
 
+/* A range of `base`, read through a buffer of its own and leaving `base`
+ * where it found it. Borrows `base`, which must be seekable. */
+LazStream *laz_stream_new_window(LazStream *base);
+
+/* Repoints a window at `size` bytes of its base from offset `start`. */
+void laz_stream_window_reset(LazStream *s, I64 start, I64 size);
+
+/* Has a file stream read chunks ahead of need, on a thread of its own and
+ * through `py_fp`, a second handle on the same file: `depth` of them past the
+ * one being read, of the `num_chunks` that begin at `starts`, whose last
+ * entry is where the last chunk ends. A NULL `py_fp` stops it. With the GIL
+ * held; FALSE if there is no memory or thread for it. */
+BOOL laz_stream_read_ahead(LazStream *s, void *py_fp, const I64 *starts,
+                           U32 num_chunks, U32 depth);
+
+/* How many chunks a stream reads ahead over: 0 while it does not. */
+U32 laz_stream_ahead_chunks(const LazStream *s);
+
+/* Narrows what is read ahead to the chunks `wanted` flags, one byte each,
+ * until reading goes into one it does not; NULL widens it to every chunk.
+ * With no chunk flagged nothing is read ahead until the next plan, wherever
+ * reading goes. */
+BOOL laz_stream_plan_ahead(LazStream *s, const U8 *wanted);
+
+/* Has a file stream take refills from ranges of the file read up front
+ * rather than read them: `n` of them, in file order and not overlapping,
+ * the i-th beginning at starts[i] and held in objects[i], a Python object
+ * with a buffer. Each is let go once reading goes past it, and any left
+ * when ranges are held again. With the GIL held; FALSE with an exception
+ * set if an object has no buffer or there is no memory. */
+BOOL laz_stream_hold(LazStream *s, U32 n, const I64 *starts,
+                     void *const *objects);
+
+/*
+ * Lets the GIL go, keeping this thread's state for a file stream's calls into
+ * Python to take it back by, and takes it back again: what the binding's
+ * LAZ_BEGIN_ALLOW_THREADS and LAZ_END_ALLOW_THREADS are made of, around
+ * anything that reads or writes through a file stream.
+ */
+void laz_stream_release_gil(void);
+void laz_stream_acquire_gil(void);
+
 void laz_stream_destroy(LazStream *s);
 
 static inline U32 laz_stream_get_byte(LazStream *s) { return s->get_byte(s); }
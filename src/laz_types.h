@@ -104,6 +104,16 @@ typedef struct {
 #define LAZ_BIG_ENDIAN 0
 #endif
 
+/* A variable each thread has its own copy of. The debugging hooks are kept
+ * in them, so that arming one in a test thread reaches no decoding on another
+ * -- which on a free-threaded build is running at the same time. C11 spells
+ * it _Thread_local; MSVC, which ships no C11 threads, __declspec(thread). */
+#if defined(_MSC_VER)
+#define LAZ_THREAD_LOCAL __declspec(thread)
+#else
+#define LAZ_THREAD_LOCAL _Thread_local
+#endif
+
 /*
  * Little-endian scalars in a byte buffer.
  *
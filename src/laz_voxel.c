@@ -0,0 +1,264 @@
+/*
+ * laz_voxel.c -- thinning points to one per voxel; see laz_voxel.h.
+ *
+ * The voxels are in arrays indexed by the order they were first landed in,
+ * and found again through an open-addressed hash of their cells. A sorted
+ * structure would find them as well, but the points of a survey arrive a
+ * scan line at a time, so consecutive points mostly land in the voxel the
+ * last one did or one beside it: what matters is a lookup that costs the
+ * same wherever the voxel is, which a hash is and a tree is not.
+ */
+
+#include <math.h>
+#include <stddef.h>
+#include <stdio.h>
+#include <stdarg.h>
+#include <stdlib.h>
+#include <string.h>
+#include "laz_voxel.h"
+
+/* The hash's slots to begin with. It doubles once it is more than half
+ * full, past which probing for an absent cell -- which is what every new
+ * voxel does -- starts to cost. */
+#define FIRST_SLOTS 1024u
+
+/* The largest cell number a double can be turned into an I64 from, kept
+ * clear of 2^63, where the conversion stops being defined. */
+#define CELL_LIMIT 9.0e18
+
+static void set_error(LazVoxelGrid *g, const char *fmt, ...)
+{
+    va_list ap;
+    va_start(ap, fmt);
+    vsnprintf(g->last_error, sizeof(g->last_error), fmt, ap);
+    va_end(ap);
+    g->has_error = LAZ_TRUE;
+}
+
+/*
+ * Where a cell goes in the hash. The three numbers are mixed by unrelated
+ * odd multipliers so that neighbouring cells, which differ by one in a
+ * single coordinate, scatter rather than landing in neighbouring slots.
+ */
+static U32 cell_hash(const I64 *cell)
+{
+    U64 h = (U64)cell[0] * 0x9E3779B97F4A7C15ULL;
+    h ^= (U64)cell[1] * 0xC2B2AE3D27D4EB4FULL;
+    h ^= (U64)cell[2] * 0x165667B19E3779F9ULL;
+    h ^= h >> 29;
+    return (U32)(h ^ (h >> 32));
+}
+
+BOOL laz_voxelgrid_setup(LazVoxelGrid *g, const F64 size[3],
+                         const F64 scale[3], const F64 offset[3],
+                         LazVoxelKeep keep, U32 image_size,
+                         U32 num_extra_bytes)
+{
+    int axis;
+
+    memset(g, 0, sizeof(*g));
+    for (axis = 0; axis < 3; axis++) {
+        /* z alone may be zero, for voxels that are columns */
+        if (!(size[axis] > 0) && !(axis == 2 && size[axis] == 0)) {
+            set_error(g, "a voxel's size must be positive");
+            return LAZ_FALSE;
+        }
+        g->size[axis] = size[axis];
+        g->scale[axis] = scale[axis];
+        g->offset[axis] = offset[axis];
+    }
+    g->keep = keep;
+    g->image_size = image_size;
+    g->num_extra_bytes = num_extra_bytes;
+    g->record_size = image_size + num_extra_bytes;
+    g->slots = (U32 *)calloc(FIRST_SLOTS, sizeof(U32));
+    if (!g->slots) {
+        set_error(g, "out of memory");
+        return LAZ_FALSE;
+    }
+    g->num_slots = FIRST_SLOTS;
+    return LAZ_TRUE;
+}
+
+/* Room for one more voxel in every per-voxel array. */
+static BOOL grow_voxels(LazVoxelGrid *g)
+{
+    U32 alloc;
+    U8 *records;
+    I64 *cells, *sums = g->sums;
+    U64 *counts;
+
+    if (g->num_voxels < g->alloc) return LAZ_TRUE;
+    if (g->alloc >= 0x7FFFFFFFu) {
+        set_error(g, "more voxels than a grid can hold");
+        return LAZ_FALSE;
+    }
+    alloc = g->alloc ? g->alloc * 2 : FIRST_SLOTS / 2;
+    /* each array is put in place as soon as it has grown, so that a failure
+     * part of the way through leaves nothing to be freed twice */
+    records = (U8 *)realloc(g->records, (size_t)alloc * g->record_size);
+    if (!records) goto oom;
+    g->records = records;
+    cells = (I64 *)realloc(g->cells, (size_t)alloc * 3 * sizeof(I64));
+    if (!cells) goto oom;
+    g->cells = cells;
+    counts = (U64 *)realloc(g->counts, (size_t)alloc * sizeof(U64));
+    if (!counts) goto oom;
+    g->counts = counts;
+    if (g->keep == LAZ_VOXEL_CENTROID) {
+        sums = (I64 *)realloc(g->sums, (size_t)alloc * 3 * sizeof(I64));
+        if (!sums) goto oom;
+        g->sums = sums;
+    }
+    g->alloc = alloc;
+    return LAZ_TRUE;
+oom:
+    set_error(g, "out of memory");
+    return LAZ_FALSE;
+}
+
+/* Twice the slots, every voxel hashed into them again. */
+static BOOL grow_slots(LazVoxelGrid *g)
+{
+    U32 num_slots = g->num_slots * 2, mask = num_slots - 1, v;
+    U32 *slots;
+
+    if (num_slots == 0) {
+        set_error(g, "more voxels than a grid can hold");
+        return LAZ_FALSE;
+    }
+    slots = (U32 *)calloc(num_slots, sizeof(U32));
+    if (!slots) {
+        set_error(g, "out of memory");
+        return LAZ_FALSE;
+    }
+    for (v = 0; v < g->num_voxels; v++) {
+        U32 at = cell_hash(g->cells + 3 * (size_t)v) & mask;
+        while (slots[at]) at = (at + 1) & mask;
+        slots[at] = v + 1;
+    }
+    free(g->slots);
+    g->slots = slots;
+    g->num_slots = num_slots;
+    return LAZ_TRUE;
+}
+
+static I32 record_z(const LazVoxelGrid *g, U32 v)
+{
+    I32 z;
+    memcpy(&z, g->records + (size_t)v * g->record_size
+                   + offsetof(LazPoint, Z), sizeof(z));
+    return z;
+}
+
+static void keep_point(LazVoxelGrid *g, U32 v, const LazPoint *p,
+                       const U8 *extra)
+{
+    U8 *record = g->records + (size_t)v * g->record_size;
+    memcpy(record, p, g->image_size);
+    if (g->num_extra_bytes)
+        memcpy(record + g->image_size, extra, g->num_extra_bytes);
+}
+
+BOOL laz_voxelgrid_add(LazVoxelGrid *g, const LazPoint *p, const U8 *extra)
+{
+    const I32 stored[3] = {p->X, p->Y, p->Z};
+    I64 cell[3] = {0, 0, 0};
+    U32 mask = g->num_slots - 1, at, v;
+    int axis;
+
+    for (axis = 0; axis < 3; axis++) {
+        F64 f;
+        if (g->size[axis] == 0) continue;       /* a column: one cell in z */
+        f = floor((stored[axis] * g->scale[axis] + g->offset[axis])
+                  / g->size[axis]);
+        if (!(fabs(f) < CELL_LIMIT)) {
+            set_error(g, "a point is too far out for voxels this small");
+            return LAZ_FALSE;
+        }
+        cell[axis] = (I64)f;
+    }
+
+    if (g->last_voxel && cell[0] == g->last_cell[0]
+        && cell[1] == g->last_cell[1] && cell[2] == g->last_cell[2]) {
+        v = g->last_voxel;
+    } else {
+        at = cell_hash(cell) & mask;
+        while ((v = g->slots[at]) != 0) {
+            const I64 *c = g->cells + 3 * (size_t)(v - 1);
+            if (c[0] == cell[0] && c[1] == cell[1] && c[2] == cell[2])
+                break;
+            at = (at + 1) & mask;
+        }
+        if (v == 0) {
+            /* a voxel no point has landed in yet */
+            if (!grow_voxels(g)) return LAZ_FALSE;
+            v = g->num_voxels++;
+            memcpy(g->cells + 3 * (size_t)v, cell, sizeof(cell));
+            g->counts[v] = 1;
+            if (g->sums)
+                for (axis = 0; axis < 3; axis++)
+                    g->sums[3 * (size_t)v + axis] = stored[axis];
+            keep_point(g, v, p, extra);
+            g->slots[at] = v + 1;
+            g->last_voxel = v + 1;
+            memcpy(g->last_cell, cell, sizeof(cell));
+            if ((U64)g->num_voxels * 2 > g->num_slots) return grow_slots(g);
+            return LAZ_TRUE;
+        }
+        g->last_voxel = v;
+        memcpy(g->last_cell, cell, sizeof(cell));
+    }
+
+    v--;
+    g->counts[v]++;
+    switch (g->keep) {
+    case LAZ_VOXEL_CENTROID:
+        /* an I64 sum of I32s overflows only past 2^32 points in one voxel */
+        for (axis = 0; axis < 3; axis++)
+            g->sums[3 * (size_t)v + axis] += stored[axis];
+        break;
+    case LAZ_VOXEL_LOWEST:
+        if (p->Z < record_z(g, v)) keep_point(g, v, p, extra);
+        break;
+    case LAZ_VOXEL_HIGHEST:
+        if (p->Z > record_z(g, v)) keep_point(g, v, p, extra);
+        break;
+    case LAZ_VOXEL_FIRST:
+        break;
+    }
+    return LAZ_TRUE;
+}
+
+void laz_voxelgrid_finish(LazVoxelGrid *g)
+{
+    static const size_t at[3] = {
+        offsetof(LazPoint, X), offsetof(LazPoint, Y), offsetof(LazPoint, Z)
+    };
+    U32 v;
+    int axis;
+
+    if (g->keep != LAZ_VOXEL_CENTROID) return;
+    for (v = 0; v < g->num_voxels; v++) {
+        U8 *record = g->records + (size_t)v * g->record_size;
+        if (g->counts[v] == 1) continue;        /* its own mean already */
+        for (axis = 0; axis < 3; axis++) {
+            /* the mean of I32s is within I32's range, so the rounded mean
+             * converts back without a check */
+            F64 mean = (F64)g->sums[3 * (size_t)v + axis]
+                     / (F64)g->counts[v];
+            I32 rounded = (I32)floor(mean + 0.5);
+            memcpy(record + at[axis], &rounded, sizeof(rounded));
+        }
+    }
+}
+
+void laz_voxelgrid_destroy(LazVoxelGrid *g)
+{
+    free(g->records);
+    free(g->cells);
+    free(g->sums);
+    free(g->counts);
+    free(g->slots);
+    memset(g, 0, sizeof(*g));
+}
@@ -0,0 +1,87 @@
+/*
+ * laz_voxel.h -- thinning points to one per voxel.
+ *
+ * Space is cut into boxes `size` across on a grid anchored at the origin of
+ * the georeferenced coordinates, and every point is hashed into the box it
+ * falls in. Each box keeps one point, chosen by `keep`, and nothing else of
+ * the points that fell in it but how many there were and, for a centroid,
+ * what their coordinates add up to. What a file thins down to is therefore
+ * the memory this costs, not the file itself.
+ *
+ * Nothing here is LASzip's: laszip has no thinning of its own, and lastools'
+ * lasthin is not open source. The grid and the rules follow what PDAL's
+ * voxel filters do.
+ */
+#ifndef LAZ_VOXEL_H
+#define LAZ_VOXEL_H
+
+#include "laz_types.h"
+
+/* Which point a voxel keeps. The names are what lazpy.Reader passes in. */
+typedef enum {
+    LAZ_VOXEL_FIRST,                    /* the first to arrive */
+    LAZ_VOXEL_CENTROID,                 /* the first, moved to their mean */
+    LAZ_VOXEL_LOWEST,                   /* the least Z, the first of a tie */
+    LAZ_VOXEL_HIGHEST                   /* the greatest Z, likewise */
+} LazVoxelKeep;
+
+/*
+ * The voxels points have landed in so far, in the order each was first
+ * landed in -- which is the order they come out, so that thinning a file
+ * keeps its points in file order.
+ *
+ * A voxel's record is the point it keeps: `image_size` bytes of LazPoint
+ * followed by its extra bytes, exactly as a reader decoded them. `slots` is
+ * an open-addressed hash from a voxel's cell to its place in the arrays,
+ * plus one so that zero can mean empty.
+ */
+typedef struct {
+    F64 size[3];                        /* size[2] of zero: columns, no z */
+    F64 scale[3], offset[3];
+    LazVoxelKeep keep;
+    U32 image_size, num_extra_bytes, record_size;
+    U8 *records;
+    I64 *cells;                         /* three per voxel */
+    I64 *sums;                          /* three per voxel, centroid only */
+    U64 *counts;
+    U32 num_voxels, alloc;
+    U32 *slots;
+    U32 num_slots;                      /* a power of two */
+    /* the voxel the last point landed in, plus one, and its cell: a scan
+     * line puts run after run of points in one voxel, and those need no
+     * hashing at all */
+    U32 last_voxel;
+    I64 last_cell[3];
+    char last_error[192];
+    BOOL has_error;
+} LazVoxelGrid;
+
+/*
+ * An empty grid. `size` is the voxel's extent along x, y and z, in the units
+ * the coordinates are in; a z extent of zero makes each voxel a column
+ * unbounded in elevation. `image_size` is how much of each decoded point to
+ * keep. False leaves the reason in `last_error`.
+ */
+BOOL laz_voxelgrid_setup(LazVoxelGrid *g, const F64 size[3],
+                         const F64 scale[3], const F64 offset[3],
+                         LazVoxelKeep keep, U32 image_size,
+                         U32 num_extra_bytes);
+
+/*
+ * One decoded point and its extra bytes. False, with the reason in
+ * `last_error`, for a point whose voxel is past what a 64-bit cell number
+ * can count or for running out of memory; the grid is still sound, and
+ * still holds every point before it.
+ */
+BOOL laz_voxelgrid_add(LazVoxelGrid *g, const LazPoint *p, const U8 *extra);
+
+/*
+ * Moves every centroid voxel's point to the mean of the points that fell in
+ * it, rounded to the nearest stored integer. Nothing for any other rule;
+ * the records are the answer afterwards either way.
+ */
+void laz_voxelgrid_finish(LazVoxelGrid *g);
+
+void laz_voxelgrid_destroy(LazVoxelGrid *g);
+
+#endif
@@ -1,6 +1,7 @@
 """What more than one test file needs: the fixture inventory, the
-reference hashes, and the kit that rebuilds and recompresses a
-fixture's point block."""
+reference hashes, the kit that rebuilds and recompresses a fixture's
+point block, and the surveys written for what the fixtures are too
+small to show."""
 
 import collections
 import functools
@@ -322,3 +323,85 @@ def awkward_records(count, length):
 SURVIVABLE = (lazpy.LazError, ValueError, struct.error, EOFError, OSError,
               MemoryError, IndexError, OverflowError, TypeError, KeyError,
               RecursionError)
+
+
+# Files of points made up for the test, for what the fixtures are too small
+# or too plain to show: many chunks, points laid out so that an area or a
+# time window falls in a few of them, every field of a survey varying.
+# Each layout is its point format and the columns it writes, drawn from
+# numpy's generator so that the same seed is the same file.
+
+def _strip(np, rng, count, side):
+    # along a strip, X rising ten units a point, so that an area is in a
+    # chunk or two and a time window, times rising with the points, in a few
+    return {
+        "X": np.arange(count) * 10,
+        "Y": rng.integers(0, 1000, count),
+        "Z": rng.integers(-500, 500, count),
+        "gps_time": np.cumsum(rng.random(count)),
+        "intensity": rng.integers(0, 65536, count),
+        "classification": rng.integers(0, 32, count),
+    }
+
+
+def _square(np, rng, count, side):
+    # scattered evenly over a square *side* metres across, centred on the
+    # offsets and a fifth as high as it is wide, at the default centimetres;
+    # intensity numbers the points, so that one can be told from another
+    across = round(side * 50)
+    return {
+        "X": rng.integers(-across, across, count),
+        "Y": rng.integers(-across, across, count),
+        "Z": rng.integers(0, round(side * 20), count),
+        "intensity": np.arange(count) % 65536,
+        "classification": rng.integers(1, 4, count),
+    }
+
+
+def _flight(np, rng, count, side):
+    # every field varying, as off a scanner: X is the point's own number,
+    # and colours and NIR are there for the point formats that keep them
+    returns = rng.integers(1, 8, count)
+    columns = {
+        "X": np.arange(count),
+        "Y": rng.integers(-3000, 3000, count),
+        "Z": rng.integers(-200, 4000, count),
+        "intensity": rng.integers(0, 65536, count),
+        "classification": rng.choice([1, 2, 6, 9], count),
+        "return_number": returns,
+        "number_of_returns": np.maximum(returns, rng.integers(1, 8, count)),
+        "point_source_ID": rng.integers(1, 40, count),
+        "gps_time": 3.2e8 + np.cumsum(rng.random(count)),
+    }
+    for name in ("red", "green", "blue", "nir"):
+        columns[name] = rng.integers(0, 65536, count)
+    return columns
+
+
+SURVEY_LAYOUTS = {"strip": (6, _strip), "square": (1, _square),
+                  "flight": (6, _flight)}
+
+
+def survey(path, layout="strip", count=60000, chunk_size=5000,
+           point_format=None, seed=0, side=50.0, **kwargs):
+    """Write *count* points laid out as *layout* to *path*, *chunk_size* to
+    a chunk, and return the path as a string.
+
+    *layout* is the name of one in SURVEY_LAYOUTS, which also picks the
+    point format unless *point_format* does, or the columns themselves.
+    Whatever else is given goes to the Writer: scales, offsets,
+    ``chunk_stats=True``, a compressor.
+    """
+    import numpy as np
+
+    if isinstance(layout, str):
+        default_format, columns = SURVEY_LAYOUTS[layout]
+        columns = columns(np, np.random.default_rng(seed), count, side)
+    else:
+        default_format, columns = 6, layout
+    if point_format is None:
+        point_format = default_format
+    with lazpy.Writer(str(path), point_format, chunk_size=chunk_size,
+                      **kwargs) as writer:
+        writer.write_arrays(columns)
+    return str(path)
@@ -0,0 +1,248 @@
+import asyncio
+import gc
+import threading
+
+import pytest
+
+from lazpy import LazError, Reader
+from lazpy.aio import AsyncReader
+from helpers import fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# asyncio.
+#
+# AsyncReader awaits what Reader does, on threads of its own. What it hands
+# back has to be what the reader does; what it decodes has to stop when the
+# task awaiting it is cancelled, and keep no further ahead of a consumer than
+# it was told to.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    path = survey(tmp_path / "survey.laz", count=200000)
+    with Reader(path) as reader:
+        reader.write_spatial_index(cell_size=50.0)
+    return path
+
+
+RECT = (3000.0, 0.0, 9000.0, 5.0)
+
+
+class TestAnswers:
+
+    def test_what_the_reader_answers(self, indexed):
+        with Reader(indexed) as reader:
+            expected = [reader.arrays("X", "Z", start=1000, count=20000),
+                        reader.arrays_within("X", "Y", rect=RECT),
+                        reader.arrays_between(5000.0, 9000.0, "X"),
+                        reader.xyz_within(rect=RECT)]
+
+        async def main():
+            async with await AsyncReader.open(indexed) as reader:
+                return await asyncio.gather(
+                    reader.arrays("X", "Z", start=1000, count=20000),
+                    reader.arrays_within("X", "Y", rect=RECT),
+                    reader.arrays_between(5000.0, 9000.0, "X"),
+                    reader.xyz_within(rect=RECT))
+
+        found = run(main())
+        for a, b in zip(found[:3], expected[:3]):
+            same(a, b)
+        assert np.array_equal(found[3], expected[3])
+
+    def test_a_reader_of_the_callers(self, indexed):
+        async def main(reader):
+            async with AsyncReader(reader, threads=2) as areader:
+                return await areader.statistics("Z")
+
+        with Reader(indexed) as reader:
+            expected = reader.statistics("Z")
+            assert run(main(reader)) == expected
+            # left open: it was not the AsyncReader's to close
+            assert reader.arrays("X", start=0, count=1)["X"][0] == 0
+
+    @pytest.mark.parametrize("name", ["pt1_v1_pointwise.laz", "pt1_v0.las",
+                                      "pt7_v3.laz"])
+    def test_fixtures_in_blocks(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays("X", "gps_time")
+
+        async def main():
+            async with await AsyncReader.open(fixture(name)) as reader:
+                return [block async for block in
+                        reader.aiter_arrays("X", "gps_time", block=7)]
+
+        blocks = run(main())
+        assert all(len(block["X"]) == 7 for block in blocks[:-1])
+        same({name: np.concatenate([b[name] for b in blocks])
+              for name in blocks[0]}, expected)
+
+    def test_an_area_in_blocks(self, indexed):
+        with Reader(indexed) as reader:
+            expected = reader.arrays_within("X", "Z", rect=RECT)
+            part = reader.arrays_within("X", rect=RECT)["X"]
+
+        async def main(**kwargs):
+            async with await AsyncReader.open(indexed) as reader:
+                return [block async for block in reader.aiter_arrays(
+                    "X", "Z", block=4000, rect=RECT, ahead=3, **kwargs)]
+
+        blocks = run(main())
+        assert all(len(block["X"]) for block in blocks)
+        same({name: np.concatenate([b[name] for b in blocks])
+              for name in blocks[0]}, expected)
+        # and of the points from start to stop
+        blocks = run(main(start=50000, stop=70000))
+        x = np.concatenate([b["X"] for b in blocks])
+        assert np.array_equal(x, part[(part >= 500000) & (part < 700000)])
+
+    def test_refusals(self, indexed):
+        async def main(**kwargs):
+            async with await AsyncReader.open(indexed) as reader:
+                async for _ in reader.aiter_arrays("X", **kwargs):
+                    pass
+
+        with pytest.raises(ValueError, match="block"):
+            run(main(block=0))
+        with pytest.raises(ValueError, match="ahead"):
+            run(main(ahead=-1))
+        with pytest.raises(ValueError, match="threads"):
+            AsyncReader(None, threads=0)
+
+    def test_an_error_is_raised_where_it_is_awaited(self, tmp_path):
+        async def main():
+            await AsyncReader.open(str(tmp_path / "nothing.laz"))
+
+        with pytest.raises(OSError):
+            run(main())
+
+
+class TestCancelling:
+
+    def test_a_cancel_stops_the_decoder(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=1000000)
+
+        async def main():
+            async with await AsyncReader.open(path, threads=1) as reader:
+                task = asyncio.ensure_future(reader.arrays("X", "Y", "Z"))
+                await asyncio.sleep(0.02)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                # the one thread is free for the next call once the last
+                # has stopped, which is where this finds its point reader
+                stopped = await reader._run(lambda: reader.reader.index)
+                a = await reader.arrays("X", start=999990)
+                return stopped, a
+
+        stopped, a = run(main())
+        assert np.array_equal(a["X"], np.arange(999990, 1000000) * 10)
+        # at a chunk, well short of the end
+        assert stopped % 5000 == 0
+        assert stopped < 1000000
+
+    def test_the_point_reader_stops_at_a_chunk(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=20000)
+        with Reader(path) as reader:
+            expected = reader.arrays("X", start=0)["X"]
+            points = reader._points()
+            reader.seek(1234)
+            points.cancel()
+            with pytest.raises(LazError, match="cancelled"):
+                reader.arrays("X", count=10000)
+            assert reader.index == 5000
+            points.cancel(False)
+            assert np.array_equal(reader.arrays("X", count=10)["X"],
+                                  expected[5000:5010])
+
+    def test_leaving_the_loop_cancels_what_was_ahead(self, indexed):
+        started = []
+
+        async def main():
+            async with await AsyncReader.open(indexed) as reader:
+                arrays = reader.reader.arrays
+
+                def counted(*names, **kwargs):
+                    started.append(kwargs["start"])
+                    return arrays(*names, **kwargs)
+
+                reader.reader.arrays = counted
+                async for block in reader.aiter_arrays("X", block=1000,
+                                                       ahead=2):
+                    break
+                return block
+
+        block = run(main())
+        assert np.array_equal(block["X"], np.arange(1000) * 10)
+        assert len(started) <= 3
+
+    def test_what_was_ahead_and_failed_is_not_logged(self, indexed):
+        logged = []
+
+        async def main():
+            asyncio.get_running_loop().set_exception_handler(
+                lambda loop, context: logged.append(context))
+            async with await AsyncReader.open(indexed) as reader:
+                arrays = reader.reader.arrays
+
+                def failing(*names, **kwargs):
+                    if kwargs["start"]:
+                        raise LazError("cancelled")
+                    return arrays(*names, **kwargs)
+
+                reader.reader.arrays = failing
+                blocks = reader.aiter_arrays("X", block=1000, ahead=3)
+                async for block in blocks:
+                    # long enough for the blocks ahead to have failed
+                    await asyncio.sleep(0.2)
+                    break
+                await blocks.aclose()
+            gc.collect()
+
+        run(main())
+        assert logged == []
+
+
+class TestBackpressure:
+
+    @pytest.mark.parametrize("ahead", [0, 1, 3])
+    def test_no_more_than_ahead_is_decoded(self, indexed, ahead):
+        started = []
+        lock = threading.Lock()
+
+        async def main():
+            async with await AsyncReader.open(indexed) as reader:
+                arrays = reader.reader.arrays
+
+                def counted(*names, **kwargs):
+                    with lock:
+                        started.append(kwargs["start"])
+                    return arrays(*names, **kwargs)
+
+                reader.reader.arrays = counted
+                seen = []
+                async for block in reader.aiter_arrays("X", block=10000,
+                                                       ahead=ahead):
+                    # a consumer far slower than the decoding
+                    await asyncio.sleep(0.02)
+                    with lock:
+                        seen.append(len(started) - len(seen))
+                return seen
+
+        seen = run(main())
+        assert len(seen) == 20
+        assert max(seen) <= ahead + 1
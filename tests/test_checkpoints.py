@@ -0,0 +1,185 @@
+import io
+
+import pytest
+
+from lazpy import _cpylaz as cpylaz
+from lazpy import Compressor, LazError, Reader, Writer
+from helpers import fixture
+
+
+# ---------------------------------------------------------------------------
+# Seek checkpoints.
+#
+# A POINTWISE file has no chunks to seek by, so Reader.keep_checkpoints keeps
+# the decoder's whole state every so many points instead. A seek that starts
+# from one has to land on the point decoding from the first would have.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+POINTWISE_FIXTURES = [f"pt{n}_v1_pointwise.laz" for n in range(6)]
+
+
+def pointwise(path, count=20000, point_format=3, **kwargs):
+    rng = np.random.default_rng(11)
+    with Writer(str(path), point_format, compressor=Compressor.POINTWISE,
+                **kwargs) as writer:
+        writer.write_arrays({
+            "X": np.arange(count),
+            "Y": np.cumsum(rng.integers(-40, 41, count)),
+            "Z": rng.integers(0, 900, count),
+            "intensity": rng.integers(0, 65536, count),
+            "classification": rng.choice([1, 2, 5, 6], count),
+            "gps_time": 2.5e8 + np.cumsum(rng.random(count)),
+            "red": rng.integers(0, 65536, count),
+        })
+    return str(path)
+
+
+def same_rows(reader, columns, start, count=3):
+    count = min(count, reader.num_points - start)
+    a = reader.arrays(start=start, count=count)
+    for name in columns:
+        assert np.array_equal(a[name], columns[name][start:start + count]), \
+            (start, name)
+
+
+class TestSeeking:
+
+    @pytest.mark.parametrize("name", POINTWISE_FIXTURES)
+    def test_every_fixture_seeks_to_what_decoding_finds(self, name):
+        with Reader(fixture(name)) as reader:
+            columns = reader.arrays(start=0)
+            reader.seek(0)
+            reader.keep_checkpoints(37)
+            reader.seek(len(reader))
+            assert reader._points().checkpoints == \
+                list(range(37, len(reader) + 1, 37))
+            targets = np.random.default_rng(2).integers(0, len(reader), 40)
+            for target in [len(reader) - 1, 0, 37, 36, 38, *targets]:
+                same_rows(reader, columns, int(target))
+
+    @pytest.mark.parametrize("point_format,extra_bytes",
+                             [(1, 0), (3, 0), (3, 5)])
+    def test_a_written_file(self, tmp_path, point_format, extra_bytes):
+        path = pointwise(tmp_path / "pointwise.laz",
+                         point_format=point_format,
+                         num_extra_bytes=extra_bytes)
+        with Reader(path) as reader:
+            columns = reader.arrays(start=0)
+            reader.seek(0)
+            reader.keep_checkpoints(1000)
+            reader.seek(len(reader))
+            for target in [19999, 12000, 11999, 0, 1000, 999, 15500, 2]:
+                same_rows(reader, columns, target)
+
+    def test_a_seek_starts_from_the_nearest_checkpoint(self):
+        path = fixture("pt3_v1_pointwise.laz")
+        data = open(path, "rb").read()
+        with Reader(path) as reader:
+            columns = reader.arrays(start=0)
+            start = reader.header["offset_to_point_data"]
+        fp = io.BytesIO(data)
+        with Reader(fp) as reader:
+            reader.keep_checkpoints(10)
+            reader.seek(len(reader))
+            # with the points before the last few checkpoints gone, only a
+            # seek that does not decode them can find the points after
+            fp.getbuffer()[start + 20:start + len(data[start:]) // 2] = \
+                bytes(len(data[start:]) // 2 - 20)
+            for target in [495, 480, 471]:
+                same_rows(reader, columns, target)
+        with Reader(io.BytesIO(fp.getvalue())) as reader:
+            try:
+                x = reader.arrays("X", start=480, count=3)["X"]
+            except LazError:
+                pass
+            else:
+                assert not np.array_equal(x, columns["X"][480:483])
+
+    def test_a_seek_forward_jumps_ahead(self, tmp_path):
+        path = pointwise(tmp_path / "pointwise.laz")
+        with Reader(path) as reader:
+            columns = reader.arrays(start=0)
+            reader.seek(0)
+            reader.keep_checkpoints(500)
+            reader.seek(len(reader))
+            reader.seek(100)
+            # past every checkpoint between, from the one before 17777
+            same_rows(reader, columns, 17777)
+            assert reader.index == 17780
+
+    def test_reading_on_from_a_checkpoint(self, tmp_path):
+        path = pointwise(tmp_path / "pointwise.laz", count=5000)
+        with Reader(path) as reader:
+            columns = reader.arrays(start=0)
+            reader.seek(0)
+            reader.keep_checkpoints(400)
+            reader.seek(len(reader))
+            reader.seek(1200)
+            rest = reader.arrays()
+            for name in columns:
+                assert np.array_equal(rest[name], columns[name][1200:])
+            # and the points passed again are not checkpointed twice
+            assert reader._points().checkpoints == \
+                list(range(400, 5001, 400))
+
+    def test_checkpoints_are_taken_as_reading_passes(self, tmp_path):
+        path = pointwise(tmp_path / "pointwise.laz", count=5000)
+        with Reader(path) as reader:
+            reader.keep_checkpoints(1000)
+            assert reader._points().checkpoints == []
+            reader.arrays("X", count=2500)
+            assert reader._points().checkpoints == [1000, 2000]
+            reader.keep_checkpoints(0)
+            reader.seek(len(reader))
+            assert reader._points().checkpoints == [1000, 2000]
+
+    def test_running_out_of_memory(self):
+        arm = cpylaz._alloc_fail_after
+        with Reader(fixture("pt1_v1_pointwise.laz")) as reader:
+            # every model the file uses, created before the allocator fails
+            columns = reader.arrays(start=0)
+            reader.seek(0)
+            reader.keep_checkpoints(50)
+            try:
+                arm(0)
+                # a checkpoint that cannot be taken is not, and costs
+                # nothing but a longer seek
+                reader.seek(len(reader))
+                assert reader._points().checkpoints == []
+            finally:
+                arm(-1)
+            reader.seek(0)
+            reader.seek(len(reader))
+            assert len(reader._points().checkpoints) == 10
+            try:
+                arm(0)
+                with pytest.raises(LazError, match="out of memory"):
+                    reader.seek(260)
+            finally:
+                arm(-1)
+            reader.seek(0)
+            same_rows(reader, columns, 260)
+
+
+class TestRefusals:
+
+    @pytest.mark.parametrize("name,match", [("pt1_v0.las", "LAS file"),
+                                            ("pt1_v2.laz", "chunk table"),
+                                            ("pt1_v1.laz", "chunk table")])
+    def test_only_a_pointwise_file_needs_them(self, name, match):
+        with Reader(fixture(name)) as reader:
+            with pytest.raises(ValueError, match=match):
+                reader.keep_checkpoints()
+
+    def test_the_point_reader_refuses_a_chunked_file(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(LazError, match="pointwise"):
+                reader._points().keep_checkpoints(10)
+
+    @pytest.mark.parametrize("every", [-1, 1 << 32])
+    def test_how_often(self, every):
+        with Reader(fixture("pt1_v1_pointwise.laz")) as reader:
+            with pytest.raises(ValueError, match="points"):
+                reader.keep_checkpoints(every)
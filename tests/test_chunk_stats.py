@@ -0,0 +1,309 @@
+import functools
+import struct
+
+import pytest
+
+from lazpy import (ADAPTIVE_CHUNK_SIZE, ChunkSummary, Compressor, LazError,
+                   Reader, UnsupportedFileError, Writer)
+from lazpy.formats import CHUNK_SUMMARY_EVLR_KEY
+import helpers
+from helpers import fixture
+
+
+# ---------------------------------------------------------------------------
+# Chunk statistics.
+#
+# Writer(chunk_stats=True) notes what each chunk holds, and a query skips the
+# chunks those notes rule out; whatever it skips, it has to find what reading
+# everything finds.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+# every file here is written with the statistics of its chunks
+survey = functools.partial(helpers.survey, point_format=1, chunk_stats=True)
+
+
+def strips(count=60000, seed=7):
+    """Points swept west to east, as a flight line's are, so that each chunk
+    covers a strip of its own; later in time, higher, brighter and more
+    often buildings the further east."""
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.integers(0, 60000, count))
+    return {
+        "X": x,
+        "Y": rng.integers(0, 10000, count),
+        "Z": rng.integers(0, 1000, count) + x // 10,
+        "intensity": x // 30 + rng.integers(0, 10, count),
+        "classification": np.where(x > 50000, 6, rng.choice([1, 2], count)),
+        "gps_time": 3.0e8 + np.arange(count) * 1e-3,
+    }
+
+
+def without_summaries(path, columns, chunk_size=5000):
+    return survey(path, columns, chunk_size=chunk_size, chunk_stats=False)
+
+
+def same(a, b):
+    assert set(a) == set(b)
+    for name in a:
+        assert a[name].tolist() == b[name].tolist(), name
+
+
+class TestSummaries:
+
+    @pytest.mark.parametrize("name", ["survey.laz", "survey.las"])
+    def test_each_chunk_is_what_its_points_are(self, tmp_path, name):
+        columns = strips(count=23456)
+        path = survey(tmp_path / name, columns)
+        with Reader(path) as reader:
+            summaries = reader.chunk_summaries
+            scales, offsets = reader.scales, reader.offsets
+        assert len(summaries) == 5
+        for chunk in summaries:
+            assert isinstance(chunk, ChunkSummary)
+            part = slice(chunk.start, chunk.start + chunk.count)
+            assert chunk.bounds == pytest.approx(tuple(
+                getattr(columns[axis][part], end)() * scales[k] + offsets[k]
+                for end in ("min", "max") for k, axis in enumerate("XYZ")))
+            assert chunk.gps_time == (columns["gps_time"][part].min(),
+                                      columns["gps_time"][part].max())
+            assert chunk.intensity == (columns["intensity"][part].min(),
+                                       columns["intensity"][part].max())
+            assert chunk.classifications == set(
+                columns["classification"][part].tolist())
+        assert [chunk.count for chunk in summaries] == [5000] * 4 + [3456]
+
+    def test_adaptive_chunks_are_the_callers(self, tmp_path):
+        path = str(tmp_path / "adaptive.laz")
+        sizes = [10, 3000, 1, 700]
+        with Writer(path, 1, chunk_size=ADAPTIVE_CHUNK_SIZE,
+                    chunk_stats=True) as writer:
+            for k, size in enumerate(sizes):
+                writer.write_arrays({"X": np.full(size, k),
+                                     "intensity": np.arange(size)})
+                writer.chunk()
+        with Reader(path) as reader:
+            summaries = reader.chunk_summaries
+        assert [chunk.count for chunk in summaries] == sizes
+        assert [chunk.start for chunk in summaries] == [0, 10, 3010, 3011]
+        assert [chunk.intensity for chunk in summaries] == [
+            (0, size - 1) for size in sizes]
+        assert [chunk.bounds[0] for chunk in summaries] == \
+            pytest.approx([0.0, 0.01, 0.02, 0.03])
+
+    def test_a_las_14_point_keeps_its_extended_class(self, tmp_path):
+        columns = {"X": np.arange(6000),
+                   "extended_classification": np.repeat([40, 2, 200], 2000)}
+        path = survey(tmp_path / "extended.laz", columns, chunk_size=2000,
+                      point_format=6)
+        with Reader(path) as reader:
+            classes = [chunk.classifications
+                       for chunk in reader.chunk_summaries]
+            legacy = reader.arrays("classification")["classification"]
+            kept = [reader._matches(chunk, {"classification": 0})
+                    for chunk in reader.chunk_summaries]
+        assert classes == [{40}, {2}, {200}]
+        # past five bits the legacy field says 0, which a filter on it finds
+        assert legacy.tolist() == [0] * 2000 + [2] * 2000 + [0] * 2000
+        assert kept == [True, False, True]
+
+    def test_a_chunk_of_no_classes_holds_no_class(self, tmp_path):
+        path = survey(tmp_path / "extended.laz", {"X": np.arange(10)},
+                      point_format=6)
+        empty = ChunkSummary(0, 0, None, None, (0, 0), set())
+        with Reader(path) as reader:
+            assert not reader._matches(empty, {"classification": 0})
+            assert not reader._matches(empty, {"classification": (0, 2)})
+
+    def test_a_chunk_of_no_times_has_no_span(self, tmp_path):
+        columns = {"X": np.arange(4),
+                   "gps_time": np.array([np.nan, np.nan, 1.0, 2.0])}
+        path = survey(tmp_path / "nan.laz", columns, chunk_size=2)
+        with Reader(path) as reader:
+            assert [chunk.gps_time for chunk in reader.chunk_summaries] == \
+                [None, (1.0, 2.0)]
+            assert reader.arrays_between(0.0, 5.0, "X")["X"].tolist() == \
+                [2, 3]
+
+    def test_a_format_without_time_has_no_span(self, tmp_path):
+        path = survey(tmp_path / "untimed.laz", {"X": np.arange(10)},
+                      point_format=0)
+        with Reader(path) as reader:
+            assert reader.chunk_summaries[0].gps_time is None
+
+    def test_they_go_in_an_extended_record(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", strips(count=1000))
+        with Reader(path) as reader:
+            records = reader.header["extended_variable_length_records"]
+            assert reader.header["version_minor"] == 4
+        assert CHUNK_SUMMARY_EVLR_KEY in records
+
+    def test_a_file_without_them_has_none(self, tmp_path):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            assert reader.chunk_summaries is None
+        with Reader(survey(tmp_path / "empty.laz", {"X": np.arange(0)})) \
+                as reader:
+            assert reader.chunk_summaries == ()
+
+    def test_summaries_of_other_points_raise(self, tmp_path):
+        # one chunk of 5 points, in a file of 10
+        payload = struct.pack("<II", 1, 1) + struct.pack(
+            "<I3i3i2d2H32s", 5, 0, 0, 0, 0, 0, 0, 0.0, 0.0, 0, 0, b"\1")
+        path = str(tmp_path / "lying.laz")
+        with Writer(path, 1, version_minor=4, evlrs=[{
+                "user_id": CHUNK_SUMMARY_EVLR_KEY[0],
+                "record_id": CHUNK_SUMMARY_EVLR_KEY[1],
+                "data": payload}]) as writer:
+            writer.write_arrays({"X": np.arange(10)})
+        with Reader(path) as reader:
+            with pytest.raises(LazError, match="describe 5 points"):
+                reader.chunk_summaries
+            with pytest.raises(LazError):
+                reader.arrays_within("X", rect=(0, 0, 1, 1))
+
+
+class TestWriting:
+
+    def test_an_older_version_cannot_carry_them(self, tmp_path):
+        with pytest.raises(UnsupportedFileError, match="LAS 1.4"):
+            Writer(str(tmp_path / "old.laz"), 1, version_minor=2,
+                   chunk_stats=True)
+
+    def test_a_pointwise_file_has_no_chunks(self, tmp_path):
+        with pytest.raises(ValueError, match="POINTWISE"):
+            Writer(str(tmp_path / "pointwise.laz"), 1,
+                   compressor=Compressor.POINTWISE, chunk_stats=True)
+
+    def test_a_plain_las_file_needs_a_run_length(self, tmp_path):
+        with pytest.raises(ValueError, match="chunk_size"):
+            Writer(str(tmp_path / "adaptive.las"), 1,
+                   chunk_size=ADAPTIVE_CHUNK_SIZE, chunk_stats=True)
+
+    def test_the_points_are_those_written_without_them(self, tmp_path):
+        columns = strips(count=8000)
+        with Reader(survey(tmp_path / "with.laz", columns)) as reader:
+            a = reader.arrays()
+        with Reader(without_summaries(tmp_path / "without.laz",
+                                      columns)) as reader:
+            b = reader.arrays()
+        same(a, b)
+
+
+class TestPruning:
+
+    AREAS = [
+        {"rect": (100.0, 20.0, 180.0, 80.0)},
+        {"rect": (-10.0, -10.0, 1000.0, 1000.0)},
+        {"rect": (700.0, 0.0, 800.0, 100.0)},
+        {"circle": (300.0, 50.0, 25.0)},
+        {"box": (0.0, 0.0, 20.0, 600.0, 100.0, 25.0)},
+    ]
+
+    @pytest.mark.parametrize("area", AREAS)
+    def test_an_area_finds_what_a_scan_finds(self, tmp_path, area):
+        columns = strips()
+        with Reader(survey(tmp_path / "with.laz", columns)) as reader:
+            a = reader.arrays_within("X", "Z", **area)
+            plan = reader.explain(**area)
+        with Reader(without_summaries(tmp_path / "without.laz",
+                                      columns)) as reader:
+            b = reader.arrays_within("X", "Z", **area)
+            scan = reader.explain(**area)
+        same(a, b)
+        assert plan.index == "chunks" and scan.index is None
+        assert plan.decoded_points <= scan.decoded_points
+
+    def test_an_area_decodes_only_the_chunks_it_reaches(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", strips())
+        with Reader(path) as reader:
+            plan = reader.explain(rect=(100.0, 0.0, 150.0, 100.0))
+        # a chunk is 50 m of the strip, and the area 50 m wide
+        assert plan.cells_hit <= 3
+        assert plan.decoded_points <= 15000
+        assert plan.use_index
+
+    def test_an_elevation_prunes_a_quadtrees_runs(self, tmp_path):
+        columns = strips()
+        path = survey(tmp_path / "survey.laz", columns,
+                      spatial_index=dict(cell_size=5.0))
+        box = (0.0, 0.0, 0.0, 600.0, 100.0, 20.0)
+        with Reader(path) as reader:
+            assert reader.spatial_index is not None
+            plan = reader.explain(box=box)
+            a = reader.arrays_within("X", box=box)
+            reader._summaries = None
+            unpruned = reader.explain(box=box)
+            b = reader.arrays_within("X", box=box)
+        same(a, b)
+        assert plan.index == "quadtree"
+        assert plan.decoded_points < unpruned.decoded_points
+
+    def test_a_time_scan_skips_chunks_out_of_the_window(self, tmp_path,
+                                                        monkeypatch):
+        columns = strips()
+        path = survey(tmp_path / "survey.laz", columns)
+        t0, t1 = 3.0e8 + 10.0, 3.0e8 + 12.0
+        times = columns["gps_time"]
+        expected = np.flatnonzero((times >= t0) & (times < t1))
+        seen = []
+        # as for a file out of time order, which has to be scanned
+        monkeypatch.setattr(Reader, "_time_range", lambda self, *args: None)
+        with Reader(path) as reader:
+            arrays = Reader.arrays
+
+            def counting(self, *names, start=None, count=None):
+                seen.append((start, count))
+                return arrays(self, *names, start=start, count=count)
+
+            monkeypatch.setattr(Reader, "arrays", counting)
+            a = reader.arrays_between(t0, t1, "X")
+            xs = [point.X for point in reader.points_between(t0, t1)]
+        assert a["X"].tolist() == columns["X"][expected].tolist()
+        assert xs == a["X"].tolist()
+        # the one chunk the window is in, and no others
+        assert seen == [(10000, 5000)]
+
+    @pytest.mark.parametrize("where", [{"classification": 6},
+                                       {"classification": (2, 6)},
+                                       {"classification": 9},
+                                       {"intensity": (50, 51)},
+                                       {"intensity": 1999,
+                                        "classification": 6}])
+    def test_a_filter_finds_what_a_scan_finds(self, tmp_path, where):
+        columns = strips()
+        stats = ("count", "max_z", "mean_intensity")
+        with Reader(survey(tmp_path / "with.laz", columns)) as reader:
+            a = reader.grid(20.0, stats, where=where)
+            b = reader.grid(20.0, stats, where=where,
+                            rect=(0.0, 0.0, 600.0, 100.0))
+        with Reader(without_summaries(tmp_path / "without.laz",
+                                      columns)) as reader:
+            c = reader.grid(20.0, stats, where=where)
+        for name in stats:
+            assert np.array_equal(a.bands[name], c.bands[name],
+                                  equal_nan=True), name
+            assert np.nansum(b.bands[name]) == \
+                pytest.approx(np.nansum(c.bands[name])), name
+
+    def test_a_filter_decodes_only_the_chunks_that_match(self, tmp_path,
+                                                         monkeypatch):
+        path = survey(tmp_path / "survey.laz", strips())
+        seen = []
+        with Reader(path) as reader:
+            arrays = Reader.arrays
+
+            def counting(self, *names, start=None, count=None):
+                seen.append((start, count))
+                return arrays(self, *names, start=start, count=count)
+
+            monkeypatch.setattr(Reader, "arrays", counting)
+            raster = reader.grid(10.0, "count", where={"classification": 6})
+            chunks = [chunk for chunk in reader.chunk_summaries
+                      if 6 in chunk.classifications]
+        # buildings are the last 100 m of the strip, in two or three chunks
+        # of the twelve
+        assert seen == [(chunks[0].start, 60000 - chunks[0].start)]
+        assert len(chunks) <= 3
+        assert raster.bands["count"].sum() == \
+            (strips()["classification"] == 6).sum()
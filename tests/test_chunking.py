@@ -87,6 +87,18 @@ class TestChunking:
                 point = reader.read()
                 assert (point.X, point.gps_time) == sequential[index]
 
+    def test_each_chunk_says_which_point_it_begins_with(self, records):
+        for chunk_size, breaks, firsts in ((137, (), [0, 137, 274, 411]),
+                                           (-1, (1, 2, 199, 200),
+                                            [0, 1, 2, 199, 200])):
+            written = self.written(records, chunk_size, breaks=breaks)
+            with Reader(io.BytesIO(written.data)) as reader:
+                points = reader._points()
+                assert points.chunk_points is None      # no table read yet
+                reader.seek(1)
+                assert points.chunk_points[:len(firsts)] == firsts
+                assert len(points.chunk_points) == len(points.chunk_starts)
+
     def with_no_chunks_declared(self, written):
         """The same file, with its chunk table saying it holds none."""
         data = bytearray(written.data)
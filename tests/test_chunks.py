@@ -0,0 +1,215 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lazpy import ADAPTIVE_CHUNK_SIZE, Chunk, LazError, Reader, Writer
+from helpers import FIXTURES, fixture, survey
+from test_saved_tables import interrupted
+
+np = pytest.importorskip("numpy")
+
+
+# ---------------------------------------------------------------------------
+# The chunk manifest.
+#
+# Reader.chunks() is every chunk's points and bytes, out of the chunk table,
+# and Reader(path, chunks=(start, stop)) a reader of a run of them that reads
+# as if the run were the whole file -- which is what a scheduler needs to
+# hand a file out in whole chunks.
+# ---------------------------------------------------------------------------
+
+
+def adaptive(path):
+    with Writer(str(path), 6, chunk_size=ADAPTIVE_CHUNK_SIZE) as writer:
+        for size in [10, 3000, 1, 7000, 400]:
+            writer.write_arrays({"X": np.arange(size),
+                                 "gps_time": np.arange(size) * 0.5})
+            writer.chunk()
+    return str(path)
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+def part(arrays, start, stop):
+    return {name: values[start:stop] for name, values in arrays.items()}
+
+
+def contiguous(chunks, num_points):
+    # each chunk begins where the one before it ended, in points and bytes
+    assert sum(chunk.count for chunk in chunks) == num_points
+    for before, after in zip(chunks, chunks[1:]):
+        assert after.start == before.start + before.count
+        assert after.offset == before.offset + before.length
+    assert all(chunk.length > 0 for chunk in chunks)
+
+
+class TestManifest:
+
+    def test_fixed_chunks(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=57000)
+        with Reader(path) as reader:
+            chunks = reader.chunks()
+            firsts, starts = reader._chunk_table()
+        assert len(chunks) == 12
+        assert isinstance(chunks[0], Chunk)
+        assert [chunk.start for chunk in chunks] == firsts[:12]
+        assert [chunk.offset for chunk in chunks] == starts[:12]
+        assert chunks[-1].count == 2000
+        assert chunks[-1].offset + chunks[-1].length == starts[12]
+        contiguous(chunks, 57000)
+
+    def test_adaptive_chunks(self, tmp_path):
+        path = adaptive(tmp_path / "adaptive.laz")
+        with Reader(path) as reader:
+            chunks = reader.chunks()
+        assert [(chunk.start, chunk.count) for chunk in chunks] == [
+            (0, 10), (10, 3000), (3010, 1), (3011, 7000), (10011, 400)]
+        contiguous(chunks, 10411)
+
+    def test_a_lost_table_is_found_by_reading(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", chunk_size=1000)
+        with Reader(path) as reader:
+            expected = reader.chunks()
+        interrupted(path)
+        with Reader(path) as reader:
+            chunks = reader.chunks()
+            assert reader.warnings
+            assert reader.index == 60000
+        # where the last chunk ends is as far as the points go, the table
+        # that followed them being gone
+        assert chunks[:-1] == expected[:-1]
+        assert chunks[-1].offset == expected[-1].offset
+
+    @pytest.mark.parametrize("name", FIXTURES)
+    def test_fixtures(self, name):
+        with Reader(fixture(name)) as reader:
+            chunks = reader.chunks()
+            if reader.laz_header is None or reader.chunk_size == 0 \
+                    or "pointwise" in name:
+                assert chunks is None
+            else:
+                contiguous(chunks, reader.num_points)
+
+    def test_from_another_thread(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            expected = reader.chunks()
+            reader.seek(123)
+            with ThreadPoolExecutor(1) as pool:
+                assert pool.submit(reader.chunks).result() == expected
+            assert reader.index == 123
+
+
+class TestChunkRange:
+
+    @pytest.mark.parametrize("start,stop", [(0, 1), (3, 7), (11, 12),
+                                            (0, 12)])
+    def test_reads_as_the_slice_of_the_file(self, tmp_path, start, stop):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays(start=0)
+            chunks = reader.chunks()
+        first, last = chunks[start], chunks[stop - 1]
+        with Reader(path, chunks=(start, stop)) as reader:
+            assert len(reader) == last.start + last.count - first.start
+            assert reader.header["number_of_point_records"] == 60000
+            same(reader.arrays(), part(expected, first.start,
+                                       last.start + last.count))
+            assert [c.offset for c in reader.chunks()] == \
+                [c.offset for c in chunks[start:stop]]
+            assert reader.chunks()[0].start == 0
+
+    def test_adaptive_chunks(self, tmp_path):
+        path = adaptive(tmp_path / "adaptive.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays(start=0)
+        with Reader(path, chunks=(1, 4)) as reader:
+            assert len(reader) == 10001
+            for start in [10000, 0, 2999, 3001, 3000]:
+                same(reader.arrays(start=start, count=3),
+                     part(expected, 10 + start, 10 + min(start + 3, 10001)))
+
+    def test_every_range_covers_the_file_once(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=23456, chunk_size=3000)
+        with Reader(path) as reader:
+            expected = reader.arrays("X", start=0)["X"]
+            count = len(reader.chunks())
+        found = []
+        for start in range(0, count, 3):
+            with Reader(path, chunks=(start, min(start + 3, count))) as r:
+                found.append(r.arrays("X")["X"])
+        assert np.array_equal(np.concatenate(found), expected)
+
+    def test_queries_keep_to_the_range(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", chunk_stats=True)
+        rect, window = (1400, 0, 2000, 10), (1000.0, 20000.0)
+        with Reader(path) as reader:
+            by_summaries = reader.arrays_within("X", rect=rect)["X"]
+            reader.write_spatial_index(cell_size=50.0)
+        with Reader(path) as reader:
+            assert reader.has_spatial_index
+            by_index = reader.arrays_within("X", rect=rect)["X"]
+            expected = reader.arrays("X", "gps_time", start=15000,
+                                     count=20000)
+        assert np.array_equal(by_index, by_summaries)
+        times = expected["gps_time"]
+        with Reader(path, chunks=(3, 7)) as reader:
+            assert [s.start for s in reader.chunk_summaries] == [
+                0, 5000, 10000, 15000]
+            assert np.array_equal(reader.arrays_within("X", rect=rect)["X"],
+                                  by_index[by_index >= 150000])
+            between = reader.arrays_between(*window, "X")["X"]
+        inside = (times >= window[0]) & (times < window[1])
+        assert np.array_equal(between, expected["X"][inside])
+
+    def test_statistics(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays("Z", start=5000, count=10000)["Z"]
+        with Reader(path, chunks=(1, 3)) as reader:
+            stats = reader.statistics("Z")
+        assert stats.num_points == 10000
+        assert stats.fields["Z"].minimum == expected.min()
+
+    def test_pickled(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path, chunks=(2, 5)) as reader:
+            expected = reader.arrays(start=0)
+            reader.seek(6000)
+            copied = pickle.loads(pickle.dumps(reader))
+        with copied:
+            assert len(copied) == 15000
+            assert copied.index == 6000
+            same(copied.arrays(start=0), expected)
+
+    def test_a_lost_table(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", chunk_size=1000)
+        with Reader(path) as reader:
+            expected = reader.arrays("X", start=0)["X"]
+        interrupted(path)
+        with Reader(path, chunks=(40, 60)) as reader:
+            assert np.array_equal(reader.arrays("X", start=0)["X"],
+                                  expected[40000:])
+
+    def test_refusals(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        for chunks in [(0, 0), (5, 3), (-1, 2), (0, 13)]:
+            with pytest.raises(IndexError, match="range"):
+                Reader(path, chunks=chunks)
+        with pytest.raises(ValueError, match="without chunks"):
+            Reader(fixture("pt1_v1_pointwise.laz"), chunks=(0, 1))
+        with Reader(path, chunks=(0, 2)) as reader:
+            with pytest.raises(ValueError, match="some of the file"):
+                reader.save_chunk_table()
+            with pytest.raises(ValueError, match="some of the file"):
+                reader.write_spatial_index()
+        interrupted(path)
+        with open(path, "r+b") as fp:
+            fp.truncate(200000)
+        with pytest.raises(LazError):
+            Reader(path, chunks=(0, 2))
@@ -0,0 +1,216 @@
+import math
+
+import pytest
+
+from lazpy import CountEstimate, Raster, Reader, Writer
+from helpers import fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Estimates.
+#
+# A spatial index states how many points fell in each of its cells; what the
+# reader makes of those counts has to bracket the count a query really finds,
+# and add up to the file.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def indexed(path, count=40000, dims=2):
+    """Points spread evenly over a 100 m square, indexed into cells small
+    enough that a query's edges cut through many of them."""
+    path = survey(path, "square", count, side=100.0,
+                  offsets=(50.0, 50.0, 0.0))
+    with Reader(path) as reader:
+        reader.write_spatial_index(cell_size=2.0, minimum_points=200,
+                                   dims=dims)
+    return path
+
+
+def unindexed(tmp_path):
+    path = str(tmp_path / "bare.laz")
+    with Writer(path, 1) as writer:
+        writer.write_arrays({"X": np.arange(10)})
+    return path
+
+
+def found(reader, **area):
+    return len(reader.arrays_within("X", **area)["X"])
+
+
+AREAS = [
+    {"rect": (10.0, 20.0, 70.5, 45.25)},
+    {"rect": (-50.0, -50.0, 150.0, 150.0)},
+    {"rect": (33.3, 33.3, 33.4, 33.4)},
+    {"circle": (50.0, 50.0, 20.0)},
+    {"circle": (0.0, 100.0, 37.5)},
+    {"box": (10.0, 10.0, 5.0, 60.0, 60.0, 30.0)},
+]
+
+
+class TestEstimateCount:
+
+    @pytest.mark.parametrize("area", AREAS)
+    def test_the_estimate_brackets_what_a_query_finds(self, tmp_path, area):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            estimate = reader.estimate_count(**area)
+            if "box" in area:
+                # a quadtree sees no elevations, so it estimates a box as
+                # the rectangle under it
+                box = area["box"]
+                area = {"rect": box[:2] + box[3:5]}
+            exact = found(reader, **area)
+        assert isinstance(estimate, CountEstimate)
+        assert estimate.low <= estimate.count <= estimate.high
+        assert estimate.low <= exact <= estimate.high
+        # the points are even, so sharing cells out by area is close
+        assert estimate.count == pytest.approx(exact, rel=0.05, abs=20)
+
+    @pytest.mark.parametrize("area", AREAS)
+    def test_an_octree_brackets_it_too(self, tmp_path, area):
+        path = indexed(tmp_path / "survey.laz", dims=3)
+        with Reader(path) as reader:
+            assert reader.spatial_index is None
+            estimate = reader.estimate_count(**area)
+            exact = found(reader, **area)
+        assert estimate.low <= exact <= estimate.high
+        assert estimate.count == pytest.approx(exact, rel=0.1, abs=50)
+
+    def test_a_circle_is_shared_out_by_its_area(self, tmp_path):
+        # a circle inside one cell takes the share of it that its area is
+        path = str(tmp_path / "one.laz")
+        with Writer(path, 1, scales=(0.01, 0.01, 0.01)) as writer:
+            writer.write_arrays({"X": np.tile([0, 400], 500),
+                                 "Y": np.tile([0, 400], 500)})
+        with Reader(path) as reader:
+            reader.write_spatial_index(cell_size=10.0)
+        with Reader(path) as reader:
+            (box, points), = reader.spatial_index.cell_counts()
+            side = box[2] - box[0]
+            estimate = reader.estimate_count(circle=(box[0] + side / 2,
+                                                     box[1] + side / 2,
+                                                     side / 4))
+        assert points == 1000
+        assert estimate.count == round(1000 * math.pi / 16)
+        assert (estimate.low, estimate.high) == (0, 1000)
+
+    def test_the_whole_area_is_the_whole_file(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            estimate = reader.estimate_count(-1e6, -1e6, 1e6, 1e6)
+        assert estimate == (40000, 40000, 40000)
+
+    def test_nothing_and_nowhere_hold_nothing(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            assert reader.estimate_count(circle=(50, 50, 0)) == (0, 0, 0)
+            assert reader.estimate_count(rect=(500, 500, 600, 600)) == \
+                (0, 0, 0)
+
+    def test_a_laszip_index_brackets_its_queries(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            area = {"rect": (1497.0, 1698.0, 1499.5, 1700.0)}
+            estimate = reader.estimate_count(**area)
+            exact = found(reader, **area)
+        assert estimate.low <= exact <= estimate.high
+
+    def test_without_an_index_there_is_nothing_to_go_on(self, tmp_path):
+        with Reader(unindexed(tmp_path)) as reader:
+            with pytest.raises(ValueError, match="spatial index"):
+                reader.estimate_count(rect=(0, 0, 1, 1))
+
+    def test_the_area_is_checked_as_a_query_checks_it(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            with pytest.raises(ValueError, match="inside out"):
+                reader.estimate_count(rect=(1, 1, 0, 0))
+            with pytest.raises(ValueError, match="radius"):
+                reader.estimate_count(circle=(1, 1, -1))
+            with pytest.raises(TypeError):
+                reader.estimate_count()
+
+
+class TestCellCounts:
+
+    def test_a_laszip_index_counts_every_point(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            index = reader.spatial_index
+            cells = index.cell_counts()
+            assert sum(points for _, points in cells) == reader.num_points
+        min_x, min_y, max_x, max_y = index.bounds
+        assert len(cells) == index.num_cells
+        for (x0, y0, x1, y1), points in cells:
+            assert min_x <= x0 < x1 <= max_x and min_y <= y0 < y1 <= max_y
+            assert points > 0
+
+    def test_every_point_is_in_its_cell(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz", count=5000)
+        with Reader(path) as reader:
+            xyz = reader.xyz()
+            cells = reader.spatial_index.cell_counts()
+        for (x0, y0, x1, y1), points in cells:
+            inside = ((xyz[:, 0] >= x0) & (xyz[:, 0] < x1)
+                      & (xyz[:, 1] >= y0) & (xyz[:, 1] < y1))
+            assert inside.sum() == points
+
+    def test_an_octree_cell_is_a_box(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz", count=5000, dims=3)
+        with Reader(path) as reader:
+            cells = reader.octree_index.cell_counts()
+        assert sum(points for _, points in cells) == 5000
+        assert all(len(box) == 6 and box[2] < box[5] for box, _ in cells)
+
+
+class TestDensity:
+
+    def test_the_counts_add_up_to_the_file(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            raster = reader.density(10.0)
+        assert isinstance(raster, Raster)
+        count = raster.bands["count"]
+        assert count.sum() == pytest.approx(40000)
+        assert np.allclose(raster.bands["density"], count / 100.0)
+        # an even spread over 100 m square, in 10 m cells
+        inside = count[count > 0]
+        assert inside.size == 100
+        assert inside == pytest.approx(np.full(100, 400.0), rel=0.2)
+
+    def test_it_is_grid_where_the_cells_are_the_indexs(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            # cells left unmerged, each 2 m across on the multiples of 2 m
+            # that a raster of 2 m cells is laid on too
+            reader.write_spatial_index(cell_size=2.0, minimum_points=0)
+        with Reader(path) as reader:
+            estimated = reader.density(2.0)
+            exact = reader.grid(2.0, "count")
+        left, _, _, top, _, _ = estimated.geotransform
+        e_left, _, _, e_top, _, _ = exact.geotransform
+        dc, dr = round((e_left - left) / 2.0), round((top - e_top) / 2.0)
+        rows, cols = exact.bands["count"].shape
+        window = estimated.bands["count"][dr:dr + rows, dc:dc + cols]
+        assert window == pytest.approx(exact.bands["count"])
+        assert window.sum() == estimated.bands["count"].sum()
+
+    def test_the_cell_size_defaults_to_the_finest_cell(self, tmp_path):
+        path = indexed(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            cells = reader.spatial_index.cell_counts()
+            raster = reader.density()
+        assert raster.geotransform[1] == min(box[2] - box[0]
+                                             for box, _ in cells)
+        assert raster.bands["count"].sum() == pytest.approx(40000)
+
+    def test_a_file_without_an_index_has_no_density(self, tmp_path):
+        with Reader(unindexed(tmp_path)) as reader:
+            with pytest.raises(ValueError, match="spatial index"):
+                reader.density()
+
+    @pytest.mark.parametrize("cell_size", [0.0, -2.0])
+    def test_a_cell_has_a_size(self, cell_size):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="size"):
+                reader.density(cell_size)
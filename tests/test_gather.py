@@ -0,0 +1,265 @@
+import gc
+import io
+import os
+import pathlib
+import weakref
+
+import pytest
+
+import lazpy.reader
+from lazpy import ADAPTIVE_CHUNK_SIZE, Reader
+from lazpy.reader import _coalesced
+from helpers import fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Reading a query's plan up front.
+#
+# A query knows the chunks it will decode before it decodes one, and reads
+# their bytes first, a few large reads with the small gaps between read
+# through. What it decodes has to be what it decodes reading as it goes;
+# what it reads has to be fewer, larger reads.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+RECTS = [(x, 0, x + 700, 10) for x in range(0, 20000, 2300)]
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+def queried(reader):
+    found = [reader.arrays_within("X", "Z", rect=rect) for rect in RECTS]
+    found.append(reader.arrays_between(1000.0, 1500.0, "X", "gps_time"))
+    found.append({"X": np.array([p.X for p in
+                                 reader.points_within(*RECTS[3])])})
+    return found
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    path = survey(tmp_path / "survey.laz", count=200000)
+    with Reader(path) as reader:
+        reader.write_spatial_index(cell_size=20.0)
+    return path
+
+
+class Counting(io.FileIO):
+    calls = 0
+
+    def read(self, *args):
+        Counting.calls += 1
+        return super().read(*args)
+
+    def readinto(self, b):
+        Counting.calls += 1
+        return super().readinto(b)
+
+
+class TestDecoding:
+
+    @pytest.mark.parametrize("name", ["survey.laz", "survey.las",
+                                      "adaptive.laz"])
+    def test_what_a_query_finds(self, tmp_path, monkeypatch, name):
+        path = survey(tmp_path / name, count=200000, chunk_size=(
+            ADAPTIVE_CHUNK_SIZE if name == "adaptive.laz" else 5000))
+        with Reader(path) as reader:
+            reader.write_spatial_index(cell_size=20.0)
+        monkeypatch.setattr(Reader, "GATHER_LIMIT", 0)
+        with Reader(path) as reader:
+            expected = queried(reader)
+        monkeypatch.undo()
+        with Reader(path) as reader:
+            for a, b in zip(queried(reader), expected):
+                same(a, b)
+
+    @pytest.mark.parametrize("limit", [1, 40000, 200000])
+    def test_a_plan_larger_than_is_read_first(self, indexed, monkeypatch,
+                                              limit):
+        with Reader(indexed) as reader:
+            expected = queried(reader)
+        monkeypatch.setattr(Reader, "GATHER_LIMIT", limit)
+        with Reader(indexed) as reader:
+            for a, b in zip(queried(reader), expected):
+                same(a, b)
+
+    def test_reading_on_after_a_query(self, indexed):
+        with Reader(indexed) as reader:
+            expected = reader.arrays("X", start=0)["X"]
+            reader.arrays_within("X", rect=RECTS[2])
+            # from wherever the query left off, and from back before it
+            at = reader.index
+            assert np.array_equal(reader.arrays("X", count=1000)["X"],
+                                  expected[at:at + 1000])
+            assert np.array_equal(reader.arrays("X", start=0)["X"],
+                                  expected)
+
+    @pytest.mark.parametrize("name", ["pt1_v1_pointwise.laz", "pt3_v2.laz"])
+    def test_files_the_plan_cannot_be_read_for(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays("X", "gps_time")
+            t0, t1 = np.quantile(expected["gps_time"], [0.2, 0.3])
+            found = reader.arrays_between(t0, t1, "X")
+        keep = (expected["gps_time"] >= t0) & (expected["gps_time"] < t1)
+        assert np.array_equal(found["X"], expected["X"][keep])
+
+
+class TestReads:
+
+    def test_a_file_object_is_read_a_range_at_a_time(self, tmp_path,
+                                                     monkeypatch):
+        path = survey(tmp_path / "survey.laz", count=200000)
+
+        def calls(t1=60000.0):
+            Counting.calls = 0
+            with Counting(path) as fp, Reader(fp) as reader:
+                found = reader.arrays_between(1000.0, t1, "X")
+            return Counting.calls, found
+
+        many, expected = calls()
+        monkeypatch.setattr(Reader, "GATHER_LIMIT", 0)
+        more, found = calls()
+        same(found, expected)
+        # what opening the file and bisecting it reads, either way
+        opening, _ = calls(1000.0)
+        # a refill at a time, and the chunks in a few reads
+        assert many - opening < (more - opening) // 4
+
+    def test_ranges_a_gap_apart_are_read_as_one(self, indexed, monkeypatch):
+        reads = []
+        pread = os.pread
+
+        def counted(fd, n, offset):
+            reads.append((offset, n))
+            return pread(fd, n, offset)
+
+        monkeypatch.setattr(lazpy.reader.os, "pread", counted)
+
+        def preads(gap):
+            reads.clear()
+            monkeypatch.setattr(Reader, "GATHER_GAP", gap)
+            with Reader(indexed) as reader:
+                found = [reader.arrays_within("X", rect=rect)
+                         for rect in RECTS[:4]]
+            return len(reads), found
+
+        joined, expected = preads(1 << 30)
+        apart, found = preads(0)
+        for a, b in zip(found, expected):
+            same(a, b)
+        # a query's chunks are one range when every gap is read through
+        assert joined == 4
+        assert apart >= joined
+
+    def test_a_range_reader_is_asked_once_a_range(self, indexed):
+        from test_ranges import Memory
+        data = pathlib.Path(indexed).read_bytes()
+        lax = pathlib.Path(indexed).with_suffix(".lax").read_bytes()
+        source = Memory(data, {".lax": lax})
+        with Reader(source) as reader:
+            reader._chunk_table()
+            before = reader.fp.requests
+            reader.arrays_within("X", rect=RECTS[5])
+            assert reader.fp.requests - before <= 1
+
+
+class Held(bytearray):
+    """Bytes read up front, that can be seen to be let go of."""
+
+
+class TestLettingGo:
+
+    @pytest.fixture
+    def held(self, monkeypatch):
+        found = []
+        read_ranges = Reader._read_ranges
+
+        def kept(self, ranges):
+            data = [Held(piece) for piece in read_ranges(self, ranges)]
+            found.extend(weakref.ref(piece) for piece in data)
+            return data
+
+        monkeypatch.setattr(Reader, "_read_ranges", kept)
+        return found
+
+    @staticmethod
+    def let_go(found):
+        gc.collect()
+        return found and all(ref() is None for ref in found)
+
+    def test_when_a_query_returns(self, indexed, held):
+        with Reader(indexed) as reader:
+            for rect in RECTS[:3]:
+                reader.arrays_within("X", rect=rect)
+            reader.arrays_between(1000.0, 1500.0, "X")
+            assert self.let_go(held)
+
+    def test_when_a_query_is_abandoned(self, indexed, held):
+        with Reader(indexed) as reader:
+            points = reader.points_within(*RECTS[2])
+            next(points)
+            assert not self.let_go(held)
+            points.close()
+            assert self.let_go(held)
+            held.clear()
+            points = reader.points_between(1000.0, 1500.0)
+            next(points)
+            del points
+            assert self.let_go(held)
+
+    def test_a_pool_for_the_reader(self, indexed):
+        data = pathlib.Path(indexed).read_bytes()
+        ranges = [(0, 100), (5000, 6000), (9000, 9001)]
+        with Reader(indexed) as reader:
+            assert reader._read_ranges(ranges) == [
+                data[start:stop] for start, stop in ranges]
+            pool = reader._gather_pool
+            assert pool is not None
+            reader._read_ranges(ranges[1:])
+            assert reader._gather_pool is pool
+        assert reader._gather_pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(int)
+
+
+class TestCoalescing:
+
+    def test_ranges_are_joined_across_small_gaps(self):
+        ranges = [(500, 600), (0, 100), (150, 300), (250, 400), (1000, 1100)]
+        assert _coalesced(ranges, 50) == [(0, 400), (500, 600), (1000, 1100)]
+        assert _coalesced(ranges, 0) == [(0, 100), (150, 400), (500, 600),
+                                         (1000, 1100)]
+        assert _coalesced(ranges, 400) == [(0, 1100)]
+        assert _coalesced([], 10) == []
+
+    def test_the_point_reader_wants_them_in_order(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            points = reader._points()
+            with pytest.raises(ValueError, match="order"):
+                points.hold_ranges([(100, b"x" * 10), (105, b"y")])
+            with pytest.raises(TypeError):
+                points.hold_ranges([(0, 17)])
+            with pytest.raises(TypeError):
+                points.hold_ranges([5])
+            points.hold_ranges([])
+
+    def test_held_bytes_are_what_is_read(self, indexed):
+        # a refill takes what it is handed, so handing it the wrong bytes
+        # shows where it looked
+        with Reader(indexed) as reader:
+            expected = reader.arrays("X", start=0)["X"]
+            size = len(pathlib.Path(indexed).read_bytes())
+            reader._points().hold_ranges([(0, bytes(size))])
+            try:
+                x = reader.arrays("X", start=0)["X"]
+            except lazpy.LazError:
+                pass
+            else:
+                assert not np.array_equal(x, expected)
+            reader._points().hold_ranges([])
+            assert np.array_equal(reader.arrays("X", start=0)["X"], expected)
@@ -0,0 +1,149 @@
+import importlib.util
+import textwrap
+import threading
+
+import pytest
+
+import lazpy
+import lazpy._cpylaz
+from lazpy import Reader
+from helpers import fixture
+
+
+# ---------------------------------------------------------------------------
+# One module per interpreter.
+#
+# Everything an import of lazpy._cpylaz makes -- its types, LazError -- is
+# that import's own, so that a subinterpreter with a GIL of its own can
+# import it alongside the main one. Loading the extension a second time in
+# one interpreter makes a second module the same way, which is what lets the
+# separation be seen on a Python without subinterpreters to run.
+# ---------------------------------------------------------------------------
+
+
+def another_module():
+    spec = importlib.util.spec_from_file_location(
+        "lazpy._cpylaz", lazpy._cpylaz.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestModuleState:
+
+    def test_a_second_import_is_a_module_of_its_own(self):
+        other = another_module()
+        assert other is not lazpy._cpylaz
+        assert other.LazError is not lazpy.LazError
+        for name in ("Point", "PointReader", "PointWriter", "SpatialIndex",
+                     "ArithmeticDecoder", "ArithmeticModel"):
+            assert getattr(other, name) is not getattr(lazpy._cpylaz, name)
+        assert other.POINT_LAYOUT == lazpy._cpylaz.POINT_LAYOUT
+
+    def test_errors_are_the_modules_own(self):
+        other = another_module()
+        with pytest.raises(other.LazError):
+            other.SpatialIndex(b"not an index")
+        try:
+            lazpy.SpatialIndex(b"not an index")
+        except other.LazError:
+            pytest.fail("the other module's LazError")
+        except lazpy.LazError:
+            pass
+
+    def test_a_reader_of_the_other_module(self):
+        other = another_module()
+        with Reader(fixture("pt3_v2.laz")) as reader:
+            expected = [reader.read().copy() for _ in range(5)]
+            args, kwargs = reader._point_args
+            with open(reader._path, "rb") as fp:
+                points = other.PointReader(fp, *args, **kwargs)
+                found = [points.read() for _ in range(5)]
+        # the points it hands back are of its module's type, not lazpy's
+        assert type(found[0]) is other.Point
+        assert [(p.X, p.Y, p.Z, p.gps_time) for p in found[-1:]] == \
+            [(p.X, p.Y, p.Z, p.gps_time) for p in expected[-1:]]
+        # and what one module's types are checked against is its own
+        with pytest.raises(TypeError):
+            lazpy._cpylaz.IntegerCompressor(
+                other.ArithmeticDecoder(), 16)
+
+    def test_types_cannot_be_changed(self):
+        with pytest.raises(TypeError):
+            lazpy._cpylaz.PointReader.checksum = None
+
+
+try:
+    from concurrent import interpreters
+except ImportError:
+    interpreters = None
+try:
+    # 3.11 and 3.12's, which 3.13 renamed and 3.14 made public as the above
+    import _xxsubinterpreters
+except ImportError:
+    _xxsubinterpreters = None
+
+
+def run_in_subinterpreter(code):
+    """Runs *code* in an interpreter of its own, raising if it raises."""
+    if interpreters is not None:
+        interp = interpreters.create()
+        try:
+            interp.exec(code)
+        finally:
+            interp.close()
+    else:
+        interp = _xxsubinterpreters.create()
+        try:
+            _xxsubinterpreters.run_string(interp, code)
+        finally:
+            _xxsubinterpreters.destroy(interp)
+
+
+# by the point, and through a file object's read(): numpy, which the array
+# calls need, is not made to be imported by more than one interpreter
+CODE = """
+    import lazpy
+    with open({path!r}, "rb") as fp, lazpy.Reader(fp) as reader:
+        assert sum(p.X for p in reader) == {total}, "decoded otherwise"
+    with lazpy.Reader({path!r}) as reader:
+        reader.read_ahead(2)
+        assert sum(p.X for p in reader) == {total}, "decoded otherwise"
+    try:
+        lazpy.SpatialIndex(b"not an index")
+    except lazpy.LazError:
+        pass
+"""
+
+
+@pytest.mark.skipif(interpreters is None and _xxsubinterpreters is None,
+                    reason="subinterpreters to run")
+class TestSubinterpreters:
+
+    def total(self, name):
+        with Reader(fixture(name)) as reader:
+            return sum(p.X for p in reader)
+
+    @pytest.mark.parametrize("name", ["pt3_v2.laz", "pt7_v3.laz"])
+    def test_decoding_in_one(self, name):
+        run_in_subinterpreter(textwrap.dedent(CODE.format(
+            path=fixture(name), total=self.total(name))))
+
+    def test_several_at_once(self):
+        # each interpreter under its own GIL, decoding at the same time
+        code = textwrap.dedent(CODE.format(
+            path=fixture("pt7_v3.laz"), total=self.total("pt7_v3.laz")))
+        failures = []
+
+        def run():
+            try:
+                run_in_subinterpreter(code)
+            except Exception as e:
+                failures.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert failures == []
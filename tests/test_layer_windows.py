@@ -0,0 +1,151 @@
+import io
+import pathlib
+
+import pytest
+
+from lazpy import _cpylaz as cpylaz
+from lazpy import LazError, Reader, Selective
+from helpers import fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Layer windows.
+#
+# A layered chunk too large to hold whole is decoded from windows over the
+# file, a buffer of each layer at a time. What it decodes to has to be what
+# reading it whole does; the tests lower the limit so that the fixtures'
+# small chunks are read the way only a very large one otherwise is.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+LAYERED_FIXTURES = [f"pt{n}_v{v}.laz" for n in range(6, 11) for v in (3, 4)]
+
+
+@pytest.fixture
+def windowed():
+    was = cpylaz._layer_window_above(0)
+    yield
+    cpylaz._layer_window_above(was)
+
+
+class SeekCounting(io.FileIO):
+    seeks = 0
+
+    def seek(self, *args):
+        SeekCounting.seeks += 1
+        return super().seek(*args)
+
+
+def whole(path, **kwargs):
+    with Reader(path, **kwargs) as reader:
+        return reader.arrays()
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+class TestDecoding:
+
+    @pytest.mark.parametrize("name", LAYERED_FIXTURES)
+    def test_every_fixture_decodes_as_it_does_whole(self, name):
+        expected = whole(fixture(name))
+        was = cpylaz._layer_window_above(0)
+        try:
+            same(whole(fixture(name)), expected)
+            with open(fixture(name), "rb") as fp, Reader(fp) as reader:
+                same(reader.arrays(), expected)
+        finally:
+            cpylaz._layer_window_above(was)
+
+    def test_a_file_of_large_chunks(self, tmp_path, windowed):
+        path = survey(tmp_path / "survey.laz", "flight", 120000, 60000,
+                      point_format=8)
+        expected = whole(path)
+        cpylaz._layer_window_above(1 << 62)
+        same(whole(path), expected)
+
+    def test_selective_decompression(self, tmp_path, windowed):
+        path = survey(tmp_path / "survey.laz", "flight", 120000, 60000,
+                      point_format=8)
+        mask = Selective.ALL & ~(Selective.Z | Selective.RGB)
+        partial = whole(path, decompress_selective=mask)
+        cpylaz._layer_window_above(1 << 62)
+        same(partial, whole(path, decompress_selective=mask))
+        full = whole(path)
+        # what is not decoded is the point each chunk begins with, held
+        assert not np.array_equal(partial["Z"], full["Z"])
+        assert np.array_equal(partial["gps_time"], full["gps_time"])
+
+    def test_seeking_between_chunks(self, tmp_path, windowed):
+        path = survey(tmp_path / "survey.laz", "flight", 120000, 60000,
+                      point_format=8)
+        expected = whole(path)
+        with Reader(path) as reader:
+            for start in [90000, 3, 59999, 60000, 119990, 0]:
+                a = reader.arrays("X", "nir", start=start, count=10)
+                assert np.array_equal(a["X"],
+                                      expected["X"][start:start + 10])
+                assert np.array_equal(a["nir"],
+                                      expected["nir"][start:start + 10])
+
+    def test_the_layers_are_read_where_they_are(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 120000, 60000,
+                      point_format=8)
+
+        def seeks(limit):
+            was = cpylaz._layer_window_above(limit)
+            try:
+                SeekCounting.seeks = 0
+                with SeekCounting(path) as fp, Reader(fp) as reader:
+                    reader.arrays()
+                return SeekCounting.seeks
+            finally:
+                cpylaz._layer_window_above(was)
+
+        # read whole, a chunk is one read; through windows, each buffer
+        # of each layer is a seek to it and one back
+        assert seeks(0) > seeks(1 << 62) + 20
+
+
+class TestDamage:
+
+    def test_a_damaged_layer_is_found_the_same_way(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 60000, 60000,
+                      point_format=8)
+        with Reader(path) as reader:
+            start = reader._chunk_table()[1][0]
+        data = bytearray(pathlib.Path(path).read_bytes())
+        # deep inside the chunk, past the first buffer of any layer
+        data[start + 600000:start + 600400] = b"\xff" * 400
+        pathlib.Path(path).write_bytes(bytes(data))
+
+        def outcome():
+            try:
+                return whole(path)["gps_time"]
+            except LazError as e:
+                return str(e)
+
+        expected = outcome()
+        was = cpylaz._layer_window_above(0)
+        try:
+            found = outcome()
+        finally:
+            cpylaz._layer_window_above(was)
+        if isinstance(expected, str):
+            assert found == expected
+        else:
+            assert np.array_equal(found, expected)
+
+    def test_a_truncated_chunk(self, tmp_path, windowed):
+        path = survey(tmp_path / "survey.laz", "flight", 60000, 60000,
+                      point_format=8)
+        with Reader(path) as reader:
+            table_at = reader._chunk_table()[1][-1]
+        data = pathlib.Path(path).read_bytes()
+        pathlib.Path(path).write_bytes(data[:table_at - 5000])
+        with pytest.raises(LazError):
+            whole(path)
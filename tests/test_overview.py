@@ -0,0 +1,157 @@
+import pathlib
+import struct
+
+import pytest
+
+from lazpy import ADAPTIVE_CHUNK_SIZE, Compressor, LazError, Reader, Writer
+from helpers import FIXTURES, fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Overviews.
+#
+# Reader.overview reads the point each chunk begins with as it is stored,
+# without decoding; what it hands back has to be what decoding the file finds
+# at those points.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def decoded_at(reader, firsts, *names):
+    a = reader.arrays(*names, start=0)
+    return {name: column[list(firsts)] for name, column in a.items()}
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+class TestOverview:
+
+    @pytest.mark.parametrize("name", FIXTURES)
+    def test_every_fixture_is_what_decoding_finds(self, name):
+        with Reader(fixture(name)) as reader:
+            overview = reader.overview()
+            firsts, _ = reader._heads()
+            same(overview, decoded_at(reader, firsts))
+
+    @pytest.mark.parametrize("point_format", [1, 6, 8])
+    def test_a_row_per_chunk(self, tmp_path, point_format):
+        path = survey(tmp_path / "survey.laz", "flight",
+                      point_format=point_format)
+        with Reader(path) as reader:
+            overview = reader.overview("X", "gps_time", "classification")
+            assert overview["X"].tolist() == list(range(0, 60000, 5000))
+            same(overview, decoded_at(reader, range(0, 60000, 5000),
+                                      "X", "gps_time", "classification"))
+
+    def test_adaptive_chunks_are_the_callers(self, tmp_path):
+        path = str(tmp_path / "adaptive.laz")
+        with Writer(path, 6, chunk_size=ADAPTIVE_CHUNK_SIZE) as writer:
+            for size in [10, 3000, 1, 700]:
+                writer.write_arrays({"X": np.arange(size) + 100})
+                writer.chunk()
+        with Reader(path) as reader:
+            overview = reader.overview("X")
+        # the chunk closed after the last point is empty, and has no row
+        assert overview["X"].tolist() == [100] * 4
+
+    def test_a_chunks_body_is_never_read(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight")
+        with Reader(path) as reader:
+            before = reader.overview()
+            decoded = reader.arrays("Z", start=0)["Z"]
+            starts = reader._chunk_table()[1]
+        # everything of each chunk after the raw point it begins with
+        data = bytearray(pathlib.Path(path).read_bytes())
+        for start, stop in zip(starts, starts[1:]):
+            data[start + 100:stop] = bytes(stop - start - 100)
+        pathlib.Path(path).write_bytes(bytes(data))
+        with Reader(path) as reader:
+            same(reader.overview(), before)
+            # where decoding the same chunks finds nothing it wrote
+            try:
+                z = reader.arrays("Z", start=0)["Z"]
+            except LazError:
+                pass
+            else:
+                assert not np.array_equal(z, decoded)
+
+    def test_reading_on_from_an_overview(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        with Reader(path) as reader:
+            reader.overview("X")
+            assert reader.index == 55000
+            assert reader.arrays("X")["X"].tolist() == \
+                list(range(55000, 60000))
+            reader.overview("Z")
+            assert reader.read().X == 55000
+
+    @pytest.mark.parametrize("threads", [2, 3, 7, 50])
+    def test_threads_find_what_one_thread_finds(self, tmp_path, threads):
+        path = survey(tmp_path / "survey.laz", "flight", chunk_size=500)
+        with Reader(path) as reader:
+            index = reader.index
+            same(reader.overview(threads=threads), reader.overview())
+            reader.seek(1234)
+            reader.overview("X", threads=threads)
+            assert reader.index == 1234
+        assert index == 0
+
+    def test_a_plain_las_file_is_strided(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Reader, "OVERVIEW_STRIDE", 700)
+        path = survey(tmp_path / "survey.las", "flight")
+        with Reader(path) as reader:
+            overview = reader.overview("X", "Y")
+            assert overview["X"].tolist() == list(range(0, 60000, 700))
+            same(overview, decoded_at(reader, range(0, 60000, 700),
+                                      "X", "Y"))
+            same(reader.overview("X", "Y", threads=4), overview)
+
+    def test_a_pointwise_file_is_one_chunk(self, tmp_path):
+        path = survey(tmp_path / "pointwise.laz", "flight", point_format=1,
+                      compressor=Compressor.POINTWISE)
+        with Reader(path) as reader:
+            assert reader.overview("X")["X"].tolist() == [0]
+
+    def test_a_lost_fixed_size_table_falls_back_to_the_chunk_size(
+            self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=1)
+        with Reader(path) as reader:
+            before = reader.overview("X", "Z")
+            start = reader.header["offset_to_point_data"]
+        data = bytearray(pathlib.Path(path).read_bytes())
+        table_at = struct.unpack_from("<q", data, start)[0]
+        struct.pack_into("<I", data, table_at + 4, 0)
+        pathlib.Path(path).write_bytes(bytes(data))
+        with Reader(path) as reader:
+            assert reader._heads()[1] is False
+            same(reader.overview("X", "Z"), before)
+
+    def test_a_file_of_no_points(self, tmp_path):
+        path = str(tmp_path / "empty.laz")
+        with Writer(path, 6):
+            pass
+        with Reader(path) as reader:
+            overview = reader.overview("X", "gps_time", threads=2)
+        assert [len(column) for column in overview.values()] == [0, 0]
+
+    def test_threads_are_at_least_one(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="threads"):
+                reader.overview(threads=0)
+
+    def test_threads_need_a_file_name(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight")
+        with open(path, "rb") as fp, Reader(fp) as reader:
+            assert len(reader.overview("X")["X"]) == 12
+            with pytest.raises(ValueError, match="by name"):
+                reader.overview("X", threads=2)
+
+    def test_a_field_must_be_one_there_is(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError):
+                reader.overview("no_such_field")
@@ -0,0 +1,280 @@
+import copy
+import os
+import pathlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import lazpy.reader
+from lazpy import ADAPTIVE_CHUNK_SIZE, LazError, Reader, Writer
+from helpers import FIXTURES, fixture, survey
+from test_ranges import Memory
+from test_saved_tables import interrupted
+
+
+# ---------------------------------------------------------------------------
+# Pickled readers.
+#
+# A reader pickles as the path or range reader it was opened from and the
+# point it was at, with what it parsed on opening -- so that a process
+# pool's worker handed one opens the file again and reads nothing of the
+# header, the records, the chunk table or the index for itself.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def adaptive(path):
+    with Writer(str(path), 6, chunk_size=ADAPTIVE_CHUNK_SIZE) as writer:
+        for size in [10, 3000, 1, 7000, 400]:
+            writer.write_arrays({"X": np.arange(size),
+                                 "gps_time": np.arange(size) * 0.5})
+            writer.chunk()
+    return str(path)
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+def again(reader):
+    return pickle.loads(pickle.dumps(reader))
+
+
+def block(reader, start, count):
+    # what a worker is handed a reader to do
+    return reader.arrays("X", "gps_time", start=start, count=count)
+
+
+class TestRoundTrip:
+
+    @pytest.mark.parametrize("name", FIXTURES)
+    def test_fixtures(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays()
+            reader.seek(len(reader) // 2)
+            with again(reader) as copied:
+                assert copied.index == len(reader) // 2
+                assert copied.header == reader.header
+                assert copied.laz_header == reader.laz_header
+                assert copied.num_extra_bytes == reader.num_extra_bytes
+                assert copied.warnings == reader.warnings
+                rest = copied.arrays()
+                same(copied.arrays(start=0), expected)
+        same(rest, {k: v[len(expected["X"]) // 2:]
+                    for k, v in expected.items()})
+
+    def test_the_chunk_table_goes_with_it(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            starts = reader._chunk_table()[1]
+            # and nothing is read for it on the other side
+            with again(reader) as copied:
+                assert copied._points().chunk_starts == starts
+                assert copied.index == 0
+                same(copied.arrays("X", start=31234, count=100),
+                     reader.arrays("X", start=31234, count=100))
+
+    def test_a_table_not_yet_read_is_read_for_it(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            with again(reader) as copied:
+                assert len(copied._saved_starts) == 13
+            assert reader.index == 0
+
+    def test_adaptive_chunks(self, tmp_path):
+        path = adaptive(tmp_path / "adaptive.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays()
+            reader.seek(3011)
+            with again(reader) as copied:
+                assert copied._saved_totals == [0, 10, 3010, 3011, 10011,
+                                                10411]
+                same(copied.arrays(count=7400),
+                     {k: v[3011:] for k, v in expected.items()})
+                for start in [10400, 0, 3009, 9000]:
+                    same(copied.arrays(start=start, count=3),
+                         {k: v[start:start + 3]
+                          for k, v in expected.items()})
+
+    def test_a_rebuilt_table_is_not_handed_on_half_found(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", chunk_size=1000)
+        interrupted(path)
+        with Reader(path) as reader:
+            expected = reader.arrays("X", start=0, count=10)
+            reader.seek(0)
+            with again(reader) as copied:
+                assert copied._saved_starts is None
+                same(copied.arrays("X", count=10), expected)
+                assert copied.warnings == reader.warnings
+            # until reading has found every chunk, which still warns
+            reader.arrays("X", start=0)
+            with again(reader) as copied:
+                assert len(copied._saved_starts) == 61
+                assert copied.warnings == reader.warnings
+
+    def test_the_index_and_summaries_go_with_it(self, tmp_path,
+                                                monkeypatch):
+        path = survey(tmp_path / "survey.laz", chunk_stats=True)
+        with Reader(path) as reader:
+            reader.write_spatial_index(cell_size=50.0)
+            reader.write_spatial_index(cell_size=50.0, dims=3)
+        rect, box = (3000, 0, 9000, 5), (3000, 0, -100, 9000, 5, 100)
+        with Reader(path) as reader:
+            assert reader.has_spatial_index and reader.octree_index
+            assert reader.chunk_summaries
+            expected = (reader.arrays_within("X", rect=rect),
+                        reader.arrays_within("X", box=box))
+            data = pickle.dumps(reader)
+
+        def looked(*args):
+            raise AssertionError("looked for again")
+
+        monkeypatch.setattr(Reader, "_sidecar_index_data", looked)
+        monkeypatch.setattr(Reader, "_appended_index_data", looked)
+        monkeypatch.setattr(Reader, "_summaries_of", looked)
+        with pickle.loads(data) as copied:
+            assert copied.spatial_index.num_cells
+            assert copied.octree_index.dims == 3
+            same(copied.arrays_within("X", rect=rect), expected[0])
+            same(copied.arrays_within("X", box=box), expected[1])
+
+    def test_an_index_not_yet_looked_for_is_looked_for_later(self):
+        with Reader(fixture("pt1_v2_appended.laz")) as reader:
+            with again(reader) as copied:
+                assert not copied._index_looked_for
+                assert copied.has_spatial_index
+
+    def test_records_read_on_the_other_side(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", chunk_stats=True)
+        with Reader(path) as reader:
+            key, = reader.header["extended_variable_length_records"]
+            with again(reader) as copied:
+                record = copied.header["extended_variable_length_records"][
+                    key]
+                assert record["data"] == reader.header[
+                    "extended_variable_length_records"][key]["data"]
+
+    def test_a_copy_is_a_reader_of_its_own(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            reader.seek(100)
+            with copy.copy(reader) as copied:
+                assert copied.fp is not reader.fp
+                copied.seek(5000)
+                assert reader.index == 100
+
+    def test_decompress_selective(self):
+        with Reader(fixture("pt7_v3.laz"), decompress_selective=0) as reader:
+            with again(reader) as copied:
+                assert copied.decompress_selective == 0
+                same(copied.arrays("X", "gps_time", start=0),
+                     reader.arrays("X", "gps_time", start=0))
+
+
+class TestHandingOn:
+
+    def test_to_a_process_pool(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        blocks = [(start, 7000) for start in range(0, 60000, 7000)]
+        with Reader(path) as reader:
+            expected = [block(reader, *b) for b in blocks]
+            with ProcessPoolExecutor(2) as pool:
+                found = list(pool.map(block, [reader] * len(blocks),
+                                      *zip(*blocks)))
+        for a, b in zip(found, expected):
+            same(a, b)
+
+    def test_nothing_is_parsed_again(self, tmp_path, monkeypatch):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            data = pickle.dumps(reader)
+        parsed = []
+        monkeypatch.setattr(lazpy.reader, "_read_las_header",
+                            lambda fp: parsed.append(fp))
+        monkeypatch.setattr(Reader, "_read_evlrs",
+                            lambda fp, header: parsed.append(fp))
+        with pickle.loads(data) as copied:
+            copied.arrays("X", start=20000, count=10)
+        assert parsed == []
+
+    def test_from_another_directory(self, tmp_path, monkeypatch):
+        survey(tmp_path / "survey.laz")
+        (tmp_path / "elsewhere").mkdir()
+        monkeypatch.chdir(tmp_path)
+        with Reader("survey.laz") as reader:
+            data = pickle.dumps(reader)
+            expected = reader.arrays("X", start=0)
+        # where a worker started somewhere else would unpickle it
+        monkeypatch.chdir(tmp_path / "elsewhere")
+        with pickle.loads(data) as copied:
+            same(copied.arrays("X", start=0), expected)
+
+    def test_a_range_reader(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        source = Memory(pathlib.Path(path).read_bytes())
+        with Reader(source) as reader:
+            expected = block(reader, 40000, 100)
+            source.ranges.clear()
+            with again(reader) as copied:
+                same(block(copied, 40000, 100), expected)
+                # only the chunk it decoded was fetched
+                assert copied._source.ranges
+                assert all(offset > 40000 for offset, _ in
+                           copied._source.ranges)
+
+
+class TestRefusals:
+
+    def test_a_file_object(self):
+        with open(fixture("pt3_v2.laz"), "rb") as fp, Reader(fp) as reader:
+            with pytest.raises(TypeError, match="file object"):
+                pickle.dumps(reader)
+
+    def test_a_closed_reader(self):
+        reader = Reader(fixture("pt3_v2.laz"))
+        reader.close()
+        with pytest.raises(ValueError, match="closed"):
+            pickle.dumps(reader)
+        with pytest.raises(ValueError, match="not open"):
+            pickle.dumps(Reader())
+
+    def test_a_file_that_changed(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            data = pickle.dumps(reader)
+        with open(path, "ab") as fp:
+            fp.write(b"\0" * 10)
+        with pytest.raises(LazError, match="pickled"):
+            pickle.loads(data)
+
+    def test_a_file_that_is_gone(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            data = pickle.dumps(reader)
+        os.remove(path)
+        with pytest.raises(OSError):
+            pickle.loads(data)
+
+    def test_tables_the_point_reader_refuses(self, tmp_path):
+        path = adaptive(tmp_path / "adaptive.laz")
+        with Reader(path) as reader:
+            firsts, starts = reader._chunk_table()
+        with Reader(path) as reader:
+            points = reader._points()
+            with pytest.raises(LazError, match="adaptive"):
+                points.use_chunk_table(starts)
+            with pytest.raises(ValueError, match="as many"):
+                points.use_chunk_table(starts, firsts[1:])
+            with pytest.raises(LazError, match="no points"):
+                points.use_chunk_table(starts, [0, 10, 10, 3011, 10011,
+                                                10411])
+            with pytest.raises(LazError, match="point 0"):
+                points.use_chunk_table(starts, [n + 1 for n in firsts])
+        with Reader(survey(tmp_path / "survey.laz")) as reader:
+            with pytest.raises(LazError, match="fixed-size"):
+                reader._points().use_chunk_table([1000, 2000],
+                                                 [0, 5000])
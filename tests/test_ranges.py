@@ -0,0 +1,292 @@
+import http.server
+import os
+import pathlib
+import threading
+
+import pytest
+
+from lazpy import HTTPRangeReader, RangeFile, Reader
+from helpers import FIXTURES, fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Range readers.
+#
+# A reader over read_range(offset, length) and size() reads a file a block at
+# a time through RangeFile's cache. What it decodes has to be what reading
+# the file does; what it fetches has to be what the decoding reaches, in as
+# few ranges as those blocks make.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+class Memory:
+    """A range reader over bytes, keeping the ranges it was asked for."""
+
+    def __init__(self, data, sidecars=None):
+        self.data = data
+        self.sidecars = sidecars or {}
+        self.ranges = []
+
+    def size(self):
+        return len(self.data)
+
+    def read_range(self, offset, length):
+        self.ranges.append((offset, length))
+        return self.data[offset:offset + length]
+
+    def sidecar(self, extension):
+        if extension not in self.sidecars:
+            return None
+        return Memory(self.sidecars[extension])
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Serves a directory, in ranges unless told not to."""
+    root = None
+    ranges = True
+    paths = []
+
+    def do_GET(self):
+        Handler.paths.append(self.path)
+        path = pathlib.Path(self.root) / self.path.lstrip("/")
+        if not path.is_file():
+            self.send_error(404)
+            return
+        data = path.read_bytes()
+        asked = self.headers.get("Range")
+        if asked and self.ranges:
+            first, last = (int(v) for v in
+                           asked.partition("=")[2].split("-"))
+            last = min(last, len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range",
+                             f"bytes {first}-{last}/{len(data)}")
+            data = data[first:last + 1]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    Handler.root = str(tmp_path)
+    Handler.ranges = True
+    Handler.paths = []
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+class TestReading:
+
+    @pytest.mark.parametrize("name", FIXTURES)
+    def test_every_fixture_reads_as_the_file_does(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.checksum()
+        data = pathlib.Path(fixture(name)).read_bytes()
+        with Reader(Memory(data)) as reader:
+            assert reader.checksum() == expected
+
+    def test_seeking(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=30000)
+        with Reader(path) as reader:
+            expected = reader.arrays()
+        with Reader(Memory(pathlib.Path(path).read_bytes())) as reader:
+            for start in [29000, 0, 12345, 4999, 5000]:
+                same(reader.arrays(start=start, count=100),
+                     {k: v[start:start + 100] for k, v in expected.items()})
+
+    def test_opening_fetches_the_ends_of_the_file(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=200000)
+        source = Memory(pathlib.Path(path).read_bytes())
+        with Reader(source) as reader:
+            reader._chunk_table()
+            # the header and records, and the chunk table at the far end
+            assert reader.fp.requests == 2
+            assert reader.fp.bytes_fetched <= 2 * RangeFile.BLOCK_SIZE
+
+    def test_a_query_fetches_the_chunks_it_decodes(self, tmp_path,
+                                                   monkeypatch):
+        # blocks as much smaller than the file as a large file's are
+        monkeypatch.setattr(RangeFile, "BLOCK_SIZE", 16384)
+        path = survey(tmp_path / "survey.laz", count=200000)
+        with Reader(path) as reader:
+            lax = pathlib.Path(reader.write_spatial_index(cell_size=50.0))
+            rect = (10000, 0, 10100, 10)
+            expected = reader.arrays_within("X", "Z", rect=rect)
+        source = Memory(pathlib.Path(path).read_bytes(),
+                        {".lax": lax.read_bytes()})
+        with Reader(source) as reader:
+            assert reader.has_spatial_index
+            same(reader.arrays_within("X", "Z", rect=rect), expected)
+            fetched = reader.fp.bytes_fetched
+        assert len(expected["X"]) == 1000
+        assert fetched < len(source.data) // 5
+
+    def test_a_range_reader_without_sidecars(self, tmp_path):
+        class Bare:
+            def __init__(self, data):
+                self.data = data
+
+            def size(self):
+                return len(self.data)
+
+            def read_range(self, offset, length):
+                return self.data[offset:offset + length]
+
+        path = survey(tmp_path / "survey.laz", count=10000)
+        with Reader(path) as reader:
+            reader.write_spatial_index()
+        with Reader(Bare(pathlib.Path(path).read_bytes())) as reader:
+            assert not reader.has_spatial_index
+            assert len(reader.arrays("X")["X"]) == 10000
+
+    def test_reading_ahead(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=40000)
+        with Reader(path) as reader:
+            expected = reader.arrays()
+        with Reader(Memory(pathlib.Path(path).read_bytes())) as reader:
+            reader.read_ahead(2)
+            same(reader.arrays(), expected)
+
+    def test_a_short_range_is_an_error(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", count=10000)
+        source = Memory(pathlib.Path(path).read_bytes())
+        source.size = lambda: len(source.data) + 100
+        with pytest.raises(OSError, match="returned"):
+            with Reader(source) as reader:
+                reader.arrays()
+
+    def test_the_range_reader_is_left_as_it_was(self):
+        class Closing(Memory):
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        source = Closing(pathlib.Path(fixture("pt1_v2.laz")).read_bytes())
+        with Reader(source) as reader:
+            fp = reader.fp
+        assert fp.closed
+        assert not source.closed
+
+
+class TestCache:
+
+    def test_a_run_of_blocks_is_one_range(self):
+        source = Memory(bytes(range(256)) * 40)
+        fp = RangeFile(source, block_size=100, cache_blocks=20)
+        fp.seek(150)
+        assert fp.read(1000) == source.data[150:1150]
+        assert source.ranges == [(100, 1100)]
+        # the blocks either side of those held are fetched, and only they
+        fp.seek(50)
+        assert fp.read(1300) == source.data[50:1350]
+        assert source.ranges[1:] == [(0, 100), (1200, 200)]
+
+    def test_blocks_held_are_not_fetched_again(self):
+        source = Memory(os.urandom(5000))
+        fp = RangeFile(source, block_size=512, cache_blocks=4)
+        for _ in range(3):
+            fp.seek(1000)
+            assert fp.read(1000) == source.data[1000:2000]
+        assert fp.requests == 1
+
+    def test_the_least_recently_used_block_goes(self):
+        source = Memory(os.urandom(5000))
+        fp = RangeFile(source, block_size=100, cache_blocks=3)
+        for at in [0, 100, 200, 0, 300]:
+            fp.seek(at)
+            fp.read(1)
+        # 100 went, not 0, which was read again before 300 came in
+        fp.seek(0)
+        fp.read(1)
+        assert fp.requests == 4
+        fp.seek(100)
+        fp.read(1)
+        assert fp.requests == 5
+
+    def test_a_read_of_more_than_is_kept(self):
+        source = Memory(os.urandom(5000))
+        fp = RangeFile(source, block_size=100, cache_blocks=2)
+        assert fp.read() == source.data
+        assert fp.requests == 1
+        assert len(fp._blocks) == 2
+
+    def test_the_end_of_the_file(self):
+        source = Memory(b"0123456789")
+        fp = RangeFile(source, block_size=4)
+        fp.seek(-3, os.SEEK_END)
+        assert fp.read(10) == b"789"
+        assert fp.read(10) == b""
+        assert source.ranges == [(4, 6)]
+
+    @pytest.mark.parametrize("kwargs", [{"block_size": 0},
+                                        {"cache_blocks": 0}])
+    def test_sizes(self, kwargs):
+        with pytest.raises(ValueError):
+            RangeFile(Memory(b""), **kwargs)
+
+    def test_closing_one_that_was_refused(self):
+        # which is what collecting it does
+        file = RangeFile.__new__(RangeFile)
+        with pytest.raises(ValueError):
+            file.__init__(Memory(b""), block_size=0)
+        file.close()
+        assert file.closed
+
+
+class TestHTTP:
+
+    def test_a_file_on_a_server(self, tmp_path, server):
+        path = survey(tmp_path / "survey.laz", count=200000)
+        with Reader(path) as reader:
+            reader.write_spatial_index(cell_size=50.0)
+            rect = (5000, 0, 5200, 10)
+            expected = reader.arrays_within("X", "Y", rect=rect)
+        with Reader(HTTPRangeReader(f"{server}/survey.laz")) as reader:
+            assert reader.has_spatial_index
+            same(reader.arrays_within("X", "Y", rect=rect), expected)
+            assert reader.fp.name == f"{server}/survey.laz"
+        assert "/survey.lax" in Handler.paths
+
+    def test_no_index_beside_it(self, tmp_path, server):
+        path = survey(tmp_path / "survey.laz", count=10000)
+        with Reader(path) as reader:
+            expected = reader.arrays("X", "Z")
+        with Reader(HTTPRangeReader(f"{server}/survey.laz")) as reader:
+            assert not reader.has_spatial_index
+            same(reader.arrays("X", "Z"), expected)
+
+    def test_a_server_without_ranges(self, tmp_path, server):
+        survey(tmp_path / "survey.laz", count=100)
+        Handler.ranges = False
+        with pytest.raises(OSError, match="byte ranges"):
+            Reader(HTTPRangeReader(f"{server}/survey.laz"))
+
+    def test_a_file_not_there(self, server):
+        with pytest.raises(OSError):
+            Reader(HTTPRangeReader(f"{server}/nothing.laz"))
+
+    def test_a_sidecar_is_the_same_url_otherwise(self):
+        source = HTTPRangeReader("https://example.com/a/b.c/cloud.laz?x=1",
+                                 headers={"Authorization": "t"})
+        sidecar = source.sidecar(".lax")
+        assert sidecar.url == "https://example.com/a/b.c/cloud.lax?x=1"
+        assert sidecar.headers == {"Authorization": "t"}
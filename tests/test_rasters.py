@@ -0,0 +1,271 @@
+import pytest
+
+from lazpy import Raster, Reader, Writer
+from lazpy import _cpylaz as cpylaz
+from helpers import FIXTURES, fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Rasters.
+#
+# Reader.grid fills its cells in C a block at a time; binning the whole of
+# xyz() with numpy is the reference it has to agree with, cell for cell.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+# the square the fixtures' points lie in, with a margin on every side
+FIXTURE_RECT = (1490.0, 1690.0, 1510.0, 1710.0)
+
+
+def binned_by_numpy(path, cell_size, rect, field="Z", where=None):
+    """Every cell's points, the memory-hungry way: ``{(row, col): values}``
+    for the cells of a raster over *rect*."""
+    with Reader(path) as reader:
+        a = reader.arrays()
+        xyz = reader.xyz(start=0)
+    keep = ((xyz[:, 0] >= rect[0]) & (xyz[:, 0] < rect[2])
+            & (xyz[:, 1] >= rect[1]) & (xyz[:, 1] < rect[3]))
+    for name, value in (where or {}).items():
+        keep &= np.isin(a[name], value)
+    left = np.floor(rect[0] / cell_size) * cell_size
+    bottom = np.floor(rect[1] / cell_size) * cell_size
+    num_rows = int(np.ceil(rect[3] / cell_size) - bottom / cell_size)
+    cols = np.floor((xyz[:, 0] - left) / cell_size).astype(int)
+    # counted up from the bottom, where the cells' edges are, and then
+    # turned over so that the first row is the northernmost
+    rows = num_rows - 1 - np.floor((xyz[:, 1] - bottom)
+                                   / cell_size).astype(int)
+    values = xyz[:, "XYZ".index(field)] if field in "XYZ" else a[field]
+    cells = {}
+    for row, col, value in zip(rows[keep], cols[keep], values[keep]):
+        cells.setdefault((row, col), []).append(value)
+    return cells
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_every_fixture_grids_as_numpy_bins_it(name):
+    cells = binned_by_numpy(fixture(name), 1.0, FIXTURE_RECT)
+    with Reader(fixture(name)) as reader:
+        raster = reader.grid(1.0, ("count", "min_z", "max_z", "mean_z"),
+                             rect=FIXTURE_RECT)
+    bands = raster.bands
+    assert bands["count"].sum() == sum(len(v) for v in cells.values())
+    for (row, col), values in cells.items():
+        assert bands["count"][row, col] == len(values)
+        assert bands["min_z"][row, col] == min(values)
+        assert bands["max_z"][row, col] == max(values)
+        assert bands["mean_z"][row, col] == pytest.approx(np.mean(values))
+    assert np.isnan(bands["max_z"][bands["count"] == 0]).all()
+
+
+class TestGrid:
+
+    def test_the_points_bounds_are_the_raster_without_an_area(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        with Reader(path) as reader:
+            raster = reader.grid(2.0, "count")
+            min_x, min_y, max_x, max_y = reader._header_bounds(2)
+        left, size, _, top, _, negative = raster.geotransform
+        rows, cols = raster.bands["count"].shape
+        assert size == 2.0 and negative == -2.0
+        assert left <= min_x < left + size and top - size <= max_y < top
+        assert left + cols * size > max_x and top - rows * size <= min_y
+        assert raster.bands["count"].sum() == 30000
+
+    @pytest.mark.parametrize("stat", ["max_intensity", "mean_intensity",
+                                      "min_z", "count"])
+    def test_a_survey_grids_as_numpy_bins_it(self, tmp_path, stat):
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        rect = (485.0, 785.0, 515.0, 815.0)
+        op, _, field = stat.partition("_")
+        cells = binned_by_numpy(path, 2.5, rect,
+                                field="Z" if field == "z" else
+                                (field or "Z"))
+        with Reader(path) as reader:
+            band = reader.grid(2.5, stat, rect=rect).bands[stat]
+        assert band.shape == (12, 12)
+        reduce = {"max": max, "min": min, "mean": np.mean, "count": len}[op]
+        for (row, col), values in cells.items():
+            assert band[row, col] == pytest.approx(reduce(values))
+
+    def test_blocks_add_up_to_the_whole(self, tmp_path, monkeypatch):
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        stats = ("count", "min_z", "max_z", "mean_z", "idw_z")
+        with Reader(path) as reader:
+            whole = reader.grid(4.0, stats)
+            monkeypatch.setattr(Reader, "WITHIN_BLOCK", 777)
+            blocked = reader.grid(4.0, stats)
+        for stat in stats:
+            assert np.allclose(whole.bands[stat], blocked.bands[stat],
+                               equal_nan=True), stat
+
+    def test_idw_alone_is_of_elevations(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        rect, where = (480.0, 780.0, 520.0, 820.0), {"classification": 2}
+        with Reader(path) as reader:
+            raster = reader.grid(4.0, ("min_z", "max_z", "mean_z", "count",
+                                       "idw"), rect=rect, where=where)
+            expected = reader.grid(4.0, ("mean_z", "idw_z"), rect=rect,
+                                   where=where)
+        assert set(raster.bands) == {"min_z", "max_z", "mean_z", "count",
+                                     "idw"}
+        assert np.array_equal(raster.bands["idw"], expected.bands["idw_z"],
+                              equal_nan=True)
+        assert np.array_equal(raster.bands["mean_z"],
+                              expected.bands["mean_z"], equal_nan=True)
+
+    @pytest.mark.parametrize("field,value", [("max_x", 505.0),
+                                             ("min_y", 799.0),
+                                             ("max_x", 1e6),
+                                             ("min_x", -1e6)])
+    def test_a_header_that_is_wrong_is_not_believed(self, tmp_path, field,
+                                                    value):
+        # one left stale by an edit drops no point outside its box, and a
+        # placeholder does not have a raster made of all of its box
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        with Reader(path) as reader:
+            expected = reader.grid(2.0, ("count", "max_z"))
+            reader.header[field] = value
+            found = reader.grid(2.0, ("count", "max_z"))
+        assert found.geotransform == expected.geotransform
+        for stat in ("count", "max_z"):
+            assert np.array_equal(found.bands[stat], expected.bands[stat],
+                                  equal_nan=True), stat
+
+    def test_a_raster_that_grows_as_the_points_go_by(self, tmp_path,
+                                                     monkeypatch):
+        # a strip whose blocks each reach further, south-west and north-east
+        # by turns, against the raster over the area the points cover
+        rng = np.random.default_rng(3)
+        reach = np.repeat(np.arange(1, 41), 500) * 1000
+        side = np.where(np.arange(20000) // 500 % 2, 1, -1)
+        path = str(tmp_path / "strip.laz")
+        with Writer(path, 1, scales=(0.01, 0.01, 0.01)) as writer:
+            writer.write_arrays({
+                "X": side * rng.integers(0, reach),
+                "Y": side * rng.integers(0, reach),
+                "Z": rng.integers(0, 3000, 20000),
+            })
+        monkeypatch.setattr(Reader, "WITHIN_BLOCK", 500)
+        with Reader(path) as reader:
+            grown = reader.grid(7.0, ("count", "min_z", "idw_z"))
+            left, size, _, top, _, _ = grown.geotransform
+            rows, cols = grown.bands["count"].shape
+            rect = (left, top - rows * size, left + cols * size, top)
+            expected = reader.grid(7.0, ("count", "min_z", "idw_z"),
+                                   rect=rect)
+        assert grown.bands["count"].sum() == 20000
+        assert grown.geotransform == expected.geotransform
+        for stat in ("count", "min_z", "idw_z"):
+            assert np.array_equal(grown.bands[stat], expected.bands[stat],
+                                  equal_nan=True), stat
+
+    def test_where_keeps_only_the_points_it_names(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        rect = (480.0, 780.0, 520.0, 820.0)
+        ground = binned_by_numpy(path, 5.0, rect,
+                                 where={"classification": 2})
+        either = binned_by_numpy(path, 5.0, rect,
+                                 where={"classification": (1, 3)})
+        with Reader(path) as reader:
+            one = reader.grid(5.0, ("count", "min_z"), rect=rect,
+                              where={"classification": 2}).bands
+            two = reader.grid(5.0, "count", rect=rect,
+                              where={"classification": [1, 3]}).bands
+        assert one["count"].sum() == sum(map(len, ground.values()))
+        assert two["count"].sum() == sum(map(len, either.values()))
+        for (row, col), values in ground.items():
+            assert one["min_z"][row, col] == min(values)
+
+    def idw(self, path, xs, zs):
+        """The one cell from 0 to 2 m, over points along its middle."""
+        with Writer(str(path), 1, scales=(0.01, 0.01, 0.01)) as writer:
+            writer.write_arrays({"X": np.array(xs), "Y": np.full(len(xs), 100),
+                                 "Z": np.array(zs)})
+        with Reader(str(path)) as reader:
+            return reader.grid(2.0, "idw_z",
+                               rect=(0.0, 0.0, 2.0, 2.0)).bands["idw_z"][0, 0]
+
+    def test_idw_leans_toward_the_point_nearest_the_centre(self, tmp_path):
+        # a quarter of a metre from the centre and three times as far, at
+        # elevations 10 and 20: weights of 1/0.25^2 and 1/0.75^2, nine to one
+        value = self.idw(tmp_path / "two.laz", [125, 25], [1000, 2000])
+        assert value == pytest.approx((9 * 10 + 20) / 10)
+
+    def test_a_point_on_the_centre_is_the_cells_value(self, tmp_path):
+        value = self.idw(tmp_path / "three.laz", [125, 100, 25],
+                         [1000, 3000, 2000])
+        assert value == 30
+
+    def test_cells_are_half_open_as_queries_are(self, tmp_path):
+        path = str(tmp_path / "edges.laz")
+        with Writer(path, 1, scales=(0.01, 0.01, 0.01)) as writer:
+            writer.write_arrays({"X": np.array([0, 100, 199, 200]),
+                                 "Y": np.array([0, 0, 0, 0])})
+        with Reader(path) as reader:
+            raster = reader.grid(1.0, "count", rect=(0.0, 0.0, 2.0, 1.0))
+        assert raster.bands["count"].tolist() == [[1, 2]]
+        assert raster.geotransform == (0.0, 1.0, 0.0, 1.0, 0.0, -1.0)
+
+    def test_a_raster_is_a_raster(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 30000, 4000,
+                      offsets=(500.0, 800.0, 0.0))
+        with Reader(path) as reader:
+            raster = reader.grid(10.0, ["count", "max_z"], circle=(500, 800,
+                                                                   5.0))
+        assert isinstance(raster, Raster)
+        assert raster.bands["count"].dtype == np.int64
+        assert raster.bands["max_z"].dtype == np.float64
+        assert raster.bands["count"].shape == (2, 2)
+
+    @pytest.mark.parametrize("stat", ["median_z", "max", "sum_z", ()])
+    def test_an_unknown_statistic_is_refused(self, stat):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError):
+                reader.grid(1.0, stat, rect=FIXTURE_RECT)
+
+    def test_a_blob_is_not_a_statistic(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="one number"):
+                reader.grid(1.0, "max_extra_bytes", rect=FIXTURE_RECT)
+
+    @pytest.mark.parametrize("cell_size", [0.0, -1.0])
+    def test_a_cell_has_a_size(self, cell_size):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="size"):
+                reader.grid(cell_size, rect=FIXTURE_RECT)
+
+
+class TestGridAdd:
+    """The C accumulator, on what Reader.grid never hands it."""
+
+    PLACEMENT = (1.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 2.0)
+
+    def test_values_and_coordinates_agree_in_length(self):
+        xs = np.array([0, 1], dtype=np.int32)
+        count = np.zeros(4, dtype=np.int64)
+        with pytest.raises(ValueError, match="values"):
+            cpylaz.grid_add(xs, xs, np.zeros(3), self.PLACEMENT, (2, 2),
+                            count, None, None, None, None, None)
+
+    def test_a_total_without_values_is_refused(self):
+        xs = np.array([0, 1], dtype=np.int32)
+        count = np.zeros(4, dtype=np.int64)
+        with pytest.raises(TypeError, match="needs values"):
+            cpylaz.grid_add(xs, xs, None, self.PLACEMENT, (2, 2), count,
+                            np.zeros(4), None, None, None, None)
+
+    def test_points_outside_are_passed_over(self):
+        xs = np.array([-1, 0, 1, 2, 2**31 - 1], dtype=np.int32)
+        count = np.zeros(4, dtype=np.int64)
+        landed = cpylaz.grid_add(xs, xs, None, self.PLACEMENT, (2, 2),
+                                 count, None, None, None, None, None)
+        assert landed == 2
+        assert count.tolist() == [0, 1, 1, 0]
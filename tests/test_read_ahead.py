@@ -0,0 +1,211 @@
+import io
+
+import pytest
+
+import lazpy.reader
+from lazpy import ADAPTIVE_CHUNK_SIZE, Reader, Writer
+from helpers import fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Read-ahead.
+#
+# Reader.read_ahead has a thread of the reader's own read the chunks after
+# the one being decoded, through a second handle on the file. What decoding
+# finds has to be what it finds without it, wherever reading goes.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+class Counting(io.FileIO):
+    """A handle on the file, counting what it reads and where."""
+    opened = []
+    own = []
+
+    def __init__(self, path, mode):
+        super().__init__(path, mode)
+        self.read_bytes = 0
+        self.ranges = []
+
+    def readinto(self, b):
+        at = self.tell()
+        n = super().readinto(b)
+        self.read_bytes += n or 0
+        if n:
+            self.ranges.append((at, at + n))
+        return n
+
+
+@pytest.fixture
+def counting(monkeypatch):
+    """The read-ahead handles the reader opens, in order; the reader's own
+    are under ``Counting.own``."""
+    Counting.opened = []
+    Counting.own = []
+
+    def counted(path, mode, buffering=-1):
+        # the reader's own handle is buffered; only read-ahead's is not
+        if buffering == 0:
+            Counting.opened.append(Counting(path, mode))
+            return Counting.opened[-1]
+        Counting.own.append(Counting(path, mode))
+        return io.BufferedReader(Counting.own[-1])
+
+    monkeypatch.setattr(lazpy.reader, "open", counted, raising=False)
+    return Counting.opened
+
+
+class TestDecoding:
+
+    @pytest.mark.parametrize("name", ["pt1_v1.laz", "pt3_v2.laz",
+                                      "pt7_v3.laz", "pt10_v4.laz"])
+    def test_every_kind_of_chunk_decodes_as_without(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays()
+        with Reader(fixture(name)) as reader:
+            reader.read_ahead(2)
+            same(reader.arrays(), expected)
+
+    @pytest.mark.parametrize("chunks", [1, 2, 5, 50])
+    def test_reading_through(self, tmp_path, chunks):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        with Reader(path) as reader:
+            expected = reader.arrays()
+        with Reader(path) as reader:
+            reader.read_ahead(chunks)
+            same(reader.arrays(), expected)
+
+    def test_adaptive_chunks(self, tmp_path):
+        path = str(tmp_path / "adaptive.laz")
+        with Writer(path, 6, chunk_size=ADAPTIVE_CHUNK_SIZE) as writer:
+            for size in [10, 3000, 1, 7000, 400]:
+                writer.write_arrays({"X": np.arange(size),
+                                     "gps_time": np.arange(size) * 0.5})
+                writer.chunk()
+        with Reader(path) as reader:
+            expected = reader.arrays()
+        with Reader(path) as reader:
+            reader.read_ahead(2)
+            same(reader.arrays(), expected)
+
+    def test_seeking_back_and_forth(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        with Reader(path) as reader:
+            expected = reader.arrays()
+        with Reader(path) as reader:
+            reader.read_ahead(2)
+            for start in [0, 12345, 4999, 5000, 59990, 30000, 7, 41000]:
+                a = reader.arrays("X", "red", start=start, count=3000)
+                assert np.array_equal(a["X"],
+                                      expected["X"][start:start + 3000])
+                assert np.array_equal(a["red"],
+                                      expected["red"][start:start + 3000])
+
+    def test_queries(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        rect = (200.0, -10.0, 400.0, 10.0)
+        window = (3.2e8 + 1000.0, 3.2e8 + 9000.0)
+        with Reader(path) as reader:
+            within = reader.arrays_within("X", "Y", rect=rect)
+            between = reader.arrays_between(*window, "X", "gps_time")
+            every = reader.arrays("X", start=0)
+        assert len(within["X"]) and len(between["X"])
+        with Reader(path) as reader:
+            reader.read_ahead(3)
+            same(reader.arrays_within("X", "Y", rect=rect), within)
+            same(reader.arrays_between(*window, "X", "gps_time"), between)
+            # and reading through afterwards reads every chunk again
+            same(reader.arrays("X", start=0), every)
+
+
+class TestTheThread:
+
+    def test_the_chunks_are_read_through_its_own_handle(self, tmp_path,
+                                                        counting):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        with Reader(path) as reader:
+            firsts, starts = reader._chunk_table()
+            reader.read_ahead(2)
+            assert len(counting) == 1
+            reader.arrays()
+        # every chunk after the first, which decoding had asked for before
+        # there was anything read ahead of it -- but for those decoding got
+        # to before the thread did, which it reads for itself rather than
+        # wait, and the thread passes over
+        overtaken = {k for k in range(1, len(starts) - 1)
+                     for fp in Counting.own for at, end in fp.ranges
+                     if at < starts[k + 1] and end > starts[k]}
+        assert counting[0].read_bytes >= sum(
+            starts[k + 1] - starts[k] for k in range(1, len(starts) - 1)
+            if k not in overtaken)
+        assert counting[0].closed
+
+    def test_a_query_reads_ahead_only_what_it_decodes(self, tmp_path,
+                                                      counting):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7,
+                      count=100000)
+        with Reader(path) as reader:
+            _, starts = reader._chunk_table()
+            reader.read_ahead(2)
+            reader.arrays_between(20000.0, 22000.0, "X")
+            read = counting[0].read_bytes
+        assert read < (starts[-1] - starts[0]) // 2
+
+    def test_none_stops_it(self, tmp_path, counting):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        with Reader(path) as reader:
+            expected = reader.arrays("X", start=0)
+            reader.read_ahead(2)
+            reader.read_ahead(0)
+            assert counting[0].closed
+            same(reader.arrays("X", start=0), expected)
+
+    def test_starting_again_closes_the_last_handle(self, tmp_path, counting):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        with Reader(path) as reader:
+            reader.read_ahead(2)
+            reader.arrays("X", count=100)
+            reader.read_ahead(4)
+            assert [fp.closed for fp in counting] == [True, False]
+            assert len(reader.arrays("X")["X"]) == 60000 - 100
+
+    def test_dropped_without_closing(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7)
+        reader = Reader(path)
+        reader.read_ahead(2)
+        reader.arrays("X", count=7000)
+        del reader
+
+
+class TestRefusals:
+
+    def test_a_file_object(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", point_format=7,
+                      count=100)
+        with open(path, "rb") as fp, Reader(fp) as reader:
+            with pytest.raises(ValueError, match="by name"):
+                reader.read_ahead()
+
+    @pytest.mark.parametrize("name", ["pt1_v0.las", "pt1_v1_pointwise.laz"])
+    def test_a_file_without_chunks(self, name):
+        with Reader(fixture(name)) as reader:
+            with pytest.raises(ValueError, match="without chunks"):
+                reader.read_ahead()
+
+    def test_how_many(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="0 chunks or more"):
+                reader.read_ahead(-1)
+
+    def test_a_plan_is_of_every_chunk(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            reader.read_ahead(1)
+            with pytest.raises(ValueError, match="every chunk"):
+                reader._points().plan_ahead(b"\1" * 1000)
@@ -0,0 +1,223 @@
+import os
+import pathlib
+import struct
+
+import pytest
+
+from lazpy import ADAPTIVE_CHUNK_SIZE, LazError, Reader
+from helpers import fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Saved chunk tables.
+#
+# A file of fixed-size chunks whose table is lost is read by finding the
+# chunks again; Reader.save_chunk_table keeps what was found, beside the file
+# or in it, and a later reader has to take that up as if the file had never
+# lost its table.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def table_offset(path):
+    with Reader(path) as reader:
+        start = reader.header["offset_to_point_data"]
+    data = pathlib.Path(path).read_bytes()
+    return start, struct.unpack_from("<q", data, start)[0]
+
+
+def interrupted(path):
+    """The file as a writer stopped before the table leaves it: the points,
+    and an offset that points at itself."""
+    start, at = table_offset(path)
+    data = bytearray(pathlib.Path(path).read_bytes()[:at])
+    struct.pack_into("<q", data, start, start)
+    pathlib.Path(path).write_bytes(bytes(data))
+    return path
+
+
+def emptied(path):
+    """The file with its table saying it holds no chunks, which leaves
+    whatever follows the table where it was."""
+    _, at = table_offset(path)
+    data = bytearray(pathlib.Path(path).read_bytes())
+    struct.pack_into("<I", data, at + 4, 0)
+    pathlib.Path(path).write_bytes(bytes(data))
+    return path
+
+
+def whole(path):
+    with Reader(path) as reader:
+        return reader._chunk_table(), reader.arrays()
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+class TestSidecar:
+
+    def test_a_saved_table_is_the_one_that_was_lost(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 25500, 1000)
+        table, columns = whole(path)
+        interrupted(path)
+        with Reader(path) as reader:
+            assert reader._points().warning is None
+            reader.seek(3000)
+            assert "chunk table" in reader._points().warning
+            saved = reader.save_chunk_table()
+            # the rest of the file was read to find the chunks it had not
+            assert reader.index == 25500
+        assert saved == str(tmp_path / "survey.lazt")
+        with Reader(path) as reader:
+            # there before anything is read, as a table in the file would be
+            assert len(reader._points().chunk_starts) == 27
+            assert reader._chunk_table() == table
+            reader.seek(25000)
+            assert reader.read().X == 25000
+            assert reader._points().warning is None
+            same(reader.arrays(start=0), columns)
+
+    def test_an_overview_can_use_it(self, tmp_path):
+        path = interrupted(survey(tmp_path / "survey.laz", "flight",
+                                  25500, 1000))
+        with Reader(path) as reader:
+            reader.save_chunk_table()
+        with Reader(path) as reader:
+            assert reader._heads()[1] is True
+            assert reader.overview("X")["X"].tolist() == \
+                list(range(0, 25500, 1000))
+
+    def test_a_table_that_will_not_decode(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 25500, 1000)
+        table, columns = whole(path)
+        emptied(path)
+        with Reader(path) as reader:
+            reader.save_chunk_table()
+        with Reader(path) as reader:
+            firsts, starts = reader._chunk_table()
+            # the last chunk is taken to run on over what is left of the
+            # table, having nothing to say where it ends
+            assert (firsts, starts[:-1]) == (table[0], table[1][:-1])
+            same(reader.arrays(start=0), columns)
+
+    def test_a_file_that_changed_is_rebuilt_again(self, tmp_path):
+        path = interrupted(survey(tmp_path / "survey.laz", "flight",
+                                  25500, 1000))
+        with Reader(path) as reader:
+            reader.save_chunk_table()
+        with open(path, "ab") as fp:
+            fp.write(b"\0" * 16)
+        with Reader(path) as reader:
+            reader.seek(0)
+            assert len(reader._points().chunk_starts) == 1
+            assert reader.arrays("X", start=20000)["X"][0] == 20000
+
+    @pytest.mark.parametrize("damage", [
+        lambda data: data[:-8],
+        lambda data: b"JUNK" + data[4:],
+        lambda data: data[:24] + struct.pack("<q", 1) + data[32:],
+        lambda data: data[:32] + data[40:48] + data[32:40] + data[48:],
+    ])
+    def test_anything_but_a_table_of_the_file_is_passed_over(self, tmp_path,
+                                                             damage):
+        path = interrupted(survey(tmp_path / "survey.laz", "flight",
+                                  25500, 1000))
+        with Reader(path) as reader:
+            sidecar = pathlib.Path(reader.save_chunk_table())
+        sidecar.write_bytes(damage(sidecar.read_bytes()))
+        with Reader(path) as reader:
+            reader.seek(0)
+            assert len(reader._points().chunk_starts) == 1
+            assert reader.arrays("X", start=12345)["X"][0] == 12345
+
+    def test_a_file_object_finds_none(self, tmp_path):
+        path = interrupted(survey(tmp_path / "survey.laz", "flight",
+                                  25500, 1000))
+        with Reader(path) as reader:
+            reader.save_chunk_table()
+        with open(path, "rb") as fp, Reader(fp) as reader:
+            reader.seek(0)
+            assert len(reader._points().chunk_starts) == 1
+            with pytest.raises(ValueError, match="no name"):
+                reader.save_chunk_table()
+
+
+class TestInPlace:
+
+    def test_the_mended_file_is_the_one_the_writer_wrote(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 25500, 1000)
+        written = pathlib.Path(path).read_bytes()
+        interrupted(path)
+        with Reader(path) as reader:
+            assert reader.save_chunk_table(in_place=True) == path
+        assert not os.path.exists(tmp_path / "survey.lazt")
+        assert pathlib.Path(path).read_bytes() == written
+
+    def test_extended_records_are_left_where_they_are(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 25500, 1000,
+                      evlrs=[{"user_id": b"lazpy-test", "record_id": 7,
+                              "data": b"\x01" * 300}])
+        table, columns = whole(path)
+        emptied(path)
+        with Reader(path) as reader:
+            reader.save_chunk_table(in_place=True)
+        with Reader(path) as reader:
+            # the last chunk runs on to where the records begin, over what
+            # is left of the old table
+            firsts, starts = reader._chunk_table()
+            assert (firsts, starts[:-1]) == (table[0], table[1][:-1])
+            assert starts[-1] == reader.header[
+                "start_of_first_extended_variable_length_record"]
+            assert reader._points().warning is None
+            same(reader.arrays(start=0), columns)
+            record = reader.header["extended_variable_length_records"][
+                (b"lazpy-test", 7)]
+            assert record["data"] == b"\x01" * 300
+
+
+class TestRefusals:
+
+    def test_a_whole_table_has_nothing_to_keep(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="whole"):
+                reader.save_chunk_table()
+
+    def test_a_kept_table_is_not_kept_twice(self, tmp_path):
+        path = interrupted(survey(tmp_path / "survey.laz", "flight",
+                                  25500, 1000))
+        with Reader(path) as reader:
+            reader.save_chunk_table()
+        with Reader(path) as reader:
+            with pytest.raises(ValueError, match="whole"):
+                reader.save_chunk_table()
+
+    @pytest.mark.parametrize("name", ["pt1_v0.las", "pt1_v1_pointwise.laz"])
+    def test_a_file_without_chunks(self, name):
+        with Reader(fixture(name)) as reader:
+            with pytest.raises(ValueError, match="without chunks"):
+                reader.save_chunk_table()
+
+    def test_adaptive_chunks(self, tmp_path):
+        path = survey(tmp_path / "adaptive.laz", "flight", 25500,
+                      ADAPTIVE_CHUNK_SIZE)
+        with Reader(path) as reader:
+            with pytest.raises(ValueError, match="adaptive"):
+                reader.save_chunk_table()
+
+    def test_the_point_reader_takes_a_table_only_before_reading(
+            self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", 10)
+        with Reader(path) as reader:
+            reader.read()
+            with pytest.raises(LazError, match="before any point"):
+                reader._points().use_chunk_table([0, 1])
+        with Reader(path) as reader:
+            with pytest.raises(ValueError, match="ends"):
+                reader._points().use_chunk_table([0])
+        with Reader(fixture("pt1_v1_pointwise.laz")) as reader:
+            with pytest.raises(LazError, match="fixed-size"):
+                reader._points().use_chunk_table([0, 1])
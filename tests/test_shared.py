@@ -0,0 +1,179 @@
+import pathlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from lazpy import ADAPTIVE_CHUNK_SIZE, Reader
+from helpers import FIXTURES, fixture, survey
+from test_ranges import Memory
+
+np = pytest.importorskip("numpy")
+
+from lazpy.shared import SharedArrays, shared_arrays  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Shared memory.
+#
+# Columns decoded into a block of shared memory have to be what arrays()
+# returns, whichever process decoded them, and reach another process as the
+# block rather than as a copy of it.
+# ---------------------------------------------------------------------------
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+def total(a, name):
+    # what a consumer in another process makes of a block it was handed
+    return int(a[name].sum())
+
+
+def scribble(a, name, value):
+    a[name][:] = value
+    a.close()
+
+
+class TestSharedArrays:
+
+    def test_another_process_sees_the_same_memory(self):
+        with SharedArrays([("X", "=i4", 1), ("blob", "u1", 3)], 1000) as a:
+            a["X"][:] = np.arange(1000)
+            with ProcessPoolExecutor(1) as pool:
+                assert pool.submit(total, a, "X").result() == 499500
+                pool.submit(scribble, a, "blob", 7).result()
+            assert a["blob"].shape == (1000, 3)
+            assert (a["blob"] == 7).all()
+
+    def test_pickled_as_the_block_not_its_contents(self):
+        with SharedArrays([("X", "=f8", 1)], 1 << 20) as a:
+            data = pickle.dumps(a)
+            assert len(data) < 1000
+            b = pickle.loads(data)
+            b["X"][5] = 2.5
+            assert a["X"][5] == 2.5
+            b.close()
+
+    def test_columns_do_not_share_a_cache_line(self):
+        with SharedArrays([("a", "u1", 1), ("b", "=f8", 1),
+                           ("c", "=u2", 1)], 3) as a:
+            for name in a:
+                assert a[name].ctypes.data % 64 == 0
+
+    def test_closing_with_an_array_held(self):
+        a = SharedArrays([("X", "=i4", 1)], 10)
+        x = a["X"]
+        with pytest.raises(BufferError):
+            a.close()
+        del x
+        a.close()
+        a.unlink()
+
+
+class TestArrays:
+
+    @pytest.mark.parametrize("name", FIXTURES)
+    def test_fixtures(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays()
+            with reader.arrays(start=0, shared=True) as a:
+                same(a, expected)
+
+    def test_named_fields_from_where_the_reader_is(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays("X", "classification", "gps_time",
+                                     start=12345, count=20000)
+            reader.seek(12345)
+            with reader.arrays("X", "classification", "gps_time",
+                               count=20000, shared=True) as a:
+                same(a, expected)
+                assert a.count == 20000
+            assert reader.index == 32345
+
+    def test_a_block_that_fails_is_unlinked(self, tmp_path, monkeypatch):
+        path = survey(tmp_path / "survey.laz")
+        made = []
+        fill = Reader._fill_columns
+
+        def failing(self, columns, count):
+            made.append(columns)
+            fill(self, columns, count)
+            raise RuntimeError("stopped")
+
+        monkeypatch.setattr(Reader, "_fill_columns", failing)
+        with Reader(path) as reader:
+            with pytest.raises(RuntimeError, match="stopped"):
+                reader.arrays("X", shared=True)
+        name = made.pop().name
+        with pytest.raises(FileNotFoundError):
+            SharedArrays([("X", "=i4", 1)], 60000, name)
+
+
+class TestInProcesses:
+
+    @pytest.mark.parametrize("name", ["survey.laz", "survey.las",
+                                      "adaptive.laz"])
+    def test_the_file(self, tmp_path, name):
+        path = survey(tmp_path / name, chunk_size=(
+            ADAPTIVE_CHUNK_SIZE if name == "adaptive.laz" else 5000))
+        with Reader(path) as reader:
+            expected = reader.arrays(start=0)
+            reader.seek(100)
+            with shared_arrays(reader, processes=3) as a:
+                same(a, expected)
+            assert reader.index == 100
+
+    @pytest.mark.parametrize("name", ["pt1_v1_pointwise.laz", "pt3_v2.laz",
+                                      "pt7_v3.laz", "pt8_compat_v2.laz"])
+    def test_fixtures(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays(start=0)
+            with shared_arrays(reader, processes=2) as a:
+                same(a, expected)
+
+    @pytest.mark.parametrize("start,count", [(0, 10), (4999, 2), (7777, None),
+                                             (59990, 1000), (60000, None),
+                                             (100, 0)])
+    def test_a_part_of_the_file(self, tmp_path, start, count):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays("X", "Z", start=start, count=count)
+            with shared_arrays(reader, "X", "Z", start=start, count=count,
+                               processes=4) as a:
+                same(a, expected)
+
+    def test_a_pool_of_the_callers(self, tmp_path):
+        paths = [survey(tmp_path / f"{n}.laz", count=20000 + n)
+                 for n in range(3)]
+        with ProcessPoolExecutor(2) as pool:
+            for path in paths:
+                with Reader(path) as reader:
+                    expected = reader.arrays("X", start=0)["X"]
+                    with shared_arrays(reader, "X", pool=pool,
+                                       processes=4) as a:
+                        assert np.array_equal(a["X"], expected)
+
+    def test_a_range_reader(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with Reader(path) as reader:
+            expected = reader.arrays("X", "gps_time", start=0)
+        source = Memory(pathlib.Path(path).read_bytes())
+        with Reader(source) as reader:
+            with shared_arrays(reader, "X", "gps_time", processes=2) as a:
+                same(a, expected)
+
+    def test_refusals(self, tmp_path):
+        path = survey(tmp_path / "survey.laz")
+        with open(path, "rb") as fp, Reader(fp) as reader:
+            with pytest.raises(ValueError, match="file object"):
+                shared_arrays(reader)
+        with Reader(path) as reader:
+            with pytest.raises(ValueError, match="processes"):
+                shared_arrays(reader, processes=0)
+            with pytest.raises(IndexError):
+                shared_arrays(reader, start=60001)
@@ -413,6 +413,9 @@ class TestSpatialIndexFormats:
             self.lax([(1, [(0, 10), (10**9, 10**9 + 5)])],
                      bounds=(1400.0, 1600.0, 1600.0, 1800.0)))
         with Reader(copy) as reader:
+            # held to the index: a file this small is cheaper to scan, and a
+            # scan would find the points this index leaves out
+            reader.SEEK_COST = 0
             indices = query_indices(reader, (1400, 1600, 1500, 1700))
             assert indices == [i for i in inside_by_scan(
                 "pt1_v2.laz", (1400, 1600, 1500, 1700)) if i <= 10]
@@ -733,6 +736,100 @@ def test_an_index_of_no_points_is_refused():
             reader.build_spatial_index()
 
 
+class PassCounter:
+    """A point reader that counts how often an index is built through it,
+    which is how many times the points were decoded to build one."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.bounds_given = []
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def build_index(self, count, bounds, *args):
+        self.bounds_given.append(bounds)
+        return self.inner.build_index(count, bounds, *args)
+
+
+def counted(reader):
+    reader._reader = PassCounter(reader._reader)
+    return reader._reader
+
+
+def two_pass_index(reader, dims=2, **kwargs):
+    """The index the points' own extent gives, laid before they go in."""
+    params = dict(FIXTURE_INDEX, **kwargs)
+    reader.seek(0)
+    stored = reader._points().bounds(reader.num_points, dims)
+    scales, offsets = reader.scales[:dims], reader.offsets[:dims]
+    bounds = tuple(value * scales[i % dims] + offsets[i % dims]
+                   for i, value in enumerate(stored))
+    reader.seek(0)
+    return reader._points().build_index(
+        reader.num_points, bounds, scales, offsets, params["cell_size"],
+        params["minimum_points"], params["maximum_intervals"], 1000)
+
+
+class TestBuildingInOnePass:
+    """The tree is laid over the points after they are bucketed, rather
+    than after a pass to find where they are -- and is the same tree."""
+
+    @pytest.mark.parametrize("name", SIDECAR_FIXTURES)
+    def test_one_pass_builds_what_two_would(self, name):
+        with Reader(fixture(name)) as reader:
+            passes = counted(reader)
+            built = reader.build_spatial_index(**FIXTURE_INDEX)
+            assert passes.bounds_given == [None]
+            assert built == two_pass_index(reader)
+
+    @pytest.mark.parametrize("cell_size", [0.5, 2.5, 7.0])
+    @pytest.mark.parametrize("dims", [2, 3])
+    def test_for_any_cell_size_a_float_holds(self, cell_size, dims):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            passes = counted(reader)
+            built = reader.build_spatial_index(
+                **dict(FIXTURE_INDEX, cell_size=cell_size, dims=dims))
+            assert len(passes.bounds_given) == 1
+            assert built == two_pass_index(reader, dims, cell_size=cell_size)
+
+    def test_a_grid_the_tree_misses_takes_a_second_pass(self):
+        """0.3 is no float's exact value, so the tree's edges drift off the
+        grid's, and only the points can say which side of one they are on."""
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            passes = counted(reader)
+            built = reader.build_spatial_index(
+                **dict(FIXTURE_INDEX, cell_size=0.3))
+            assert len(passes.bounds_given) == 2
+            assert passes.bounds_given[1] is not None
+            assert built == two_pass_index(reader, cell_size=0.3)
+
+    def test_header_bounds_are_one_pass_when_they_hold(self, tmp_path):
+        path = layered_file(tmp_path / "layers.laz", layers=2)
+        with Reader(path) as reader:
+            passes = counted(reader)
+            data = reader.build_spatial_index(cell_size=4.0, bounds="header")
+            assert passes.bounds_given == [(0.0, 0.0, 49.0, 49.0)]
+        index = cpylaz.SpatialIndex(data)
+        assert points_covered(index.intervals(0, 0, 50, 50)) == 5000
+
+    def test_header_bounds_that_miss_points_are_not_believed(self, tmp_path):
+        """A point outside the tree is a point no query finds."""
+        path = layered_file(tmp_path / "layers.laz", layers=2)
+        with Reader(path) as reader:
+            reader.header["max_x"] = 10.0
+            passes = counted(reader)
+            data = reader.build_spatial_index(cell_size=4.0, bounds="header")
+            assert len(passes.bounds_given) == 2
+        with Reader(path) as reader:
+            assert data == reader.build_spatial_index(cell_size=4.0)
+
+    def test_bounds_are_points_or_header(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="'points' or 'header'"):
+                reader.build_spatial_index(bounds=(0, 0, 1, 1))
+
+
 class TestRegionArguments:
     """One area, spelled the same way whichever query is asked.
 
@@ -809,3 +906,387 @@ class TestArraysWithinBlocking:
             a = reader.arrays_within("X", "Y", circle=(0.0, 0.0, 0.0))
         assert sorted(a) == ["X", "Y"]
         assert all(len(column) == 0 for column in a.values())
+
+
+# ---------------------------------------------------------------------------
+# Three dimensions.
+#
+# An octree over the cube around the points rather than a quadtree over the
+# square, so that a query for a range of elevations skips the cells above and
+# below it as well as beside it. laszip has nothing to compare it with, so
+# what these check is that it selects what a filtered scan selects, and that
+# it decodes less than the quadtree would for the same box.
+# ---------------------------------------------------------------------------
+
+OCTREE_INDEX = dict(FIXTURE_INDEX, dims=3)
+
+
+def inside_box_by_scan(name, box):
+    """The indices a filtered full scan selects for a box, from a scan of
+    the file's georeferenced x, y and z."""
+    min_x, min_y, min_z, max_x, max_y, max_z = box
+    with Reader(fixture(name)) as reader:
+        xyz = [reader.scale(point) for point in reader]
+    return [i for i, (x, y, z) in enumerate(xyz)
+            if min_x <= x < max_x and min_y <= y < max_y
+            and min_z <= z < max_z]
+
+
+def box_indices(reader, box):
+    return [reader.index - 1 for _ in reader.points_within(box=box)]
+
+
+def with_octree(name, tmp_path):
+    """A copy of a fixture with an octree beside it and no quadtree."""
+    copy = without_sidecar(name, tmp_path)
+    with Reader(copy) as reader:
+        reader.write_spatial_index(**OCTREE_INDEX)
+    return copy
+
+
+def layered_file(path, layers=10, side=50):
+    """Flat layers of points a metre apart, written one whole layer after
+    another: the file an elevation slice is the most of a help to, since
+    every layer covers the whole area."""
+    with Writer(str(path), 1, scales=(0.01, 0.01, 0.01),
+                offsets=(0.0, 0.0, 0.0)) as writer:
+        for z in range(layers):
+            for y in range(side):
+                for x in range(side):
+                    writer.write(Point(X=x * 100, Y=y * 100, Z=z * 100))
+    return str(path)
+
+
+BOXES = [(1495, 1695, 30, 1503, 1703, 38),
+         (1498, 1699, 33, 1501, 1702, 35),
+         (1495, 1695, 34.5, 1503, 1703, 34.75),
+         (1500, 1700, 0, 1501, 1701, 1)]
+
+
+class TestOctree:
+
+    @pytest.mark.parametrize("box", BOXES)
+    def test_a_box_selects_what_a_scan_selects(self, box, tmp_path):
+        copy = with_octree("pt1_v2.laz", tmp_path)
+        with Reader(copy) as reader:
+            assert reader.octree_index is not None
+            assert not reader.has_spatial_index
+            assert box_indices(reader, box) == \
+                inside_box_by_scan("pt1_v2.laz", box)
+
+    @pytest.mark.parametrize("box", BOXES)
+    def test_a_box_without_an_octree_selects_the_same(self, box, tmp_path):
+        """Through the quadtree's rectangle, and through a scan of it all."""
+        expected = inside_box_by_scan("pt1_v2.laz", box)
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            assert reader.octree_index is None
+            assert box_indices(reader, box) == expected
+        with Reader(without_sidecar("pt1_v2.laz", tmp_path)) as reader:
+            assert box_indices(reader, box) == expected
+
+    def test_it_describes_its_tree(self, tmp_path):
+        copy = with_octree("pt1_v2.laz", tmp_path)
+        assert os.path.exists(copy[:-4] + ".lax3")
+        with Reader(copy) as reader:
+            index = reader.octree_index
+            assert index.dims == 3
+            assert len(index.bounds) == 6
+            min_x, min_y, min_z, max_x, max_y, max_z = index.bounds
+            # a cube: as many cells deep as across
+            assert max_x - min_x == max_y - min_y == max_z - min_z
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            assert reader.spatial_index.dims == 2
+
+    def test_the_other_shapes_can_use_it(self, tmp_path):
+        """An octree answers a rectangle or a circle as reaching from the
+        lowest elevation to the highest."""
+        copy = with_octree("pt1_v2.laz", tmp_path)
+        with Reader(copy) as reader:
+            for rect in RECTANGLES:
+                assert query_indices(reader, rect) == \
+                    inside_by_scan("pt1_v2.laz", rect)
+            circle = (1499.0, 1699.0, 2.5)
+            assert circle_indices(reader, circle) == \
+                inside_circle_by_scan("pt1_v2.laz", circle)
+
+    def test_a_quadtree_answers_a_box_as_the_rectangle_under_it(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            index = reader.spatial_index
+            for box in BOXES:
+                min_x, min_y, _, max_x, max_y, _ = box
+                assert index.intervals_within_box(*box) == \
+                    index.intervals(min_x, min_y, max_x, max_y)
+
+    def test_a_slice_decodes_a_fraction_of_the_file(self, tmp_path):
+        """The point of a third dimension: every layer covers the whole
+        area, so a quadtree can skip none of them, and an octree can skip
+        all but the one asked about."""
+        path = layered_file(tmp_path / "layers.laz")
+        with Reader(path) as reader:
+            reader.write_spatial_index(cell_size=1.0, minimum_points=0,
+                                       dims=3)
+            reader.write_spatial_index(cell_size=1.0, minimum_points=0)
+        box = (0, 0, 4.75, 50, 50, 5.25)
+        with Reader(path) as reader:
+            octree = points_covered(
+                reader.octree_index.intervals_within_box(*box))
+            quadtree = points_covered(
+                reader.spatial_index.intervals_within_box(*box))
+            assert octree <= reader.num_points // 5
+            assert quadtree == reader.num_points
+            found = box_indices(reader, box)
+        assert found == list(range(5 * 2500, 6 * 2500))
+
+    def test_the_array_forms_select_what_the_points_do(self, tmp_path):
+        np = pytest.importorskip("numpy")
+        copy = with_octree("pt1_v2.laz", tmp_path)
+        box = BOXES[1]
+        with Reader(copy) as reader:
+            wanted = [p.Z for p in reader.points_within(box=box)]
+            columns = reader.arrays_within("Z", box=box)
+            xyz = reader.xyz_within(box=box)
+        assert columns["Z"].tolist() == wanted
+        assert np.all((xyz[:, 2] >= box[2]) & (xyz[:, 2] < box[5]))
+
+    def test_an_inside_out_box_is_refused(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="inside out"):
+                list(reader.points_within(box=(0, 0, 2, 1, 1, 1)))
+
+    def test_only_two_or_three_dimensions(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="2 or 3"):
+                reader.build_spatial_index(dims=4)
+
+    def test_a_quadtree_where_the_octree_belongs_is_not_passed_over(
+            self, tmp_path):
+        copy = without_sidecar("pt1_v2.laz", tmp_path)
+        (tmp_path / "pt1_v2.lax3").write_bytes(built_index("pt1_v2.laz"))
+        with Reader(copy) as reader:
+            with pytest.raises(LazError, match="not an octree"):
+                reader.octree_index
+
+    def test_a_cell_outside_the_tree_is_refused(self, tmp_path):
+        copy = with_octree("pt1_v2.laz", tmp_path)
+        with open(copy[:-4] + ".lax3", "rb") as fh:
+            data = bytearray(fh.read())
+        # the first cell's index, behind LASX, the octree and LASV's header
+        first_cell = 8 + 8 + 12 + 24 + 12
+        data[first_cell:first_cell + 8] = struct.pack("<Q", 2**40)
+        with pytest.raises(LazError, match="out of range"):
+            cpylaz.SpatialIndex(bytes(data))
+
+
+# ---------------------------------------------------------------------------
+# Indexing while writing.
+#
+# A writer sees every coordinate on its way into the file, so the index can
+# be built from them there rather than from the file read back. It has to be
+# the index reading it back builds, and that is what every test here asks.
+# ---------------------------------------------------------------------------
+
+def copied_with_index(name, path, **spatial_index):
+    """The points of a fixture written again, indexed as they go."""
+    with Reader(fixture(name)) as reader:
+        columns = reader.arrays()
+        columns.pop("extra_bytes", None)
+        with Writer(str(path), reader.point_format, scales=reader.scales,
+                    offsets=reader.offsets,
+                    spatial_index=spatial_index) as writer:
+            writer.write_arrays(columns)
+    return str(path)
+
+
+def index_read_back(path, **kwargs):
+    with Reader(path) as reader:
+        return reader.build_spatial_index(**kwargs)
+
+
+class TestIndexingWhileWriting:
+
+    @pytest.mark.parametrize("name", ["pt1_v2.laz", "pt6_v3.laz"])
+    def test_the_index_goes_inside_the_file(self, name, tmp_path):
+        path = copied_with_index(name, tmp_path / name, **FIXTURE_INDEX)
+        assert not os.path.exists(path[:-4] + ".lax")
+        with Reader(path) as reader:
+            assert reader._appended_index_data() == \
+                index_read_back(path, **FIXTURE_INDEX)
+            for rect in RECTANGLES:
+                assert query_indices(reader, rect) == \
+                    inside_by_scan(name, rect)
+
+    @pytest.mark.parametrize("cell_size", [1.0, 0.3])
+    def test_a_grid_the_tree_misses_is_read_back(self, cell_size, tmp_path):
+        params = dict(FIXTURE_INDEX, cell_size=cell_size)
+        path = copied_with_index("pt1_v2.laz", tmp_path / "copy.laz",
+                                 **params)
+        with Reader(path) as reader:
+            assert reader._appended_index_data() == \
+                index_read_back(path, **params)
+
+    def test_an_octree_goes_beside_the_file(self, tmp_path):
+        params = dict(FIXTURE_INDEX, dims=3)
+        path = copied_with_index("pt1_v2.laz", tmp_path / "copy.laz",
+                                 **params)
+        with open(path[:-4] + ".lax3", "rb") as fh:
+            assert fh.read() == index_read_back(path, **params)
+        with Reader(path) as reader:
+            assert reader.octree_index is not None
+            assert not reader.has_spatial_index
+
+    def test_a_plain_las_has_its_index_beside_it(self, tmp_path):
+        path = copied_with_index("pt1_v2.laz", tmp_path / "copy.las",
+                                 **FIXTURE_INDEX)
+        with open(path[:-4] + ".lax", "rb") as fh:
+            assert fh.read() == index_read_back(path, **FIXTURE_INDEX)
+
+    def test_an_offset_moved_after_the_points_is_caught(self, tmp_path):
+        """Every point the grid placed moved with it, so the index comes
+        from the file as it ended up instead."""
+        path = str(tmp_path / "layers.laz")
+        with Writer(path, 1, spatial_index=dict(cell_size=4.0)) as writer:
+            for x in range(20):
+                writer.write(Point(X=x * 100, Y=x * 100, Z=0))
+            writer.header["x_offset"] = 1000.0
+        with Reader(path) as reader:
+            assert reader._appended_index_data() == \
+                index_read_back(path, cell_size=4.0)
+            assert len(list(reader.points_within(1000, 0, 1004.5, 4.5))) == 5
+
+    def test_a_file_of_no_points_has_no_index(self, tmp_path):
+        path = str(tmp_path / "empty.laz")
+        Writer(path, 1, spatial_index=dict(cell_size=1.0)).close()
+        with Reader(path) as reader:
+            assert not reader.has_spatial_index
+
+    def test_a_file_object_has_nowhere_to_put_one(self):
+        with pytest.raises(ValueError, match="file object"):
+            Writer(io.BytesIO(), 1, spatial_index=dict(cell_size=1.0))
+
+    def test_a_plain_las_cannot_carry_one_inside(self, tmp_path):
+        with pytest.raises(ValueError, match="beside the file"):
+            Writer(str(tmp_path / "plain.las"), 1,
+                   spatial_index=dict(sidecar=False))
+
+    def test_unknown_options_are_refused(self, tmp_path):
+        with pytest.raises(TypeError, match="cellsize"):
+            Writer(str(tmp_path / "x.laz"), 1,
+                   spatial_index=dict(cellsize=1.0))
+
+
+# ---------------------------------------------------------------------------
+# Reading a query chunk by chunk.
+#
+# The gap between two of an index's runs in one chunk is decoded whichever way
+# it is crossed, so a query reads through it rather than seeking over it: one
+# span per chunk touched, rather than one per run.
+# ---------------------------------------------------------------------------
+
+def scan_lines(path, width=2000, lines=20, chunk_size=6000):
+    """Lines of points longer than the gap an index's runs merge across, so
+    that a narrow query meets every line as a run of its own."""
+    np = pytest.importorskip("numpy")
+    lines_of, along = np.divmod(np.arange(width * lines), width)
+    with Writer(str(path), 1, chunk_size=chunk_size,
+                spatial_index=dict(cell_size=4.0, minimum_points=0,
+                                   maximum_intervals=-1000)) as writer:
+        writer.write_arrays({"X": along * 100, "Y": lines_of * 100,
+                             "Z": along % 7})
+    return str(path)
+
+
+class TestPlannedSpans:
+
+    RECT = (100, 0, 104, 20)
+
+    def test_one_span_per_chunk_touched(self, tmp_path):
+        path = scan_lines(tmp_path / "lines.laz")
+        with Reader(path) as reader:
+            runs = [(start, end + 1) for start, end
+                    in reader.spatial_index.intervals(*self.RECT)]
+            spans = reader.explain(rect=self.RECT).spans
+            firsts = reader._points().chunk_points
+        assert len(runs) == 20
+        chunks = [[i for i, first in enumerate(firsts)
+                   if first <= start][-1] for start, _ in spans]
+        assert chunks == sorted(set(chunks)) and len(chunks) == 7
+        for start, stop in runs:
+            assert any(s <= start and stop <= e for s, e in spans)
+
+    def test_reading_through_selects_what_seeking_over_did(self, tmp_path):
+        path = scan_lines(tmp_path / "lines.laz")
+        with Reader(path) as reader:
+            planned = reader.arrays_within("X", "Y", rect=self.RECT)
+            points = [reader.index - 1
+                      for _ in reader.points_within(rect=self.RECT)]
+            reader._planned = lambda spans: spans
+            unplanned = reader.arrays_within("X", "Y", rect=self.RECT)
+        assert planned["X"].tolist() == unplanned["X"].tolist()
+        assert planned["Y"].tolist() == unplanned["Y"].tolist()
+        assert len(points) == 80 == len(planned["X"])
+
+    def test_an_uncompressed_file_keeps_its_runs(self, tmp_path):
+        """Where any point is a file seek away, there is nothing to join."""
+        path = scan_lines(tmp_path / "lines.las")
+        with Reader(path) as reader:
+            spans = reader.explain(rect=self.RECT).spans
+        assert len(spans) == 20
+
+
+class TestExplain:
+    """What a query would cost, asked before it is run -- and the same
+    reckoning deciding whether it is run through the index at all."""
+
+    def test_a_narrow_query_reads_through_the_index(self, tmp_path):
+        path = scan_lines(tmp_path / "lines.laz")
+        with Reader(path) as reader:
+            plan = reader.explain(rect=TestPlannedSpans.RECT)
+        assert plan.index == "quadtree" and plan.use_index
+        assert (plan.runs, len(plan.spans), plan.chunks) == (20, 7, 7)
+        # each span is decoded from the head of its chunk
+        assert plan.candidates < plan.decoded_points < plan.scan_points
+        assert plan.scan_points == 40000
+        assert 0 < plan.decoded_bytes < plan.scan_bytes
+
+    def test_a_query_over_everything_scans(self, tmp_path):
+        path = scan_lines(tmp_path / "lines.laz")
+        everything = (0, 0, 2000, 20)
+        with Reader(path) as reader:
+            plan = reader.explain(rect=everything)
+            assert not plan.use_index
+            assert plan.decoded_points == plan.scan_points
+            assert len(reader.arrays_within("X", rect=everything)["X"]) \
+                == 40000
+
+    def test_cells_hit_are_the_index_s_own_count(self, tmp_path):
+        path = scan_lines(tmp_path / "lines.laz")
+        with Reader(path) as reader:
+            plan = reader.explain(rect=TestPlannedSpans.RECT)
+            index = reader.spatial_index
+            index.intervals(*TestPlannedSpans.RECT)
+            assert plan.cells_hit == index.cells_hit > 0
+            index.intervals(-10, -10, -5, -5)
+            assert index.cells_hit == 0
+
+    def test_a_file_with_no_index_is_a_scan(self, tmp_path):
+        copy = without_sidecar("pt1_v2.laz", tmp_path)
+        with Reader(copy) as reader:
+            plan = reader.explain(1495, 1695, 1503, 1703)
+        assert plan.index is None and not plan.use_index
+        assert plan.spans == [(0, 500)] and plan.cells_hit == 0
+
+    def test_an_uncompressed_file_decodes_only_its_candidates(self,
+                                                              tmp_path):
+        path = scan_lines(tmp_path / "lines.las")
+        with Reader(path) as reader:
+            plan = reader.explain(rect=TestPlannedSpans.RECT)
+            record = reader.header["point_data_record_length"]
+        assert plan.decoded_points == plan.candidates == 20 * 4
+        assert plan.decoded_bytes == plan.candidates * record
+        assert plan.chunks == 0 and plan.use_index
+
+    def test_a_circle_of_no_size_decodes_nothing(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            plan = reader.explain(circle=(1500, 1700, 0))
+        assert plan.spans == [] and plan.decoded_points == 0
+        assert plan.use_index
@@ -0,0 +1,177 @@
+import pytest
+
+from lazpy import FieldStatistics, Reader, Statistics, Writer
+from helpers import FIXTURES, fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Statistics.
+#
+# Reader.statistics totals every point in C and keeps nothing of them; the
+# same reductions over the columns numpy is given are what it has to agree
+# with.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_every_fixture_is_summed_up_as_numpy_sums_it(name):
+    with Reader(fixture(name)) as reader:
+        columns = reader.arrays()
+        stats = reader.statistics()
+    assert stats.num_points == len(columns["X"])
+    assert set(stats.fields) == {name for name, column in columns.items()
+                                 if column.ndim == 1}
+    for field, s in stats.fields.items():
+        column = columns[field].astype(np.float64)
+        assert s.count == len(column), field
+        assert s.minimum == column.min(), field
+        assert s.maximum == column.max(), field
+        assert s.mean == pytest.approx(column.mean(), rel=1e-12), field
+        assert s.stddev == pytest.approx(column.std(), rel=1e-9,
+                                         abs=1e-9), field
+        if s.histogram is not None:
+            values, counts = np.unique(columns[field], return_counts=True)
+            assert s.histogram == dict(zip(values.tolist(),
+                                           counts.tolist())), field
+
+
+class TestStatistics:
+
+    def test_the_bounds_and_returns_are_what_the_header_says(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight",
+                      offsets=(300.0, 700.0, 10.0))
+        with Reader(path) as reader:
+            stats = reader.statistics("classification")
+            header = reader.header
+        assert stats.bounds == pytest.approx(tuple(
+            header[f"{end}_{axis}"] for end in ("min", "max")
+            for axis in "xyz"))
+        assert (stats.number_of_points_by_return
+                == tuple(header["extended_number_of_points_by_return"]))
+        assert list(stats.fields) == ["classification"]
+
+    def test_a_legacy_format_counts_its_own_returns(self, tmp_path):
+        path = survey(tmp_path / "legacy.laz", "flight", point_format=1)
+        with Reader(path) as reader:
+            returns = reader.arrays("return_number")["return_number"]
+            stats = reader.statistics("intensity")
+            header = reader.header
+        assert (stats.number_of_points_by_return[:5]
+                == tuple(header["number_of_points_by_return"]))
+        assert stats.number_of_points_by_return == tuple(
+            np.bincount(returns, minlength=16)[1:].tolist())
+
+    def test_the_bounds_are_georeferenced(self, tmp_path):
+        path = str(tmp_path / "three.laz")
+        with Writer(path, 0, scales=(0.5, 0.25, 0.01),
+                    offsets=(100.0, 200.0, 0.0)) as writer:
+            writer.write_arrays({"X": np.array([4, -2, 0]),
+                                 "Y": np.array([0, 8, -4]),
+                                 "Z": np.array([7, 7, 7])})
+        with Reader(path) as reader:
+            stats = reader.statistics()
+        assert stats.bounds == pytest.approx((99.0, 199.0, 0.07,
+                                              102.0, 202.0, 0.07))
+
+    @pytest.mark.parametrize("threads", [2, 3, 8, 50])
+    def test_threads_find_what_one_thread_finds(self, tmp_path, threads):
+        path = survey(tmp_path / "survey.laz", "flight")
+        with Reader(path) as reader:
+            one = reader.statistics()
+            many = reader.statistics(threads=threads)
+        assert many.num_points == one.num_points
+        assert many.bounds == one.bounds
+        assert many.number_of_points_by_return == \
+            one.number_of_points_by_return
+        for name, s in one.fields.items():
+            t = many.fields[name]
+            assert (t.count, t.minimum, t.maximum, t.histogram) == \
+                (s.count, s.minimum, s.maximum, s.histogram), name
+            assert t.mean == pytest.approx(s.mean, rel=1e-12), name
+            assert t.stddev == pytest.approx(s.stddev, rel=1e-9), name
+
+    def test_a_plain_las_file_divides_anywhere(self, tmp_path):
+        path = survey(tmp_path / "survey.las", "flight", count=1001)
+        with Reader(path) as reader:
+            assert len(reader._divided(4)) == 4
+            one = reader.statistics("Z", "gps_time")
+            many = reader.statistics("Z", "gps_time", threads=4)
+        assert many.fields["Z"] == one.fields["Z"]
+        assert many.fields["gps_time"].mean == \
+            pytest.approx(one.fields["gps_time"].mean)
+
+    def test_threads_divide_at_chunk_boundaries(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight")
+        with Reader(path) as reader:
+            firsts = set(reader._chunk_table()[0]) | {reader.num_points}
+            ranges = reader._divided(3)
+        assert ranges[0][0] == 0 and ranges[-1][1] == 60000
+        assert all(start in firsts and stop in firsts
+                   for start, stop in ranges)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    def test_a_nan_is_no_value(self, tmp_path):
+        path = str(tmp_path / "nan.laz")
+        with Writer(path, 1) as writer:
+            writer.write_arrays({"X": np.arange(4),
+                                 "gps_time": np.array([1.0, np.nan, 3.0,
+                                                       np.nan])})
+        with Reader(path) as reader:
+            s = reader.statistics("gps_time").fields["gps_time"]
+        assert (s.count, s.minimum, s.maximum, s.mean, s.stddev) == \
+            (2, 1.0, 3.0, 2.0, 1.0)
+
+    def test_a_file_of_no_points(self, tmp_path):
+        path = str(tmp_path / "empty.laz")
+        with Writer(path, 6):
+            pass
+        with Reader(path) as reader:
+            stats = reader.statistics("Z", "classification", threads=2)
+        assert stats.num_points == 0 and stats.bounds is None
+        assert stats.number_of_points_by_return == (0,) * 15
+        assert stats.fields["Z"] == FieldStatistics(0, None, None, None,
+                                                    None, None)
+        assert stats.fields["classification"].histogram == {}
+
+    def test_the_results_are_namedtuples(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight", count=100)
+        with Reader(path) as reader:
+            stats = reader.statistics("point_source_ID")
+        assert isinstance(stats, Statistics)
+        s = stats.fields["point_source_ID"]
+        assert isinstance(s, FieldStatistics)
+        assert sum(s.histogram.values()) == 100
+
+    def test_measurements_have_no_histogram(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            stats = reader.statistics("Z", "gps_time", "scan_angle_rank",
+                                      "user_data")
+        assert stats.fields["Z"].histogram is None
+        assert stats.fields["gps_time"].histogram is None
+        assert stats.fields["scan_angle_rank"].histogram is None
+        assert stats.fields["user_data"].histogram is not None
+
+    def test_the_reader_is_left_after_the_last_point(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            reader.statistics("Z")
+            assert reader.index == reader.num_points
+
+    @pytest.mark.parametrize("name", ["extra_bytes", "no_such_field"])
+    def test_a_field_must_be_one_number(self, name):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError):
+                reader.statistics(name)
+
+    def test_threads_are_at_least_one(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="threads"):
+                reader.statistics(threads=0)
+
+    def test_threads_need_a_file_name(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "flight")
+        with open(path, "rb") as fp, Reader(fp) as reader:
+            assert reader.statistics("Z").num_points == 60000
+            with pytest.raises(ValueError, match="by name"):
+                reader.statistics("Z", threads=2)
@@ -0,0 +1,259 @@
+import io
+import pathlib
+import sys
+import sysconfig
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import lazpy.reader
+from lazpy import ADAPTIVE_CHUNK_SIZE, Reader, SpatialIndex
+from helpers import fixture, survey
+from test_ranges import Memory
+
+
+# ---------------------------------------------------------------------------
+# One reader, several threads.
+#
+# The calls that say where to read decode through a cursor of the calling
+# thread's own, so a reader shared by a pool of threads answers each of them
+# as a reader of its own would -- without any of them opening the file again
+# or reading its header.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+BLOCKS = [(start, 7000) for start in range(0, 120000, 7000)] * 2
+RECTS = [(x, 0, x + 900, 10) for x in range(0, 1200000, 31000)]
+
+
+def in_threads(call, args, threads=8):
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(lambda a: call(*a), args))
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    path = survey(tmp_path / "survey.laz", count=120000)
+    with Reader(path) as reader:
+        reader.write_spatial_index(cell_size=50.0)
+    return path
+
+
+class TestSharing:
+
+    @pytest.mark.parametrize("name", ["survey.laz", "survey.las",
+                                      "adaptive.laz"])
+    def test_blocks_read_at_once(self, tmp_path, name):
+        path = survey(tmp_path / name, count=120000, chunk_size=(
+            ADAPTIVE_CHUNK_SIZE if name == "adaptive.laz" else 5000))
+        with Reader(path) as reader:
+            expected = reader.arrays("X", "gps_time")
+            found = in_threads(
+                lambda start, count: reader.arrays(
+                    "X", "gps_time", start=start, count=count), BLOCKS)
+        for (start, count), block in zip(BLOCKS, found):
+            same(block, {k: v[start:start + count]
+                         for k, v in expected.items()})
+
+    def test_areas_queried_at_once(self, indexed):
+        with Reader(indexed) as reader:
+            expected = [reader.arrays_within("X", "Z", rect=rect)
+                        for rect in RECTS]
+        with Reader(indexed) as reader:
+            found = in_threads(
+                lambda rect: reader.arrays_within("X", "Z", rect=rect),
+                [(rect,) for rect in RECTS])
+            assert reader.has_spatial_index
+        for a, b in zip(found, expected):
+            same(a, b)
+        assert sum(len(a["X"]) for a in found) > 0
+
+    def test_time_windows_at_once(self, indexed):
+        windows = [(t, t + 500.0) for t in range(0, 60000, 4000)]
+        with Reader(indexed) as reader:
+            expected = [reader.arrays_between(t0, t1, "X")
+                        for t0, t1 in windows]
+            found = in_threads(
+                lambda t0, t1: reader.arrays_between(t0, t1, "X"), windows)
+        for a, b in zip(found, expected):
+            same(a, b)
+
+    @pytest.mark.parametrize("name", ["pt1_v1_pointwise.laz", "pt3_v2.laz",
+                                      "pt7_v3.laz"])
+    def test_fixtures(self, name):
+        with Reader(fixture(name)) as reader:
+            expected = reader.arrays("X", "Y")
+            n = len(expected["X"])
+            blocks = [(start, 7) for start in range(0, n, max(n // 16, 1))]
+            found = in_threads(
+                lambda start, count: reader.arrays(
+                    "X", "Y", start=start, count=count), blocks)
+        for (start, count), block in zip(blocks, found):
+            same(block, {k: v[start:start + count]
+                         for k, v in expected.items()})
+
+    def test_a_range_reader(self, indexed):
+        data = pathlib.Path(indexed).read_bytes()
+        lax = pathlib.Path(indexed).with_suffix(".lax").read_bytes()
+        with Reader(indexed) as reader:
+            expected = [reader.arrays_within("X", rect=rect)
+                        for rect in RECTS]
+        with Reader(Memory(data, {".lax": lax})) as reader:
+            found = in_threads(
+                lambda rect: reader.arrays_within("X", rect=rect),
+                [(rect,) for rect in RECTS])
+        for a, b in zip(found, expected):
+            same(a, b)
+
+    def test_a_file_object_takes_turns(self, indexed):
+        with Reader(indexed) as reader:
+            expected = reader.arrays("X")["X"]
+        with open(indexed, "rb") as fp, Reader(fp) as reader:
+            found = in_threads(
+                lambda start, count: reader.arrays(
+                    "X", start=start, count=count), BLOCKS)
+        for (start, count), block in zip(BLOCKS, found):
+            assert np.array_equal(block["X"], expected[start:start + count])
+
+
+class TestTheCursors:
+
+    def test_nothing_is_opened_or_parsed_again(self, indexed, monkeypatch):
+        with Reader(indexed) as reader:
+            reader.has_spatial_index
+            opened, parsed = [], []
+            monkeypatch.setattr(lazpy.reader, "open",
+                                lambda *a, **k: opened.append(a),
+                                raising=False)
+            header = lazpy.reader._read_las_header
+            monkeypatch.setattr(lazpy.reader, "_read_las_header",
+                                lambda fp: parsed.append(fp) or header(fp))
+            in_threads(lambda rect: reader.arrays_within("X", rect=rect),
+                       [(rect,) for rect in RECTS])
+            assert opened == []
+            assert parsed == []
+
+    def test_the_openers_position_is_its_own(self, indexed):
+        with Reader(indexed) as reader:
+            expected = reader.arrays("X", start=0)["X"]
+            reader.seek(31234)
+            in_threads(lambda start, count: reader.arrays(
+                "X", start=start, count=count), BLOCKS)
+            assert reader.index == 31234
+            assert np.array_equal(reader.arrays("X", count=10)["X"],
+                                  expected[31234:31244])
+
+    def test_cursors_are_kept_for_the_next_call(self, indexed):
+        with Reader(indexed) as reader:
+            for _ in range(3):
+                in_threads(lambda start, count: reader.arrays(
+                    "X", start=start, count=count), BLOCKS, threads=4)
+            assert 1 <= len(reader._spares) <= 4
+
+    def test_the_index_is_looked_for_once(self, indexed, monkeypatch):
+        looked = []
+        sidecar = Reader._sidecar_index_data
+
+        def counted(self, dims=2):
+            looked.append(dims)
+            return sidecar(self, dims)
+
+        monkeypatch.setattr(Reader, "_sidecar_index_data", counted)
+        with Reader(indexed) as reader:
+            barrier = threading.Barrier(8)
+
+            def index():
+                barrier.wait()
+                return reader.spatial_index
+
+            found = in_threads(index, [()] * 8)
+        assert looked == [2]
+        assert all(index is found[0] is not None for index in found)
+
+    def test_threads_for_statistics_from_a_range_reader(self, indexed):
+        with Reader(indexed) as reader:
+            # in the same parts, so that they add up the same way
+            expected = reader.statistics("X", "Z", threads=4)
+        data = pathlib.Path(indexed).read_bytes()
+        with Reader(Memory(data)) as reader:
+            assert reader.statistics("X", "Z", threads=4) == expected
+
+    def test_closed_under_another_thread(self, indexed):
+        reader = Reader(indexed)
+        in_threads(lambda: reader.arrays("X", start=0, count=10), [()])
+        reader.close()
+        assert reader._spares == []
+        with pytest.raises(ValueError, match="closed"):
+            in_threads(lambda: reader.arrays("X", start=0, count=10), [()])
+
+
+class Calling(io.FileIO):
+    """A file that calls *call* before each read."""
+    call = None
+
+    def readinto(self, b):
+        if self.call is not None:
+            self.call()
+        return super().readinto(b)
+
+
+class TestOneCallAtATime:
+
+    def test_a_second_thread_waits_for_the_first(self, indexed):
+        # the point reader itself, with nothing of Reader's around it
+        started = threading.Event()
+
+        def slowly():
+            started.set()
+            threading.Event().wait(0.005)
+
+        with Calling(indexed) as fp, Reader(fp) as reader:
+            points = reader._points()
+            points.seek(0)
+            fp.call = slowly
+            with ThreadPoolExecutor(1) as pool:
+                decoding = pool.submit(points.checksum, len(reader))
+                started.wait()
+                # not the index part of the way through, but the one the
+                # checksum leaves behind it
+                assert points.index == len(reader)
+                assert decoding.result()[1] == len(reader)
+
+    def test_calling_back_in_raises(self, indexed):
+        with Calling(indexed) as fp, Reader(fp) as reader:
+            points = reader._points()
+            points.seek(0)
+            fp.call = lambda: points.index
+            with pytest.raises(RuntimeError, match="already in a call"):
+                points.checksum(len(reader))
+
+    def test_cancel_reaches_a_reader_in_a_call(self, indexed):
+        with Calling(indexed) as fp, Reader(fp) as reader:
+            points = reader._points()
+            points.seek(0)
+            fp.call = points.cancel
+            with pytest.raises(lazpy.LazError, match="cancelled"):
+                points.checksum(len(reader))
+            points.cancel(False)
+
+    def test_an_index_shared_by_threads(self, indexed):
+        index = SpatialIndex(
+            pathlib.Path(indexed).with_suffix(".lax").read_bytes())
+        expected = [index.intervals(*rect) for rect in RECTS]
+        assert in_threads(lambda rect: index.intervals(*rect),
+                          [(rect,) for rect in RECTS]) == expected
+        assert any(expected)
+
+    @pytest.mark.skipif(not sysconfig.get_config_var("Py_GIL_DISABLED"),
+                        reason="a free-threaded build of Python")
+    def test_importing_leaves_the_gil_off(self):
+        assert not sys._is_gil_enabled()
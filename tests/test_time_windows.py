@@ -0,0 +1,209 @@
+import pytest
+
+from lazpy import Compressor, Reader, Writer
+from helpers import fixture
+
+
+# ---------------------------------------------------------------------------
+# Time windows.
+#
+# Reader.arrays_between and points_between bisect a file's chunks by time
+# where its points are in time order, and scan it where they are not; either
+# way they have to find what filtering every point's time would.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def flight(path, times, chunk_size=1000, **kwargs):
+    """A file of points at *times*, each point's X its own number so that
+    which points came back can be told from X alone."""
+    times = np.asarray(times, dtype=np.float64)
+    with Writer(str(path), 1, chunk_size=chunk_size, **kwargs) as writer:
+        writer.write_arrays({"X": np.arange(len(times)), "gps_time": times})
+    return str(path)
+
+
+def in_window(times, t0, t1):
+    return np.flatnonzero((times >= t0) & (times < t1))
+
+
+def line(count=20000, seed=5):
+    """Times as a flight line's are: rising, unevenly, with repeats."""
+    rng = np.random.default_rng(seed)
+    steps = rng.random(count) * (rng.random(count) > 0.1)
+    return 3.0e8 + np.cumsum(steps * 1e-3)
+
+
+def tile():
+    """Two flight lines across one tile, fifty seconds apart, their points
+    interleaved as a tile cut from both has them."""
+    times = np.empty(12000)
+    times[0::2], times[1::2] = line(6000, seed=1), line(6000, seed=2) + 50.0
+    return times
+
+
+class TestArraysBetween:
+
+    @pytest.mark.parametrize("window", [(0.3, 0.9), (0.0, 1.0), (0.5, 0.5),
+                                        (-1.0, 0.1), (0.95, 2.0),
+                                        (-2.0, -1.0), (1.5, 3.0)])
+    def test_a_window_is_what_filtering_finds(self, tmp_path, window):
+        times = line()
+        path = flight(tmp_path / "line.laz", times)
+        span = times[-1] - times[0]
+        t0, t1 = (times[0] + span * w for w in window)
+        with Reader(path) as reader:
+            a = reader.arrays_between(t0, t1, "X", "gps_time")
+        assert a["X"].tolist() == in_window(times, t0, t1).tolist()
+        assert ((a["gps_time"] >= t0) & (a["gps_time"] < t1)).all()
+
+    def test_the_window_is_half_open(self, tmp_path):
+        times = np.repeat(np.arange(10.0), 300)
+        path = flight(tmp_path / "steps.laz", times)
+        with Reader(path) as reader:
+            a = reader.arrays_between(3.0, 5.0, "X")
+        assert a["X"].tolist() == list(range(900, 1500))
+
+    def test_only_the_chunks_in_the_window_are_decoded(self, tmp_path,
+                                                       monkeypatch):
+        times = line(40000)
+        path = flight(tmp_path / "line.laz", times)
+        t0, t1 = times[22222], times[23456]
+        seen = []
+        with Reader(path) as reader:
+            arrays = Reader.arrays
+
+            def counting(self, *names, start=None, count=None):
+                seen.append((start, count))
+                return arrays(self, *names, start=start, count=count)
+
+            monkeypatch.setattr(Reader, "arrays", counting)
+            a = reader.arrays_between(t0, t1, "X")
+        assert a["X"].tolist() == in_window(times, t0, t1).tolist()
+        # the two chunks the window is in and nothing else, decoded once:
+        # the answer is cut from what was read to find where it begins
+        assert seen == [(22000, 2000)]
+
+    @pytest.mark.parametrize("names", [(), ("X",), ("gps_time", "X")])
+    def test_the_answer_is_cut_from_the_blocks_read(self, tmp_path,
+                                                    monkeypatch, names):
+        times = line(40000)
+        path = flight(tmp_path / "line.laz", times)
+        monkeypatch.setattr(Reader, "WITHIN_BLOCK", 777)
+        with Reader(path) as reader:
+            every = reader.arrays(*names, start=0)
+            for first, last in [(999, 30001), (5, 6), (1234, 1234),
+                                (0, 39999)]:
+                t0, t1 = times[first], times[last]
+                found = in_window(times, t0, t1)
+                a = reader.arrays_between(t0, t1, *names)
+                assert list(a) == list(every)
+                for name in every:
+                    assert np.array_equal(a[name], every[name][found]), name
+
+    def test_a_tile_out_of_time_order_is_scanned(self, tmp_path):
+        times = tile()
+        path = flight(tmp_path / "tile.laz", times)
+        t0, t1 = times[2000], times[8000]
+        with Reader(path) as reader:
+            assert reader._time_range(t0, t1) is None
+            a = reader.arrays_between(t0, t1, "X", "gps_time")
+        assert a["X"].tolist() == in_window(times, t0, t1).tolist()
+
+    def test_chunks_in_order_around_points_that_are_not(self, tmp_path):
+        # every chunk begins later than the one before, but inside one of
+        # them time runs backwards
+        times = line(5000)
+        times[2100:2200] = times[2100:2200][::-1]
+        path = flight(tmp_path / "swapped.laz", times)
+        t0, t1 = times[2000], times[2300]
+        with Reader(path) as reader:
+            assert reader._time_range(t0, t1) is None
+            a = reader.arrays_between(t0, t1, "X")
+        assert a["X"].tolist() == in_window(times, t0, t1).tolist()
+
+    def test_a_plain_las_file_is_bisected_too(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Reader, "TIME_STRIDE", 700)
+        times = line(10000)
+        path = flight(tmp_path / "line.las", times)
+        t0, t1 = times[4321], times[5678]
+        start, stop = np.searchsorted(times, (t0, t1))
+        with Reader(path) as reader:
+            assert reader._time_range(t0, t1) == (start, stop - start)
+            a = reader.arrays_between(t0, t1, "X")
+        assert a["X"].tolist() == in_window(times, t0, t1).tolist()
+
+    def test_a_pointwise_file_is_scanned(self, tmp_path):
+        times = line(3000)
+        path = flight(tmp_path / "pointwise.laz", times,
+                      compressor=Compressor.POINTWISE)
+        with Reader(path) as reader:
+            assert reader._time_range(times[10], times[20]) is None
+            a = reader.arrays_between(times[10], times[20], "X")
+        assert a["X"].tolist() == in_window(times, times[10],
+                                            times[20]).tolist()
+
+    def test_no_names_is_every_field(self, tmp_path):
+        times = line(3000)
+        path = flight(tmp_path / "line.laz", times)
+        with Reader(path) as reader:
+            a = reader.arrays_between(times[100], times[200])
+            b = reader.arrays(start=0)
+        keep = in_window(times, times[100], times[200])
+        assert set(a) == set(b)
+        for name in a:
+            assert (a[name] == b[name][keep]).all(), name
+
+    def test_a_scan_keeps_gps_time_only_when_asked(self, tmp_path):
+        times = line(3000)[::-1].copy()
+        path = flight(tmp_path / "backwards.laz", times)
+        with Reader(path) as reader:
+            assert list(reader.arrays_between(times[200], times[100],
+                                              "X")) == ["X"]
+            assert reader.arrays_between(0.0, 1.0, "X")["X"].size == 0
+
+    @pytest.mark.parametrize("name", ["pt1_v2.laz", "pt6_v3.laz",
+                                      "pt1_v0.las"])
+    def test_the_fixtures(self, name):
+        with Reader(fixture(name)) as reader:
+            times = reader.arrays("gps_time")["gps_time"]
+            t0, t1 = np.quantile(times, [0.25, 0.6])
+            a = reader.arrays_between(t0, t1, "gps_time")
+        assert a["gps_time"].tolist() == \
+            times[in_window(times, t0, t1)].tolist()
+
+    def test_a_format_without_time_has_no_window(self):
+        with Reader(fixture("pt0_v0.las")) as reader:
+            with pytest.raises(ValueError, match="no GPS time"):
+                reader.arrays_between(0.0, 1.0)
+
+    @pytest.mark.parametrize("window", [(2.0, 1.0), (float("nan"), 1.0)])
+    def test_a_window_runs_forward(self, window):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="window"):
+                reader.arrays_between(*window)
+
+
+class TestPointsBetween:
+
+    def test_the_points_are_those_the_arrays_are(self, tmp_path):
+        times = line()
+        path = flight(tmp_path / "line.laz", times)
+        t0, t1 = times[7000], times[9100]
+        with Reader(path) as reader:
+            xs = [point.X for point in reader.points_between(t0, t1)]
+        assert xs == in_window(times, t0, t1).tolist()
+
+    def test_a_scan_yields_them_in_file_order(self, tmp_path):
+        times = tile()
+        path = flight(tmp_path / "tile.laz", times, chunk_size=300)
+        t0, t1 = times[100], times[3000]
+        with Reader(path) as reader:
+            xs = [point.X for point in reader.points_between(t0, t1)]
+        assert xs == in_window(times, t0, t1).tolist()
+
+    def test_the_window_is_checked_when_asked_for(self):
+        with Reader(fixture("pt0_v0.las")) as reader:
+            with pytest.raises(ValueError, match="no GPS time"):
+                reader.points_between(0.0, 1.0)
@@ -0,0 +1,164 @@
+import pytest
+
+from lazpy import Reader, Writer
+from helpers import FIXTURES, fixture, survey
+
+
+# ---------------------------------------------------------------------------
+# Voxel thinning.
+#
+# Reader.voxel_downsample does in one pass in C what numpy does with the whole
+# file decoded and np.unique over the cells, so numpy is the reference: the
+# same cells from the same georeferenced coordinates, and for each the point
+# each rule says to keep.
+# ---------------------------------------------------------------------------
+
+np = pytest.importorskip("numpy")
+
+
+def thinned_by_numpy(path, size, keep, names=None):
+    """What voxel_downsample should return, the memory-hungry way."""
+    with Reader(path) as reader:
+        columns = reader.arrays(*(names or ()))
+        xyz = reader.xyz(start=0)
+    size = np.broadcast_to(np.asarray(size, dtype=np.float64), (3,))
+    cells = np.floor(xyz / size).astype(np.int64)
+    _, first, voxel_of = np.unique(cells, axis=0, return_index=True,
+                                   return_inverse=True)
+    voxel_of = voxel_of.reshape(-1)
+    order = np.argsort(first)               # voxels by their first point
+    if keep == "first":
+        kept = first[order]
+    else:
+        z = columns["Z"] if "Z" in columns else reader_z(path)
+        rank = z if keep == "lowest" else -z.astype(np.int64)
+        # the first of the lowest: sorted by voxel, then by Z, then by index
+        by = np.lexsort((np.arange(len(z)), rank, voxel_of))
+        starts = np.r_[0, np.flatnonzero(np.diff(voxel_of[by])) + 1]
+        kept = by[starts][order]
+    return {name: column[kept] for name, column in columns.items()}
+
+
+def reader_z(path):
+    with Reader(path) as reader:
+        return reader.arrays("Z")["Z"]
+
+
+@pytest.mark.parametrize("keep", ["first", "lowest", "highest"])
+@pytest.mark.parametrize("name", FIXTURES)
+def test_every_fixture_thins_as_numpy_thins_it(name, keep):
+    expected = thinned_by_numpy(fixture(name), 0.5, keep)
+    with Reader(fixture(name)) as reader:
+        got = reader.voxel_downsample(size=0.5, keep=keep)
+    assert list(got) == list(expected)
+    for field in expected:
+        assert np.array_equal(got[field], expected[field]), field
+
+
+class TestVoxelDownsample:
+
+    @pytest.mark.parametrize("size", [1.0, (2.0, 0.5, 3.0), (0.25, 4.0, 1.0)])
+    @pytest.mark.parametrize("keep", ["first", "lowest", "highest"])
+    def test_a_survey_thins_as_numpy_thins_it(self, tmp_path, size, keep):
+        path = survey(tmp_path / "survey.laz", "square", 20000, 3000,
+                      offsets=(1000.0, 2000.0, 0.0))
+        expected = thinned_by_numpy(path, size, keep, ("X", "Y", "Z",
+                                                       "intensity"))
+        with Reader(path) as reader:
+            got = reader.voxel_downsample("X", "Y", "Z", "intensity",
+                                          size=size, keep=keep)
+        assert 1000 < len(got["X"]) < 20000
+        for field in expected:
+            assert np.array_equal(got[field], expected[field]), field
+
+    def test_a_centroid_is_the_mean_of_its_points(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 20000, 3000,
+                      offsets=(1000.0, 2000.0, 0.0))
+        with Reader(path) as reader:
+            a = reader.arrays("X", "Y", "Z", "intensity")
+            cells = np.floor(reader.xyz(start=0) / 2.0).astype(np.int64)
+            got = reader.voxel_downsample("X", "Y", "Z", "intensity",
+                                          size=2.0)
+        first = thinned_by_numpy(path, 2.0, "first", ("intensity",))
+        _, voxel_of = np.unique(cells, axis=0, return_inverse=True)
+        voxel_of = voxel_of.reshape(-1)
+        # the first point's other fields, at the mean of every point's XYZ
+        assert np.array_equal(got["intensity"], first["intensity"])
+        for axis in "XYZ":
+            sums = np.bincount(voxel_of, weights=a[axis])
+            means = np.floor(sums / np.bincount(voxel_of) + 0.5)
+            mine = voxel_of[np.searchsorted(a["intensity"],
+                                            got["intensity"])]
+            assert np.array_equal(got[axis], means[mine]), axis
+
+    def test_columns_take_in_every_elevation(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 20000, 3000,
+                      offsets=(1000.0, 2000.0, 0.0))
+        with Reader(path) as reader:
+            columns = reader.voxel_downsample("X", "Y", "Z", size=(5.0, 5.0),
+                                              keep="lowest")
+            cubes = reader.voxel_downsample("X", size=5.0, keep="lowest")
+        assert len(columns["X"]) == 100          # a 50 m square, 5 m cells
+        assert len(cubes["X"]) > 100
+        expected = thinned_by_numpy(path, (5.0, 5.0, 1e9), "lowest",
+                                    ("X", "Y", "Z"))
+        for field in expected:
+            assert np.array_equal(columns[field], expected[field]), field
+
+    def test_an_area_thins_only_what_is_inside_it(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 20000, 3000,
+                      offsets=(1000.0, 2000.0, 0.0))
+        rect = (990.0, 1990.0, 1010.0, 2005.0)
+        with Reader(path) as reader:
+            inside = reader.arrays_within("X", "Y", "Z", rect=rect)
+            got = reader.voxel_downsample("X", "Y", "Z", size=1.0,
+                                          keep="first", rect=rect)
+        cells = np.floor(
+            np.column_stack([inside[axis] * 0.01 for axis in "XYZ"])
+            + [1000.0, 2000.0, 0.0]).astype(np.int64)
+        _, first = np.unique(cells, axis=0, return_index=True)
+        assert np.array_equal(got["X"], inside["X"][np.sort(first)])
+
+    def test_a_writer_is_given_the_thinned_points(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 20000, 3000,
+                      offsets=(1000.0, 2000.0, 0.0))
+        out = str(tmp_path / "thinned.laz")
+        with Reader(path) as reader:
+            expected = reader.voxel_downsample(size=1.0)
+            expected.pop("extra_bytes", None)
+            with Writer(out, 1, scales=reader.scales,
+                        offsets=reader.offsets) as writer:
+                written = reader.voxel_downsample(size=1.0, writer=writer)
+        assert written == len(expected["X"])
+        with Reader(out) as thinned:
+            got = thinned.arrays()
+        for field in expected:
+            assert np.array_equal(got[field], expected[field]), field
+
+    def test_the_extra_bytes_come_with_the_point_kept(self):
+        name = "pt1_v2.laz"
+        expected = thinned_by_numpy(fixture(name), 1.0, "highest")
+        with Reader(fixture(name)) as reader:
+            got = reader.voxel_downsample("extra_bytes", size=1.0,
+                                          keep="highest")
+        assert np.array_equal(got["extra_bytes"], expected["extra_bytes"])
+
+    def test_nothing_inside_is_no_points(self, tmp_path):
+        path = survey(tmp_path / "survey.laz", "square", 20000, 3000,
+                      offsets=(1000.0, 2000.0, 0.0))
+        with Reader(path) as reader:
+            got = reader.voxel_downsample("X", "return_number", size=1.0,
+                                          rect=(0.0, 0.0, 1.0, 1.0))
+        assert len(got["X"]) == 0 and len(got["return_number"]) == 0
+
+    @pytest.mark.parametrize("size", [0.0, -1.0, (1.0, 0.0, 1.0),
+                                      (1.0,), (1.0, 1.0, 1.0, 1.0)])
+    def test_a_voxel_has_a_size(self, size):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="size"):
+                reader.voxel_downsample(size=size)
+
+    def test_keep_is_one_of_four(self):
+        with Reader(fixture("pt1_v2.laz")) as reader:
+            with pytest.raises(ValueError, match="median"):
+                reader.voxel_downsample(size=1.0, keep="median")